@@ -0,0 +1,58 @@
+"""Add query pattern indexes
+
+Revision ID: 3c1f9a2d4e58
+Revises: 7b86d7397ead
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a2d4e58'
+down_revision = '7b86d7397ead'
+branch_labels = None
+depends_on = None
+
+ACTIVE_STATUS_PREDICATE = sa.text("status IN ('pending', 'in_progress')")
+
+# (index name, table, columns, extra create_index kwargs)
+INDEXES = [
+    ("ix_work_centers_code", "work_centers", ["code"], {}),
+    ("ix_work_orders_priority_delivery", "work_orders", ["priority_level", "datum_isporuke"], {}),
+    ("ix_work_orders_status", "work_orders", ["status"], {}),
+    ("ix_work_orders_updated_at", "work_orders", ["updated_at"], {}),
+    ("ix_work_orders_product_id", "work_orders", ["product_id"], {}),
+    ("ix_work_orders_active_delivery", "work_orders", ["datum_isporuke"],
+     {"postgresql_where": ACTIVE_STATUS_PREDICATE}),
+    ("ix_work_orders_rn_trgm", "work_orders", ["rn"],
+     {"postgresql_using": "gin", "postgresql_ops": {"rn": "gin_trgm_ops"}}),
+    ("ix_products_kpl_trgm", "products", ["kpl"],
+     {"postgresql_using": "gin", "postgresql_ops": {"kpl": "gin_trgm_ops"}}),
+    ("ix_products_name_trgm", "products", ["name"],
+     {"postgresql_using": "gin", "postgresql_ops": {"name": "gin_trgm_ops"}}),
+    ("ix_operations_work_center_status", "operations", ["work_center_id", "status"], {}),
+    ("ix_operations_active_work_center_sequence", "operations", ["work_center_id", "operation_sequence"],
+     {"postgresql_where": ACTIVE_STATUS_PREDICATE}),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Build concurrently so the hot tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
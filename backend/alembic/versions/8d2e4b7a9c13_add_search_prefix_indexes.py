@@ -0,0 +1,39 @@
+"""Add search prefix indexes
+
+Revision ID: 8d2e4b7a9c13
+Revises: 3c1f9a2d4e58
+Create Date: 2026-10-19 10:04:17.552930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4b7a9c13'
+down_revision = '3c1f9a2d4e58'
+branch_labels = None
+depends_on = None
+
+# varchar_pattern_ops lets LIKE 'term%' use a btree regardless of collation
+INDEXES = [
+    ("ix_work_orders_rn_prefix", "work_orders", "rn"),
+    ("ix_products_kpl_prefix", "products", "kpl"),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name, table, [column],
+                postgresql_ops={column: "varchar_pattern_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,45 @@
+"""Add daily operation performance rollups
+
+Revision ID: a3c6e8f1b924
+Revises: f2b8d4e6a071
+Create Date: 2026-10-19 20:26:37.904113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c6e8f1b924'
+down_revision = 'f2b8d4e6a071'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The rollup refresher finds recently changed states by updated_at
+    op.create_index('ix_operation_states_updated_at', 'operation_states', ['updated_at'])
+
+    op.create_table(
+        'operation_performance_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('work_center_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('operation_type', sa.String(200), nullable=False),
+        sa.Column('operations', sa.Integer(), server_default='0'),
+        sa.Column('comparable_operations', sa.Integer(), server_default='0'),
+        sa.Column('planned_minutes', sa.DECIMAL(14, 2), server_default='0'),
+        sa.Column('actual_minutes', sa.DECIMAL(14, 2), server_default='0'),
+        sa.Column('elapsed_minutes', sa.DECIMAL(14, 2), server_default='0'),
+        sa.Column('quantity_completed', sa.BigInteger(), server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime()),
+        sa.PrimaryKeyConstraint('day', 'work_center_id', 'product_id', 'operation_type'),
+    )
+    op.create_index(
+        'ix_operation_performance_daily_work_center_day', 'operation_performance_daily', ['work_center_id', 'day']
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('operation_performance_daily')
+    op.drop_index('ix_operation_states_updated_at', table_name='operation_states')
@@ -0,0 +1,83 @@
+"""Add work order summaries
+
+Revision ID: b57e0c3f6a21
+Revises: 8d2e4b7a9c13
+Create Date: 2026-10-19 11:26:03.840115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b57e0c3f6a21'
+down_revision = '8d2e4b7a9c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'work_order_summaries',
+        sa.Column('work_order_id', sa.Integer(), sa.ForeignKey('work_orders.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('rn', sa.String(50), nullable=False),
+        sa.Column('product_id', sa.Integer()),
+        sa.Column('product_kpl', sa.String(50), nullable=False),
+        sa.Column('product_name', sa.String(200), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('priority_level', sa.Integer()),
+        sa.Column('datum_isporuke', sa.Date()),
+        sa.Column('datum_sastavljanja', sa.Date()),
+        sa.Column('datum_treci', sa.Date()),
+        sa.Column('status', sa.String(20)),
+        sa.Column('work_center_codes', postgresql.ARRAY(sa.String(20))),
+        sa.Column('remaining_hours', sa.DECIMAL(10, 2)),
+        sa.Column('remaining_hours_by_work_center', postgresql.JSONB()),
+        sa.Column('next_operation_id', sa.Integer()),
+        sa.Column('next_operation_naziv', sa.String(200)),
+        sa.Column('next_operation_status', sa.String(20)),
+        sa.Column('next_work_center_code', sa.String(20)),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.Column('refreshed_at', sa.DateTime()),
+    )
+    op.create_index('ix_work_order_summaries_priority_delivery', 'work_order_summaries', ['priority_level', 'datum_isporuke'])
+    op.create_index('ix_work_order_summaries_status', 'work_order_summaries', ['status'])
+    op.create_index('ix_work_order_summaries_work_center_codes', 'work_order_summaries', ['work_center_codes'], postgresql_using='gin')
+
+    # Backfill; afterwards rows are maintained by the application on commit
+    op.execute("""
+        INSERT INTO work_order_summaries
+        SELECT wo.id, wo.rn, wo.product_id, p.kpl, p.name, wo.quantity, wo.priority_level,
+               wo.datum_isporuke, wo.datum_sastavljanja, wo.datum_treci, wo.status,
+               coalesce(agg.work_center_codes, ARRAY[]::varchar[]),
+               coalesce(agg.remaining_hours, 0),
+               coalesce(agg.remaining_hours_by_work_center, '{}'::jsonb),
+               nxt.id, nxt.naziv, nxt.status, nxt.work_center_code,
+               wo.created_at, wo.updated_at, timezone('utc', now())
+          FROM work_orders wo
+          JOIN products p ON p.id = wo.product_id
+          LEFT JOIN LATERAL (
+                SELECT array_agg(wc.code) AS work_center_codes,
+                       sum(o.norma) FILTER (WHERE o.status IN ('pending', 'in_progress')) / 60 AS remaining_hours,
+                       jsonb_object_agg(wc.code, round(o.norma / 60, 2)) FILTER (WHERE o.status IN ('pending', 'in_progress'))
+                           AS remaining_hours_by_work_center
+                  FROM operations o
+                  JOIN work_centers wc ON wc.id = o.work_center_id
+                 WHERE o.work_order_id = wo.id
+          ) agg ON true
+          LEFT JOIN LATERAL (
+                SELECT o.id, o.naziv, o.status, wc.code AS work_center_code
+                  FROM operations o
+                  JOIN work_centers wc ON wc.id = o.work_center_id
+                 WHERE o.work_order_id = wo.id
+                   AND o.status IN ('pending', 'in_progress')
+                 ORDER BY o.operation_sequence, o.id
+                 LIMIT 1
+          ) nxt ON true
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('work_order_summaries')
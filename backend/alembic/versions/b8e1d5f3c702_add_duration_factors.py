@@ -0,0 +1,34 @@
+"""Add learned duration factors
+
+Revision ID: b8e1d5f3c702
+Revises: a3c6e8f1b924
+Create Date: 2026-10-19 21:02:14.530218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1d5f3c702'
+down_revision = 'a3c6e8f1b924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'duration_factors',
+        sa.Column('work_center_id', sa.Integer(), nullable=False),
+        sa.Column('product_type_id', sa.Integer(), nullable=False),
+        sa.Column('naziv_pattern', sa.String(100), nullable=False),
+        sa.Column('samples', sa.Integer(), server_default='0'),
+        sa.Column('mean_factor', sa.Float(), server_default='1.0'),
+        sa.Column('m2', sa.Float(), server_default='0'),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.PrimaryKeyConstraint('work_center_id', 'product_type_id', 'naziv_pattern'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('duration_factors')
@@ -0,0 +1,42 @@
+"""Add outbox events
+
+Revision ID: c4d8e2f1a937
+Revises: b57e0c3f6a21
+Create Date: 2026-10-19 14:12:45.208311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e2f1a937'
+down_revision = 'b57e0c3f6a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('aggregate_type', sa.String(30), nullable=False),
+        sa.Column('aggregate_id', sa.Integer()),
+        sa.Column('event_type', sa.String(50), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('published_at', sa.DateTime()),
+        sa.Column('attempts', sa.Integer(), server_default='0'),
+        sa.Column('last_error', sa.Text()),
+    )
+    # The dispatcher only ever scans the unpublished tail
+    op.create_index(
+        'ix_outbox_events_unpublished', 'outbox_events', ['id'],
+        postgresql_where=sa.text('published_at IS NULL')
+    )
+    op.create_index('ix_outbox_events_published_at', 'outbox_events', ['published_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('outbox_events')
@@ -0,0 +1,59 @@
+"""Add shift calendar and per-shift OEE counters
+
+Revision ID: c9f3a1e7d456
+Revises: b8e1d5f3c702
+Create Date: 2026-10-19 21:48:03.117452
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f3a1e7d456'
+down_revision = 'b8e1d5f3c702'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('operation_events', sa.Column('scrap_quantity', sa.Integer()))
+
+    op.create_table(
+        'shifts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('work_center_id', sa.Integer(), sa.ForeignKey('work_centers.id', ondelete='CASCADE')),
+        sa.Column('name', sa.String(20), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('weekdays', sa.String(7), server_default='12345'),
+        sa.Column('break_minutes', sa.Integer(), server_default='0'),
+        sa.Column('is_active', sa.Boolean(), server_default=sa.true()),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_shifts_work_center_id', 'shifts', ['work_center_id'])
+
+    op.create_table(
+        'oee_shift_stats',
+        sa.Column('work_center_id', sa.Integer(), nullable=False),
+        sa.Column('shift_start', sa.DateTime(), nullable=False),
+        sa.Column('shift_name', sa.String(20), nullable=False),
+        sa.Column('shift_end', sa.DateTime(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('planned_minutes', sa.DECIMAL(10, 2), server_default='0'),
+        sa.Column('run_minutes', sa.DECIMAL(12, 2), server_default='0'),
+        sa.Column('ideal_minutes', sa.DECIMAL(12, 2), server_default='0'),
+        sa.Column('good_quantity', sa.Integer(), server_default='0'),
+        sa.Column('scrap_quantity', sa.Integer(), server_default='0'),
+        sa.Column('stops', sa.Integer(), server_default='0'),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.PrimaryKeyConstraint('work_center_id', 'shift_start', 'shift_name'),
+    )
+    op.create_index('ix_oee_shift_stats_day', 'oee_shift_stats', ['day'])
+
+
+def downgrade() -> None:
+    op.drop_table('oee_shift_stats')
+    op.drop_index('ix_shifts_work_center_id', table_name='shifts')
+    op.drop_table('shifts')
+    op.drop_column('operation_events', 'scrap_quantity')
@@ -0,0 +1,71 @@
+"""Add partitioned history tables
+
+Revision ID: d1e7a3b9c524
+Revises: c4d8e2f1a937
+Create Date: 2026-10-19 15:03:27.611094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1e7a3b9c524'
+down_revision = 'c4d8e2f1a937'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Monthly partitions are created by the archive service as it needs them
+    op.create_table(
+        'work_orders_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=False),
+        sa.Column('rn', sa.String(50), nullable=False),
+        sa.Column('product_id', sa.Integer()),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('priority_level', sa.Integer()),
+        sa.Column('datum_isporuke', sa.Date()),
+        sa.Column('datum_sastavljanja', sa.Date()),
+        sa.Column('datum_treci', sa.Date()),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'completed_at'),
+        postgresql_partition_by='RANGE (completed_at)',
+    )
+    op.create_index('ix_work_orders_history_rn', 'work_orders_history', ['rn'])
+    op.create_index('ix_work_orders_history_product_id', 'work_orders_history', ['product_id'])
+
+    op.create_table(
+        'operations_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=False),
+        sa.Column('work_order_id', sa.Integer(), nullable=False),
+        sa.Column('work_center_id', sa.Integer(), nullable=False),
+        sa.Column('operation_sequence', sa.Integer(), nullable=False),
+        sa.Column('naziv', sa.String(200), nullable=False),
+        sa.Column('norma', sa.DECIMAL(8, 2)),
+        sa.Column('quantity', sa.Integer()),
+        sa.Column('quantity_completed', sa.Integer()),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('dependencies', postgresql.JSONB()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'completed_at'),
+        postgresql_partition_by='RANGE (completed_at)',
+    )
+    op.create_index('ix_operations_history_work_order_id', 'operations_history', ['work_order_id'])
+    op.create_index(
+        'ix_operations_history_work_center_completed', 'operations_history', ['work_center_id', 'completed_at']
+    )
+
+
+def downgrade() -> None:
+    # Dropping a partitioned table drops its partitions
+    op.drop_table('operations_history')
+    op.drop_table('work_orders_history')
@@ -0,0 +1,51 @@
+"""Add work center downtime and planned operation times
+
+Revision ID: d4a7b2e9f183
+Revises: c9f3a1e7d456
+Create Date: 2026-10-19 22:31:40.662801
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7b2e9f183'
+down_revision = 'c9f3a1e7d456'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The archive copies every operations column, so history gets them too
+    for table in ('operations', 'operations_history'):
+        op.add_column(table, sa.Column('estimated_start_time', sa.DateTime()))
+        op.add_column(table, sa.Column('estimated_completion_time', sa.DateTime()))
+
+    op.create_table(
+        'downtimes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column(
+            'work_center_id', sa.Integer(), sa.ForeignKey('work_centers.id', ondelete='CASCADE'), nullable=False
+        ),
+        sa.Column('kind', sa.String(20), nullable=False),
+        sa.Column('reason', sa.String(200)),
+        sa.Column('starts_at', sa.DateTime(), nullable=False),
+        sa.Column('ends_at', sa.DateTime()),
+        sa.Column('expected_end', sa.DateTime()),
+        sa.Column('reported_by', sa.String(100)),
+        sa.Column('note', sa.Text()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_downtimes_work_center_starts', 'downtimes', ['work_center_id', 'starts_at'])
+    op.create_index(
+        'ix_downtimes_open', 'downtimes', ['work_center_id'], postgresql_where=sa.text('ends_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('downtimes')
+    for table in ('operations_history', 'operations'):
+        op.drop_column(table, 'estimated_completion_time')
+        op.drop_column(table, 'estimated_start_time')
@@ -0,0 +1,65 @@
+"""Add shop-floor operation events and derived actual times
+
+Revision ID: e5a9c7d2f316
+Revises: d1e7a3b9c524
+Create Date: 2026-10-19 17:42:08.315920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c7d2f316'
+down_revision = 'd1e7a3b9c524'
+branch_labels = None
+depends_on = None
+
+
+# Archiving copies operations column for column, so history gets the same columns
+_DERIVED_COLUMNS = (
+    ('actual_start_time', sa.DateTime()),
+    ('actual_completion_time', sa.DateTime()),
+    ('running_since', sa.DateTime()),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'operation_events',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('operation_id', sa.Integer(), nullable=False),
+        sa.Column('work_center_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(20), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('recorded_at', sa.DateTime()),
+        sa.Column('quantity', sa.Integer()),
+        sa.Column('terminal_id', sa.String(50)),
+        sa.Column('operator', sa.String(100)),
+        sa.Column('note', sa.Text()),
+        sa.Column('client_event_id', sa.String(64), nullable=False, unique=True),
+    )
+    op.create_index('ix_operation_events_operation_id', 'operation_events', ['operation_id', 'id'])
+    op.create_index(
+        'ix_operation_events_work_center_occurred', 'operation_events', ['work_center_id', 'occurred_at']
+    )
+
+    for table in ('operations', 'operations_history'):
+        for name, column_type in _DERIVED_COLUMNS:
+            op.add_column(table, sa.Column(name, column_type))
+    op.add_column('operations', sa.Column('actual_minutes', sa.DECIMAL(10, 2), server_default='0'))
+    op.add_column('operations_history', sa.Column('actual_minutes', sa.DECIMAL(10, 2)))
+
+    op.create_index(
+        'ix_operations_running_work_center', 'operations', ['work_center_id'],
+        postgresql_where=sa.text('running_since IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_operations_running_work_center', table_name='operations')
+    for table in ('operations', 'operations_history'):
+        op.drop_column(table, 'actual_minutes')
+        for name, _ in reversed(_DERIVED_COLUMNS):
+            op.drop_column(table, name)
+    op.drop_table('operation_events')
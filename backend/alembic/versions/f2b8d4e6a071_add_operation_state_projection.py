@@ -0,0 +1,75 @@
+"""Add operation state projection and snapshots
+
+Revision ID: f2b8d4e6a071
+Revises: e5a9c7d2f316
+Create Date: 2026-10-19 19:11:54.208377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4e6a071'
+down_revision = 'e5a9c7d2f316'
+branch_labels = None
+depends_on = None
+
+
+def _state_columns():
+    return [
+        sa.Column('work_order_id', sa.Integer(), nullable=False),
+        sa.Column('work_center_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('running_since', sa.DateTime()),
+        sa.Column('actual_start_time', sa.DateTime()),
+        sa.Column('actual_completion_time', sa.DateTime()),
+        sa.Column('actual_minutes', sa.DECIMAL(12, 2), server_default='0'),
+        sa.Column('planned_minutes', sa.DECIMAL(12, 2)),
+        sa.Column('quantity', sa.Integer()),
+        sa.Column('quantity_completed', sa.Integer(), server_default='0'),
+        sa.Column('event_count', sa.Integer(), server_default='0'),
+        sa.Column('last_event_id', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime()),
+    ]
+
+
+def upgrade() -> None:
+    op.add_column('operation_events', sa.Column('status', sa.String(20)))
+
+    op.create_table(
+        'operation_states',
+        sa.Column('operation_id', sa.Integer(), primary_key=True),
+        *_state_columns(),
+    )
+    op.create_index(
+        'ix_operation_states_work_center_completed', 'operation_states',
+        ['work_center_id', 'actual_completion_time']
+    )
+
+    op.create_table(
+        'projection_snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('projection', sa.String(50), nullable=False),
+        sa.Column('event_horizon', sa.BigInteger(), nullable=False),
+        sa.Column('row_count', sa.Integer(), server_default='0'),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_projection_snapshots_projection_id', 'projection_snapshots', ['projection', 'id'])
+
+    op.create_table(
+        'operation_state_snapshots',
+        sa.Column(
+            'snapshot_id', sa.Integer(),
+            sa.ForeignKey('projection_snapshots.id', ondelete='CASCADE'), primary_key=True
+        ),
+        sa.Column('operation_id', sa.Integer(), primary_key=True),
+        *_state_columns(),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('operation_state_snapshots')
+    op.drop_table('projection_snapshots')
+    op.drop_table('operation_states')
+    op.drop_column('operation_events', 'status')
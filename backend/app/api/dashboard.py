@@ -0,0 +1,18 @@
+"""
+Dashboard API endpoints
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.schemas.dashboard import DashboardResponse
+from app.services.dashboard_rollups import dashboard_rollups
+
+router = APIRouter()
+
+
+@router.get("/", response_model=DashboardResponse)
+async def get_dashboard(db: AsyncSession = Depends(get_db)):
+    """Get all dashboard counters (served from in-process rollups)"""
+    
+    return await dashboard_rollups.snapshot(db)
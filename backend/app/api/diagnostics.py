@@ -0,0 +1,46 @@
+"""
+Diagnostics API endpoints: captured slow requests and N+1 suspects
+"""
+from fastapi import APIRouter, Query
+
+from app.database.connection import settings
+from app.utils.instrumentation import n_plus_one_suspects, slow_requests
+
+router = APIRouter()
+
+
+@router.get("/slow-requests")
+async def get_slow_requests(
+    limit: int = Query(20, ge=1, le=1000),
+    include_statements: bool = Query(True, description="Include the captured SQL statements")
+):
+    """Requests slower than slow_request_ms, newest first, with their SQL"""
+    
+    captured = list(slow_requests)[-limit:][::-1]
+    if not include_statements:
+        captured = [{key: value for key, value in entry.items() if key != "statements"} for entry in captured]
+    return {
+        "threshold_ms": settings.slow_request_ms,
+        "buffer_size": slow_requests.maxlen,
+        "captured": len(slow_requests),
+        "requests": captured
+    }
+
+
+@router.delete("/slow-requests")
+async def clear_slow_requests():
+    """Empty the slow request buffer"""
+    
+    cleared = len(slow_requests)
+    slow_requests.clear()
+    return {"cleared": cleared}
+
+
+@router.get("/n-plus-one")
+async def get_n_plus_one():
+    """Routes whose latest flagged request repeated a statement n_plus_one_threshold times or more"""
+    
+    return {
+        "threshold": settings.n_plus_one_threshold,
+        "routes": sorted(n_plus_one_suspects.values(), key=lambda suspect: suspect["at"], reverse=True)
+    }
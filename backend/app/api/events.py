@@ -0,0 +1,66 @@
+"""
+Server-sent events API endpoint for live schedule and status updates
+"""
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.repositories.work_center_registry import work_center_registry
+from app.services.event_bus import event_bus, Event
+
+router = APIRouter()
+
+# Comment frames keep proxies from closing idle streams
+KEEPALIVE_SECONDS = 15.0
+
+
+def format_event(event: Event) -> str:
+    """Render an event as an SSE frame"""
+    return f"id: {event.stream_id}\nevent: {event.type}\ndata: {json.dumps(event.data, default=str)}\n\n"
+
+
+@router.get("/")
+async def stream_events(
+    request: Request,
+    work_center: Optional[List[str]] = Query(None, description="Work center codes to follow (default: all)"),
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream operation status, sequence and work order changes as server-sent events"""
+
+    work_center_ids = None
+    if work_center:
+        work_center_ids = set()
+        for code in work_center:
+            work_center_id = await work_center_registry.resolve_id(db, code)
+            if work_center_id is None:
+                raise HTTPException(status_code=404, detail=f"Work center not found: {code}")
+            work_center_ids.add(work_center_id)
+
+    # The stream outlives the request's session; release it now
+    await db.close()
+
+    subscription = event_bus.subscribe(work_center_ids, last_event_id=last_event_id)
+
+    async def frames():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,75 @@
+"""
+Streaming export API endpoints
+"""
+import os
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+
+from app.services.export_service import (
+    DATASETS,
+    MEDIA_TYPES,
+    FILE_EXTENSIONS,
+    ExportFormat,
+    arrow_available,
+    export_stream,
+    resolve_filters,
+)
+from app.services.excel_export import export_plan_to_temp_file
+
+router = APIRouter()
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@router.get("/plan/xlsx")
+async def export_plan_xlsx(
+    work_center: Optional[str] = Query(None, description="Only this work center"),
+    start: Optional[datetime] = Query(None, description="Plan start (default: today 07:00)")
+):
+    """Download the active plan in the legacy PRINT layout, one sheet per work center"""
+    
+    filters = await resolve_filters(work_center=work_center)
+    if filters is None:
+        raise HTTPException(status_code=404, detail="Work center not found")
+    
+    result = await export_plan_to_temp_file(work_center_id=filters.work_center_id, start=start)
+    
+    filename = f"Plan_{datetime.now():%Y%m%d_%H%M}.xlsx"
+    return FileResponse(
+        result["path"],
+        media_type=XLSX_MEDIA_TYPE,
+        filename=filename,
+        background=BackgroundTask(os.remove, result["path"])
+    )
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="ndjson, csv or arrow"),
+    work_center: Optional[str] = Query(None, description="Only this work center"),
+    status: Optional[str] = Query(None, description="Only this status"),
+    batch_size: int = Query(2000, ge=100, le=50000, description="Rows fetched per cursor round trip")
+):
+    """Stream operations, schedule or work_orders without loading them into memory"""
+    
+    export = DATASETS.get(dataset)
+    if export is None:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset; choose one of {sorted(DATASETS)}")
+    
+    if format == ExportFormat.ARROW and not arrow_available():
+        raise HTTPException(status_code=501, detail="Arrow export requires the pyarrow package")
+    
+    filters = await resolve_filters(work_center=work_center, status=status)
+    if filters is None:
+        raise HTTPException(status_code=404, detail="Work center not found")
+    
+    filename = f"{dataset}_{datetime.now():%Y%m%d_%H%M%S}.{FILE_EXTENSIONS[format]}"
+    return StreamingResponse(
+        export_stream(export, format, filters, batch_size),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
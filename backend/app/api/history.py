@@ -0,0 +1,111 @@
+"""
+Production history API endpoints: archived work orders, operations and reports
+"""
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.repositories.history import HistoryRepository
+from app.repositories.work_center_registry import work_center_registry
+from app.services.archive_service import archive_finished_work_orders
+
+router = APIRouter()
+
+
+@router.get("/work-orders")
+async def get_archived_work_orders(
+    date_from: Optional[date] = Query(None, description="Completed on or after"),
+    date_to: Optional[date] = Query(None, description="Completed on or before"),
+    status: Optional[str] = Query(None, description="completed or cancelled"),
+    kpl: Optional[str] = Query(None, description="Product KPL"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Archived work orders by completion date"""
+    
+    return await HistoryRepository(db).get_work_orders(
+        date_from=date_from, date_to=date_to, status=status, kpl=kpl, skip=skip, limit=limit
+    )
+
+
+@router.get("/operations")
+async def get_archived_operations(
+    date_from: Optional[date] = Query(None, description="Completed on or after"),
+    date_to: Optional[date] = Query(None, description="Completed on or before"),
+    work_center: Optional[str] = Query(None, description="Work center code"),
+    work_order_id: Optional[int] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Archived operations by completion date"""
+    
+    work_center_id = None
+    if work_center:
+        work_center_id = await work_center_registry.resolve_id(db, work_center)
+        if work_center_id is None:
+            raise HTTPException(status_code=404, detail="Work center not found")
+    
+    return await HistoryRepository(db).get_operations(
+        date_from=date_from, date_to=date_to, work_center_id=work_center_id,
+        work_order_id=work_order_id, skip=skip, limit=limit
+    )
+
+
+@router.get("/summary")
+async def get_history_summary(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Finished operations and hours per month and work center, archived or not"""
+    
+    return await HistoryRepository(db).get_monthly_summary(date_from=date_from, date_to=date_to)
+
+
+@router.get("/partitions")
+async def get_history_partitions(db: AsyncSession = Depends(get_db)):
+    """Monthly partitions of the history tables with their sizes"""
+    
+    return await HistoryRepository(db).get_partitions()
+
+
+@router.post("/archive")
+async def archive_finished(
+    older_than_days: Optional[int] = Query(None, ge=0, description="Default: archive_after_days setting"),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+    max_batches: Optional[int] = Query(None, ge=1)
+):
+    """Move finished work orders and their operations into the history tables"""
+    
+    try:
+        result = await archive_finished_work_orders(
+            older_than_days=older_than_days, batch_size=batch_size, max_batches=max_batches
+        )
+        return result.to_dict()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Archiving failed: {str(e)}")
+
+
+@router.post("/work-orders/{work_order_id}/restore")
+async def restore_work_order(work_order_id: int, db: AsyncSession = Depends(get_db)):
+    """Move an archived work order and its operations back into the active tables"""
+    
+    try:
+        restored = await HistoryRepository(db).restore_work_order(work_order_id)
+        if restored is None:
+            raise HTTPException(status_code=404, detail="Archived work order not found")
+        await db.commit()
+        return {"work_order_id": work_order_id, **restored}
+    except HTTPException:
+        raise
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="An active work order with the same RN already exists")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Restore failed: {str(e)}")
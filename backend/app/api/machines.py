@@ -1,14 +1,24 @@
 """
 Machines/Work Centers API endpoints
 """
+from datetime import datetime, timedelta
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from pydantic import BaseModel
 
 from app.database.connection import get_db
 from app.database.models import WorkCenter, WorkCenterCategory, Operation
+from app.repositories.work_center_registry import work_center_registry
+from app.repositories.downtime import DowntimeRepository, PLANNED, BREAKDOWN
+from app.schemas.downtime import DowntimeCreate, DowntimeResolve, DowntimeResponse
+from app.services.dashboard_rollups import dashboard_rollups
+from app.services.rescheduling import RescheduleResult, publish_reschedule, reschedule_work_centers
+from app.services.shift_calendar import shift_calendar
+from app.utils.response_cache import (
+    cached_json_response, response_cache, table_tag, bulk_tag, work_center_tag
+)
 
 router = APIRouter()
 
@@ -44,88 +54,236 @@ class WorkCenterWithStats(WorkCenterResponse):
 
 @router.get("/", response_model=List[WorkCenterResponse])
 async def get_work_centers(
+    request: Request,
     active_only: bool = True,
     db: AsyncSession = Depends(get_db)
 ):
     """Get list of work centers"""
     
-    query = select(WorkCenter)
-    if active_only:
-        query = query.where(WorkCenter.is_active == True)
+    async def build():
+        work_centers = await work_center_registry.get_all(db, active_only=active_only)
+        
+        return [WorkCenterResponse.model_validate(wc) for wc in work_centers], [table_tag("work_centers")]
     
-    query = query.order_by(WorkCenter.code)
-    result = await db.execute(query)
-    work_centers = result.scalars().all()
-    
-    return [WorkCenterResponse.model_validate(wc) for wc in work_centers]
+    return await cached_json_response(request, build)
 
 
 @router.get("/{work_center_code}", response_model=WorkCenterWithStats)
 async def get_work_center(
     work_center_code: str,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """Get specific work center with statistics"""
     
-    # Get work center
-    wc_query = select(WorkCenter).where(WorkCenter.code == work_center_code)
-    work_center = await db.scalar(wc_query)
+    async def build():
+        # Get work center
+        work_center = await work_center_registry.get_by_code(db, work_center_code)
+        
+        if not work_center:
+            raise HTTPException(status_code=404, detail="Work center not found")
+        
+        # Statistics come from the dashboard rollups, not a per-request aggregate
+        counters = await dashboard_rollups.get_work_center_counters(db, work_center.id)
+        status_distribution = counters["status_distribution"]
+        
+        stats = WorkCenterStats(
+            total_operations=counters["total_operations"],
+            pending_operations=status_distribution.get("pending", 0),
+            in_progress_operations=status_distribution.get("in_progress", 0),
+            completed_operations=status_distribution.get("completed", 0),
+            total_hours=counters["total_hours"]
+        )
+        
+        response = WorkCenterWithStats(
+            **WorkCenterResponse.model_validate(work_center).model_dump(),
+            stats=stats
+        )
+        tags = [table_tag("work_centers"), work_center_tag(work_center.id), bulk_tag("operations")]
+        return response, tags
     
+    return await cached_json_response(request, build)
+
+
+async def _resolve_work_center(db: AsyncSession, work_center_code: str):
+    work_center = await work_center_registry.get_by_code(db, work_center_code)
     if not work_center:
         raise HTTPException(status_code=404, detail="Work center not found")
+    return work_center
+
+
+async def _reschedule(db: AsyncSession, work_center_id: int, reason: str) -> RescheduleResult:
+    """Replan the work center and its alternates, commit and push the plans to planners"""
+    result = await reschedule_work_centers(db, [work_center_id])
+    await db.commit()
+    for affected_id in result.work_center_ids:
+        await response_cache.invalidate(work_center_tag(affected_id))
+    publish_reschedule(result, reason)
+    return result
+
+
+def _reschedule_summary(result: RescheduleResult) -> dict:
+    return {
+        "work_centers": [work_center_registry.peek_code(id) for id in result.work_center_ids],
+        "operations": result.operations,
+        "changed": result.changed,
+        "unscheduled": result.unscheduled,
+        "seconds": result.seconds,
+        "alternates": [
+            {"operation_id": planned.operation_id, **planned.alternate}
+            for plan in result.plans.values() for planned in plan if planned.alternate
+        ]
+    }
+
+
+@router.get("/{work_center_code}/calendar")
+async def get_work_center_calendar(
+    work_center_code: str,
+    days: int = Query(7, ge=1, le=31),
+    db: AsyncSession = Depends(get_db)
+):
+    """Shift windows and downtime of a work center for the coming days"""
+    
+    work_center = await _resolve_work_center(db, work_center_code)
+    
+    start = datetime.utcnow()
+    end = start + timedelta(days=days)
+    await shift_calendar.ensure_loaded(db)
+    shifts = shift_calendar.windows(work_center.id, start, end)
+    downtimes = await DowntimeRepository(db).get_for_work_center(work_center.id, start, end)
     
-    # Get statistics
-    stats_query = select(
-        func.count(Operation.id).label("total_operations"),
-        func.count().filter(Operation.status == "pending").label("pending_operations"),
-        func.count().filter(Operation.status == "in_progress").label("in_progress_operations"),
-        func.count().filter(Operation.status == "completed").label("completed_operations"),
-        func.coalesce(func.sum(Operation.norma), 0).label("total_hours")
-    ).where(Operation.work_center_id == work_center.id)
-    
-    result = await db.execute(stats_query)
-    stats_row = result.first()
-    
-    stats = WorkCenterStats(
-        total_operations=stats_row.total_operations or 0,
-        pending_operations=stats_row.pending_operations or 0,
-        in_progress_operations=stats_row.in_progress_operations or 0,
-        completed_operations=stats_row.completed_operations or 0,
-        total_hours=float(stats_row.total_hours or 0)
+    return {
+        "work_center": work_center_code,
+        "timezone": str(shift_calendar.zone),
+        "shifts": [
+            {
+                "name": window.name,
+                "day": window.day,
+                "start": window.start,
+                "end": window.end,
+                "planned_minutes": window.planned_minutes
+            }
+            for window in shifts
+        ],
+        "downtimes": [DowntimeResponse.model_validate(downtime) for downtime in downtimes]
+    }
+
+
+@router.get("/{work_center_code}/downtimes", response_model=List[DowntimeResponse])
+async def get_downtimes(
+    work_center_code: str,
+    days_back: int = Query(30, ge=0, le=366),
+    db: AsyncSession = Depends(get_db)
+):
+    """Downtime of a work center from days_back ago on, including upcoming windows"""
+    
+    work_center = await _resolve_work_center(db, work_center_code)
+    return await DowntimeRepository(db).get_for_work_center(
+        work_center.id, date_from=datetime.utcnow() - timedelta(days=days_back)
     )
+
+
+@router.post("/{work_center_code}/downtimes")
+async def create_downtime(
+    work_center_code: str,
+    request: DowntimeCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """Plan a maintenance window or report a breakdown; the queue is rescheduled around it"""
+    
+    work_center = await _resolve_work_center(db, work_center_code)
     
-    return WorkCenterWithStats(
-        **WorkCenterResponse.model_validate(work_center).model_dump(),
-        stats=stats
+    now = datetime.utcnow()
+    starts_at = request.starts_at or now
+    if request.kind == PLANNED and request.ends_at is None:
+        raise HTTPException(status_code=422, detail="A planned window needs ends_at")
+    if request.ends_at is not None and request.ends_at <= starts_at:
+        raise HTTPException(status_code=422, detail="ends_at must be after starts_at")
+    
+    downtime = await DowntimeRepository(db).create(
+        work_center_id=work_center.id,
+        kind=request.kind,
+        reason=request.reason,
+        starts_at=starts_at,
+        ends_at=request.ends_at,
+        expected_end=starts_at + timedelta(minutes=request.expected_minutes) if request.expected_minutes else None,
+        reported_by=request.reported_by,
+        note=request.note,
+        created_at=now
     )
+    result = await _reschedule(db, work_center.id, f"downtime.{request.kind}")
+    
+    return {
+        "downtime": DowntimeResponse.model_validate(downtime),
+        "reschedule": _reschedule_summary(result)
+    }
 
 
-@router.get("/{work_center_code}/calendar")
-async def get_work_center_calendar(
+@router.post("/{work_center_code}/downtimes/{downtime_id}/resolve")
+async def resolve_downtime(
     work_center_code: str,
+    downtime_id: int,
+    request: DowntimeResolve = DowntimeResolve(),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get work center calendar (placeholder for future implementation)"""
+    """End a breakdown; the queue is pulled forward again"""
     
-    # Get work center
-    wc_query = select(WorkCenter).where(WorkCenter.code == work_center_code)
-    work_center = await db.scalar(wc_query)
+    work_center = await _resolve_work_center(db, work_center_code)
+    downtime = await DowntimeRepository(db).get(downtime_id)
+    if downtime is None or downtime.work_center_id != work_center.id:
+        raise HTTPException(status_code=404, detail="Downtime not found")
+    if downtime.kind != BREAKDOWN or downtime.ends_at is not None:
+        raise HTTPException(status_code=409, detail="Only open breakdowns can be resolved")
     
-    if not work_center:
-        raise HTTPException(status_code=404, detail="Work center not found")
+    ended_at = request.ended_at or datetime.utcnow()
+    if ended_at < downtime.starts_at:
+        raise HTTPException(status_code=422, detail="ended_at is before the breakdown started")
+    downtime.ends_at = ended_at
+    if request.note:
+        downtime.note = f"{downtime.note}\n{request.note}" if downtime.note else request.note
+    result = await _reschedule(db, work_center.id, "downtime.resolved")
     
-    # Placeholder calendar data
     return {
-        "work_center": work_center_code,
-        "calendar": "Calendar functionality to be implemented",
-        "shifts": {
-            "shift_1": "07:00-15:00",
-            "shift_2": "15:00-23:00", 
-            "shift_3": "23:00-07:00"
-        }
+        "downtime": DowntimeResponse.model_validate(downtime),
+        "reschedule": _reschedule_summary(result)
     }
 
 
+@router.delete("/{work_center_code}/downtimes/{downtime_id}")
+async def delete_downtime(
+    work_center_code: str,
+    downtime_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """Cancel a downtime entered by mistake"""
+    
+    work_center = await _resolve_work_center(db, work_center_code)
+    downtime = await DowntimeRepository(db).get(downtime_id)
+    if downtime is None or downtime.work_center_id != work_center.id:
+        raise HTTPException(status_code=404, detail="Downtime not found")
+    
+    await db.delete(downtime)
+    result = await _reschedule(db, work_center.id, "downtime.cancelled")
+    return {"message": "Downtime deleted", "reschedule": _reschedule_summary(result)}
+
+
+@router.post("/{work_center_code}/reschedule")
+async def reschedule_work_center(
+    work_center_code: str,
+    include_alternates: bool = Query(False, description="Also replan the work centers of the same category"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Replan the queue of a work center around its shifts and downtime"""
+    
+    work_center = await _resolve_work_center(db, work_center_code)
+    result = await reschedule_work_centers(db, [work_center.id], include_alternates=include_alternates)
+    await db.commit()
+    for affected_id in result.work_center_ids:
+        await response_cache.invalidate(work_center_tag(affected_id))
+    publish_reschedule(result, "manual")
+    return _reschedule_summary(result)
+
+
 @router.put("/{work_center_code}/status")
 async def update_work_center_status(
     work_center_code: str,
@@ -134,21 +292,33 @@ async def update_work_center_status(
 ):
     """Update work center status"""
     
-    # Get work center
-    wc_query = select(WorkCenter).where(WorkCenter.code == work_center_code)
-    work_center = await db.scalar(wc_query)
+    # Resolve the code from the registry, then load the row to write by primary key
+    work_center_info = await work_center_registry.get_by_code(db, work_center_code)
     
-    if not work_center:
+    if not work_center_info:
         raise HTTPException(status_code=404, detail="Work center not found")
     
+    work_center = await db.get(WorkCenter, work_center_info.id)
+    
     # Update status
-    if "is_active" in status_data:
+    changed = "is_active" in status_data and work_center.is_active != status_data["is_active"]
+    if changed:
         work_center.is_active = status_data["is_active"]
     
     await db.commit()
+    await response_cache.invalidate(table_tag("work_centers"))
+    
+    # A deactivated work center has no capacity; its queue waits or moves to an alternate
+    reschedule = None
+    if changed:
+        result = await _reschedule(
+            db, work_center.id, "work_center.activated" if work_center.is_active else "work_center.deactivated"
+        )
+        reschedule = _reschedule_summary(result)
     
     return {
         "message": "Work center status updated",
         "work_center": work_center_code,
-        "is_active": work_center.is_active
+        "is_active": work_center.is_active,
+        "reschedule": reschedule
     }
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+OEE API endpoints: availability, performance and quality per work center and shift
+"""
+from datetime import date, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.database.models import Shift
+from app.repositories.work_center_registry import work_center_registry
+from app.schemas.oee import ShiftCalendarUpdate, ShiftResponse
+from app.services.oee import get_current_oee, get_shift_oee, rebuild_oee, summarize
+
+router = APIRouter()
+
+
+async def _work_center_id(db: AsyncSession, work_center: Optional[str]) -> Optional[int]:
+    if not work_center:
+        return None
+    work_center_id = await work_center_registry.resolve_id(db, work_center)
+    if work_center_id is None:
+        raise HTTPException(status_code=404, detail="Work center not found")
+    return work_center_id
+
+
+def _labelled(shifts):
+    rows = []
+    for shift in shifts:
+        row = shift.to_dict()
+        row["work_center"] = work_center_registry.peek_code(shift.work_center_id)
+        rows.append(row)
+    return rows
+
+
+@router.get("/current")
+async def get_current(
+    work_center: Optional[str] = Query(None, description="Work center code"),
+    db: AsyncSession = Depends(get_db)
+):
+    """OEE of the shift running now, per work center"""
+    
+    work_center_id = await _work_center_id(db, work_center)
+    return {"shifts": _labelled(await get_current_oee(db, work_center_id))}
+
+
+@router.get("/shifts")
+async def get_shifts(
+    date_from: Optional[date] = Query(None, description="First plant day; default: 7 days ago"),
+    date_to: Optional[date] = Query(None, description="Last plant day; default: today"),
+    work_center: Optional[str] = Query(None, description="Work center code"),
+    db: AsyncSession = Depends(get_db)
+):
+    """OEE per work center and shift"""
+    
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=6)
+    if date_from > date_to:
+        raise HTTPException(status_code=422, detail="date_from is after date_to")
+    if (date_to - date_from).days > 92:
+        raise HTTPException(status_code=422, detail="At most 93 days per request")
+    work_center_id = await _work_center_id(db, work_center)
+    
+    shifts = await get_shift_oee(db, date_from, date_to, work_center_id)
+    return {"date_from": date_from, "date_to": date_to, "shifts": _labelled(shifts)}
+
+
+@router.get("/work-centers/{code}")
+async def get_work_center_oee(
+    code: str,
+    days_back: int = Query(7, ge=1, le=93),
+    db: AsyncSession = Depends(get_db)
+):
+    """OEE of one work center over the last days, overall and per shift"""
+    
+    work_center_id = await _work_center_id(db, code)
+    date_to = date.today()
+    shifts = await get_shift_oee(db, date_to - timedelta(days=days_back - 1), date_to, work_center_id)
+    return {
+        "work_center": code,
+        "days_back": days_back,
+        "summary": summarize(shifts),
+        "shifts": [shift.to_dict() for shift in shifts]
+    }
+
+
+@router.get("/calendar", response_model=List[ShiftResponse])
+async def get_calendar(
+    work_center: Optional[str] = Query(None, description="Work center code; empty for the plant-wide calendar"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stored shifts of a work center or the plant (the configured default applies where there are none)"""
+    
+    work_center_id = await _work_center_id(db, work_center)
+    stmt = select(Shift).where(
+        Shift.work_center_id == work_center_id if work_center_id is not None else Shift.work_center_id.is_(None)
+    ).order_by(Shift.start_time)
+    return (await db.execute(stmt)).scalars().all()
+
+
+@router.put("/calendar", response_model=List[ShiftResponse])
+async def replace_calendar(
+    request: ShiftCalendarUpdate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Replace the shifts of a work center or the plant. Counters already recorded
+    keep their old shifts until the affected days are rebuilt.
+    """
+    
+    work_center_id = await _work_center_id(db, request.work_center)
+    await db.execute(delete(Shift).where(
+        Shift.work_center_id == work_center_id if work_center_id is not None else Shift.work_center_id.is_(None)
+    ))
+    shifts = [Shift(work_center_id=work_center_id, is_active=True, **shift.model_dump()) for shift in request.shifts]
+    db.add_all(shifts)
+    await db.commit()
+    return shifts
+
+
+@router.post("/rebuild")
+async def rebuild(
+    date_from: date = Query(..., description="First plant day"),
+    date_to: Optional[date] = Query(None, description="Last plant day; default: today")
+):
+    """Recompute the OEE counters of a day range from the event log"""
+    
+    date_to = date_to or date.today()
+    if date_from > date_to:
+        raise HTTPException(status_code=422, detail="date_from is after date_to")
+    return (await rebuild_oee(date_from, date_to)).to_dict()
@@ -0,0 +1,119 @@
+"""
+Performance analytics API endpoints: norma vs actual time per work center, product and operation type
+"""
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.database.models import Product
+from app.repositories.performance import PerformanceRepository, PERFORMANCE_GROUPS
+from app.repositories.work_center import WorkCenterRepository
+from app.repositories.work_center_registry import work_center_registry
+from app.services.performance_rollups import refresh_performance_rollups
+
+router = APIRouter()
+
+
+async def _resolve_filters(db: AsyncSession, work_center: Optional[str], kpl: Optional[str]):
+    work_center_id = product_id = None
+    if work_center:
+        work_center_id = await work_center_registry.resolve_id(db, work_center)
+        if work_center_id is None:
+            raise HTTPException(status_code=404, detail="Work center not found")
+    if kpl:
+        product_id = await db.scalar(select(Product.id).where(Product.kpl == kpl))
+        if product_id is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+    return work_center_id, product_id
+
+
+async def _label_keys(db: AsyncSession, rows, group_by: Optional[str]):
+    """Add readable names for work center and product keys"""
+    if group_by == "work_center":
+        for row in rows:
+            row["work_center"] = work_center_registry.peek_code(row["key"])
+    elif group_by == "product":
+        product_ids = {row["key"] for row in rows if row["key"]}
+        kpls = dict((await db.execute(
+            select(Product.id, Product.kpl).where(Product.id.in_(product_ids))
+        )).all()) if product_ids else {}
+        for row in rows:
+            row["kpl"] = kpls.get(row["key"])
+    return rows
+
+
+@router.get("/efficiency")
+async def get_efficiency(
+    group_by: str = Query("work_center", description=", ".join(PERFORMANCE_GROUPS)),
+    date_from: Optional[date] = Query(None, description="Completed on or after"),
+    date_to: Optional[date] = Query(None, description="Completed on or before"),
+    work_center: Optional[str] = Query(None, description="Work center code"),
+    kpl: Optional[str] = Query(None, description="Product KPL"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Norma vs actual running time per work center, product or operation type"""
+    
+    if group_by not in PERFORMANCE_GROUPS:
+        raise HTTPException(status_code=422, detail=f"group_by must be one of {', '.join(PERFORMANCE_GROUPS)}")
+    work_center_id, product_id = await _resolve_filters(db, work_center, kpl)
+    
+    rows = await PerformanceRepository(db).get_efficiency(
+        group_by=group_by, date_from=date_from, date_to=date_to,
+        work_center_id=work_center_id, product_id=product_id, limit=limit
+    )
+    return {"group_by": group_by, "rows": await _label_keys(db, rows, group_by)}
+
+
+@router.get("/trend")
+async def get_trend(
+    months: int = Query(12, ge=1, le=60),
+    group_by: Optional[str] = Query("work_center", description=f"{', '.join(PERFORMANCE_GROUPS)} or empty for overall"),
+    work_center: Optional[str] = Query(None, description="Work center code"),
+    kpl: Optional[str] = Query(None, description="Product KPL"),
+    operation_type: Optional[str] = Query(None, description="Operation name"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Monthly efficiency with rolling 3-month value, month-over-month change and rank"""
+    
+    group_by = group_by or None
+    if group_by is not None and group_by not in PERFORMANCE_GROUPS:
+        raise HTTPException(status_code=422, detail=f"group_by must be one of {', '.join(PERFORMANCE_GROUPS)}")
+    work_center_id, product_id = await _resolve_filters(db, work_center, kpl)
+    
+    rows = await PerformanceRepository(db).get_trend(
+        months=months, group_by=group_by, work_center_id=work_center_id,
+        product_id=product_id, operation_type=operation_type
+    )
+    return {"months": months, "group_by": group_by, "rows": await _label_keys(db, rows, group_by)}
+
+
+@router.get("/work-centers/{code}")
+async def get_work_center_performance(
+    code: str,
+    days_back: int = Query(30, ge=1, le=366),
+    db: AsyncSession = Depends(get_db)
+):
+    """Performance of one work center over the last days"""
+    
+    result = await WorkCenterRepository(db).get_work_center_performance(code, days_back)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    work_center = result["work_center"]
+    return {
+        "work_center": {"id": work_center.id, "code": work_center.code, "name": work_center.name},
+        "performance": result["performance"]
+    }
+
+
+@router.post("/rollups/refresh")
+async def refresh_rollups(
+    date_from: Optional[date] = Query(None, description="Default: first completion day"),
+    date_to: Optional[date] = Query(None, description="Default: last completion day")
+):
+    """Recompute daily rollups; without dates only recent and changed days"""
+    
+    return await refresh_performance_rollups(date_from=date_from, date_to=date_to)
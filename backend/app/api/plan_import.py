@@ -0,0 +1,40 @@
+"""
+Plan import API endpoints
+"""
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.services.plan_import import MissingPolicy, import_plan, parse_plan_export
+
+router = APIRouter()
+
+
+@router.post("/plan")
+async def import_plan_export(
+    file: UploadFile = File(..., description="ERP plan export (.xlsx)"),
+    dry_run: bool = Query(False, description="Only report what would change"),
+    missing_policy: MissingPolicy = Query(
+        MissingPolicy.COMPLETE, description="What to do with active operations missing from the export"
+    ),
+    db: AsyncSession = Depends(get_db)
+):
+    """Apply an ERP plan export incrementally: only new and changed rows are written"""
+    
+    try:
+        # Parsing is CPU-bound pandas work; keep it off the event loop
+        incoming = await run_in_threadpool(parse_plan_export, file.file)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Cannot read plan export: {e}")
+    
+    try:
+        result = await import_plan(db, incoming, missing_policy=missing_policy, dry_run=dry_run)
+        if dry_run:
+            await db.rollback()
+        else:
+            await db.commit()
+        return result.to_dict()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Plan import failed: {str(e)}")
@@ -2,7 +2,7 @@
 Scheduling API endpoints
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from pydantic import BaseModel
@@ -11,6 +11,13 @@ from enum import Enum
 from app.database.connection import get_db
 from app.database.models import WorkOrder, Operation, WorkCenter
 from app.services.scheduling_service import SchedulingService
+from app.services.duration_model import duration_model, refit as refit_duration_model
+from app.repositories.work_center_registry import work_center_registry
+from app.repositories.operation import OperationRepository
+from app.services.event_bus import event_bus
+from app.utils.response_cache import (
+    cached_json_response, response_cache, table_tag, bulk_tag, work_center_tag
+)
 
 router = APIRouter()
 
@@ -41,6 +48,8 @@ class ScheduleEntry(BaseModel):
     sequence_order: int
     estimated_start: Optional[str] = None
     estimated_end: Optional[str] = None
+    estimated_end_p90: Optional[str] = None
+    correction_factor: Optional[float] = None
 
 
 class OptimizationResponse(BaseModel):
@@ -48,6 +57,7 @@ class OptimizationResponse(BaseModel):
     optimized_schedule: List[ScheduleEntry]
     total_operations: int
     estimated_completion: Optional[str] = None
+    estimated_completion_p90: Optional[str] = None
     conflicts: List[str] = []
 
 
@@ -65,8 +75,7 @@ async def optimize_schedule(
     """Optimize schedule based on selected criteria"""
     
     # Get work center
-    wc_query = select(WorkCenter).where(WorkCenter.code == request.work_center)
-    work_center = await db.scalar(wc_query)
+    work_center = await work_center_registry.get_by_code(db, request.work_center)
     if not work_center:
         raise HTTPException(status_code=404, detail="Work center not found")
     
@@ -96,32 +105,73 @@ async def optimize_schedule(
         )
     
     # Use scheduling service to optimize
-    scheduling_service = SchedulingService()
+    scheduling_service = SchedulingService(db)
     optimized_operations = await scheduling_service.optimize_by_criteria(
         operations_data, request.criteria
     )
+    timings = await scheduling_service.calculate_completion_times(
+        [operation for operation, _ in optimized_operations]
+    )
     
     # Format response
     schedule_entries = []
-    for idx, (operation, work_order_rn) in enumerate(optimized_operations):
+    for idx, ((operation, work_order_rn), timing) in enumerate(zip(optimized_operations, timings)):
         entry = ScheduleEntry(
             operation_id=operation.id,
             work_order_id=operation.work_order_id,
             work_order_rn=work_order_rn,
             naziv=operation.naziv,
             norma=float(operation.norma) if operation.norma else None,
-            sequence_order=idx + 1
+            sequence_order=idx + 1,
+            estimated_start=timing["estimated_start"].isoformat(),
+            estimated_end=timing["estimated_end"].isoformat(),
+            estimated_end_p90=timing["estimated_end_p90"].isoformat(),
+            correction_factor=timing["correction_factor"]
         )
         schedule_entries.append(entry)
     
     return OptimizationResponse(
         optimized_schedule=schedule_entries,
         total_operations=len(schedule_entries),
-        estimated_completion=None,  # TODO: Calculate based on norma
+        estimated_completion=schedule_entries[-1].estimated_end,
+        estimated_completion_p90=schedule_entries[-1].estimated_end_p90,
         conflicts=[]
     )
 
 
+@router.get("/duration-model")
+async def get_duration_model(
+    work_center: Optional[str] = None,
+    limit: int = 200,
+    db: AsyncSession = Depends(get_db)
+):
+    """Learned norma correction factors (all fallback levels), most samples first"""
+    
+    work_center_id = None
+    if work_center:
+        work_center_obj = await work_center_registry.get_by_code(db, work_center)
+        if not work_center_obj:
+            raise HTTPException(status_code=404, detail="Work center not found")
+        work_center_id = work_center_obj.id
+    
+    await duration_model.ensure_loaded(db)
+    factors = duration_model.get_factors(work_center_id)
+    return {
+        "min_samples": duration_model.min_samples,
+        "total_factors": len(factors),
+        "factors": factors[:limit]
+    }
+
+
+@router.post("/duration-model/refit")
+async def refit_duration_factors(db: AsyncSession = Depends(get_db)):
+    """Recompute all duration factors from completed operations"""
+    
+    result = await refit_duration_model(db)
+    await db.commit()
+    return {"message": "Duration model refitted", **result}
+
+
 @router.put("/reorder")
 async def reorder_schedule(
     request: ReorderRequest,
@@ -130,8 +180,7 @@ async def reorder_schedule(
     """Reorder schedule based on drag-drop changes"""
     
     # Get work center
-    wc_query = select(WorkCenter).where(WorkCenter.code == request.work_center)
-    work_center = await db.scalar(wc_query)
+    work_center = await work_center_registry.get_by_code(db, request.work_center)
     if not work_center:
         raise HTTPException(status_code=404, detail="Work center not found")
     
@@ -150,14 +199,23 @@ async def reorder_schedule(
     if len(operations) != len(request.new_order):
         raise HTTPException(status_code=400, detail="Invalid operation IDs provided")
     
-    # Update sequence order (this is a simplified implementation)
-    # In a real system, you'd want to store this in a separate scheduling table
-    for idx, operation_id in enumerate(request.new_order):
-        operation = next(op for op in operations if op.id == operation_id)
-        # For now, we'll just acknowledge the reorder
-        # TODO: Implement actual sequence storage
+    # Store the new sequence on the operations
+    updated = await OperationRepository(db).update_operation_sequence(
+        request.work_center, request.new_order
+    )
+    if not updated:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to store the new sequence")
     
     await db.commit()
+    await response_cache.invalidate(work_center_tag(work_center.id))
+    
+    # Sequence updates are bulk statements, so announce the move explicitly
+    event_bus.publish(
+        "schedule.reordered",
+        {"work_center": request.work_center, "new_order": request.new_order},
+        work_center_ids=[work_center.id]
+    )
     
     return {
         "message": "Schedule reordered successfully",
@@ -169,45 +227,55 @@ async def reorder_schedule(
 @router.get("/{work_center}")
 async def get_schedule(
     work_center: str,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """Get current schedule for a work center"""
     
-    # Get work center
-    wc_query = select(WorkCenter).where(WorkCenter.code == work_center)
-    work_center_obj = await db.scalar(wc_query)
-    if not work_center_obj:
-        raise HTTPException(status_code=404, detail="Work center not found")
-    
-    # Get operations
-    operations_query = select(Operation, WorkOrder.rn)\
-        .join(WorkOrder, Operation.work_order_id == WorkOrder.id)\
-        .where(
-            and_(
-                Operation.work_center_id == work_center_obj.id,
-                Operation.status.in_(["pending", "in_progress"])
+    async def build():
+        # Get work center
+        work_center_obj = await work_center_registry.get_by_code(db, work_center)
+        if not work_center_obj:
+            raise HTTPException(status_code=404, detail="Work center not found")
+        
+        # Get operations
+        operations_query = select(Operation, WorkOrder.rn)\
+            .join(WorkOrder, Operation.work_order_id == WorkOrder.id)\
+            .where(
+                and_(
+                    Operation.work_center_id == work_center_obj.id,
+                    Operation.status.in_(["pending", "in_progress"])
+                )
+            )\
+            .order_by(WorkOrder.datum_isporuke.asc().nulls_last())
+        
+        result = await db.execute(operations_query)
+        operations_data = result.all()
+        
+        # Format response
+        schedule_entries = []
+        for idx, (operation, work_order_rn) in enumerate(operations_data):
+            entry = ScheduleEntry(
+                operation_id=operation.id,
+                work_order_id=operation.work_order_id,
+                work_order_rn=work_order_rn,
+                naziv=operation.naziv,
+                norma=float(operation.norma) if operation.norma else None,
+                sequence_order=idx + 1
             )
-        )\
-        .order_by(WorkOrder.datum_isporuke.asc().nulls_last())
-    
-    result = await db.execute(operations_query)
-    operations_data = result.all()
+            schedule_entries.append(entry)
+        
+        response = {
+            "work_center": work_center,
+            "schedule": schedule_entries,
+            "total_operations": len(schedule_entries)
+        }
+        tags = [
+            table_tag("work_centers"),
+            table_tag("work_orders"),
+            work_center_tag(work_center_obj.id),
+            bulk_tag("operations")
+        ]
+        return response, tags
     
-    # Format response
-    schedule_entries = []
-    for idx, (operation, work_order_rn) in enumerate(operations_data):
-        entry = ScheduleEntry(
-            operation_id=operation.id,
-            work_order_id=operation.work_order_id,
-            work_order_rn=work_order_rn,
-            naziv=operation.naziv,
-            norma=float(operation.norma) if operation.norma else None,
-            sequence_order=idx + 1
-        )
-        schedule_entries.append(entry)
-    
-    return {
-        "work_center": work_center,
-        "schedule": schedule_entries,
-        "total_operations": len(schedule_entries)
-    }
\ No newline at end of file
+    return await cached_json_response(request, build)
@@ -0,0 +1,25 @@
+"""
+Unified search API endpoint
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.schemas.search import SearchEntity, SearchResponse
+from app.services.search_service import SearchService
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=100, description="Search term (RN, KPL, name, work center)"),
+    types: Optional[List[SearchEntity]] = Query(None, description="Entity types to search; all by default"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Type-ahead search across work orders, products and work centers"""
+    
+    service = SearchService(db)
+    return await service.search(q, entities=types or list(SearchEntity), limit=limit)
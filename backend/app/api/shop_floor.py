@@ -0,0 +1,181 @@
+"""
+Shop-floor terminal API: clock operations in and out, report quantities and completion
+"""
+from dataclasses import asdict
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.repositories.operation_event import OperationEventRepository, ACTUAL_VS_PLANNED_GROUPS
+from app.repositories.work_center_registry import work_center_registry
+from app.schemas.shop_floor import (
+    ShopFloorEventBody, ShopFloorBatchRequest, ShopFloorEventResult, OperationEventResponse
+)
+from app.services.operation_events import (
+    TERMINAL_EVENT_TYPES, START, PAUSE, STOP, SHIFT_END, COMPLETE, ShopFloorEvent, get_event_writer
+)
+from app.services.operation_projection import take_snapshot, rebuild_projection, get_projection_status
+
+router = APIRouter()
+
+
+async def _submit(operation_id: int, event_type: str, body: ShopFloorEventBody) -> ShopFloorEventResult:
+    outcome = await get_event_writer().submit(
+        ShopFloorEvent(operation_id=operation_id, event_type=event_type, **body.model_dump())
+    )
+    if outcome.outcome == "not_found":
+        raise HTTPException(status_code=404, detail="Operation not found")
+    if outcome.outcome == "rejected":
+        raise HTTPException(status_code=409, detail=outcome.error)
+    return ShopFloorEventResult(**asdict(outcome))
+
+
+@router.post("/operations/{operation_id}/start", response_model=ShopFloorEventResult)
+async def start_operation(operation_id: int, body: ShopFloorEventBody = ShopFloorEventBody()):
+    """Clock in: the operation is running from now (or occurred_at)"""
+    
+    return await _submit(operation_id, START, body)
+
+
+@router.post("/operations/{operation_id}/pause", response_model=ShopFloorEventResult)
+async def pause_operation(operation_id: int, body: ShopFloorEventBody = ShopFloorEventBody()):
+    """Interrupt a running operation (breaks, material, setup)"""
+    
+    return await _submit(operation_id, PAUSE, body)
+
+
+@router.post("/operations/{operation_id}/stop", response_model=ShopFloorEventResult)
+async def stop_operation(operation_id: int, body: ShopFloorEventBody = ShopFloorEventBody()):
+    """Clock out of an unfinished operation"""
+    
+    return await _submit(operation_id, STOP, body)
+
+
+@router.post("/operations/{operation_id}/shift-end", response_model=ShopFloorEventResult)
+async def end_shift_on_operation(operation_id: int, body: ShopFloorEventBody = ShopFloorEventBody()):
+    """Clock out at the end of the shift; the next shift starts it again"""
+    
+    return await _submit(operation_id, SHIFT_END, body)
+
+
+@router.post("/operations/{operation_id}/complete", response_model=ShopFloorEventResult)
+async def complete_operation(operation_id: int, body: ShopFloorEventBody = ShopFloorEventBody()):
+    """Finish the operation; without a quantity the planned quantity counts as done"""
+    
+    return await _submit(operation_id, COMPLETE, body)
+
+
+@router.post("/events", response_model=List[ShopFloorEventResult])
+async def record_event_batch(request: ShopFloorBatchRequest):
+    """Apply several reports in order; each gets its own outcome instead of an error status"""
+    
+    unknown = sorted({event.event_type for event in request.events} - set(TERMINAL_EVENT_TYPES))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown event types: {', '.join(unknown)}")
+    
+    outcomes = await get_event_writer().submit_many([
+        ShopFloorEvent(**event.model_dump()) for event in request.events
+    ])
+    return [ShopFloorEventResult(**asdict(outcome)) for outcome in outcomes]
+
+
+@router.get("/operations/{operation_id}/events", response_model=List[OperationEventResponse])
+async def get_operation_events(
+    operation_id: int,
+    after_id: Optional[int] = Query(None, description="Only events recorded after this event id"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Event log of an operation"""
+    
+    return await OperationEventRepository(db).get_events(operation_id, after_id=after_id, limit=limit)
+
+
+@router.get("/active")
+async def get_active_operations(
+    work_center: Optional[str] = Query(None, description="Work center code"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Operations clocked in right now"""
+    
+    work_center_id = None
+    if work_center:
+        work_center_id = await work_center_registry.resolve_id(db, work_center)
+        if work_center_id is None:
+            raise HTTPException(status_code=404, detail="Work center not found")
+    
+    rows = await OperationEventRepository(db).get_running(work_center_id)
+    for row in rows:
+        row["work_center"] = work_center_registry.peek_code(row["work_center_id"])
+    return {"count": len(rows), "operations": rows}
+
+
+
+@router.get("/operations/{operation_id}/state")
+async def get_operation_state(operation_id: int, db: AsyncSession = Depends(get_db)):
+    """Projected lifecycle state and time totals of an operation (also after archiving)"""
+    
+    state = await OperationEventRepository(db).get_state(operation_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No events recorded for this operation")
+    return {column.name: getattr(state, column.name) for column in state.__table__.columns}
+
+
+@router.get("/actual-vs-planned")
+async def get_actual_vs_planned(
+    date_from: Optional[date] = Query(None, description="Completed on or after"),
+    date_to: Optional[date] = Query(None, description="Completed on or before"),
+    work_center: Optional[str] = Query(None, description="Work center code"),
+    group_by: str = Query("work_center", description=", ".join(ACTUAL_VS_PLANNED_GROUPS)),
+    db: AsyncSession = Depends(get_db)
+):
+    """Actual against planned minutes of completed operations"""
+    
+    if group_by not in ACTUAL_VS_PLANNED_GROUPS:
+        raise HTTPException(status_code=422, detail=f"group_by must be one of {', '.join(ACTUAL_VS_PLANNED_GROUPS)}")
+    
+    work_center_id = None
+    if work_center:
+        work_center_id = await work_center_registry.resolve_id(db, work_center)
+        if work_center_id is None:
+            raise HTTPException(status_code=404, detail="Work center not found")
+    
+    rows = await OperationEventRepository(db).get_actual_vs_planned(
+        date_from=date_from, date_to=date_to, work_center_id=work_center_id, group_by=group_by
+    )
+    for row in rows:
+        if "work_center_id" in row:
+            row["work_center"] = work_center_registry.peek_code(row["work_center_id"])
+    return {"group_by": group_by, "rows": rows}
+
+
+@router.get("/projection")
+async def get_projection():
+    """Projection size, newest snapshot and events a rebuild would replay"""
+    
+    return await get_projection_status()
+
+
+@router.post("/projection/snapshot")
+async def snapshot_projection():
+    """Snapshot the projection now"""
+    
+    snapshot = await take_snapshot()
+    if snapshot is None:
+        return {"message": "No events since the last snapshot"}
+    return snapshot.to_dict()
+
+
+@router.post("/projection/rebuild")
+async def rebuild_operation_projection(
+    from_snapshot: bool = Query(True, description="Start from the newest snapshot instead of the whole log")
+):
+    """Rebuild the projection from the event log"""
+    
+    try:
+        result = await rebuild_projection(use_snapshot=from_snapshot)
+        return result.to_dict()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rebuild failed: {str(e)}")
@@ -2,72 +2,100 @@
 Work Orders API endpoints
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 
 from app.database.connection import get_db
+from app.database.models import WorkOrder
 from app.services.work_order_service import WorkOrderService
+from app.services.status_transitions import InvalidStatusTransition
+from app.repositories.counting import CountMode
+from app.utils.response_cache import cached_json_response, response_cache, table_tag
 from app.schemas.work_order import (
     WorkOrderCreate, 
     WorkOrderUpdate, 
     WorkOrderResponse, 
-    WorkOrderWithProduct,
-    WorkOrderListResponse
+    WorkOrderListItem,
+    WorkOrderListResponse,
+    WorkOrderStatusUpdate,
+    WorkOrderStatusBatch
 )
 
 router = APIRouter()
 
+# The list is read from work_order_summaries, which all three tables feed
+WORK_ORDER_LIST_TAGS = [table_tag("work_orders"), table_tag("operations"), table_tag("products")]
+
 
 @router.get("/", response_model=WorkOrderListResponse)
 async def get_work_orders(
+    request: Request,
     work_center: Optional[str] = Query(None, description="Filter by work center code"),
     status: Optional[str] = Query(None, description="Filter by status"),
     urgent_only: bool = Query(False, description="Show only urgent orders (priority > 0)"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     offset: int = Query(0, ge=0, description="Number of records to skip"),
+    count: CountMode = Query(CountMode.EXACT, description="Total count strategy: exact (cached), estimated or none"),
+    include_stats: bool = Query(False, description="Include work center distribution statistics"),
     db: AsyncSession = Depends(get_db)
 ):
     """Get list of work orders with filtering options"""
     
-    service = WorkOrderService(db)
-    
-    try:
-        result = await service.get_work_orders_with_filters(
-            status=status,
-            work_center=work_center,
-            urgent_only=urgent_only,
-            skip=offset,
-            limit=limit
-        )
+    async def build():
+        service = WorkOrderService(db)
         
-        # Format work orders for response
-        work_orders = []
-        for wo in result["work_orders"]:
-            work_order = WorkOrderWithProduct(
-                id=wo.id,
-                rn=wo.rn,
-                product_id=wo.product_id,
-                quantity=wo.quantity,
-                priority_level=wo.priority_level,
-                datum_isporuke=wo.datum_isporuke,
-                datum_sastavljanja=wo.datum_sastavljanja,
-                datum_treci=wo.datum_treci,
-                status=wo.status,
-                created_at=wo.created_at,
-                updated_at=wo.updated_at,
-                product_name=wo.product.name if wo.product else "",
-                product_kpl=wo.product.kpl if wo.product else ""
+        try:
+            result = await service.get_work_orders_with_filters(
+                status=status,
+                work_center=work_center,
+                urgent_only=urgent_only,
+                skip=offset,
+                limit=limit,
+                count_mode=count,
+                include_work_center_stats=include_stats
             )
-            work_orders.append(work_order)
-        
-        return WorkOrderListResponse(
-            work_orders=work_orders,
-            total_count=result["total_count"],
-            work_center_stats=result["work_center_stats"]
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            
+            # Format work orders for response
+            work_orders = []
+            for summary in result["work_orders"]:
+                work_order = WorkOrderListItem(
+                    id=summary.work_order_id,
+                    rn=summary.rn,
+                    product_id=summary.product_id,
+                    quantity=summary.quantity,
+                    priority_level=summary.priority_level,
+                    datum_isporuke=summary.datum_isporuke,
+                    datum_sastavljanja=summary.datum_sastavljanja,
+                    datum_treci=summary.datum_treci,
+                    status=summary.status,
+                    created_at=summary.created_at,
+                    updated_at=summary.updated_at,
+                    product_name=summary.product_name,
+                    product_kpl=summary.product_kpl,
+                    remaining_hours=float(summary.remaining_hours or 0),
+                    remaining_hours_by_work_center={
+                        code: float(hours or 0)
+                        for code, hours in (summary.remaining_hours_by_work_center or {}).items()
+                    },
+                    next_operation_id=summary.next_operation_id,
+                    next_operation_naziv=summary.next_operation_naziv,
+                    next_operation_status=summary.next_operation_status,
+                    next_work_center_code=summary.next_work_center_code
+                )
+                work_orders.append(work_order)
+            
+            response = WorkOrderListResponse(
+                work_orders=work_orders,
+                total_count=result["total_count"],
+                work_center_stats=result["work_center_stats"]
+            )
+            return response, WORK_ORDER_LIST_TAGS
+            
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    return await cached_json_response(request, build)
 
 
 @router.post("/", response_model=WorkOrderResponse)
@@ -87,6 +115,7 @@ async def create_work_order(
         
         # Create work order
         created_work_order = await service.create_work_order(work_order)
+        await response_cache.invalidate(*WORK_ORDER_LIST_TAGS)
         return created_work_order
         
     except ValueError as e:
@@ -111,28 +140,50 @@ async def get_work_order(
     return work_order
 
 
+@router.post("/status/batch")
+async def transition_work_orders(
+    batch: WorkOrderStatusBatch,
+    db: AsyncSession = Depends(get_db)
+):
+    """Move many work orders to one status; each is validated, its open operations follow"""
+    
+    service = WorkOrderService(db)
+    
+    try:
+        result = await service.transition_work_orders(
+            batch.work_order_ids, batch.status, note=batch.note, all_or_nothing=batch.all_or_nothing
+        )
+    except InvalidStatusTransition as e:
+        raise HTTPException(status_code=409 if batch.all_or_nothing else 400, detail=str(e))
+    
+    if result.accepted:
+        await response_cache.invalidate(*WORK_ORDER_LIST_TAGS)
+    return result.to_dict()
+
+
 @router.patch("/{work_order_id}/status")
 async def update_work_order_status(
     work_order_id: int,
-    status_update: dict,
+    status_update: WorkOrderStatusUpdate,
     db: AsyncSession = Depends(get_db)
 ):
-    """Update work order status"""
+    """Update work order status; its open operations follow"""
     
-    query = select(WorkOrder).where(WorkOrder.id == work_order_id)
-    work_order = await db.scalar(query)
+    service = WorkOrderService(db)
+    
+    try:
+        work_order = await service.update_work_order_status(
+            work_order_id, status_update.status, note=status_update.note
+        )
+    except InvalidStatusTransition as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
     if not work_order:
         raise HTTPException(status_code=404, detail="Work order not found")
     
-    # Update status
-    if "status" in status_update:
-        work_order.status = status_update["status"]
-    
-    await db.commit()
-    await db.refresh(work_order)
+    await response_cache.invalidate(*WORK_ORDER_LIST_TAGS)
     
-    return {"message": "Status updated successfully", "work_order_id": work_order_id}
+    return {"message": "Status updated successfully", "work_order_id": work_order_id, "status": work_order.status}
 
 
 @router.put("/{work_order_id}", response_model=WorkOrderResponse)
@@ -155,6 +206,7 @@ async def update_work_order(
         setattr(work_order, field, value)
     
     await db.commit()
+    await response_cache.invalidate(*WORK_ORDER_LIST_TAGS)
     await db.refresh(work_order)
     
     return WorkOrderResponse.model_validate(work_order)
\ No newline at end of file
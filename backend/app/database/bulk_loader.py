@@ -0,0 +1,268 @@
+"""
+COPY-based bulk loading of products, work orders and operations
+
+Rows are streamed into a temporary staging table with asyncpg's binary COPY
+(copy_records_to_table) and merged into the real table with one set-based
+INSERT ... SELECT ... ON CONFLICT statement. Foreign keys are resolved in
+the merge by natural key (KPL, work order rn, work center code), so callers
+never need database ids and a load is a handful of round trips regardless
+of its size.
+
+Everything runs on the session's connection inside its transaction: the
+caller commits, and a rollback discards staging data and merged rows alike.
+The merge returns the product and work order ids it wrote and records them
+in the session's change set, so work order summaries and the outbox follow
+a load the way they follow ORM writes.
+
+    loader = BulkLoader(session)
+    await loader.load_products(rows)
+    await loader.load_work_orders(rows)
+    await loader.load_operations(rows)
+    await session.commit()
+
+Values must already have their column's Python type (int, float, date, str);
+COPY does not coerce.
+"""
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Mapping, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .change_tracking import mark_changed, mark_products_changed, mark_work_orders_changed
+
+_UTC_NOW = "timezone('utc', now())"
+
+
+@dataclass
+class BulkLoadResult:
+    """Outcome of loading one staging table"""
+    table: str
+    staged: int = 0
+    inserted: int = 0
+    updated: int = 0
+    copy_seconds: float = 0.0
+    merge_seconds: float = 0.0
+
+    @property
+    def skipped(self) -> int:
+        """Staged rows neither inserted nor updated (duplicates, unresolved keys, ignored conflicts)"""
+        return self.staged - self.inserted - self.updated
+
+
+@dataclass(frozen=True)
+class _StagingSpec:
+    """Staging columns of a target table and the SQL that merges them"""
+    table: str
+    columns: Tuple[Tuple[str, str], ...]
+    merge_sql: str
+    merge_sql_ignore: str
+    # Records the ids the merge returned, so summaries and the outbox see them row by row
+    mark_ids: Callable[[AsyncSession, Iterable[int]], None]
+
+
+def _counted(insert_sql: str, key: str) -> str:
+    """
+    Wrap an INSERT into its inserted/updated counts (xmax = 0 on inserts) and
+    the distinct values of key over the rows it wrote
+    """
+    return f"""
+        WITH merged AS ({insert_sql}
+            RETURNING (xmax = 0) AS inserted, {key} AS merged_id
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted), array_agg(DISTINCT merged_id)
+        FROM merged
+    """
+
+
+_PRODUCTS_INSERT = f"""
+    INSERT INTO products (kpl, name, description, is_active, created_at, updated_at)
+    SELECT DISTINCT ON (kpl)
+        kpl, name, description, COALESCE(is_active, true), {_UTC_NOW}, {_UTC_NOW}
+    FROM {{stage}}
+    ORDER BY kpl, seq DESC
+"""
+
+_WORK_ORDERS_INSERT = f"""
+    INSERT INTO work_orders (
+        rn, product_id, quantity, priority_level,
+        datum_isporuke, datum_sastavljanja, datum_treci, status, created_at, updated_at
+    )
+    SELECT DISTINCT ON (s.rn)
+        s.rn, p.id, GREATEST(COALESCE(s.quantity, 1), 1), COALESCE(s.priority_level, 0),
+        s.datum_isporuke, s.datum_sastavljanja, s.datum_treci, COALESCE(s.status, 'pending'),
+        {_UTC_NOW}, {_UTC_NOW}
+    FROM {{stage}} s
+    JOIN products p ON p.kpl = s.kpl
+    ORDER BY s.rn, s.seq DESC
+"""
+
+# New operations without an explicit sequence go to the end of their work center's queue
+_OPERATIONS_INSERT = f"""
+    WITH latest AS (
+        SELECT DISTINCT ON (work_order_rn, work_center_code) *
+        FROM {{stage}}
+        ORDER BY work_order_rn, work_center_code, seq DESC
+    ), resolved AS (
+        SELECT l.*, wo.id AS work_order_id, wc.id AS work_center_id
+        FROM latest l
+        JOIN work_orders wo ON wo.rn = l.work_order_rn
+        JOIN work_centers wc ON wc.code = l.work_center_code
+    ), queue_tail AS (
+        SELECT work_center_id, max(operation_sequence) AS last_sequence
+        FROM operations
+        WHERE work_center_id IN (SELECT work_center_id FROM resolved)
+        GROUP BY work_center_id
+    )
+    INSERT INTO operations (
+        work_order_id, work_center_id, operation_sequence, naziv, norma,
+        quantity, quantity_completed, status, created_at, updated_at
+    )
+    SELECT
+        r.work_order_id, r.work_center_id,
+        COALESCE(
+            r.operation_sequence,
+            COALESCE(t.last_sequence, 0) + row_number() OVER (PARTITION BY r.work_center_id ORDER BY r.seq)
+        ),
+        COALESCE(r.naziv, ''), r.norma::numeric(8, 2), r.quantity, COALESCE(r.quantity_completed, 0),
+        COALESCE(r.status, 'pending'), {_UTC_NOW}, {_UTC_NOW}
+    FROM resolved r
+    LEFT JOIN queue_tail t ON t.work_center_id = r.work_center_id
+    ORDER BY r.seq
+"""
+
+_SPECS = {
+    spec.table: spec for spec in (
+        _StagingSpec(
+            table="products",
+            columns=(
+                ("kpl", "varchar(50)"),
+                ("name", "varchar(200)"),
+                ("description", "text"),
+                ("is_active", "boolean"),
+            ),
+            merge_sql=_counted(_PRODUCTS_INSERT + f"""
+                ON CONFLICT (kpl) DO UPDATE SET
+                    name = EXCLUDED.name,
+                    description = COALESCE(EXCLUDED.description, products.description),
+                    updated_at = {_UTC_NOW}""", "id"),
+            merge_sql_ignore=_counted(_PRODUCTS_INSERT + "ON CONFLICT (kpl) DO NOTHING", "id"),
+            mark_ids=mark_products_changed,
+        ),
+        _StagingSpec(
+            table="work_orders",
+            columns=(
+                ("rn", "varchar(50)"),
+                ("kpl", "varchar(50)"),
+                ("quantity", "integer"),
+                ("priority_level", "integer"),
+                ("datum_isporuke", "date"),
+                ("datum_sastavljanja", "date"),
+                ("datum_treci", "date"),
+                ("status", "varchar(20)"),
+            ),
+            # Status belongs to the shop floor once a work order exists
+            merge_sql=_counted(_WORK_ORDERS_INSERT + f"""
+                ON CONFLICT (rn) DO UPDATE SET
+                    product_id = EXCLUDED.product_id,
+                    quantity = EXCLUDED.quantity,
+                    priority_level = EXCLUDED.priority_level,
+                    datum_isporuke = EXCLUDED.datum_isporuke,
+                    datum_sastavljanja = EXCLUDED.datum_sastavljanja,
+                    datum_treci = EXCLUDED.datum_treci,
+                    updated_at = {_UTC_NOW}""", "id"),
+            merge_sql_ignore=_counted(_WORK_ORDERS_INSERT + "ON CONFLICT (rn) DO NOTHING", "id"),
+            mark_ids=mark_work_orders_changed,
+        ),
+        _StagingSpec(
+            table="operations",
+            columns=(
+                ("work_order_rn", "varchar(50)"),
+                ("work_center_code", "varchar(20)"),
+                ("operation_sequence", "integer"),
+                ("naziv", "varchar(200)"),
+                ("norma", "double precision"),
+                ("quantity", "integer"),
+                ("quantity_completed", "integer"),
+                ("status", "varchar(20)"),
+            ),
+            # Sequence and status of existing operations are owned by planners and the shop floor
+            merge_sql=_counted(_OPERATIONS_INSERT + f"""
+                ON CONFLICT (work_order_id, work_center_id) DO UPDATE SET
+                    naziv = EXCLUDED.naziv,
+                    norma = EXCLUDED.norma,
+                    quantity = EXCLUDED.quantity,
+                    quantity_completed = EXCLUDED.quantity_completed,
+                    updated_at = {_UTC_NOW}""", "work_order_id"),
+            merge_sql_ignore=_counted(
+                _OPERATIONS_INSERT + "ON CONFLICT (work_order_id, work_center_id) DO NOTHING", "work_order_id"
+            ),
+            mark_ids=mark_work_orders_changed,
+        ),
+    )
+}
+
+_stage_names = itertools.count(1)
+
+
+class BulkLoader:
+    """COPY rows into staging tables and merge them into the schema"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _driver_connection(self):
+        connection = await self.session.connection()
+        raw = await connection.get_raw_connection()
+        return raw.driver_connection
+
+    async def _load(self, spec: _StagingSpec, rows: Iterable[Mapping[str, Any]], update_existing: bool) -> BulkLoadResult:
+        result = BulkLoadResult(table=spec.table)
+        stage = f"_stage_{spec.table}_{next(_stage_names)}"
+        names = [name for name, _ in spec.columns]
+
+        # seq keeps input order: the last row wins when a key repeats
+        column_sql = ", ".join(f"{name} {sql_type}" for name, sql_type in spec.columns)
+        await self.session.execute(text(f"CREATE TEMP TABLE {stage} (seq bigint, {column_sql}) ON COMMIT DROP"))
+
+        def records():
+            for seq, row in enumerate(rows):
+                result.staged += 1
+                yield (seq, *(row.get(name) for name in names))
+
+        started = time.perf_counter()
+        driver = await self._driver_connection()
+        await driver.copy_records_to_table(stage, records=records(), columns=["seq", *names])
+        result.copy_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await self.session.execute(text(f"ANALYZE {stage}"))
+        merge_sql = spec.merge_sql if update_existing else spec.merge_sql_ignore
+        counts = await self.session.execute(text(merge_sql.format(stage=stage)))
+        result.inserted, result.updated, ids = counts.one()
+        await self.session.execute(text(f"DROP TABLE {stage}"))
+        result.merge_seconds = time.perf_counter() - started
+
+        mark_changed(self.session, spec.table)
+        spec.mark_ids(self.session, ids or [])
+        return result
+
+    async def load_products(self, rows: Iterable[Mapping[str, Any]], update_existing: bool = True) -> BulkLoadResult:
+        """Rows: kpl, name, description, is_active"""
+        return await self._load(_SPECS["products"], rows, update_existing)
+
+    async def load_work_orders(self, rows: Iterable[Mapping[str, Any]], update_existing: bool = True) -> BulkLoadResult:
+        """Rows: rn, kpl, quantity, priority_level, datum_isporuke, datum_sastavljanja, datum_treci, status"""
+        return await self._load(_SPECS["work_orders"], rows, update_existing)
+
+    async def load_operations(self, rows: Iterable[Mapping[str, Any]], update_existing: bool = True) -> BulkLoadResult:
+        """
+        Rows: work_order_rn, work_center_code, operation_sequence, naziv, norma,
+        quantity, quantity_completed, status.
+
+        Rows whose work order or work center does not exist are skipped.
+        """
+        return await self._load(_SPECS["operations"], rows, update_existing)
+
@@ -0,0 +1,199 @@
+"""
+Session change tracking for write-driven cache invalidation and
+derived-table maintenance
+"""
+import logging
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CHANGE_SET_KEY = "change_set"
+
+# Attributes whose before/after values are captured for row-level consumers
+TRACKED_ATTRIBUTES = {
+    "work_orders": ("status", "priority_level", "updated_at"),
+    "operations": (
+        "status", "work_center_id", "work_order_id", "norma",
+        "operation_sequence", "quantity_completed", "running_since", "actual_minutes", "updated_at",
+    ),
+    "work_centers": ("code",),
+}
+
+
+@dataclass(frozen=True)
+class RowChange:
+    """Tracked attribute values of one row before and after a transaction wrote it"""
+    table: str
+    id: int
+    old: Optional[Dict[str, Any]]  # None for inserts
+    new: Optional[Dict[str, Any]]  # None for deletes
+
+
+@dataclass
+class ChangeSet:
+    """Everything a transaction wrote, collected until it commits"""
+    tables: Set[str] = field(default_factory=set)
+    work_order_ids: Set[int] = field(default_factory=set)
+    product_ids: Set[int] = field(default_factory=set)
+    row_changes: List[RowChange] = field(default_factory=list)
+    # Tables written by bulk UPDATE/DELETE/INSERT statements, invisible row by row
+    bulk_tables: Set[str] = field(default_factory=set)
+
+
+CommitListener = Callable[[ChangeSet], None]
+BeforeCommitListener = Callable[[Session, ChangeSet], None]
+
+_commit_listeners: List[CommitListener] = []
+_before_commit_listeners: List[BeforeCommitListener] = []
+
+
+def on_commit(listener: CommitListener) -> CommitListener:
+    """Register a callback invoked with the change set of every committed transaction"""
+    _commit_listeners.append(listener)
+    return listener
+
+
+def before_commit(listener: BeforeCommitListener) -> BeforeCommitListener:
+    """
+    Register a callback that runs inside the transaction just before it commits.
+    Listeners may execute statements on the (sync) session; errors abort the commit.
+    """
+    _before_commit_listeners.append(listener)
+    return listener
+
+
+def _sync_session(session: Union[Session, AsyncSession]) -> Session:
+    if isinstance(session, AsyncSession):
+        return session.sync_session
+    return session
+
+
+def get_change_set(session: Union[Session, AsyncSession]) -> ChangeSet:
+    """Get the pending change set of a session"""
+    sync_session = _sync_session(session)
+    change_set = sync_session.info.get(CHANGE_SET_KEY)
+    if change_set is None:
+        change_set = ChangeSet()
+        sync_session.info[CHANGE_SET_KEY] = change_set
+    return change_set
+
+
+def mark_changed(session: Union[Session, AsyncSession], *tables: str) -> None:
+    """Record writes that bypass the ORM (raw SQL, COPY, ...)"""
+    change_set = get_change_set(session)
+    change_set.tables.update(tables)
+    # Nothing was seen row by row, so listeners must treat them like bulk statements
+    change_set.bulk_tables.update(tables)
+
+
+def mark_work_orders_changed(session: Union[Session, AsyncSession], work_order_ids: Iterable[int]) -> None:
+    """Record work orders touched by bulk statements the flush cannot see"""
+    get_change_set(session).work_order_ids.update(
+        work_order_id for work_order_id in work_order_ids if work_order_id is not None
+    )
+
+
+def mark_products_changed(session: Union[Session, AsyncSession], product_ids: Iterable[int]) -> None:
+    """Record products touched by bulk statements the flush cannot see"""
+    get_change_set(session).product_ids.update(
+        product_id for product_id in product_ids if product_id is not None
+    )
+
+
+def _previous_value(obj, attribute: str):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else None
+
+
+def _row_change(obj, table_name: str, is_new: bool, is_deleted: bool) -> Optional[RowChange]:
+    attributes = TRACKED_ATTRIBUTES.get(table_name)
+    if not attributes:
+        return None
+    
+    state = inspect(obj)
+    current = {attribute: getattr(obj, attribute) for attribute in attributes}
+    if is_new:
+        return RowChange(table_name, obj.id, None, current)
+    if is_deleted:
+        return RowChange(table_name, obj.id, current, None)
+    
+    previous = dict(current)
+    changed = False
+    for attribute in attributes:
+        history = state.attrs[attribute].history
+        if history.deleted:
+            previous[attribute] = history.deleted[0]
+            changed = True
+    
+    return RowChange(table_name, obj.id, previous, current) if changed else None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session: Session, flush_context) -> None:
+    change_set = get_change_set(session)
+    new, deleted = set(session.new), set(session.deleted)
+    for obj in chain(new, session.dirty, deleted):
+        table_name = getattr(obj, "__tablename__", None)
+        if table_name:
+            change_set.tables.add(table_name)
+        
+        row_change = _row_change(obj, table_name, obj in new, obj in deleted)
+        if row_change is not None:
+            change_set.row_changes.append(row_change)
+        
+        if table_name == "work_orders":
+            change_set.work_order_ids.add(obj.id)
+        elif table_name == "operations":
+            # An operation moved between work orders touches both
+            change_set.work_order_ids.update(
+                value for value in (obj.work_order_id, _previous_value(obj, "work_order_id"))
+                if value is not None
+            )
+        elif table_name == "products":
+            change_set.product_ids.add(obj.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_statement_tables(orm_execute_state) -> None:
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None:
+        change_set = get_change_set(orm_execute_state.session)
+        change_set.tables.add(table.name)
+        change_set.bulk_tables.add(table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _run_before_commit_listeners(session: Session) -> None:
+    if not _before_commit_listeners:
+        return
+    
+    # Flush first so ids of pending objects are known to the listeners
+    session.flush()
+    change_set = get_change_set(session)
+    for listener in _before_commit_listeners:
+        listener(session, change_set)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_change_set(session: Session) -> None:
+    change_set = session.info.pop(CHANGE_SET_KEY, None)
+    if change_set is None or not change_set.tables:
+        return
+    for listener in _commit_listeners:
+        try:
+            listener(change_set)
+        except Exception:
+            logger.exception("Commit listener %r failed", listener)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_change_set(session: Session) -> None:
+    session.info.pop(CHANGE_SET_KEY, None)
@@ -1,14 +1,17 @@
 """
 SQLAlchemy database models for MES Production Scheduling System
 """
-from datetime import datetime, date
+from datetime import datetime, date, time
 from typing import Optional
-from sqlalchemy import String, Integer, DateTime, Date, Boolean, DECIMAL, Text, ForeignKey, UniqueConstraint
+from sqlalchemy import String, Integer, BigInteger, DateTime, Date, Time, Boolean, DECIMAL, Float, Text, ForeignKey, UniqueConstraint, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 
 from .connection import Base
 
+# Statuses that make up the active backlog; partial indexes are built on this predicate
+ACTIVE_STATUS_PREDICATE = "status IN ('pending', 'in_progress')"
+
 
 class Organization(Base):
     """Organizations table"""
@@ -80,7 +83,10 @@ class WorkCenter(Base):
     category: Mapped[Optional["WorkCenterCategory"]] = relationship("WorkCenterCategory", back_populates="work_centers")
     operations: Mapped[list["Operation"]] = relationship("Operation", back_populates="work_center")
     
-    __table_args__ = (UniqueConstraint("plant_id", "code"),)
+    __table_args__ = (
+        UniqueConstraint("plant_id", "code"),
+        Index("ix_work_centers_code", "code"),
+    )
 
 
 class ProductType(Base):
@@ -116,6 +122,12 @@ class Product(Base):
     # Relationships
     product_type: Mapped[Optional["ProductType"]] = relationship("ProductType", back_populates="products")
     work_orders: Mapped[list["WorkOrder"]] = relationship("WorkOrder", back_populates="product")
+    
+    __table_args__ = (
+        Index("ix_products_kpl_prefix", "kpl", postgresql_ops={"kpl": "varchar_pattern_ops"}),
+        Index("ix_products_kpl_trgm", "kpl", postgresql_using="gin", postgresql_ops={"kpl": "gin_trgm_ops"}),
+        Index("ix_products_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
 
 class WorkOrder(Base):
@@ -137,6 +149,19 @@ class WorkOrder(Base):
     # Relationships
     product: Mapped["Product"] = relationship("Product", back_populates="work_orders")
     operations: Mapped[list["Operation"]] = relationship("Operation", back_populates="work_order")
+    
+    __table_args__ = (
+        Index("ix_work_orders_priority_delivery", "priority_level", "datum_isporuke"),
+        Index("ix_work_orders_status", "status"),
+        Index("ix_work_orders_updated_at", "updated_at"),
+        Index("ix_work_orders_product_id", "product_id"),
+        Index(
+            "ix_work_orders_active_delivery", "datum_isporuke",
+            postgresql_where=text(ACTIVE_STATUS_PREDICATE)
+        ),
+        Index("ix_work_orders_rn_prefix", "rn", postgresql_ops={"rn": "varchar_pattern_ops"}),
+        Index("ix_work_orders_rn_trgm", "rn", postgresql_using="gin", postgresql_ops={"rn": "gin_trgm_ops"}),
+    )
 
 
 class Operation(Base):
@@ -148,11 +173,19 @@ class Operation(Base):
     work_center_id: Mapped[int] = mapped_column(Integer, ForeignKey("work_centers.id"))
     operation_sequence: Mapped[int] = mapped_column(Integer, nullable=False)
     naziv: Mapped[str] = mapped_column(String(200), nullable=False)
-    norma: Mapped[Optional[float]] = mapped_column(DECIMAL(8, 2))  # Standard time hours
+    norma: Mapped[Optional[float]] = mapped_column(DECIMAL(8, 2))  # Standard time minutes
     quantity: Mapped[Optional[int]] = mapped_column(Integer)
     quantity_completed: Mapped[int] = mapped_column(Integer, default=0)
     status: Mapped[str] = mapped_column(String(20), default="pending")
     dependencies: Mapped[Optional[dict]] = mapped_column(JSONB)
+    # Derived from operation_events by the shop-floor service
+    actual_start_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_completion_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_minutes: Mapped[float] = mapped_column(DECIMAL(10, 2), default=0)
+    running_since: Mapped[Optional[datetime]] = mapped_column(DateTime)  # set while clocked in
+    # Planned by the rescheduler around shifts and downtime
+    estimated_start_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    estimated_completion_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -160,4 +193,352 @@ class Operation(Base):
     work_order: Mapped["WorkOrder"] = relationship("WorkOrder", back_populates="operations")
     work_center: Mapped["WorkCenter"] = relationship("WorkCenter", back_populates="operations")
     
-    __table_args__ = (UniqueConstraint("work_order_id", "work_center_id"),)
\ No newline at end of file
+    __table_args__ = (
+        UniqueConstraint("work_order_id", "work_center_id"),
+        Index("ix_operations_work_center_status", "work_center_id", "status"),
+        Index(
+            "ix_operations_active_work_center_sequence", "work_center_id", "operation_sequence",
+            postgresql_where=text(ACTIVE_STATUS_PREDICATE)
+        ),
+        Index(
+            "ix_operations_running_work_center", "work_center_id",
+            postgresql_where=text("running_since IS NOT NULL")
+        ),
+    )
+
+
+class WorkOrderSummary(Base):
+    """
+    Denormalized work order list row, one per work order.
+    Maintained incrementally on work order/operation/product writes.
+    """
+    __tablename__ = "work_order_summaries"
+    
+    work_order_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("work_orders.id", ondelete="CASCADE"), primary_key=True
+    )
+    rn: Mapped[str] = mapped_column(String(50), nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer)
+    product_kpl: Mapped[str] = mapped_column(String(50), nullable=False)
+    product_name: Mapped[str] = mapped_column(String(200), nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    priority_level: Mapped[int] = mapped_column(Integer, default=0)
+    datum_isporuke: Mapped[Optional[date]] = mapped_column(Date)
+    datum_sastavljanja: Mapped[Optional[date]] = mapped_column(Date)
+    datum_treci: Mapped[Optional[date]] = mapped_column(Date)
+    status: Mapped[str] = mapped_column(String(20))
+    work_center_codes: Mapped[list[str]] = mapped_column(ARRAY(String(20)), default=list)
+    remaining_hours: Mapped[float] = mapped_column(DECIMAL(10, 2), default=0)
+    remaining_hours_by_work_center: Mapped[dict] = mapped_column(JSONB, default=dict)
+    next_operation_id: Mapped[Optional[int]] = mapped_column(Integer)
+    next_operation_naziv: Mapped[Optional[str]] = mapped_column(String(200))
+    next_operation_status: Mapped[Optional[str]] = mapped_column(String(20))
+    next_work_center_code: Mapped[Optional[str]] = mapped_column(String(20))
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_work_order_summaries_priority_delivery", "priority_level", "datum_isporuke"),
+        Index("ix_work_order_summaries_status", "status"),
+        Index("ix_work_order_summaries_work_center_codes", "work_center_codes", postgresql_using="gin"),
+    )
+
+
+class OutboxEvent(Base):
+    """
+    Change-data-capture outbox: one row per committed operation/work order change,
+    written in the same transaction and published to downstream consumers.
+    """
+    __tablename__ = "outbox_events"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    aggregate_type: Mapped[str] = mapped_column(String(30), nullable=False)
+    aggregate_id: Mapped[Optional[int]] = mapped_column(Integer)
+    event_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    
+    __table_args__ = (
+        Index("ix_outbox_events_unpublished", "id", postgresql_where=text("published_at IS NULL")),
+        Index("ix_outbox_events_published_at", "published_at"),
+    )
+
+
+class WorkOrderHistory(Base):
+    """
+    Archived (completed/cancelled) work orders, range-partitioned by completion month.
+    Partitions are created by the archive service as months are archived.
+    """
+    __tablename__ = "work_orders_history"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    completed_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    rn: Mapped[str] = mapped_column(String(50), nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    priority_level: Mapped[Optional[int]] = mapped_column(Integer)
+    datum_isporuke: Mapped[Optional[date]] = mapped_column(Date)
+    datum_sastavljanja: Mapped[Optional[date]] = mapped_column(Date)
+    datum_treci: Mapped[Optional[date]] = mapped_column(Date)
+    status: Mapped[str] = mapped_column(String(20))
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_work_orders_history_rn", "rn"),
+        Index("ix_work_orders_history_product_id", "product_id"),
+        {"postgresql_partition_by": "RANGE (completed_at)"},
+    )
+
+
+class OperationHistory(Base):
+    """
+    Operations of archived work orders, partitioned like their work order
+    (completed_at is the work order's completion time).
+    """
+    __tablename__ = "operations_history"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    completed_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    work_order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    work_center_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    operation_sequence: Mapped[int] = mapped_column(Integer, nullable=False)
+    naziv: Mapped[str] = mapped_column(String(200), nullable=False)
+    norma: Mapped[Optional[float]] = mapped_column(DECIMAL(8, 2))
+    quantity: Mapped[Optional[int]] = mapped_column(Integer)
+    quantity_completed: Mapped[Optional[int]] = mapped_column(Integer)
+    status: Mapped[str] = mapped_column(String(20))
+    dependencies: Mapped[Optional[dict]] = mapped_column(JSONB)
+    actual_start_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_completion_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_minutes: Mapped[Optional[float]] = mapped_column(DECIMAL(10, 2))
+    running_since: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    estimated_start_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    estimated_completion_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_operations_history_work_order_id", "work_order_id"),
+        Index("ix_operations_history_work_center_completed", "work_center_id", "completed_at"),
+        {"postgresql_partition_by": "RANGE (completed_at)"},
+    )
+
+
+class OperationEvent(Base):
+    """
+    Append-only shop-floor log: one row per start/pause/stop/shift-end/complete
+    reported by a terminal. Operation status and actual times are derived from it.
+    """
+    __tablename__ = "operation_events"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # No foreign keys: the log outlives operations moved to the history tables
+    operation_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    work_center_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    event_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    status: Mapped[Optional[str]] = mapped_column(String(20))  # operation status after the event
+    occurred_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    recorded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    quantity: Mapped[Optional[int]] = mapped_column(Integer)
+    scrap_quantity: Mapped[Optional[int]] = mapped_column(Integer)  # rejected pieces, on top of quantity
+    terminal_id: Mapped[Optional[str]] = mapped_column(String(50))
+    operator: Mapped[Optional[str]] = mapped_column(String(100))
+    note: Mapped[Optional[str]] = mapped_column(Text)
+    # Terminals resend on timeouts; the same id is recorded once
+    client_event_id: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    
+    __table_args__ = (
+        Index("ix_operation_events_operation_id", "operation_id", "id"),
+        Index("ix_operation_events_work_center_occurred", "work_center_id", "occurred_at"),
+    )
+
+
+class OperationState(Base):
+    """
+    Projection of operation_events: current lifecycle state and time totals of
+    every operation that has events, kept in the same transaction as the log.
+    Survives archiving, so actual-vs-planned reports cover history too.
+    """
+    __tablename__ = "operation_states"
+    
+    operation_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    work_order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    work_center_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    running_since: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_start_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_completion_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_minutes: Mapped[float] = mapped_column(DECIMAL(12, 2), default=0)
+    planned_minutes: Mapped[Optional[float]] = mapped_column(DECIMAL(12, 2))
+    quantity: Mapped[Optional[int]] = mapped_column(Integer)
+    quantity_completed: Mapped[int] = mapped_column(Integer, default=0)
+    event_count: Mapped[int] = mapped_column(Integer, default=0)
+    last_event_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_operation_states_work_center_completed", "work_center_id", "actual_completion_time"),
+        Index("ix_operation_states_updated_at", "updated_at"),
+    )
+
+
+class ProjectionSnapshot(Base):
+    """
+    A saved copy of a projection. Every event with id <= event_horizon is
+    reflected in it, so a rebuild only replays the events after the horizon.
+    """
+    __tablename__ = "projection_snapshots"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    projection: Mapped[str] = mapped_column(String(50), nullable=False)
+    event_horizon: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_projection_snapshots_projection_id", "projection", "id"),
+    )
+
+
+class OperationStateSnapshot(Base):
+    """operation_states rows as of a projection snapshot"""
+    __tablename__ = "operation_state_snapshots"
+    
+    snapshot_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("projection_snapshots.id", ondelete="CASCADE"), primary_key=True
+    )
+    operation_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    work_order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    work_center_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    running_since: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_start_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_completion_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    actual_minutes: Mapped[float] = mapped_column(DECIMAL(12, 2), default=0)
+    planned_minutes: Mapped[Optional[float]] = mapped_column(DECIMAL(12, 2))
+    quantity: Mapped[Optional[int]] = mapped_column(Integer)
+    quantity_completed: Mapped[int] = mapped_column(Integer, default=0)
+    event_count: Mapped[int] = mapped_column(Integer, default=0)
+    last_event_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+
+class OperationPerformanceDaily(Base):
+    """
+    Completed-operation time totals per completion day, work center, product and
+    operation type (operation name), rebuilt from operation_states by the
+    performance rollup refresher. Sums cover operations with both a norma and
+    recorded running time; elapsed minutes include pauses.
+    """
+    __tablename__ = "operation_performance_daily"
+    
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    work_center_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, primary_key=True)  # 0: unknown
+    operation_type: Mapped[str] = mapped_column(String(200), primary_key=True)
+    operations: Mapped[int] = mapped_column(Integer, default=0)
+    comparable_operations: Mapped[int] = mapped_column(Integer, default=0)
+    planned_minutes: Mapped[float] = mapped_column(DECIMAL(14, 2), default=0)
+    actual_minutes: Mapped[float] = mapped_column(DECIMAL(14, 2), default=0)
+    elapsed_minutes: Mapped[float] = mapped_column(DECIMAL(14, 2), default=0)
+    quantity_completed: Mapped[int] = mapped_column(BigInteger, default=0)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_operation_performance_daily_work_center_day", "work_center_id", "day"),
+    )
+
+
+class DurationFactor(Base):
+    """
+    Learned actual/norma ratio per work center, product type and operation name
+    pattern: running count, mean and sum of squared deviations (Welford), updated
+    as operations complete.
+    """
+    __tablename__ = "duration_factors"
+    
+    work_center_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    product_type_id: Mapped[int] = mapped_column(Integer, primary_key=True)  # 0: unknown
+    naziv_pattern: Mapped[str] = mapped_column(String(100), primary_key=True)
+    samples: Mapped[int] = mapped_column(Integer, default=0)
+    mean_factor: Mapped[float] = mapped_column(Float, default=1.0)
+    m2: Mapped[float] = mapped_column(Float, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class Shift(Base):
+    """
+    Shift calendar: when a work center is planned to produce. Rows without a
+    work center apply to every work center that has none of its own.
+    """
+    __tablename__ = "shifts"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    work_center_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("work_centers.id", ondelete="CASCADE"))
+    name: Mapped[str] = mapped_column(String(20), nullable=False)
+    start_time: Mapped[time] = mapped_column(Time, nullable=False)  # plant local time
+    end_time: Mapped[time] = mapped_column(Time, nullable=False)  # at or before start_time: ends next day
+    weekdays: Mapped[str] = mapped_column(String(7), default="12345")  # ISO weekdays the shift starts on
+    break_minutes: Mapped[int] = mapped_column(Integer, default=0)  # planned stops, not counted against availability
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    
+    __table_args__ = (
+        Index("ix_shifts_work_center_id", "work_center_id"),
+    )
+
+
+class OeeShiftStats(Base):
+    """
+    OEE counters per work center and shift, added to by every shop-floor batch.
+    Runs outside any shift are kept under the 'overtime' shift of their day.
+    """
+    __tablename__ = "oee_shift_stats"
+    
+    work_center_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    shift_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)  # UTC
+    shift_name: Mapped[str] = mapped_column(String(20), primary_key=True)
+    shift_end: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)  # plant local date the shift starts on
+    planned_minutes: Mapped[float] = mapped_column(DECIMAL(10, 2), default=0)
+    run_minutes: Mapped[float] = mapped_column(DECIMAL(12, 2), default=0)
+    ideal_minutes: Mapped[float] = mapped_column(DECIMAL(12, 2), default=0)
+    good_quantity: Mapped[int] = mapped_column(Integer, default=0)
+    scrap_quantity: Mapped[int] = mapped_column(Integer, default=0)
+    stops: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_oee_shift_stats_day", "day"),
+    )
+
+
+class Downtime(Base):
+    """
+    Time a work center cannot produce: planned maintenance windows and
+    breakdowns. An open breakdown (no ends_at) lasts until resolved and is
+    planned around until expected_end.
+    """
+    __tablename__ = "downtimes"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    work_center_id: Mapped[int] = mapped_column(Integer, ForeignKey("work_centers.id", ondelete="CASCADE"), nullable=False)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)  # planned or breakdown
+    reason: Mapped[Optional[str]] = mapped_column(String(200))
+    starts_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    ends_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    expected_end: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    reported_by: Mapped[Optional[str]] = mapped_column(String(100))
+    note: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_downtimes_work_center_starts", "work_center_id", "starts_at"),
+        Index("ix_downtimes_open", "work_center_id", postgresql_where=text("ends_at IS NULL")),
+    )
@@ -0,0 +1,187 @@
+"""
+Registry of hot repository query patterns and the indexes that serve them
+
+Each pattern mirrors the WHERE/ORDER BY shape of a repository method and names
+the index (declared in models.py, created by the matching Alembic migration)
+the planner is expected to use. verify_index_usage() runs EXPLAIN for every
+pattern so a missing or unused index shows up before it shows up in latency.
+
+Usage:
+    python -m app.database.query_patterns
+"""
+import asyncio
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import select, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from .models import WorkOrder, Operation, WorkCenter, Product
+from app.repositories.search import prefix_match
+
+ACTIVE_STATUSES = ["pending", "in_progress"]
+
+
+@dataclass(frozen=True)
+class QueryPattern:
+    """A repository query shape and the indexes expected to serve it"""
+    name: str
+    index_names: Tuple[str, ...]
+    build_statement: Callable[[], Select]
+    description: str = ""
+
+
+QUERY_PATTERNS: List[QueryPattern] = [
+    QueryPattern(
+        name="WorkOrderRepository.get_work_orders_with_filters",
+        index_names=("ix_work_orders_priority_delivery",),
+        build_statement=lambda: select(WorkOrder).order_by(
+            WorkOrder.priority_level, WorkOrder.datum_isporuke
+        ).limit(100),
+        description="Default list ordering by HITNO then delivery date"
+    ),
+    QueryPattern(
+        name="WorkOrderRepository.get_by_status",
+        index_names=("ix_work_orders_status",),
+        build_statement=lambda: select(WorkOrder).where(WorkOrder.status == "in_progress").limit(100),
+        description="Status filter on work orders"
+    ),
+    QueryPattern(
+        name="WorkOrderRepository.get_overdue_orders",
+        index_names=("ix_work_orders_active_delivery",),
+        build_statement=lambda: select(WorkOrder).where(
+            WorkOrder.datum_isporuke < date.today(),
+            WorkOrder.status.in_(ACTIVE_STATUSES)
+        ).order_by(WorkOrder.datum_isporuke),
+        description="Partial index on the active backlog ordered by delivery date"
+    ),
+    QueryPattern(
+        name="WorkOrderRepository.get_recent_work_orders",
+        index_names=("ix_work_orders_updated_at",),
+        build_statement=lambda: select(WorkOrder).order_by(WorkOrder.updated_at.desc()).limit(5),
+        description="Most recently updated work orders"
+    ),
+    QueryPattern(
+        name="WorkOrderRepository.search_work_orders",
+        index_names=("ix_work_orders_rn_trgm",),
+        build_statement=lambda: select(WorkOrder).where(WorkOrder.rn.ilike("%1008%")).limit(100),
+        description="Trigram GIN index for leading-wildcard RN search"
+    ),
+    QueryPattern(
+        name="WorkOrderRepository.search_work_orders_ranked (RN prefix)",
+        index_names=("ix_work_orders_rn_prefix",),
+        build_statement=lambda: select(WorkOrder.id).where(prefix_match([WorkOrder.rn], "1008")),
+        description="Type-ahead prefix match on RN"
+    ),
+    QueryPattern(
+        name="ProductRepository.search_products_ranked (KPL prefix)",
+        index_names=("ix_products_kpl_prefix",),
+        build_statement=lambda: select(Product.id).where(prefix_match([Product.kpl], "1008")),
+        description="Type-ahead prefix match on KPL"
+    ),
+    QueryPattern(
+        name="ProductRepository.search_products",
+        index_names=("ix_products_kpl_trgm", "ix_products_name_trgm"),
+        build_statement=lambda: select(Product).where(
+            or_(Product.kpl.ilike("%1008%"), Product.name.ilike("%rahmen%"))
+        ).limit(100),
+        description="Trigram GIN indexes for KPL and name search"
+    ),
+    QueryPattern(
+        name="ProductRepository.get_product_statistics",
+        index_names=("ix_work_orders_product_id",),
+        build_statement=lambda: select(WorkOrder.status).where(WorkOrder.product_id == 1),
+        description="Work orders of a single product"
+    ),
+    QueryPattern(
+        name="OperationRepository.get_operations_for_scheduling",
+        index_names=("ix_operations_active_work_center_sequence",),
+        build_statement=lambda: select(Operation).where(
+            Operation.work_center_id == 1,
+            Operation.status.in_(ACTIVE_STATUSES)
+        ).order_by(Operation.operation_sequence),
+        description="Partial index on the active queue of a work center"
+    ),
+    QueryPattern(
+        name="WorkCenterRepository.get_work_center_statistics",
+        index_names=("ix_operations_work_center_status",),
+        build_statement=lambda: select(Operation.id).where(
+            Operation.work_center_id == 1,
+            Operation.status == "in_progress"
+        ),
+        description="Operations of a work center by status"
+    ),
+    QueryPattern(
+        name="WorkCenterRepository.get_by_code",
+        index_names=("ix_work_centers_code",),
+        build_statement=lambda: select(WorkCenter).where(WorkCenter.code == "SAV100"),
+        description="Work center lookup by code"
+    ),
+]
+
+
+def _collect_index_names(plan: Dict[str, Any], found: Set[str]) -> Set[str]:
+    """Walk an EXPLAIN (FORMAT JSON) plan tree and collect used index names"""
+    if "Index Name" in plan:
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        _collect_index_names(child, found)
+    return found
+
+
+async def explain_pattern(session: AsyncSession, pattern: QueryPattern) -> Dict[str, Any]:
+    """Run EXPLAIN for a pattern and report which indexes the plan uses"""
+    connection = await session.connection()
+    compiled = pattern.build_statement().compile(
+        dialect=connection.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    raw_plan = result.scalar()
+    plan = raw_plan if isinstance(raw_plan, list) else json.loads(raw_plan)
+
+    used = _collect_index_names(plan[0]["Plan"], set())
+    return {
+        "pattern": pattern.name,
+        "expected": list(pattern.index_names),
+        "used": sorted(used),
+        "ok": bool(used & set(pattern.index_names))
+    }
+
+
+async def verify_index_usage(
+    session: AsyncSession,
+    patterns: Iterable[QueryPattern] = QUERY_PATTERNS,
+    disable_seqscan: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    EXPLAIN every registered pattern.
+
+    Sequential scans are disabled by default so the check is meaningful on
+    small development databases, where the planner would rightly prefer them.
+    """
+    if disable_seqscan:
+        await session.execute(text("SET LOCAL enable_seqscan = off"))
+
+    return [await explain_pattern(session, pattern) for pattern in patterns]
+
+
+async def _main() -> int:
+    from .connection import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            report = await verify_index_usage(session)
+
+    for entry in report:
+        marker = "✅" if entry["ok"] else "❌"
+        print(f"{marker} {entry['pattern']}: expected {entry['expected']}, used {entry['used']}")
+
+    return 0 if all(entry["ok"] for entry in report) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
@@ -1,13 +1,22 @@
 """
 MES Production Scheduling System - FastAPI Main Application
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from sqlalchemy import text
 
-from app.database.connection import engine
+from app.database.connection import engine, AsyncSessionLocal, settings
 from app.database.models import Base
-from app.api import work_orders, scheduling, machines
+from app.repositories.work_order_summary import WorkOrderSummaryRepository
+from app.repositories.work_center_registry import work_center_registry
+from app.services.outbox_dispatcher import get_dispatcher
+from app.services.operation_events import stop_event_writer
+from app.services.operation_projection import ensure_projection, projection_snapshotter
+from app.services.performance_rollups import performance_rollup_refresher
+from app.api import work_orders, scheduling, machines, search, dashboard, events, export, plan_import, history, shop_floor, performance, oee, diagnostics
+from app.utils.instrumentation import MetricsMiddleware, instrument_engine
+from app.utils.metrics import metrics, PROMETHEUS_CONTENT_TYPE
 
 
 @asynccontextmanager
@@ -16,14 +25,41 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting MES Production Scheduling System...")
     
-    # Create database tables
+    # Create database tables (trigram indexes need pg_trgm)
     async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
     
+    # Backfill the work order summary table on databases created without migrations
+    async with AsyncSessionLocal() as session:
+        if await WorkOrderSummaryRepository(session).ensure_populated():
+            await session.commit()
+            print("📋 Work order summaries built")
+        
+        # Work center codes resolve from memory from here on
+        await work_center_registry.load(session)
+    
+    # Operation state projection: restore it if it was lost, then snapshot periodically
+    rebuilt = await ensure_projection()
+    if rebuilt:
+        print(f"🔁 Operation states rebuilt ({rebuilt.replayed_events} events replayed)")
+    projection_snapshotter.start()
+    performance_rollup_refresher.start()
+    
+    # Publish change-data-capture events from the outbox
+    if settings.outbox_enabled:
+        get_dispatcher().start()
+        print(f"📤 Outbox dispatcher started ({settings.outbox_sink})")
+    
     yield
     
     # Shutdown
     print("🛑 Shutting down MES Production Scheduling System...")
+    await stop_event_writer()
+    await projection_snapshotter.stop()
+    await performance_rollup_refresher.stop()
+    if settings.outbox_enabled:
+        await get_dispatcher().stop()
 
 
 # Create FastAPI application
@@ -34,6 +70,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Per-route latency and SQL per request; statement timing on every connection
+instrument_engine(engine.sync_engine)
+app.add_middleware(MetricsMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -47,6 +87,16 @@ app.add_middleware(
 app.include_router(work_orders.router, prefix="/api/work-orders", tags=["work-orders"])
 app.include_router(scheduling.router, prefix="/api/schedule", tags=["scheduling"])
 app.include_router(machines.router, prefix="/api/machines", tags=["machines"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(plan_import.router, prefix="/api/import", tags=["import"])
+app.include_router(history.router, prefix="/api/history", tags=["history"])
+app.include_router(shop_floor.router, prefix="/api/shop-floor", tags=["shop-floor"])
+app.include_router(performance.router, prefix="/api/performance", tags=["performance"])
+app.include_router(oee.router, prefix="/api/oee", tags=["oee"])
+app.include_router(diagnostics.router, prefix="/api/diagnostics", tags=["diagnostics"])
 
 
 @app.get("/")
@@ -59,6 +109,12 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Metrics in the Prometheus text format"""
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -8,6 +8,13 @@ from .operation import OperationRepository
 from .work_center import WorkCenterRepository
 from .product import ProductRepository
 from .organization import OrganizationRepository
+from .work_order_summary import WorkOrderSummaryRepository
+from .work_center_registry import WorkCenterRegistry, WorkCenterInfo, work_center_registry
+from .outbox import OutboxRepository
+from .history import HistoryRepository
+from .operation_event import OperationEventRepository
+from .performance import PerformanceRepository
+from .downtime import DowntimeRepository
 
 __all__ = [
     "BaseRepository",
@@ -16,4 +23,13 @@ __all__ = [
     "WorkCenterRepository",
     "ProductRepository",
     "OrganizationRepository",
+    "WorkOrderSummaryRepository",
+    "WorkCenterRegistry",
+    "WorkCenterInfo",
+    "work_center_registry",
+    "OutboxRepository",
+    "HistoryRepository",
+    "OperationEventRepository",
+    "PerformanceRepository",
+    "DowntimeRepository",
 ]
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Total-count strategies for paginated list queries
+"""
+import time
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.database.change_tracking import ChangeSet, on_commit
+from app.database.connection import settings
+
+
+class CountMode(str, Enum):
+    """How a list endpoint obtains its total count"""
+    EXACT = "exact"          # COUNT(*) cached per filter signature
+    ESTIMATED = "estimated"  # pg_class.reltuples for unfiltered lists
+    NONE = "none"            # skip totals entirely
+
+
+class CountCache:
+    """
+    Exact counts keyed by filter signature.
+    Entries are dropped when any table they were counted from is written.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple, Tuple[float, int, FrozenSet[str]]] = {}
+
+    def get(self, signature: Tuple) -> Optional[int]:
+        """Get a cached count if it is still fresh"""
+        entry = self._entries.get(signature)
+        if entry is None:
+            return None
+
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(signature, None)
+            return None
+
+        return value
+
+    def set(self, signature: Tuple, value: int, tables: Iterable[str]) -> None:
+        """Cache a count together with the tables it depends on"""
+        if len(self._entries) >= self.max_entries:
+            # Evict the entry closest to expiry
+            oldest = min(self._entries, key=lambda key: self._entries[key][0])
+            self._entries.pop(oldest, None)
+
+        self._entries[signature] = (
+            time.monotonic() + self.ttl_seconds,
+            value,
+            frozenset(tables)
+        )
+
+    def invalidate(self, *tables: str) -> None:
+        """Drop every count that depends on one of the given tables"""
+        changed = set(tables)
+        stale = [key for key, (_, _, deps) in self._entries.items() if deps & changed]
+        for key in stale:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all cached counts"""
+        self._entries.clear()
+
+
+count_cache = CountCache(ttl_seconds=settings.count_cache_ttl_seconds)
+
+
+@on_commit
+def _invalidate_counts(change_set: ChangeSet) -> None:
+    count_cache.invalidate(*change_set.tables)
+
+
+def filter_signature(name: str, **filters: Any) -> Tuple:
+    """Build a hashable cache key from the filters that are actually applied"""
+    applied = tuple(
+        sorted((key, value) for key, value in filters.items() if value not in (None, False))
+    )
+    return (name,) + applied
+
+
+async def estimate_row_count(session: AsyncSession, table_name: str) -> Optional[int]:
+    """Planner row estimate from pg_class; None if the table was never analyzed"""
+    stmt = text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table_name")
+    result = await session.execute(stmt, {"table_name": table_name})
+    estimate = result.scalar()
+
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+async def resolve_total_count(
+    session: AsyncSession,
+    count_stmt: Select,
+    mode: CountMode,
+    signature: Tuple,
+    tables: Iterable[str],
+    estimate_table: Optional[str] = None
+) -> Optional[int]:
+    """
+    Resolve a total count according to the requested mode.
+
+    estimate_table should only be given for unfiltered lists; filtered
+    ESTIMATED requests fall back to the cached exact count.
+    """
+    if mode == CountMode.NONE:
+        return None
+
+    if mode == CountMode.ESTIMATED and estimate_table:
+        estimate = await estimate_row_count(session, estimate_table)
+        if estimate is not None:
+            return estimate
+
+    cached = count_cache.get(signature)
+    if cached is not None:
+        return cached
+
+    result = await session.execute(count_stmt)
+    total = result.scalar() or 0
+    count_cache.set(signature, total, tables)
+    return total
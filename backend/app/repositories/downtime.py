@@ -0,0 +1,100 @@
+"""
+Downtime repository: planned maintenance windows and breakdowns per work center
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import settings
+from app.database.models import Downtime
+
+PLANNED = "planned"
+BREAKDOWN = "breakdown"
+DOWNTIME_KINDS = (PLANNED, BREAKDOWN)
+
+
+def planned_end(downtime: Downtime, now: datetime) -> datetime:
+    """Where planning assumes the downtime ends; open breakdowns never before now"""
+    if downtime.ends_at is not None:
+        return downtime.ends_at
+    expected = downtime.expected_end or downtime.starts_at + timedelta(minutes=settings.breakdown_default_minutes)
+    return max(expected, now + timedelta(minutes=1))
+
+
+class DowntimeRepository:
+    """
+    Downtime windows, and the capacity gaps they leave for the rescheduler
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, id: int) -> Optional[Downtime]:
+        """Downtime by id"""
+        return await self.session.get(Downtime, id)
+
+    async def create(self, **values) -> Downtime:
+        """Record a downtime; the caller commits"""
+        downtime = Downtime(**values)
+        self.session.add(downtime)
+        await self.session.flush()
+        return downtime
+
+    async def get_for_work_center(
+        self,
+        work_center_id: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Downtime]:
+        """Downtimes of a work center overlapping a period (open ones always), oldest first"""
+        stmt = select(Downtime).where(Downtime.work_center_id == work_center_id)
+        if date_from is not None:
+            stmt = stmt.where(or_(Downtime.ends_at.is_(None), Downtime.ends_at > date_from))
+        if date_to is not None:
+            stmt = stmt.where(Downtime.starts_at < date_to)
+        result = await self.session.execute(stmt.order_by(Downtime.starts_at, Downtime.id))
+        return result.scalars().all()
+
+    async def get_open_breakdowns(self, work_center_id: int) -> List[Downtime]:
+        """Breakdowns of a work center not resolved yet"""
+        result = await self.session.execute(
+            select(Downtime).where(
+                Downtime.work_center_id == work_center_id,
+                Downtime.kind == BREAKDOWN,
+                Downtime.ends_at.is_(None)
+            ).order_by(Downtime.starts_at)
+        )
+        return result.scalars().all()
+
+    async def get_gaps(
+        self,
+        work_center_ids: Iterable[int],
+        start: datetime,
+        end: datetime,
+        now: Optional[datetime] = None
+    ) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """Downtime per work center within [start, end), merged into disjoint sorted intervals"""
+        now = now or datetime.utcnow()
+        work_center_ids = list(work_center_ids)
+        gaps: Dict[int, List[Tuple[datetime, datetime]]] = {work_center_id: [] for work_center_id in work_center_ids}
+        if not work_center_ids:
+            return gaps
+        result = await self.session.execute(
+            select(Downtime).where(
+                Downtime.work_center_id.in_(work_center_ids),
+                Downtime.starts_at < end,
+                or_(Downtime.ends_at.is_(None), Downtime.ends_at > start)
+            ).order_by(Downtime.work_center_id, Downtime.starts_at)
+        )
+        for downtime in result.scalars():
+            gap_start, gap_end = max(downtime.starts_at, start), min(planned_end(downtime, now), end)
+            if gap_end <= gap_start:
+                continue
+            intervals = gaps[downtime.work_center_id]
+            if intervals and gap_start <= intervals[-1][1]:
+                intervals[-1] = (intervals[-1][0], max(intervals[-1][1], gap_end))
+            else:
+                intervals.append((gap_start, gap_end))
+        return gaps
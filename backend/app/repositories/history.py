@@ -0,0 +1,336 @@
+"""
+History repository: archived work orders and operations
+
+Completed and cancelled work orders are moved with their operations from the
+hot tables into work_orders_history / operations_history, both range
+partitioned by completion month. Reports filter on completed_at so the
+planner only touches the partitions in range.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select, func, text, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.change_tracking import mark_changed, mark_work_orders_changed
+from app.database.models import (
+    WorkOrder, Operation, Product, WorkCenter, WorkOrderHistory, OperationHistory
+)
+
+ACTIVE_STATUSES = ["pending", "in_progress"]
+ARCHIVABLE_STATUSES = ["completed", "cancelled"]
+
+HISTORY_TABLES = ("work_orders_history", "operations_history")
+
+# A work order's completion time: its last update, which is the final status change
+_HOT_COMPLETED_AT = func.coalesce(WorkOrder.updated_at, WorkOrder.created_at)
+
+_WORK_ORDER_COLUMNS = [column.name for column in WorkOrder.__table__.columns]
+_OPERATION_COLUMNS = [column.name for column in Operation.__table__.columns]
+
+
+def _month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def _range(date_from: Optional[date], date_to: Optional[date]):
+    """Inclusive date bounds as a half-open datetime range"""
+    start = datetime.combine(date_from, datetime.min.time()) if date_from else None
+    end = datetime.combine(date_to + timedelta(days=1), datetime.min.time()) if date_to else None
+    return start, end
+
+
+class HistoryRepository:
+    """
+    Archive moves and historical report queries
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def ensure_partitions(self, months: Iterable[date]) -> List[str]:
+        """Create the monthly partitions of both history tables; returns the ones that were new"""
+        existing = set(await self.get_partition_names())
+        created = []
+        for month in sorted(set(months)):
+            for table in HISTORY_TABLES:
+                name = partition_name(table, month)
+                if name in existing:
+                    continue
+                await self.session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+                ))
+                created.append(name)
+        return created
+
+    async def get_partition_names(self) -> List[str]:
+        result = await self.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname IN ('work_orders_history', 'operations_history')"
+        ))
+        return [row[0] for row in result.fetchall()]
+
+    async def get_partitions(self) -> List[Dict[str, Any]]:
+        """Partitions with their bounds and estimated row counts"""
+        result = await self.session.execute(text(
+            "SELECT p.relname AS parent, c.relname AS partition, "
+            "       pg_get_expr(c.relpartbound, c.oid) AS bounds, "
+            "       GREATEST(c.reltuples, 0)::bigint AS estimated_rows, "
+            "       pg_total_relation_size(c.oid) AS total_bytes "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname IN ('work_orders_history', 'operations_history') "
+            "ORDER BY p.relname, c.relname"
+        ))
+        return [dict(row._mapping) for row in result.fetchall()]
+
+    async def claim_archivable(self, cutoff: datetime, limit: int, statuses: Sequence[str] = ARCHIVABLE_STATUSES):
+        """Lock a batch of finished work orders last changed before cutoff; returns (id, completed_at) rows"""
+        has_active_operations = select(Operation.id).where(
+            Operation.work_order_id == WorkOrder.id,
+            Operation.status.in_(ACTIVE_STATUSES)
+        ).exists()
+        stmt = select(WorkOrder.id, _HOT_COMPLETED_AT.label("completed_at")).where(
+            WorkOrder.status.in_(list(statuses)),
+            _HOT_COMPLETED_AT < cutoff,
+            ~has_active_operations
+        ).order_by(WorkOrder.id).limit(limit).with_for_update(of=WorkOrder, skip_locked=True)
+        result = await self.session.execute(stmt)
+        return result.fetchall()
+
+    async def archive_work_orders(self, rows) -> Dict[str, Any]:
+        """Move claimed work orders and their operations into the history tables"""
+        ids = [row.id for row in rows]
+        if not ids:
+            return {"work_orders": 0, "operations": 0, "partitions_created": []}
+
+        partitions = await self.ensure_partitions(_month_start(row.completed_at) for row in rows)
+
+        operation_columns = ", ".join(_OPERATION_COLUMNS)
+        moved_operations = await self.session.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM operations o
+                USING work_orders wo
+                WHERE o.work_order_id = wo.id AND wo.id = ANY(:ids)
+                RETURNING o.*, COALESCE(wo.updated_at, wo.created_at) AS completed_at
+            )
+            INSERT INTO operations_history ({operation_columns}, completed_at, archived_at)
+            SELECT {operation_columns}, completed_at, timezone('utc', now()) FROM moved
+        """), {"ids": ids})
+
+        work_order_columns = ", ".join(_WORK_ORDER_COLUMNS)
+        moved_work_orders = await self.session.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM work_orders WHERE id = ANY(:ids) RETURNING *
+            )
+            INSERT INTO work_orders_history ({work_order_columns}, completed_at, archived_at)
+            SELECT {work_order_columns}, COALESCE(updated_at, created_at), timezone('utc', now()) FROM moved
+        """), {"ids": ids})
+
+        mark_changed(self.session, "operations", "work_orders")
+        mark_work_orders_changed(self.session, ids)
+        return {
+            "work_orders": moved_work_orders.rowcount,
+            "operations": moved_operations.rowcount,
+            "partitions_created": partitions,
+        }
+
+    async def restore_work_order(self, work_order_id: int) -> Optional[Dict[str, int]]:
+        """Move an archived work order and its operations back into the hot tables"""
+        work_order_columns = ", ".join(_WORK_ORDER_COLUMNS)
+        restored = await self.session.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM work_orders_history WHERE id = :id RETURNING *
+            )
+            INSERT INTO work_orders ({work_order_columns})
+            SELECT {work_order_columns} FROM moved
+        """), {"id": work_order_id})
+        if not restored.rowcount:
+            return None
+
+        operation_columns = ", ".join(_OPERATION_COLUMNS)
+        operations = await self.session.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM operations_history WHERE work_order_id = :id RETURNING *
+            )
+            INSERT INTO operations ({operation_columns})
+            SELECT {operation_columns} FROM moved
+        """), {"id": work_order_id})
+
+        mark_changed(self.session, "operations", "work_orders")
+        mark_work_orders_changed(self.session, [work_order_id])
+        return {"work_orders": restored.rowcount, "operations": operations.rowcount}
+
+    async def get_work_orders(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        status: Optional[str] = None,
+        kpl: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Archived work orders completed in a date range, newest first"""
+        start, end = _range(date_from, date_to)
+        conditions = []
+        if start:
+            conditions.append(WorkOrderHistory.completed_at >= start)
+        if end:
+            conditions.append(WorkOrderHistory.completed_at < end)
+        if status:
+            conditions.append(WorkOrderHistory.status == status)
+        if kpl:
+            conditions.append(Product.kpl == kpl)
+
+        base = select(WorkOrderHistory, Product.kpl, Product.name).outerjoin(
+            Product, WorkOrderHistory.product_id == Product.id
+        ).where(*conditions)
+
+        total = await self.session.scalar(select(func.count()).select_from(base.subquery()))
+        result = await self.session.execute(
+            base.order_by(WorkOrderHistory.completed_at.desc(), WorkOrderHistory.id.desc()).offset(skip).limit(limit)
+        )
+
+        items = []
+        for work_order, product_kpl, product_name in result.fetchall():
+            items.append({
+                "id": work_order.id,
+                "rn": work_order.rn,
+                "product_kpl": product_kpl,
+                "product_name": product_name,
+                "quantity": work_order.quantity,
+                "priority_level": work_order.priority_level,
+                "datum_isporuke": work_order.datum_isporuke,
+                "status": work_order.status,
+                "created_at": work_order.created_at,
+                "completed_at": work_order.completed_at,
+                "archived_at": work_order.archived_at,
+            })
+        return {"items": items, "total": total, "skip": skip, "limit": limit}
+
+    async def get_operations(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        work_center_id: Optional[int] = None,
+        work_order_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Archived operations completed in a date range"""
+        start, end = _range(date_from, date_to)
+        conditions = []
+        if start:
+            conditions.append(OperationHistory.completed_at >= start)
+        if end:
+            conditions.append(OperationHistory.completed_at < end)
+        if work_center_id is not None:
+            conditions.append(OperationHistory.work_center_id == work_center_id)
+        if work_order_id is not None:
+            conditions.append(OperationHistory.work_order_id == work_order_id)
+
+        base = select(OperationHistory, WorkCenter.code).outerjoin(
+            WorkCenter, OperationHistory.work_center_id == WorkCenter.id
+        ).where(*conditions)
+
+        total = await self.session.scalar(select(func.count()).select_from(base.subquery()))
+        result = await self.session.execute(
+            base.order_by(OperationHistory.completed_at.desc(), OperationHistory.id).offset(skip).limit(limit)
+        )
+
+        items = []
+        for operation, work_center_code in result.fetchall():
+            items.append({
+                "id": operation.id,
+                "work_order_id": operation.work_order_id,
+                "work_center_code": work_center_code,
+                "operation_sequence": operation.operation_sequence,
+                "naziv": operation.naziv,
+                "norma": float(operation.norma) if operation.norma is not None else None,
+                "quantity": operation.quantity,
+                "quantity_completed": operation.quantity_completed,
+                "status": operation.status,
+                "completed_at": operation.completed_at,
+            })
+        return {"items": items, "total": total, "skip": skip, "limit": limit}
+
+    async def get_monthly_summary(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Finished operations per month and work center, from the history tables
+        and from finished work orders not archived yet, so reports are complete
+        whenever the archive last ran.
+        """
+        start, end = _range(date_from, date_to)
+
+        archived = select(
+            OperationHistory.completed_at.label("completed_at"),
+            OperationHistory.work_center_id.label("work_center_id"),
+            OperationHistory.status.label("status"),
+            OperationHistory.norma.label("norma"),
+            OperationHistory.quantity_completed.label("quantity_completed"),
+            literal(True).label("archived"),
+        )
+        if start:
+            archived = archived.where(OperationHistory.completed_at >= start)
+        if end:
+            archived = archived.where(OperationHistory.completed_at < end)
+
+        not_archived = select(
+            _HOT_COMPLETED_AT.label("completed_at"),
+            Operation.work_center_id.label("work_center_id"),
+            Operation.status.label("status"),
+            Operation.norma.label("norma"),
+            Operation.quantity_completed.label("quantity_completed"),
+            literal(False).label("archived"),
+        ).join(
+            WorkOrder, Operation.work_order_id == WorkOrder.id
+        ).where(WorkOrder.status.in_(ARCHIVABLE_STATUSES))
+        if start:
+            not_archived = not_archived.where(_HOT_COMPLETED_AT >= start)
+        if end:
+            not_archived = not_archived.where(_HOT_COMPLETED_AT < end)
+
+        finished = union_all(archived, not_archived).subquery("finished")
+        month = func.date_trunc("month", finished.c.completed_at)
+
+        stmt = select(
+            month.label("month"),
+            WorkCenter.code.label("work_center_code"),
+            func.count().filter(finished.c.status == "completed").label("completed_operations"),
+            func.count().filter(finished.c.status == "cancelled").label("cancelled_operations"),
+            func.coalesce(func.sum(finished.c.norma).filter(finished.c.status == "completed"), 0).label("completed_hours"),
+            func.coalesce(func.sum(finished.c.quantity_completed), 0).label("quantity_completed"),
+            func.count().filter(finished.c.archived).label("archived_operations"),
+        ).outerjoin(
+            WorkCenter, finished.c.work_center_id == WorkCenter.id
+        ).group_by(month, WorkCenter.code).order_by(month, WorkCenter.code)
+
+        result = await self.session.execute(stmt)
+        return [
+            {
+                "month": row.month.date().isoformat() if row.month else None,
+                "work_center_code": row.work_center_code,
+                "completed_operations": row.completed_operations,
+                "cancelled_operations": row.cancelled_operations,
+                "completed_hours": round(float(row.completed_hours) / 60, 2),  # norma is in minutes
+                "quantity_completed": int(row.quantity_completed),
+                "archived_operations": row.archived_operations,
+            }
+            for row in result.fetchall()
+        ]
@@ -3,12 +3,14 @@ Operation repository for scheduling and production operations
 """
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
-from sqlalchemy import select, func, and_, or_, update
+from sqlalchemy import select, func, and_, or_, delete, exists
 from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import Operation, WorkOrder, WorkCenter, Product
 from app.schemas.operation import OperationCreate, OperationUpdate
+from app.services.operation_events import record_status_change
+from .work_center_registry import work_center_registry
 from .base import BaseRepository
 
 
@@ -37,11 +39,15 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         limit: int = 100
     ) -> List[Operation]:
         """Get operations by work center"""
+        work_center_id = await work_center_registry.resolve_id(self.session, work_center_code)
+        if work_center_id is None:
+            return []
+        
         stmt = select(Operation).options(
             joinedload(Operation.work_order).joinedload(WorkOrder.product),
             joinedload(Operation.work_center)
-        ).join(WorkCenter).where(
-            WorkCenter.code == work_center_code
+        ).where(
+            Operation.work_center_id == work_center_id
         ).order_by(Operation.operation_sequence).offset(skip).limit(limit)
         
         result = await self.session.execute(stmt)
@@ -80,10 +86,14 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         end_date: Optional[date] = None
     ) -> List[Operation]:
         """Get scheduled operations for a work center with date filtering"""
+        work_center_id = await work_center_registry.resolve_id(self.session, work_center_code)
+        if work_center_id is None:
+            return []
+        
         stmt = select(Operation).options(
             joinedload(Operation.work_order).joinedload(WorkOrder.product),
             joinedload(Operation.work_center)
-        ).join(WorkCenter).where(WorkCenter.code == work_center_code)
+        ).where(Operation.work_center_id == work_center_id)
         
         conditions = []
         
@@ -113,12 +123,16 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         work_center_code: str
     ) -> Dict[str, Any]:
         """Get operations formatted for scheduling interface"""
+        work_center_info = await work_center_registry.get_by_code(self.session, work_center_code)
+        if work_center_info is None:
+            return {"operations": [], "work_center": None, "total_count": 0}
+        
         stmt = select(Operation).options(
             joinedload(Operation.work_order).joinedload(WorkOrder.product),
             joinedload(Operation.work_center)
-        ).join(WorkCenter).where(
+        ).where(
             and_(
-                WorkCenter.code == work_center_code,
+                Operation.work_center_id == work_center_info.id,
                 Operation.status.in_(['pending', 'in_progress'])
             )
         ).order_by(Operation.operation_sequence)
@@ -126,10 +140,8 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         result = await self.session.execute(stmt)
         operations = result.scalars().all()
         
-        # Get work center information
-        work_center_stmt = select(WorkCenter).where(WorkCenter.code == work_center_code)
-        work_center_result = await self.session.execute(work_center_stmt)
-        work_center = work_center_result.scalar_one_or_none()
+        # Already in the identity map when any operation was returned
+        work_center = await self.session.get(WorkCenter, work_center_info.id)
         
         return {
             "operations": operations,
@@ -144,15 +156,20 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
     ) -> bool:
         """Update operation sequence for scheduling"""
         try:
-            # Update the sequence for each operation
+            # Load the operations once and let the flush batch the updates;
+            # the change tracker then sees the touched work orders row by row
+            result = await self.session.execute(
+                select(Operation).where(Operation.id.in_(operation_ids))
+            )
+            operations = {operation.id: operation for operation in result.scalars().all()}
+            
+            now = datetime.utcnow()
             for index, operation_id in enumerate(operation_ids):
-                stmt = update(Operation).where(
-                    Operation.id == operation_id
-                ).values(
-                    operation_sequence=index + 1,
-                    updated_at=datetime.utcnow()
-                )
-                await self.session.execute(stmt)
+                operation = operations.get(operation_id)
+                if operation is None:
+                    continue
+                operation.operation_sequence = index + 1
+                operation.updated_at = now
             
             await self.session.flush()
             return True
@@ -166,65 +183,60 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         work_center_code: Optional[str] = None
     ) -> Dict[str, Any]:
         """Get operation statistics for dashboard"""
-        base_stmt = select(Operation)
-        
-        if work_center_code:
-            base_stmt = base_stmt.join(WorkCenter).where(
-                WorkCenter.code == work_center_code
-            )
-        
-        # Total operations
-        total_stmt = select(func.count(Operation.id))
-        if work_center_code:
-            total_stmt = total_stmt.join(WorkCenter).where(
-                WorkCenter.code == work_center_code
-            )
-        
-        total_result = await self.session.execute(total_stmt)
-        total_operations = total_result.scalar()
-        
-        # Operations by status
-        status_stmt = select(
+        # One grouped pass; totals and the average are folded from the groups
+        stmt = select(
             Operation.status,
-            func.count(Operation.id).label('count')
+            func.count(Operation.id).label('count'),
+            func.sum(Operation.norma).label('norma_sum'),
+            func.count(Operation.norma).label('norma_count')
         )
         if work_center_code:
-            status_stmt = status_stmt.join(WorkCenter).where(
-                WorkCenter.code == work_center_code
-            )
-        
-        status_stmt = status_stmt.group_by(Operation.status)
-        status_result = await self.session.execute(status_stmt)
-        status_stats = {row.status: row.count for row in status_result.fetchall()}
+            work_center_id = await work_center_registry.resolve_id(self.session, work_center_code)
+            stmt = stmt.where(Operation.work_center_id == work_center_id)
         
-        # Average operation time
-        avg_time_stmt = select(func.avg(Operation.norma))
-        if work_center_code:
-            avg_time_stmt = avg_time_stmt.join(WorkCenter).where(
-                WorkCenter.code == work_center_code
-            )
+        stmt = stmt.group_by(Operation.status)
+        result = await self.session.execute(stmt)
+        rows = result.fetchall()
         
-        avg_time_result = await self.session.execute(avg_time_stmt)
-        avg_time = avg_time_result.scalar() or 0
+        status_stats = {row.status: row.count for row in rows}
+        norma_sum = sum(float(row.norma_sum or 0) for row in rows)
+        norma_count = sum(row.norma_count for row in rows)
         
         return {
-            "total_operations": total_operations,
+            "total_operations": sum(status_stats.values()),
             "status_distribution": status_stats,
-            "average_operation_time": float(avg_time),
+            "average_operation_time": norma_sum / norma_count if norma_count else 0.0,
             "work_center": work_center_code
         }
     
+    async def get_work_center_status_rollup(self) -> List[Any]:
+        """Operation counts and standard hours per (work center, status), all work centers at once"""
+        stmt = select(
+            Operation.work_center_id,
+            Operation.status,
+            func.count(Operation.id).label('count'),
+            func.coalesce(func.sum(Operation.norma), 0).label('norma_sum'),
+            func.count(Operation.norma).label('norma_count')
+        ).group_by(Operation.work_center_id, Operation.status)
+        
+        result = await self.session.execute(stmt)
+        return result.fetchall()
+    
     async def get_operations_by_priority(
         self, 
         work_center_code: str,
         limit: int = 100
     ) -> List[Operation]:
         """Get operations ordered by work order priority"""
+        work_center_id = await work_center_registry.resolve_id(self.session, work_center_code)
+        if work_center_id is None:
+            return []
+        
         stmt = select(Operation).options(
             joinedload(Operation.work_order).joinedload(WorkOrder.product),
             joinedload(Operation.work_center)
-        ).join(WorkOrder).join(WorkCenter).where(
-            WorkCenter.code == work_center_code
+        ).join(WorkOrder).where(
+            Operation.work_center_id == work_center_id
         ).order_by(
             WorkOrder.priority_level,
             WorkOrder.datum_isporuke,
@@ -240,11 +252,15 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         limit: int = 100
     ) -> List[Operation]:
         """Get operations ordered by delivery date"""
+        work_center_id = await work_center_registry.resolve_id(self.session, work_center_code)
+        if work_center_id is None:
+            return []
+        
         stmt = select(Operation).options(
             joinedload(Operation.work_order).joinedload(WorkOrder.product),
             joinedload(Operation.work_center)
-        ).join(WorkOrder).join(WorkCenter).where(
-            WorkCenter.code == work_center_code
+        ).join(WorkOrder).where(
+            Operation.work_center_id == work_center_id
         ).order_by(
             WorkOrder.datum_isporuke,
             Operation.operation_sequence
@@ -259,11 +275,15 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         limit: int = 100
     ) -> List[Operation]:
         """Get operations ordered by assembly date"""
+        work_center_id = await work_center_registry.resolve_id(self.session, work_center_code)
+        if work_center_id is None:
+            return []
+        
         stmt = select(Operation).options(
             joinedload(Operation.work_order).joinedload(WorkOrder.product),
             joinedload(Operation.work_center)
-        ).join(WorkOrder).join(WorkCenter).where(
-            WorkCenter.code == work_center_code
+        ).join(WorkOrder).where(
+            Operation.work_center_id == work_center_id
         ).order_by(
             WorkOrder.datum_sastavljanja,
             Operation.operation_sequence
@@ -279,24 +299,41 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         actual_start_time: Optional[datetime] = None,
         actual_completion_time: Optional[datetime] = None
     ) -> Optional[Operation]:
-        """Update operation status and timestamps"""
+        """
+        Update operation status through the event log.
+        The given completion (or start) time becomes the event's time.
+        """
         operation = await self.get_by_id(id)
         if not operation:
             return None
         
-        operation.status = status
-        operation.updated_at = datetime.utcnow()
-        
-        if actual_start_time:
-            operation.actual_start_time = actual_start_time
-        
-        if actual_completion_time:
-            operation.actual_completion_time = actual_completion_time
+        occurred_at = actual_completion_time if status == "completed" else actual_start_time
+        outcome, = await record_status_change(
+            self.session, [id], status, occurred_at=occurred_at
+        )
+        if outcome.outcome == "rejected":
+            raise ValueError(outcome.error)
         
+        operation.updated_at = datetime.utcnow()
         await self.session.flush()
         await self.session.refresh(operation)
         return operation
     
+    async def has_in_progress(self, work_order_id: int) -> bool:
+        """Whether any operation of a work order is in progress"""
+        stmt = select(exists().where(
+            Operation.work_order_id == work_order_id,
+            Operation.status == "in_progress"
+        ))
+        return bool(await self.session.scalar(stmt))
+    
+    async def delete_by_work_order(self, work_order_id: int) -> int:
+        """Delete all operations of a work order in one statement; returns how many"""
+        result = await self.session.execute(
+            delete(Operation).where(Operation.work_order_id == work_order_id)
+        )
+        return result.rowcount
+    
     async def get_work_center_capacity(
         self, 
         work_center_code: str,
@@ -305,16 +342,14 @@ class OperationRepository(BaseRepository[Operation, OperationCreate, OperationUp
         """Get work center capacity utilization"""
         
         # Get work center info
-        work_center_stmt = select(WorkCenter).where(WorkCenter.code == work_center_code)
-        work_center_result = await self.session.execute(work_center_stmt)
-        work_center = work_center_result.scalar_one_or_none()
+        work_center = await work_center_registry.get_by_code(self.session, work_center_code)
         
         if not work_center:
             return {"error": "Work center not found"}
         
         # Get operations for the date
-        operations_stmt = select(Operation).join(WorkCenter).where(
-            WorkCenter.code == work_center_code
+        operations_stmt = select(Operation).where(
+            Operation.work_center_id == work_center.id
         )
         
         if date_filter:
@@ -0,0 +1,151 @@
+"""
+Operation event repository: reads of the operation event log and its projection
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func, cast, Date
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Operation, OperationEvent, OperationState, WorkOrder
+
+ACTUAL_VS_PLANNED_GROUPS = ("work_center", "day", "work_center_day")
+
+
+class OperationEventRepository:
+    """
+    Event log, its operation_states projection and clocked-in operations;
+    writes go through app.services.operation_events
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_events(
+        self,
+        operation_id: int,
+        after_id: Optional[int] = None,
+        limit: int = 500
+    ) -> List[OperationEvent]:
+        """Events of an operation in recording order"""
+        stmt = select(OperationEvent).where(OperationEvent.operation_id == operation_id)
+        if after_id is not None:
+            stmt = stmt.where(OperationEvent.id > after_id)
+        stmt = stmt.order_by(OperationEvent.id).limit(limit)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_events_between(
+        self,
+        date_from: datetime,
+        date_to: datetime,
+        work_center_id: Optional[int] = None
+    ) -> List[OperationEvent]:
+        """Events that occurred in [date_from, date_to), oldest first"""
+        stmt = select(OperationEvent).where(
+            OperationEvent.occurred_at >= date_from,
+            OperationEvent.occurred_at < date_to
+        )
+        if work_center_id is not None:
+            stmt = stmt.where(OperationEvent.work_center_id == work_center_id)
+        stmt = stmt.order_by(OperationEvent.occurred_at, OperationEvent.id)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_running(self, work_center_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Operations clocked in right now, with who started them and where"""
+        stmt = select(
+            Operation.id,
+            Operation.work_order_id,
+            WorkOrder.rn,
+            Operation.work_center_id,
+            Operation.naziv,
+            Operation.running_since,
+            Operation.actual_minutes,
+            Operation.quantity,
+            Operation.quantity_completed,
+        ).join(WorkOrder, WorkOrder.id == Operation.work_order_id).where(
+            Operation.running_since.is_not(None)
+        )
+        if work_center_id is not None:
+            stmt = stmt.where(Operation.work_center_id == work_center_id)
+        stmt = stmt.order_by(Operation.work_center_id, Operation.running_since)
+        rows = [dict(row._mapping) for row in await self.session.execute(stmt)]
+        if not rows:
+            return rows
+
+        # The start event that opened each running interval
+        starts_stmt = select(
+            OperationEvent.operation_id, OperationEvent.operator, OperationEvent.terminal_id
+        ).where(
+            OperationEvent.operation_id.in_([row["id"] for row in rows]),
+            OperationEvent.event_type == "start"
+        ).distinct(OperationEvent.operation_id).order_by(
+            OperationEvent.operation_id, OperationEvent.id.desc()
+        )
+        starts = {row.operation_id: row for row in await self.session.execute(starts_stmt)}
+        for row in rows:
+            start = starts.get(row["id"])
+            row["actual_minutes"] = float(row["actual_minutes"] or 0)
+            row["operator"] = start.operator if start else None
+            row["terminal_id"] = start.terminal_id if start else None
+        return rows
+
+    async def get_state(self, operation_id: int) -> Optional[OperationState]:
+        """Projected lifecycle state of an operation"""
+        return await self.session.get(OperationState, operation_id)
+
+    async def get_actual_vs_planned(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        work_center_id: Optional[int] = None,
+        group_by: str = "work_center"
+    ) -> List[Dict[str, Any]]:
+        """
+        Actual against planned minutes of completed operations, by completion date,
+        summed from the projection (archived operations included).
+        efficiency is planned / actual over operations that have both.
+        """
+        if group_by not in ACTUAL_VS_PLANNED_GROUPS:
+            raise ValueError(f"group_by must be one of {', '.join(ACTUAL_VS_PLANNED_GROUPS)}")
+
+        comparable = (OperationState.planned_minutes.is_not(None)) & (OperationState.actual_minutes > 0)
+        completion_day = cast(OperationState.actual_completion_time, Date).label("day")
+        keys = {
+            "work_center": [OperationState.work_center_id],
+            "day": [completion_day],
+            "work_center_day": [OperationState.work_center_id, completion_day],
+        }[group_by]
+
+        stmt = select(
+            *keys,
+            func.count().label("operations"),
+            func.count().filter(comparable).label("comparable_operations"),
+            func.coalesce(func.sum(OperationState.actual_minutes), 0).label("actual_minutes"),
+            func.coalesce(func.sum(OperationState.planned_minutes).filter(comparable), 0).label("planned_minutes"),
+            func.coalesce(func.sum(OperationState.actual_minutes).filter(comparable), 0).label("comparable_actual_minutes"),
+            func.coalesce(func.sum(OperationState.quantity_completed), 0).label("quantity_completed"),
+        ).where(
+            OperationState.status == "completed",
+            OperationState.actual_completion_time.is_not(None)
+        )
+        if date_from:
+            stmt = stmt.where(OperationState.actual_completion_time >= date_from)
+        if date_to:
+            stmt = stmt.where(OperationState.actual_completion_time < date_to + timedelta(days=1))
+        if work_center_id is not None:
+            stmt = stmt.where(OperationState.work_center_id == work_center_id)
+        stmt = stmt.group_by(*keys).order_by(*keys)
+
+        rows = []
+        for row in await self.session.execute(stmt):
+            values = dict(row._mapping)
+            planned = float(values["planned_minutes"])
+            comparable_actual = float(values.pop("comparable_actual_minutes"))
+            values["actual_minutes"] = float(values["actual_minutes"])
+            values["planned_minutes"] = planned
+            values["variance_minutes"] = round(comparable_actual - planned, 2)
+            values["efficiency"] = round(planned / comparable_actual, 3) if comparable_actual else None
+            rows.append(values)
+        return rows
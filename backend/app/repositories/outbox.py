@@ -0,0 +1,219 @@
+"""
+Outbox repository: change-data-capture rows for downstream consumers
+
+Every transaction that changes operations or work orders writes its changes
+to outbox_events just before it commits, so the outbox and the data it
+describes commit (or roll back) together. The dispatcher publishes the rows
+afterwards; see app.services.outbox_dispatcher.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database.change_tracking import ChangeSet, before_commit
+from app.database.connection import settings
+from app.database.models import OutboxEvent, Operation, WorkOrder, WorkOrderHistory
+
+CAPTURED_TABLES = {"operations": "operation", "work_orders": "work_order"}
+
+# Ids per snapshot query
+SNAPSHOT_CHUNK_SIZE = 5000
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _row_dict(row) -> Dict[str, Any]:
+    return {key: _jsonable(value) for key, value in row._mapping.items()}
+
+
+def _snapshots(session: Session, table, column, ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """Current rows of a table whose column is in ids"""
+    ids = sorted(ids)
+    rows = []
+    for start in range(0, len(ids), SNAPSHOT_CHUNK_SIZE):
+        result = session.connection().execute(
+            select(table).where(column.in_(ids[start:start + SNAPSHOT_CHUNK_SIZE])).order_by(table.c.id)
+        )
+        rows.extend(_row_dict(row) for row in result)
+    return rows
+
+
+def build_outbox_events(session: Session, change_set: ChangeSet) -> List[Dict[str, Any]]:
+    """Outbox rows describing a transaction's operation and work order changes"""
+    events: List[Dict[str, Any]] = []
+
+    # Row-level changes the flush saw, with the full row as committed
+    changed_ids: Dict[str, set] = {table: set() for table in CAPTURED_TABLES}
+    for change in change_set.row_changes:
+        if change.table in CAPTURED_TABLES and change.new is not None:
+            changed_ids[change.table].add(change.id)
+
+    current = {
+        "operations": {
+            row["id"]: row for row in _snapshots(
+                session, Operation.__table__, Operation.__table__.c.id, changed_ids["operations"]
+            )
+        },
+        "work_orders": {
+            row["id"]: row for row in _snapshots(
+                session, WorkOrder.__table__, WorkOrder.__table__.c.id, changed_ids["work_orders"]
+            )
+        },
+    }
+
+    for change in change_set.row_changes:
+        aggregate = CAPTURED_TABLES.get(change.table)
+        if aggregate is None:
+            continue
+        if change.old is None:
+            kind = "created"
+        elif change.new is None:
+            kind = "deleted"
+        else:
+            kind = "updated"
+        old, new = change.old or {}, change.new or {}
+        changes = {
+            key: [_jsonable(old.get(key)), _jsonable(new.get(key))]
+            for key in set(old) | set(new)
+            if key != "updated_at" and old.get(key) != new.get(key)
+        }
+        if kind == "updated" and old == new:
+            continue
+        row = current[change.table].get(change.id) if change.new is not None else {
+            "id": change.id, **{key: _jsonable(value) for key, value in old.items()}
+        }
+        events.append({
+            "aggregate_type": aggregate,
+            "aggregate_id": change.id,
+            "event_type": f"{aggregate}.{kind}",
+            "payload": {"row": row, "changes": changes},
+        })
+
+    # Bulk statements are invisible row by row: publish whole work orders instead
+    bulk = change_set.bulk_tables & set(CAPTURED_TABLES)
+    if bulk:
+        if change_set.work_order_ids:
+            work_orders = {
+                row["id"]: row for row in _snapshots(
+                    session, WorkOrder.__table__, WorkOrder.__table__.c.id, change_set.work_order_ids
+                )
+            }
+            operations: Dict[int, List[Dict[str, Any]]] = {}
+            for row in _snapshots(
+                session, Operation.__table__, Operation.__table__.c.work_order_id, change_set.work_order_ids
+            ):
+                operations.setdefault(row["work_order_id"], []).append(row)
+
+            # Gone from the hot table: archived into history, or really deleted
+            missing = change_set.work_order_ids - set(work_orders)
+            archived = {
+                row["id"] for row in _snapshots(
+                    session, WorkOrderHistory.__table__, WorkOrderHistory.__table__.c.id, missing
+                )
+            } if missing else set()
+
+            for work_order_id in sorted(change_set.work_order_ids):
+                row = work_orders.get(work_order_id)
+                if row:
+                    event_type = "work_order.snapshot"
+                elif work_order_id in archived:
+                    event_type = "work_order.archived"
+                else:
+                    event_type = "work_order.deleted"
+                events.append({
+                    "aggregate_type": "work_order",
+                    "aggregate_id": work_order_id,
+                    "event_type": event_type,
+                    # The operation list is complete: consumers replace theirs
+                    "payload": {"row": row or {"id": work_order_id}, "operations": operations.get(work_order_id, [])},
+                })
+        else:
+            events.append({
+                "aggregate_type": "table",
+                "aggregate_id": None,
+                "event_type": "resync",
+                "payload": {"tables": sorted(bulk)},
+            })
+
+    return events
+
+
+@before_commit
+def _write_outbox_events(session: Session, change_set: ChangeSet) -> None:
+    """Record the transaction's changes in the outbox, inside the transaction"""
+    if not settings.outbox_enabled or not (change_set.tables & set(CAPTURED_TABLES)):
+        return
+    if session.get_bind().dialect.name != "postgresql":
+        return
+
+    events = build_outbox_events(session, change_set)
+    if events:
+        # Core insert on the connection: the outbox itself is not a tracked change
+        session.connection().execute(OutboxEvent.__table__.insert(), events)
+
+
+class OutboxRepository:
+    """
+    Dispatcher access to the outbox table
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def claim_unpublished(self, limit: int) -> List[OutboxEvent]:
+        """Oldest unpublished events, locked so concurrent dispatchers skip them"""
+        stmt = select(OutboxEvent).where(
+            OutboxEvent.published_at.is_(None)
+        ).order_by(
+            OutboxEvent.id
+        ).limit(limit).with_for_update(skip_locked=True)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def mark_published(self, ids: List[int]) -> None:
+        """Mark events as delivered"""
+        await self.session.execute(
+            update(OutboxEvent.__table__).where(OutboxEvent.__table__.c.id.in_(ids)).values(
+                published_at=func.timezone("utc", func.now()),
+                attempts=OutboxEvent.__table__.c.attempts + 1,
+                last_error=None
+            )
+        )
+
+    async def mark_failed(self, ids: List[int], error: str) -> None:
+        """Record a failed delivery attempt; the events stay unpublished"""
+        await self.session.execute(
+            update(OutboxEvent.__table__).where(OutboxEvent.__table__.c.id.in_(ids)).values(
+                attempts=OutboxEvent.__table__.c.attempts + 1,
+                last_error=error[:2000]
+            )
+        )
+
+    async def purge_published(self, older_than_days: int) -> int:
+        """Delete events delivered more than the given number of days ago"""
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        result = await self.session.execute(
+            delete(OutboxEvent.__table__).where(OutboxEvent.__table__.c.published_at < cutoff)
+        )
+        return result.rowcount
+
+    async def get_statistics(self) -> Dict[str, Optional[Any]]:
+        """Backlog size and delivery progress"""
+        stmt = select(
+            func.count(OutboxEvent.id).filter(OutboxEvent.published_at.is_(None)).label("pending"),
+            func.min(OutboxEvent.created_at).filter(OutboxEvent.published_at.is_(None)).label("oldest_pending"),
+            func.max(OutboxEvent.published_at).label("last_published"),
+            func.max(OutboxEvent.attempts).filter(OutboxEvent.published_at.is_(None)).label("max_attempts"),
+        )
+        row = (await self.session.execute(stmt)).one()
+        return dict(row._mapping)
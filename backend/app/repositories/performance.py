@@ -0,0 +1,289 @@
+"""
+Performance repository: norma against actual time from the daily rollups
+
+operation_performance_daily holds one row per completion day, work center,
+product and operation type, summed from the operation_states projection
+(archived operations included). Reports aggregate these rows in SQL, with
+window functions for trends, so a 12-month query touches a few thousand
+pre-aggregated rows instead of every operation.
+
+efficiency is planned / actual running minutes (pauses excluded);
+gross_efficiency is planned / elapsed minutes from first start to
+completion (pauses included). Both are ratios of sums, so long operations
+weigh more than short ones.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.change_tracking import mark_changed
+
+PERFORMANCE_GROUPS = ("work_center", "product", "operation_type")
+
+# Group key expressions over operation_performance_daily (alias d)
+_GROUP_KEYS = {
+    "work_center": "d.work_center_id",
+    "product": "d.product_id",
+    "operation_type": "d.operation_type",
+}
+
+_COMPARABLE = "s.planned_minutes IS NOT NULL AND s.actual_minutes > 0 AND s.actual_start_time IS NOT NULL"
+
+_REFRESH_SQL = f"""
+    INSERT INTO operation_performance_daily (
+        day, work_center_id, product_id, operation_type, operations, comparable_operations,
+        planned_minutes, actual_minutes, elapsed_minutes, quantity_completed, refreshed_at
+    )
+    SELECT
+        s.actual_completion_time::date,
+        s.work_center_id,
+        COALESCE(wo.product_id, woh.product_id, 0),
+        COALESCE(o.naziv, oh.naziv, ''),
+        count(*),
+        count(*) FILTER (WHERE {_COMPARABLE}),
+        COALESCE(sum(s.planned_minutes) FILTER (WHERE {_COMPARABLE}), 0),
+        COALESCE(sum(s.actual_minutes) FILTER (WHERE {_COMPARABLE}), 0),
+        COALESCE(sum(
+            GREATEST(extract(epoch FROM s.actual_completion_time - s.actual_start_time) / 60, s.actual_minutes)
+        ) FILTER (WHERE {_COMPARABLE}), 0),
+        COALESCE(sum(s.quantity_completed), 0),
+        timezone('utc', now())
+    FROM operation_states s
+    LEFT JOIN operations o ON o.id = s.operation_id
+    LEFT JOIN operations_history oh ON o.id IS NULL AND oh.id = s.operation_id
+    LEFT JOIN work_orders wo ON wo.id = s.work_order_id
+    LEFT JOIN work_orders_history woh ON wo.id IS NULL AND woh.id = s.work_order_id
+    WHERE s.status = 'completed'
+      AND s.actual_completion_time >= :date_from
+      AND s.actual_completion_time < :date_to
+    GROUP BY 1, 2, 3, 4
+"""
+
+_RATIOS = """
+    round(planned_minutes / NULLIF(actual_minutes, 0), 3) AS efficiency,
+    round(planned_minutes / NULLIF(elapsed_minutes, 0), 3) AS gross_efficiency,
+    elapsed_minutes - actual_minutes AS pause_minutes
+"""
+
+
+def _floats(row) -> Dict[str, Any]:
+    values = dict(row._mapping)
+    for key, value in values.items():
+        if key not in ("day", "month", "key") and value is not None and not isinstance(value, (int, str, date)):
+            values[key] = float(value)
+    return values
+
+
+class PerformanceRepository:
+    """
+    Daily performance rollups and the reports read from them
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def refresh_days(self, days: List[date]) -> int:
+        """Recompute the rollup rows of the given completion days; returns rows written"""
+        written = 0
+        # Consecutive days are refreshed as one range
+        for start, end in _ranges(sorted(set(days))):
+            await self.session.execute(
+                text("DELETE FROM operation_performance_daily WHERE day BETWEEN :date_from AND :date_to"),
+                {"date_from": start, "date_to": end}
+            )
+            result = await self.session.execute(
+                text(_REFRESH_SQL),
+                {
+                    "date_from": datetime.combine(start, datetime.min.time()),
+                    "date_to": datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                }
+            )
+            written += result.rowcount
+        if days:
+            mark_changed(self.session, "operation_performance_daily")
+        return written
+
+    async def get_changed_days(self, since: datetime) -> List[date]:
+        """Completion days of operations whose state changed since a point in time"""
+        result = await self.session.execute(
+            text("""
+                SELECT DISTINCT actual_completion_time::date AS day
+                FROM operation_states
+                WHERE updated_at >= :since AND status = 'completed' AND actual_completion_time IS NOT NULL
+            """),
+            {"since": since}
+        )
+        return [row.day for row in result]
+
+    async def get_last_refresh(self) -> Optional[datetime]:
+        """When rollup rows were last written"""
+        return await self.session.scalar(text("SELECT max(refreshed_at) FROM operation_performance_daily"))
+
+    async def get_completion_range(self) -> Optional[Dict[str, date]]:
+        """First and last completion day in the projection"""
+        row = (await self.session.execute(text("""
+            SELECT min(actual_completion_time)::date AS first_day, max(actual_completion_time)::date AS last_day
+            FROM operation_states WHERE status = 'completed'
+        """))).one()
+        return dict(row._mapping) if row.first_day else None
+
+    async def get_efficiency(
+        self,
+        group_by: str = "work_center",
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        work_center_id: Optional[int] = None,
+        product_id: Optional[int] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Efficiency per work center, product or operation type, ranked, with each group's share of planned time"""
+        if group_by not in _GROUP_KEYS:
+            raise ValueError(f"group_by must be one of {', '.join(PERFORMANCE_GROUPS)}")
+
+        conditions, params = self._conditions(date_from, date_to, work_center_id, product_id)
+        params["limit"] = limit
+        result = await self.session.execute(text(f"""
+            WITH grouped AS (
+                SELECT
+                    {_GROUP_KEYS[group_by]} AS key,
+                    sum(d.operations) AS operations,
+                    sum(d.comparable_operations) AS comparable_operations,
+                    sum(d.planned_minutes) AS planned_minutes,
+                    sum(d.actual_minutes) AS actual_minutes,
+                    sum(d.elapsed_minutes) AS elapsed_minutes,
+                    sum(d.quantity_completed) AS quantity_completed
+                FROM operation_performance_daily d
+                WHERE {conditions}
+                GROUP BY 1
+            )
+            SELECT
+                key, operations, comparable_operations, planned_minutes, actual_minutes, elapsed_minutes,
+                quantity_completed,
+                {_RATIOS},
+                round(planned_minutes / NULLIF(sum(planned_minutes) OVER (), 0), 4) AS planned_share,
+                rank() OVER (ORDER BY planned_minutes / NULLIF(actual_minutes, 0) DESC NULLS LAST) AS efficiency_rank
+            FROM grouped
+            ORDER BY efficiency_rank, key
+            LIMIT :limit
+        """), params)
+        return [_floats(row) for row in result]
+
+    async def get_trend(
+        self,
+        months: int = 12,
+        group_by: Optional[str] = "work_center",
+        work_center_id: Optional[int] = None,
+        product_id: Optional[int] = None,
+        operation_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Monthly efficiency over the last months per group (or overall), with the
+        rolling 3-month efficiency, change against the previous month and rank in the month
+        """
+        if group_by is not None and group_by not in _GROUP_KEYS:
+            raise ValueError(f"group_by must be one of {', '.join(PERFORMANCE_GROUPS)}")
+
+        month_index = date.today().year * 12 + date.today().month - 1 - (months - 1)
+        first_month = date(month_index // 12, month_index % 12 + 1, 1)
+        conditions, params = self._conditions(first_month, None, work_center_id, product_id)
+        if operation_type is not None:
+            conditions += " AND d.operation_type = :operation_type"
+            params["operation_type"] = operation_type
+        key = _GROUP_KEYS[group_by] if group_by else "NULL::integer"
+
+        result = await self.session.execute(text(f"""
+            WITH monthly AS (
+                SELECT
+                    date_trunc('month', d.day)::date AS month,
+                    {key} AS key,
+                    sum(d.operations) AS operations,
+                    sum(d.planned_minutes) AS planned_minutes,
+                    sum(d.actual_minutes) AS actual_minutes,
+                    sum(d.elapsed_minutes) AS elapsed_minutes
+                FROM operation_performance_daily d
+                WHERE {conditions}
+                GROUP BY 1, 2
+            )
+            SELECT
+                month, key, operations, planned_minutes, actual_minutes, elapsed_minutes,
+                {_RATIOS},
+                round(
+                    sum(planned_minutes) OVER rolling / NULLIF(sum(actual_minutes) OVER rolling, 0), 3
+                ) AS efficiency_3_months,
+                round(
+                    planned_minutes / NULLIF(actual_minutes, 0)
+                    - lag(planned_minutes / NULLIF(actual_minutes, 0)) OVER by_key, 3
+                ) AS efficiency_change,
+                rank() OVER (
+                    PARTITION BY month ORDER BY planned_minutes / NULLIF(actual_minutes, 0) DESC NULLS LAST
+                ) AS rank_in_month
+            FROM monthly
+            WINDOW
+                by_key AS (PARTITION BY key ORDER BY month),
+                rolling AS (PARTITION BY key ORDER BY month RANGE BETWEEN INTERVAL '2 months' PRECEDING AND CURRENT ROW)
+            ORDER BY key, month
+        """), params)
+        return [_floats(row) for row in result]
+
+    async def get_work_center_summary(self, work_center_id: int, date_from: date, date_to: date) -> Dict[str, Any]:
+        """Totals of one work center straight from the projection (no rollup lag)"""
+        result = await self.session.execute(text(f"""
+            SELECT
+                count(*) AS completed_operations,
+                count(*) FILTER (WHERE {_COMPARABLE}) AS comparable_operations,
+                COALESCE(sum(s.planned_minutes), 0) AS total_planned_minutes,
+                COALESCE(sum(s.planned_minutes) FILTER (WHERE {_COMPARABLE}), 0) AS planned_minutes,
+                COALESCE(sum(s.actual_minutes) FILTER (WHERE {_COMPARABLE}), 0) AS actual_minutes,
+                COALESCE(sum(
+                    GREATEST(extract(epoch FROM s.actual_completion_time - s.actual_start_time) / 60, s.actual_minutes)
+                ) FILTER (WHERE {_COMPARABLE}), 0) AS elapsed_minutes
+            FROM operation_states s
+            WHERE s.work_center_id = :work_center_id
+              AND s.status = 'completed'
+              AND s.actual_completion_time >= :date_from
+              AND s.actual_completion_time < :date_to
+        """), {
+            "work_center_id": work_center_id,
+            "date_from": datetime.combine(date_from, datetime.min.time()),
+            "date_to": datetime.combine(date_to + timedelta(days=1), datetime.min.time()),
+        })
+        return _floats(result.one())
+
+    @staticmethod
+    def _conditions(
+        date_from: Optional[date],
+        date_to: Optional[date],
+        work_center_id: Optional[int],
+        product_id: Optional[int]
+    ):
+        conditions, params = ["TRUE"], {}
+        if date_from:
+            conditions.append("d.day >= :date_from")
+            params["date_from"] = date_from
+        if date_to:
+            conditions.append("d.day <= :date_to")
+            params["date_to"] = date_to
+        if work_center_id is not None:
+            conditions.append("d.work_center_id = :work_center_id")
+            params["work_center_id"] = work_center_id
+        if product_id is not None:
+            conditions.append("d.product_id = :product_id")
+            params["product_id"] = product_id
+        return " AND ".join(conditions), params
+
+
+def _ranges(days: List[date]):
+    """Sorted days as (first, last) runs of consecutive days"""
+    start = previous = None
+    for day in days:
+        if start is None:
+            start = previous = day
+        elif day == previous + timedelta(days=1):
+            previous = day
+        else:
+            yield start, previous
+            start = previous = day
+    if start is not None:
+        yield start, previous
@@ -1,7 +1,7 @@
 """
 Product repository for product management
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.models import Product, ProductType, WorkOrder
 from app.schemas.product import ProductCreate, ProductUpdate
 from .base import BaseRepository
+from .search import normalize_term, search_condition, rank_expression
 
 
 class ProductRepository(BaseRepository[Product, ProductCreate, ProductUpdate]):
@@ -72,19 +73,30 @@ class ProductRepository(BaseRepository[Product, ProductCreate, ProductUpdate]):
         skip: int = 0, 
         limit: int = 100
     ) -> List[Product]:
-        """Search products by KPL, name, or description"""
-        stmt = select(Product).options(
-            joinedload(Product.type)
+        """Search products by KPL or name"""
+        ranked = await self.search_products_ranked(search_term, skip, limit)
+        return [product for product, _ in ranked]
+    
+    async def search_products_ranked(
+        self, 
+        search_term: str,
+        skip: int = 0, 
+        limit: int = 100
+    ) -> List[Tuple[Product, float]]:
+        """Search products by KPL prefix or KPL/name similarity, best matches first"""
+        term = normalize_term(search_term)
+        if not term:
+            return []
+        
+        score = rank_expression([Product.kpl], [Product.kpl, Product.name], term)
+        stmt = select(Product, score).options(
+            joinedload(Product.product_type)
         ).where(
-            or_(
-                Product.kpl.ilike(f"%{search_term}%"),
-                Product.name.ilike(f"%{search_term}%"),
-                Product.description.ilike(f"%{search_term}%")
-            )
-        ).offset(skip).limit(limit)
+            search_condition([Product.kpl], [Product.kpl, Product.name], term)
+        ).order_by(score.desc(), Product.kpl).offset(skip).limit(limit)
         
         result = await self.session.execute(stmt)
-        return result.scalars().all()
+        return [(row[0], float(row[1])) for row in result.all()]
     
     async def get_products_with_work_orders(
         self, 
@@ -0,0 +1,68 @@
+"""
+Shared match and ranking expressions for pg_trgm backed search
+"""
+from typing import Sequence
+
+from sqlalchemy import and_, case, func, literal, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+# Trigram indexes cannot serve patterns with fewer than three characters
+MIN_TRIGRAM_TERM_LENGTH = 3
+
+
+def normalize_term(search_term: str) -> str:
+    """Trim the term; wildcards are escaped by the match helpers"""
+    return (search_term or "").strip()
+
+
+def uses_trigrams(term: str) -> bool:
+    """Whether a substring match can be served by a trigram index"""
+    return len(term) >= MIN_TRIGRAM_TERM_LENGTH
+
+
+def prefix_match(columns: Sequence[ColumnElement], term: str) -> ColumnElement:
+    """
+    Case-sensitive prefix match, served by varchar_pattern_ops btree indexes.
+
+    Written as a ~>=~ / ~<~ range rather than LIKE 'term%' so the index is
+    still usable when asyncpg's prepared statements switch to generic plans.
+    """
+    upper_bound = term[:-1] + chr(ord(term[-1]) + 1)
+    return or_(*[
+        and_(column.op("~>=~")(term), column.op("~<~")(upper_bound))
+        for column in columns
+    ])
+
+
+def substring_match(columns: Sequence[ColumnElement], term: str) -> ColumnElement:
+    """Case-insensitive substring match, served by gin_trgm_ops indexes"""
+    return or_(*[column.icontains(term, autoescape=True) for column in columns])
+
+
+def search_condition(
+    prefix_columns: Sequence[ColumnElement],
+    fuzzy_columns: Sequence[ColumnElement],
+    term: str
+) -> ColumnElement:
+    """Prefix match on code columns, plus substring match once the term is long enough"""
+    condition = prefix_match(prefix_columns, term)
+    if uses_trigrams(term):
+        condition = or_(condition, substring_match(fuzzy_columns, term))
+    return condition
+
+
+def rank_expression(
+    prefix_columns: Sequence[ColumnElement],
+    fuzzy_columns: Sequence[ColumnElement],
+    term: str
+) -> ColumnElement:
+    """
+    Relevance score: prefix hits on codes (RN, KPL, ...) rank above everything,
+    then trigram word similarity on the descriptive columns.
+    """
+    prefix_bonus = case((prefix_match(prefix_columns, term), literal(1.0)), else_=literal(0.0))
+    similarities = [
+        func.coalesce(func.word_similarity(term, column), 0.0) for column in fuzzy_columns
+    ]
+    similarity = similarities[0] if len(similarities) == 1 else func.greatest(*similarities)
+    return (prefix_bonus + similarity).label("score")
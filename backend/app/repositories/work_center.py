@@ -1,7 +1,7 @@
 """
 Work Center repository for machine and resource management
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date, timedelta
 from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload, joinedload
@@ -10,6 +10,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.models import WorkCenter, WorkCenterCategory, Plant, Operation
 from app.schemas.work_center import WorkCenterCreate, WorkCenterUpdate
 from .base import BaseRepository
+from .search import normalize_term, search_condition, rank_expression
+from .performance import PerformanceRepository
+from app.services.oee import get_current_oee
 
 
 class WorkCenterRepository(BaseRepository[WorkCenter, WorkCenterCreate, WorkCenterUpdate]):
@@ -103,46 +106,33 @@ class WorkCenterRepository(BaseRepository[WorkCenter, WorkCenterCreate, WorkCent
         if not work_center:
             return {"error": "Work center not found"}
         
-        # Total operations
-        total_ops_stmt = select(func.count(Operation.id)).where(
-            Operation.work_center_id == work_center.id
-        )
-        total_ops_result = await self.session.execute(total_ops_stmt)
-        total_operations = total_ops_result.scalar()
-        
-        # Operations by status
+        # Single grouped pass over the work center's operations
         status_stmt = select(
             Operation.status,
-            func.count(Operation.id).label('count')
+            func.count(Operation.id).label('count'),
+            func.sum(Operation.norma).label('norma_sum'),
+            func.count(Operation.norma).label('norma_count')
         ).where(
             Operation.work_center_id == work_center.id
         ).group_by(Operation.status)
         
         status_result = await self.session.execute(status_stmt)
-        status_distribution = {row.status: row.count for row in status_result.fetchall()}
+        rows = status_result.fetchall()
+        status_distribution = {row.status: row.count for row in rows}
         
-        # Average setup time
-        avg_setup_stmt = select(func.avg(Operation.norma)).where(
-            Operation.work_center_id == work_center.id
-        )
-        avg_setup_result = await self.session.execute(avg_setup_stmt)
-        avg_setup_time = avg_setup_result.scalar() or 0
-        
-        # Current utilization (operations in progress)
-        current_ops_stmt = select(func.count(Operation.id)).where(
-            and_(
-                Operation.work_center_id == work_center.id,
-                Operation.status == 'in_progress'
-            )
-        )
-        current_ops_result = await self.session.execute(current_ops_stmt)
-        current_operations = current_ops_result.scalar()
+        total_operations = sum(status_distribution.values())
+        norma_count = sum(row.norma_count for row in rows)
+        avg_setup_time = sum(float(row.norma_sum or 0) for row in rows) / norma_count if norma_count else 0
+        current_operations = status_distribution.get('in_progress', 0)
         
         # Calculate utilization rate
         utilization_rate = 0
         if total_operations > 0:
             utilization_rate = (current_operations / total_operations) * 100
         
+        # Measured OEE of the shift running now
+        current_shift = await get_current_oee(self.session, work_center.id)
+        
         return {
             "work_center": work_center,
             "statistics": {
@@ -150,7 +140,8 @@ class WorkCenterRepository(BaseRepository[WorkCenter, WorkCenterCreate, WorkCent
                 "status_distribution": status_distribution,
                 "utilization_rate": utilization_rate,
                 "avg_setup_time": float(avg_setup_time),
-                "current_operations": current_operations
+                "current_operations": current_operations,
+                "current_shift_oee": current_shift[0].to_dict() if current_shift else None
             }
         }
     
@@ -271,7 +262,7 @@ class WorkCenterRepository(BaseRepository[WorkCenter, WorkCenterCreate, WorkCent
         code: str,
         days_back: int = 30
     ) -> Dict[str, Any]:
-        """Get work center performance metrics"""
+        """Get work center performance metrics (norma vs recorded running time)"""
         work_center = await self.get_by_code(code)
         if not work_center:
             return {"error": "Work center not found"}
@@ -280,44 +271,32 @@ class WorkCenterRepository(BaseRepository[WorkCenter, WorkCenterCreate, WorkCent
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days_back)
         
-        # Completed operations in period
-        completed_stmt = select(Operation).where(
-            and_(
-                Operation.work_center_id == work_center.id,
-                Operation.status == 'completed',
-                func.date(Operation.actual_completion_time) >= start_date,
-                func.date(Operation.actual_completion_time) <= end_date
-            )
+        # One aggregate over the operation state projection
+        totals = await PerformanceRepository(self.session).get_work_center_summary(
+            work_center.id, start_date, end_date
+        )
+        total_completed = totals["completed_operations"]
+        comparable = totals["comparable_operations"]
+        
+        avg_planned_time = totals["planned_minutes"] / comparable if comparable else 0
+        avg_actual_time = totals["actual_minutes"] / comparable if comparable else 0
+        efficiency = (totals["planned_minutes"] / totals["actual_minutes"]) * 100 if totals["actual_minutes"] > 0 else 0
+        gross_efficiency = (
+            (totals["planned_minutes"] / totals["elapsed_minutes"]) * 100 if totals["elapsed_minutes"] > 0 else 0
         )
-        
-        completed_result = await self.session.execute(completed_stmt)
-        completed_operations = completed_result.scalars().all()
-        
-        # Calculate performance metrics
-        total_completed = len(completed_operations)
-        total_planned_time = sum(op.norma or 0 for op in completed_operations)
-        
-        # Calculate actual vs planned time (if data available)
-        actual_times = []
-        for op in completed_operations:
-            if op.actual_start_time and op.actual_completion_time:
-                actual_time = (op.actual_completion_time - op.actual_start_time).total_seconds() / 60
-                actual_times.append(actual_time)
-        
-        avg_actual_time = sum(actual_times) / len(actual_times) if actual_times else 0
-        avg_planned_time = total_planned_time / total_completed if total_completed > 0 else 0
-        
-        efficiency = (avg_planned_time / avg_actual_time) * 100 if avg_actual_time > 0 else 0
         
         return {
             "work_center": work_center,
             "performance": {
                 "period_days": days_back,
                 "completed_operations": total_completed,
-                "total_planned_time_minutes": total_planned_time,
+                "timed_operations": comparable,
+                "total_planned_time_minutes": totals["total_planned_minutes"],
                 "average_planned_time_minutes": avg_planned_time,
                 "average_actual_time_minutes": avg_actual_time,
+                "pause_time_minutes": totals["elapsed_minutes"] - totals["actual_minutes"],
                 "efficiency_percent": min(efficiency, 200),  # Cap at 200% for realistic values
+                "gross_efficiency_percent": min(gross_efficiency, 200),
                 "operations_per_day": total_completed / days_back if days_back > 0 else 0
             }
         }
@@ -329,16 +308,29 @@ class WorkCenterRepository(BaseRepository[WorkCenter, WorkCenterCreate, WorkCent
         limit: int = 100
     ) -> List[WorkCenter]:
         """Search work centers by code or name"""
-        stmt = select(WorkCenter).options(
+        ranked = await self.search_work_centers_ranked(search_term, skip, limit)
+        return [work_center for work_center, _ in ranked]
+    
+    async def search_work_centers_ranked(
+        self, 
+        search_term: str,
+        skip: int = 0, 
+        limit: int = 100
+    ) -> List[Tuple[WorkCenter, float]]:
+        """Search work centers by code prefix or code/name/description similarity, best matches first"""
+        term = normalize_term(search_term)
+        if not term:
+            return []
+        
+        # Few rows, so description can stay in the match without an index
+        fuzzy_columns = [WorkCenter.code, WorkCenter.name, WorkCenter.description]
+        score = rank_expression([WorkCenter.code], fuzzy_columns, term)
+        stmt = select(WorkCenter, score).options(
             joinedload(WorkCenter.category),
             joinedload(WorkCenter.plant)
         ).where(
-            or_(
-                WorkCenter.code.ilike(f"%{search_term}%"),
-                WorkCenter.name.ilike(f"%{search_term}%"),
-                WorkCenter.description.ilike(f"%{search_term}%")
-            )
-        ).offset(skip).limit(limit)
+            search_condition([WorkCenter.code], fuzzy_columns, term)
+        ).order_by(score.desc(), WorkCenter.code).offset(skip).limit(limit)
         
         result = await self.session.execute(stmt)
-        return result.scalars().all()
\ No newline at end of file
+        return [(row[0], float(row[1])) for row in result.all()]
@@ -0,0 +1,141 @@
+"""
+In-process registry of work centers for code lookups without a query
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.change_tracking import ChangeSet, on_commit
+from app.database.connection import settings
+from app.database.models import WorkCenter
+
+
+@dataclass(frozen=True)
+class WorkCenterInfo:
+    """Immutable snapshot of a work center row"""
+    id: int
+    code: str
+    name: str
+    description: Optional[str]
+    category_id: Optional[int]
+    capacity_hours_per_day: float
+    setup_time_minutes: int
+    cost_per_hour: Optional[float]
+    is_active: bool
+
+
+class WorkCenterRegistry:
+    """
+    Code → work center mapping, loaded in one query and kept until a
+    transaction in this process writes to work_centers or ttl_seconds pass.
+    Work centers change a few times a year, so request handlers and
+    repositories resolve codes from memory. Writes from other workers or the
+    CLI loaders are seen after the TTL, or sooner when a lookup misses and
+    the loaded copy is older than miss_reload_seconds.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, miss_reload_seconds: float = 5.0):
+        self.ttl_seconds = ttl_seconds
+        self.miss_reload_seconds = miss_reload_seconds
+        self._by_code: Dict[str, WorkCenterInfo] = {}
+        self._by_id: Dict[int, WorkCenterInfo] = {}
+        self._loaded_at: Optional[float] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Reload on the next lookup"""
+        self._version += 1
+        self._loaded_at = None
+
+    async def load(self, session: AsyncSession) -> None:
+        """Read all work centers"""
+        version = self._version
+        result = await session.execute(select(WorkCenter).order_by(WorkCenter.code))
+
+        by_code: Dict[str, WorkCenterInfo] = {}
+        by_id: Dict[int, WorkCenterInfo] = {}
+        for work_center in result.scalars().all():
+            info = WorkCenterInfo(
+                id=work_center.id,
+                code=work_center.code,
+                name=work_center.name,
+                description=work_center.description,
+                category_id=work_center.category_id,
+                capacity_hours_per_day=float(work_center.capacity_hours_per_day or 0),
+                setup_time_minutes=work_center.setup_time_minutes or 0,
+                cost_per_hour=float(work_center.cost_per_hour) if work_center.cost_per_hour is not None else None,
+                is_active=bool(work_center.is_active)
+            )
+            # Codes are unique per plant; with several plants the first one wins, as before
+            by_code.setdefault(info.code, info)
+            by_id[info.id] = info
+
+        self._by_code = by_code
+        self._by_id = by_id
+        # A write that committed while we were reading leaves the registry stale
+        self._loaded_at = time.monotonic() if self._version == version else None
+
+    def _fresh(self, max_age: float) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < max_age
+
+    async def _ensure_loaded(self, session: AsyncSession, max_age: Optional[float] = None) -> None:
+        max_age = self.ttl_seconds if max_age is None else max_age
+        if self._fresh(max_age):
+            return
+        async with self._lock:
+            if not self._fresh(max_age):
+                await self.load(session)
+
+    async def get_by_code(self, session: AsyncSession, code: str) -> Optional[WorkCenterInfo]:
+        """Work center by code"""
+        await self._ensure_loaded(session)
+        info = self._by_code.get(code)
+        if info is None:
+            # Possibly created elsewhere since the last load
+            await self._ensure_loaded(session, self.miss_reload_seconds)
+            info = self._by_code.get(code)
+        return info
+
+    async def get_by_id(self, session: AsyncSession, id: int) -> Optional[WorkCenterInfo]:
+        """Work center by id"""
+        await self._ensure_loaded(session)
+        info = self._by_id.get(id)
+        if info is None:
+            await self._ensure_loaded(session, self.miss_reload_seconds)
+            info = self._by_id.get(id)
+        return info
+
+    async def resolve_id(self, session: AsyncSession, code: str) -> Optional[int]:
+        """Work center id of a code, None if unknown"""
+        info = await self.get_by_code(session, code)
+        return info.id if info else None
+
+    def peek_code(self, id: int) -> Optional[str]:
+        """Code of a work center from whatever is loaded, without a query"""
+        info = self._by_id.get(id)
+        return info.code if info else None
+
+    async def get_all(self, session: AsyncSession, active_only: bool = False) -> List[WorkCenterInfo]:
+        """All work centers ordered by code"""
+        await self._ensure_loaded(session)
+        return [
+            info for info in sorted(self._by_id.values(), key=lambda info: info.code)
+            if info.is_active or not active_only
+        ]
+
+
+work_center_registry = WorkCenterRegistry(
+    ttl_seconds=settings.work_center_registry_ttl_seconds,
+    miss_reload_seconds=settings.work_center_registry_miss_reload_seconds,
+)
+
+
+@on_commit
+def _invalidate_work_center_registry(change_set: ChangeSet) -> None:
+    if "work_centers" in change_set.tables:
+        work_center_registry.invalidate()
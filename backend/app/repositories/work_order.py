@@ -1,15 +1,18 @@
 """
 Work Order repository for database operations
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import date, datetime
-from sqlalchemy import select, func, and_, or_
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, func, and_, or_, union
+from sqlalchemy.orm import selectinload, joinedload, contains_eager
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import WorkOrder, Product, Operation, WorkCenter
 from app.schemas.work_order import WorkOrderCreate, WorkOrderUpdate
 from .base import BaseRepository
+from .counting import CountMode, filter_signature, resolve_total_count
+from .search import normalize_term, search_condition, rank_expression
+from .work_center_registry import work_center_registry
 
 
 class WorkOrderRepository(BaseRepository[WorkOrder, WorkOrderCreate, WorkOrderUpdate]):
@@ -126,18 +129,46 @@ class WorkOrderRepository(BaseRepository[WorkOrder, WorkOrderCreate, WorkOrderUp
         limit: int = 100
     ) -> List[WorkOrder]:
         """Search work orders by RN or product name"""
-        stmt = select(WorkOrder).options(
-            joinedload(WorkOrder.product)
+        ranked = await self.search_work_orders_ranked(search_term, skip, limit)
+        return [work_order for work_order, _ in ranked]
+    
+    async def search_work_orders_ranked(
+        self, 
+        search_term: str,
+        skip: int = 0, 
+        limit: int = 100
+    ) -> List[Tuple[WorkOrder, float]]:
+        """Search work orders by RN, KPL or product name, best matches first"""
+        term = normalize_term(search_term)
+        if not term:
+            return []
+        
+        # Each branch is index-friendly on its own; OR-ing across the join is not
+        matching_products = select(Product.id).where(
+            search_condition([Product.kpl], [Product.kpl, Product.name], term)
+        )
+        candidates = union(
+            select(WorkOrder.id).where(
+                search_condition([WorkOrder.rn], [WorkOrder.rn], term)
+            ),
+            select(WorkOrder.id).where(WorkOrder.product_id.in_(matching_products))
+        ).subquery()
+        
+        score = rank_expression(
+            [WorkOrder.rn, Product.kpl],
+            [WorkOrder.rn, Product.kpl, Product.name],
+            term
+        )
+        stmt = select(WorkOrder, score).join(
+            Product, WorkOrder.product_id == Product.id
+        ).options(
+            contains_eager(WorkOrder.product)
         ).where(
-            or_(
-                WorkOrder.rn.ilike(f"%{search_term}%"),
-                Product.name.ilike(f"%{search_term}%"),
-                Product.kpl.ilike(f"%{search_term}%")
-            )
-        ).offset(skip).limit(limit)
+            WorkOrder.id.in_(select(candidates.c.id))
+        ).order_by(score.desc(), WorkOrder.rn).offset(skip).limit(limit)
         
         result = await self.session.execute(stmt)
-        return result.scalars().all()
+        return [(row[0], float(row[1])) for row in result.all()]
     
     async def get_work_orders_with_filters(
         self,
@@ -146,7 +177,9 @@ class WorkOrderRepository(BaseRepository[WorkOrder, WorkOrderCreate, WorkOrderUp
         work_center: Optional[str] = None,
         urgent_only: bool = False,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        count_mode: CountMode = CountMode.EXACT,
+        include_work_center_stats: bool = False
     ) -> Dict[str, Any]:
         """Get work orders with comprehensive filtering"""
         
@@ -168,23 +201,37 @@ class WorkOrderRepository(BaseRepository[WorkOrder, WorkOrderCreate, WorkOrderUp
             conditions.append(WorkOrder.priority_level == 1)
         
         if work_center:
-            # Filter by work center through operations
-            stmt = stmt.join(Operation).join(WorkCenter)
-            conditions.append(WorkCenter.code == work_center)
+            # Filter by work center through operations; the code resolves from the registry
+            work_center_id = await work_center_registry.resolve_id(self.session, work_center)
+            stmt = stmt.join(Operation)
+            conditions.append(Operation.work_center_id == work_center_id)
         
         if conditions:
             stmt = stmt.where(and_(*conditions))
         
-        # Get total count for pagination
+        # Total count for pagination, resolved through the count strategy layer
         count_stmt = select(func.count(WorkOrder.id))
+        count_tables = {WorkOrder.__tablename__}
         if conditions:
             if work_center:
-                count_stmt = count_stmt.join(Operation).join(WorkCenter)
+                count_stmt = count_stmt.join(Operation)
+                count_tables.add(Operation.__tablename__)
             count_stmt = count_stmt.where(and_(*conditions))
         
-        # Execute count query
-        count_result = await self.session.execute(count_stmt)
-        total_count = count_result.scalar()
+        total_count = await resolve_total_count(
+            self.session,
+            count_stmt,
+            mode=count_mode,
+            signature=filter_signature(
+                "work_orders",
+                status=status,
+                priority_level=priority_level,
+                work_center=work_center,
+                urgent_only=urgent_only
+            ),
+            tables=count_tables,
+            estimate_table=None if conditions else WorkOrder.__tablename__
+        )
         
         # Apply pagination and ordering
         stmt = stmt.order_by(
@@ -196,8 +243,10 @@ class WorkOrderRepository(BaseRepository[WorkOrder, WorkOrderCreate, WorkOrderUp
         result = await self.session.execute(stmt)
         work_orders = result.scalars().all()
         
-        # Get work center statistics
-        work_center_stats = await self.get_work_center_statistics()
+        # Work center distribution is only computed on request
+        work_center_stats = {}
+        if include_work_center_stats:
+            work_center_stats = await self.get_work_center_statistics()
         
         return {
             "work_orders": work_orders,
@@ -229,44 +278,28 @@ class WorkOrderRepository(BaseRepository[WorkOrder, WorkOrderCreate, WorkOrderUp
         return work_order
     
     async def get_dashboard_statistics(self) -> Dict[str, Any]:
-        """Get dashboard statistics"""
-        # Active work orders
-        active_stmt = select(func.count(WorkOrder.id)).where(
-            WorkOrder.status == 'in_progress'
-        )
-        active_result = await self.session.execute(active_stmt)
-        active_count = active_result.scalar()
-        
-        # Completed today
+        """Get dashboard statistics in a single aggregate pass"""
         today = datetime.now().date()
-        completed_stmt = select(func.count(WorkOrder.id)).where(
-            and_(
-                WorkOrder.status == 'completed',
-                func.date(WorkOrder.updated_at) == today
-            )
-        )
-        completed_result = await self.session.execute(completed_stmt)
-        completed_today = completed_result.scalar()
-        
-        # Pending work orders
-        pending_stmt = select(func.count(WorkOrder.id)).where(
-            WorkOrder.status == 'pending'
+        stmt = select(
+            func.count().filter(WorkOrder.status == 'in_progress').label('active_count'),
+            func.count().filter(
+                and_(
+                    WorkOrder.status == 'completed',
+                    func.date(WorkOrder.updated_at) == today
+                )
+            ).label('completed_today'),
+            func.count().filter(WorkOrder.status == 'pending').label('pending_count'),
+            func.count().filter(WorkOrder.priority_level == 1).label('urgent_count')
         )
-        pending_result = await self.session.execute(pending_stmt)
-        pending_count = pending_result.scalar()
         
-        # Urgent work orders
-        urgent_stmt = select(func.count(WorkOrder.id)).where(
-            WorkOrder.priority_level == 1
-        )
-        urgent_result = await self.session.execute(urgent_stmt)
-        urgent_count = urgent_result.scalar()
+        result = await self.session.execute(stmt)
+        row = result.one()
         
         return {
-            "active_count": active_count,
-            "completed_today": completed_today,
-            "pending_count": pending_count,
-            "urgent_count": urgent_count
+            "active_count": row.active_count,
+            "completed_today": row.completed_today,
+            "pending_count": row.pending_count,
+            "urgent_count": row.urgent_count
         }
     
     async def get_recent_work_orders(self, limit: int = 5) -> List[WorkOrder]:
@@ -0,0 +1,234 @@
+"""
+Work order summary repository: the denormalized list table and its maintenance
+"""
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import select, func, and_, true, literal_column, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Insert
+
+from app.database.change_tracking import ChangeSet, before_commit
+from app.database.models import WorkOrderSummary, WorkOrder, Product, Operation, WorkCenter
+from .counting import CountMode, filter_signature, resolve_total_count
+
+ACTIVE_STATUSES = ["pending", "in_progress"]
+
+# Ids per refresh statement
+REFRESH_CHUNK_SIZE = 5000
+
+SUMMARY_COLUMNS = [
+    "work_order_id", "rn", "product_id", "product_kpl", "product_name", "quantity",
+    "priority_level", "datum_isporuke", "datum_sastavljanja", "datum_treci", "status",
+    "work_center_codes", "remaining_hours", "remaining_hours_by_work_center",
+    "next_operation_id", "next_operation_naziv", "next_operation_status",
+    "next_work_center_code", "created_at", "updated_at", "refreshed_at",
+]
+
+
+def build_refresh_statement(
+    work_order_ids: Optional[Iterable[int]] = None,
+    product_ids: Optional[Iterable[int]] = None,
+    work_center_ids: Optional[Iterable[int]] = None
+) -> Insert:
+    """
+    Upsert summary rows recomputed from the normalized tables.
+    Without ids the whole table is rebuilt.
+    """
+    scope = []
+    if work_order_ids is not None:
+        scope.append(WorkOrder.id.in_(list(work_order_ids)))
+    if product_ids is not None:
+        scope.append(WorkOrder.product_id.in_(list(product_ids)))
+    if work_center_ids is not None:
+        scope.append(WorkOrder.id.in_(
+            select(Operation.work_order_id).where(Operation.work_center_id.in_(list(work_center_ids)))
+        ))
+
+    active = Operation.status.in_(ACTIVE_STATUSES)
+
+    per_work_order = select(
+        Operation.work_order_id.label("work_order_id"),
+        func.array_agg(WorkCenter.code).label("work_center_codes"),
+        # norma is in minutes; the summary carries hours
+        (func.sum(Operation.norma).filter(active) / 60).label("remaining_hours"),
+        func.jsonb_object_agg(
+            WorkCenter.code, func.round(Operation.norma / 60, 2)
+        ).filter(active).label("remaining_hours_by_work_center"),
+    ).join(
+        WorkCenter, Operation.work_center_id == WorkCenter.id
+    ).where(
+        Operation.work_order_id == WorkOrder.id
+    ).group_by(Operation.work_order_id).lateral("per_work_order")
+
+    next_operation = select(
+        Operation.id.label("id"),
+        Operation.naziv.label("naziv"),
+        Operation.status.label("status"),
+        WorkCenter.code.label("work_center_code"),
+    ).join(
+        WorkCenter, Operation.work_center_id == WorkCenter.id
+    ).where(
+        and_(Operation.work_order_id == WorkOrder.id, active)
+    ).order_by(
+        Operation.operation_sequence, Operation.id
+    ).limit(1).lateral("next_operation")
+
+    source = select(
+        WorkOrder.id,
+        WorkOrder.rn,
+        WorkOrder.product_id,
+        Product.kpl,
+        Product.name,
+        WorkOrder.quantity,
+        WorkOrder.priority_level,
+        WorkOrder.datum_isporuke,
+        WorkOrder.datum_sastavljanja,
+        WorkOrder.datum_treci,
+        WorkOrder.status,
+        func.coalesce(per_work_order.c.work_center_codes, literal_column("ARRAY[]::varchar[]")),
+        func.coalesce(per_work_order.c.remaining_hours, 0),
+        func.coalesce(per_work_order.c.remaining_hours_by_work_center, literal_column("'{}'::jsonb")),
+        next_operation.c.id,
+        next_operation.c.naziv,
+        next_operation.c.status,
+        next_operation.c.work_center_code,
+        WorkOrder.created_at,
+        WorkOrder.updated_at,
+        func.timezone("utc", func.now()),
+    ).join(
+        Product, WorkOrder.product_id == Product.id
+    ).outerjoin(
+        per_work_order, true()
+    ).outerjoin(
+        next_operation, true()
+    )
+
+    if scope:
+        source = source.where(*scope)
+
+    stmt = pg_insert(WorkOrderSummary).from_select(SUMMARY_COLUMNS, source)
+    return stmt.on_conflict_do_update(
+        index_elements=[WorkOrderSummary.work_order_id],
+        set_={column: stmt.excluded[column] for column in SUMMARY_COLUMNS[1:]}
+    )
+
+
+@before_commit
+def _refresh_changed_summaries(session: Session, change_set: ChangeSet) -> None:
+    """Keep summaries in step with the work orders a transaction touched"""
+    if session.get_bind().dialect.name != "postgresql":
+        return
+
+    # Summaries show work center codes, so a rename touches the work orders with operations
+    # there. Status or capacity changes show nowhere, and new work centers have no operations yet
+    # (the only bulk statement on work_centers is the plan import inserting new ones).
+    renamed = {
+        change.id for change in change_set.row_changes
+        if change.table == "work_centers" and change.old is not None and change.new is not None
+        and change.old["code"] != change.new["code"]
+    }
+    if renamed:
+        session.execute(build_refresh_statement(work_center_ids=renamed))
+
+    # Bulk loads can touch more ids than one statement may bind
+    work_order_ids = sorted(change_set.work_order_ids)
+    for start in range(0, len(work_order_ids), REFRESH_CHUNK_SIZE):
+        session.execute(build_refresh_statement(work_order_ids=work_order_ids[start:start + REFRESH_CHUNK_SIZE]))
+
+    product_ids = sorted(change_set.product_ids)
+    for start in range(0, len(product_ids), REFRESH_CHUNK_SIZE):
+        session.execute(build_refresh_statement(product_ids=product_ids[start:start + REFRESH_CHUNK_SIZE]))
+
+
+class WorkOrderSummaryRepository:
+    """
+    Read and maintenance access to the work order summary table
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def refresh_work_orders(self, work_order_ids: Iterable[int]) -> None:
+        """Recompute summaries of specific work orders"""
+        await self.session.execute(build_refresh_statement(work_order_ids=work_order_ids))
+
+    async def refresh_all(self) -> None:
+        """Rebuild every summary row and drop orphans"""
+        await self.session.execute(build_refresh_statement())
+        await self.session.execute(text(
+            "DELETE FROM work_order_summaries s "
+            "WHERE NOT EXISTS (SELECT 1 FROM work_orders w WHERE w.id = s.work_order_id)"
+        ))
+
+    async def ensure_populated(self) -> bool:
+        """Build the table if it is empty while work orders exist; True if it was built"""
+        has_summaries = await self.session.scalar(select(select(WorkOrderSummary.work_order_id).exists()))
+        has_work_orders = await self.session.scalar(select(select(WorkOrder.id).exists()))
+        if has_summaries or not has_work_orders:
+            return False
+
+        await self.refresh_all()
+        return True
+
+    async def get_work_orders_with_filters(
+        self,
+        status: Optional[str] = None,
+        priority_level: Optional[int] = None,
+        work_center: Optional[str] = None,
+        urgent_only: bool = False,
+        skip: int = 0,
+        limit: int = 100,
+        count_mode: CountMode = CountMode.EXACT
+    ) -> Dict[str, Any]:
+        """Filter work orders from the summary table alone, no joins"""
+        conditions = []
+
+        if status:
+            conditions.append(WorkOrderSummary.status == status)
+
+        if priority_level:
+            conditions.append(WorkOrderSummary.priority_level == priority_level)
+
+        if urgent_only:
+            conditions.append(WorkOrderSummary.priority_level == 1)
+
+        if work_center:
+            # Array containment is served by the GIN index
+            conditions.append(WorkOrderSummary.work_center_codes.contains([work_center]))
+
+        count_stmt = select(func.count()).select_from(WorkOrderSummary)
+        if conditions:
+            count_stmt = count_stmt.where(and_(*conditions))
+
+        total_count = await resolve_total_count(
+            self.session,
+            count_stmt,
+            mode=count_mode,
+            signature=filter_signature(
+                "work_order_summaries",
+                status=status,
+                priority_level=priority_level,
+                work_center=work_center,
+                urgent_only=urgent_only
+            ),
+            tables={WorkOrderSummary.__tablename__},
+            estimate_table=None if conditions else WorkOrderSummary.__tablename__
+        )
+
+        stmt = select(WorkOrderSummary)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+
+        stmt = stmt.order_by(
+            WorkOrderSummary.priority_level,
+            WorkOrderSummary.datum_isporuke
+        ).offset(skip).limit(limit)
+
+        result = await self.session.execute(stmt)
+
+        return {
+            "work_orders": result.scalars().all(),
+            "total_count": total_count
+        }
@@ -0,0 +1,29 @@
+"""
+Pydantic schemas for dashboard rollups
+"""
+from datetime import datetime
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+
+class WorkOrderCounters(BaseModel):
+    """Work order dashboard counters"""
+    active_count: int
+    completed_today: int
+    pending_count: int
+    urgent_count: int
+
+
+class WorkCenterCounters(BaseModel):
+    """Operation counters of one work center"""
+    total_operations: int
+    status_distribution: Dict[str, int]
+    total_hours: float
+    average_operation_time: float
+
+
+class DashboardResponse(BaseModel):
+    """All dashboard counters in one read"""
+    work_orders: WorkOrderCounters
+    work_centers: Dict[str, WorkCenterCounters]
+    refreshed_at: Optional[datetime] = None
@@ -0,0 +1,42 @@
+"""
+Downtime Pydantic schemas for request/response validation
+"""
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class DowntimeCreate(BaseModel):
+    """Planned maintenance window or breakdown report"""
+    kind: str = Field(..., pattern="^(planned|breakdown)$", description="planned or breakdown")
+    reason: Optional[str] = Field(None, max_length=200, description="Cause or maintenance task")
+    starts_at: Optional[datetime] = Field(None, description="Start (UTC); default: now")
+    ends_at: Optional[datetime] = Field(None, description="End (UTC); required for planned windows")
+    expected_minutes: Optional[int] = Field(
+        None, gt=0, description="Expected repair time of an open breakdown"
+    )
+    reported_by: Optional[str] = Field(None, max_length=100, description="Who reported it")
+    note: Optional[str] = Field(None, description="Free-text remark")
+
+
+class DowntimeResolve(BaseModel):
+    """End of a breakdown"""
+    ended_at: Optional[datetime] = Field(None, description="When production resumed (UTC); default: now")
+    note: Optional[str] = Field(None, description="Free-text remark")
+
+
+class DowntimeResponse(BaseModel):
+    """Recorded downtime"""
+    id: int
+    work_center_id: int
+    kind: str
+    reason: Optional[str] = None
+    starts_at: datetime
+    ends_at: Optional[datetime] = None
+    expected_end: Optional[datetime] = None
+    reported_by: Optional[str] = None
+    note: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
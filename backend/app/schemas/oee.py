@@ -0,0 +1,31 @@
+"""
+Shift calendar Pydantic schemas for request/response validation
+"""
+from datetime import time
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class ShiftBody(BaseModel):
+    """One shift, in plant local time"""
+    name: str = Field(..., min_length=1, max_length=20, description="Shift name, e.g. 1, 2, 3")
+    start_time: time = Field(..., description="Start, plant local time")
+    end_time: time = Field(..., description="End; at or before start_time means the next day")
+    weekdays: str = Field("12345", pattern=r"^[1-7]{1,7}$", description="ISO weekdays the shift starts on")
+    break_minutes: int = Field(0, ge=0, le=480, description="Planned breaks")
+
+
+class ShiftCalendarUpdate(BaseModel):
+    """Replacement shift calendar of one work center (or plant-wide)"""
+    work_center: Optional[str] = Field(None, description="Work center code; empty for the plant-wide calendar")
+    shifts: List[ShiftBody] = Field(default_factory=list, max_length=20)
+
+
+class ShiftResponse(ShiftBody):
+    """Stored shift"""
+    id: int
+    work_center_id: Optional[int] = None
+    is_active: bool
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,31 @@
+"""
+Pydantic schemas for unified search
+"""
+from enum import Enum
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class SearchEntity(str, Enum):
+    """Searchable entity types"""
+    WORK_ORDER = "work_order"
+    PRODUCT = "product"
+    WORK_CENTER = "work_center"
+
+
+class SearchHit(BaseModel):
+    """A single ranked search result"""
+    type: SearchEntity
+    id: int
+    code: str = Field(..., description="RN, KPL or work center code")
+    label: str = Field(..., description="Human readable name")
+    score: float = Field(..., description="Relevance; prefix matches on codes score above 1")
+    product_kpl: Optional[str] = None
+    status: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    """Response schema for unified search"""
+    query: str
+    results: List[SearchHit]
+    total: int
@@ -0,0 +1,74 @@
+"""
+Shop-floor event Pydantic schemas for request/response validation
+"""
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class ShopFloorEventBody(BaseModel):
+    """Terminal report for one operation"""
+    terminal_id: Optional[str] = Field(None, max_length=50, description="Reporting terminal")
+    operator: Optional[str] = Field(None, max_length=100, description="Operator name or badge")
+    quantity: Optional[int] = Field(None, ge=0, description="Pieces made since the previous report")
+    scrap_quantity: Optional[int] = Field(None, ge=0, description="Rejected pieces, not included in quantity")
+    note: Optional[str] = Field(None, description="Free-text remark")
+    client_event_id: Optional[str] = Field(
+        None, max_length=64, description="Terminal-generated id; resending it is a no-op"
+    )
+    occurred_at: Optional[datetime] = Field(None, description="When it happened (UTC); default: now")
+
+
+class ShopFloorBatchEvent(ShopFloorEventBody):
+    """Report in a batch (terminals flushing their offline buffer)"""
+    operation_id: int = Field(..., description="Operation ID")
+    event_type: str = Field(..., description="start, pause, stop, shift_end or complete")
+
+
+class ShopFloorBatchRequest(BaseModel):
+    """Reports applied in order"""
+    events: List[ShopFloorBatchEvent] = Field(..., min_length=1, max_length=1000)
+
+
+class OperationFloorState(BaseModel):
+    """Operation state derived from its events"""
+    id: int
+    work_order_id: int
+    work_center_id: int
+    status: str
+    running: bool
+    running_since: Optional[datetime] = None
+    actual_start_time: Optional[datetime] = None
+    actual_completion_time: Optional[datetime] = None
+    actual_minutes: float
+    quantity: Optional[int] = None
+    quantity_completed: int
+
+
+class ShopFloorEventResult(BaseModel):
+    """Outcome of one report: accepted, duplicate, rejected or not_found"""
+    client_event_id: str
+    operation_id: int
+    event_type: str
+    outcome: str
+    error: Optional[str] = None
+    operation: Optional[OperationFloorState] = None
+
+
+class OperationEventResponse(BaseModel):
+    """Recorded shop-floor event"""
+    id: int
+    operation_id: int
+    work_center_id: int
+    event_type: str
+    occurred_at: datetime
+    recorded_at: Optional[datetime] = None
+    quantity: Optional[int] = None
+    scrap_quantity: Optional[int] = None
+    terminal_id: Optional[str] = None
+    operator: Optional[str] = None
+    note: Optional[str] = None
+    client_event_id: str
+
+    class Config:
+        from_attributes = True
@@ -67,6 +67,7 @@ class WorkCenterStatistics(BaseModel):
     utilization_rate: float
     avg_setup_time: float
     current_operations: int
+    current_shift_oee: Optional[dict] = None
     
     class Config:
         from_attributes = True
@@ -2,8 +2,8 @@
 Pydantic schemas for work orders
 """
 from datetime import date, datetime
-from typing import Optional, List
-from pydantic import BaseModel, ConfigDict
+from typing import Dict, Optional, List
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class WorkOrderBase(BaseModel):
@@ -32,6 +32,18 @@ class WorkOrderUpdate(BaseModel):
     status: Optional[str] = None
 
 
+class WorkOrderStatusUpdate(BaseModel):
+    """Status change of one work order"""
+    status: str = Field(..., description="pending, in_progress, completed or cancelled")
+    note: Optional[str] = Field(None, description="Recorded on the cascaded operation events")
+
+
+class WorkOrderStatusBatch(WorkOrderStatusUpdate):
+    """Status change of many work orders, e.g. the end-of-shift close-out"""
+    work_order_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    all_or_nothing: bool = Field(False, description="Change none of them if any is rejected or missing")
+
+
 class WorkOrderResponse(WorkOrderBase):
     """Schema for work order responses"""
     model_config = ConfigDict(from_attributes=True)
@@ -48,8 +60,18 @@ class WorkOrderWithProduct(WorkOrderResponse):
     product_kpl: str
 
 
+class WorkOrderListItem(WorkOrderWithProduct):
+    """Work order list row with remaining work and next operation"""
+    remaining_hours: float = 0
+    remaining_hours_by_work_center: Dict[str, float] = {}
+    next_operation_id: Optional[int] = None
+    next_operation_naziv: Optional[str] = None
+    next_operation_status: Optional[str] = None
+    next_work_center_code: Optional[str] = None
+
+
 class WorkOrderListResponse(BaseModel):
     """Response schema for work order lists"""
-    work_orders: List[WorkOrderWithProduct]
-    total_count: int
-    work_center_stats: dict
\ No newline at end of file
+    work_orders: List[WorkOrderListItem]
+    total_count: Optional[int] = None  # None when totals are skipped
+    work_center_stats: dict = {}
\ No newline at end of file
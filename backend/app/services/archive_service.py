@@ -0,0 +1,63 @@
+"""
+Archiving of finished work orders into the partitioned history tables
+
+Work orders that are completed or cancelled, have no open operations and
+have not changed for archive_after_days are moved with their operations in
+batches, one transaction per batch, so the hot tables stay bounded by the
+active backlog and no lock is held for long.
+"""
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.database.connection import AsyncSessionLocal, settings
+from app.repositories.history import HistoryRepository, ARCHIVABLE_STATUSES
+
+
+@dataclass
+class ArchiveResult:
+    """Counts of one archive run"""
+    cutoff: Optional[datetime] = None
+    work_orders: int = 0
+    operations: int = 0
+    batches: int = 0
+    partitions_created: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+async def archive_finished_work_orders(
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    statuses: Sequence[str] = ARCHIVABLE_STATUSES,
+    max_batches: Optional[int] = None
+) -> ArchiveResult:
+    """Move finished work orders older than the cutoff into history, batch by batch"""
+    older_than_days = settings.archive_after_days if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.archive_batch_size
+    result = ArchiveResult(cutoff=datetime.utcnow() - timedelta(days=older_than_days))
+    started = time.perf_counter()
+
+    while max_batches is None or result.batches < max_batches:
+        async with AsyncSessionLocal() as session:
+            repository = HistoryRepository(session)
+            rows = await repository.claim_archivable(result.cutoff, batch_size, statuses)
+            if not rows:
+                await session.rollback()
+                break
+
+            moved = await repository.archive_work_orders(rows)
+            await session.commit()
+
+        result.batches += 1
+        result.work_orders += moved["work_orders"]
+        result.operations += moved["operations"]
+        result.partitions_created.extend(moved["partitions_created"])
+        if len(rows) < batch_size:
+            break
+
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
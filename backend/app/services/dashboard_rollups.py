@@ -0,0 +1,180 @@
+"""
+In-process dashboard rollups maintained from committed status transitions
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, date
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.change_tracking import ChangeSet, on_commit
+from app.database.connection import settings
+from app.repositories.work_order import WorkOrderRepository
+from app.repositories.operation import OperationRepository
+from app.repositories.work_center_registry import work_center_registry
+
+WORK_ORDER_COUNTERS = ("active_count", "completed_today", "pending_count", "urgent_count")
+
+
+def _work_order_contribution(values: Optional[Dict[str, Any]], today: date) -> Counter:
+    """Dashboard counters a single work order row contributes to"""
+    contribution = Counter()
+    if values is None:
+        return contribution
+
+    status = values.get("status")
+    if status == "in_progress":
+        contribution["active_count"] += 1
+    elif status == "pending":
+        contribution["pending_count"] += 1
+    elif status == "completed":
+        updated_at = values.get("updated_at")
+        if updated_at is None or updated_at.date() == today:
+            contribution["completed_today"] += 1
+
+    if values.get("priority_level") == 1:
+        contribution["urgent_count"] += 1
+
+    return contribution
+
+
+class WorkCenterRollup:
+    """Operation counters of one work center"""
+
+    def __init__(self):
+        self.status_counts: Counter = Counter()
+        self.norma_sum = 0.0
+        self.norma_count = 0
+
+    def add(self, status: str, count: int, norma_sum: float, norma_count: int) -> None:
+        self.status_counts[status] += count
+        self.norma_sum += norma_sum
+        self.norma_count += norma_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        status_distribution = {status: count for status, count in self.status_counts.items() if count}
+        return {
+            "total_operations": sum(status_distribution.values()),
+            "status_distribution": status_distribution,
+            # norma is in minutes
+            "total_hours": round(self.norma_sum / 60, 2),
+            "average_operation_time": self.norma_sum / self.norma_count if self.norma_count else 0.0
+        }
+
+
+class DashboardRollups:
+    """
+    Dashboard counters for work orders and every work center.
+
+    A refresh costs two queries regardless of how many work centers exist
+    (one FILTER aggregate, one GROUP BY over operations) and runs at most once
+    per TTL. In between, committed transactions adjust the counters from their
+    row changes, so reads never touch the database.
+    Bulk statements cannot be replayed row by row and force a refresh instead.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self._work_orders: Counter = Counter()
+        self._work_centers: Dict[int, WorkCenterRollup] = {}
+        self._work_center_codes: Dict[int, str] = {}
+        self._computed_at = 0.0
+        self._computed_day: Optional[date] = None
+        self._refreshed_at: Optional[datetime] = None
+        self._dirty = True
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Force a recompute on the next read"""
+        self._dirty = True
+
+    def _is_stale(self) -> bool:
+        return (
+            self._dirty
+            or time.monotonic() - self._computed_at > self.ttl_seconds
+            or self._computed_day != datetime.now().date()
+        )
+
+    async def refresh(self, session: AsyncSession) -> None:
+        """Recompute all counters from the database"""
+        version = self._version
+
+        work_order_stats = await WorkOrderRepository(session).get_dashboard_statistics()
+        rows = await OperationRepository(session).get_work_center_status_rollup()
+        work_center_infos = await work_center_registry.get_all(session)
+
+        work_centers: Dict[int, WorkCenterRollup] = {}
+        for row in rows:
+            rollup = work_centers.setdefault(row.work_center_id, WorkCenterRollup())
+            rollup.add(row.status, row.count, float(row.norma_sum or 0), row.norma_count)
+
+        self._work_orders = Counter({key: work_order_stats[key] for key in WORK_ORDER_COUNTERS})
+        self._work_centers = work_centers
+        self._work_center_codes = {info.id: info.code for info in work_center_infos}
+        self._computed_at = time.monotonic()
+        self._computed_day = datetime.now().date()
+        self._refreshed_at = datetime.utcnow()
+        # A commit that landed while we were querying may or may not be included
+        self._dirty = self._version != version
+
+    async def _ensure_fresh(self, session: AsyncSession) -> None:
+        if not self._is_stale():
+            return
+        async with self._lock:
+            if self._is_stale():
+                await self.refresh(session)
+
+    async def get_work_order_counters(self, session: AsyncSession) -> Dict[str, int]:
+        """Active, pending, urgent and completed-today work order counts"""
+        await self._ensure_fresh(session)
+        return {key: self._work_orders.get(key, 0) for key in WORK_ORDER_COUNTERS}
+
+    async def get_work_center_counters(self, session: AsyncSession, work_center_id: int) -> Dict[str, Any]:
+        """Operation counters of a single work center"""
+        await self._ensure_fresh(session)
+        return self._work_centers.get(work_center_id, WorkCenterRollup()).to_dict()
+
+    async def snapshot(self, session: AsyncSession) -> Dict[str, Any]:
+        """All dashboard counters"""
+        await self._ensure_fresh(session)
+        return {
+            "work_orders": {key: self._work_orders.get(key, 0) for key in WORK_ORDER_COUNTERS},
+            "work_centers": {
+                code: self._work_centers.get(work_center_id, WorkCenterRollup()).to_dict()
+                for work_center_id, code in sorted(self._work_center_codes.items(), key=lambda item: item[1])
+            },
+            "refreshed_at": self._refreshed_at
+        }
+
+    def apply(self, change_set: ChangeSet) -> None:
+        """Fold a committed change set into the counters"""
+        self._version += 1
+
+        if change_set.bulk_tables & {"work_orders", "operations"} or "work_centers" in change_set.tables:
+            self._dirty = True
+            return
+
+        today = datetime.now().date()
+        for change in change_set.row_changes:
+            if change.table == "work_orders":
+                self._work_orders.subtract(_work_order_contribution(change.old, today))
+                self._work_orders.update(_work_order_contribution(change.new, today))
+            elif change.table == "operations":
+                for values, sign in ((change.old, -1), (change.new, 1)):
+                    if values is None:
+                        continue
+                    norma = values.get("norma")
+                    rollup = self._work_centers.setdefault(values["work_center_id"], WorkCenterRollup())
+                    rollup.add(
+                        values.get("status") or "pending",
+                        sign,
+                        sign * float(norma or 0),
+                        sign if norma is not None else 0
+                    )
+
+
+dashboard_rollups = DashboardRollups(ttl_seconds=settings.dashboard_rollup_ttl_seconds)
+on_commit(dashboard_rollups.apply)
@@ -0,0 +1,290 @@
+"""
+Learned correction of norma (standard time) from completed operations
+
+Every operation completed with both a norma and recorded running time is a
+sample of factor = actual minutes / norma minutes. Samples are kept as
+running count, mean and sum of squared deviations per (work center,
+product type, naziv pattern) in duration_factors: the transaction that
+completes operations merges its batch into those rows (Chan's parallel form
+of Welford's update), so the model refits incrementally with no training job.
+
+For scheduling, the rows are loaded into an in-process lookup table that
+also holds the coarser (work center, product type) and (work center) levels,
+merged from the same statistics. An estimate uses the most specific level
+with at least duration_model_min_samples samples, so a lookup is a few dict
+probes and never touches the database.
+"""
+import math
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.change_tracking import ChangeSet, mark_changed, on_commit
+from app.database.connection import settings
+from app.database.models import DurationFactor, Product, WorkOrder
+
+# Samples outside this range are clamped: a forgotten clock-out must not dominate a factor
+MIN_FACTOR = 0.1
+MAX_FACTOR = 10.0
+
+# Duration assumed for operations without a norma (the scheduler's historical default)
+DEFAULT_MINUTES = 60.0
+
+ANY = "*"
+
+FactorKey = Tuple[int, int, str]
+
+
+def naziv_pattern(naziv: Optional[str]) -> str:
+    """
+    Operation name reduced to what identifies the kind of work: lower case,
+    no accents, numbers and dimensions collapsed to '#', first three words.
+    'Rezanje lima 5mm' and 'REZANJE LIMA 8 mm' share 'rezanje lima #'.
+    """
+    if not naziv:
+        return ""
+    value = unicodedata.normalize("NFKD", naziv).encode("ascii", "ignore").decode().lower()
+    value = re.sub(r"\d+(?:[.,]\d+)?\s*(?:mm|cm|m|kg|x)?\b", "#", value)
+    words = re.findall(r"[a-z]+|#", value)
+    return " ".join(words[:3])[:100]
+
+
+@dataclass
+class FactorStats:
+    """Count, mean and sum of squared deviations of factor samples"""
+    samples: int = 0
+    mean: float = 1.0
+    m2: float = 0.0
+
+    def add(self, factor: float) -> None:
+        """Welford's single-sample update"""
+        self.samples += 1
+        if self.samples == 1:
+            self.mean, self.m2 = factor, 0.0
+            return
+        delta = factor - self.mean
+        self.mean += delta / self.samples
+        self.m2 += delta * (factor - self.mean)
+
+    def merge(self, other: "FactorStats") -> None:
+        """Chan's combination of two partial statistics"""
+        if other.samples == 0:
+            return
+        if self.samples == 0:
+            self.samples, self.mean, self.m2 = other.samples, other.mean, other.m2
+            return
+        total = self.samples + other.samples
+        delta = other.mean - self.mean
+        self.mean += delta * other.samples / total
+        self.m2 += other.m2 + delta * delta * self.samples * other.samples / total
+        self.samples = total
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.samples - 1)) if self.samples > 1 else 0.0
+
+
+@dataclass
+class DurationEstimate:
+    """Corrected duration of one operation"""
+    norma_minutes: Optional[float]
+    minutes: float
+    std_minutes: float
+    factor: float
+    samples: int
+    level: str  # pattern, product_type, work_center or none
+
+    @property
+    def hours(self) -> float:
+        return self.minutes / 60
+
+
+def clamp_factor(actual_minutes: float, planned_minutes: float) -> float:
+    return min(max(actual_minutes / planned_minutes, MIN_FACTOR), MAX_FACTOR)
+
+
+async def product_types_of(session: AsyncSession, work_order_ids: Iterable[int]) -> Dict[int, int]:
+    """Product type id per work order (0 where unknown)"""
+    work_order_ids = set(work_order_ids)
+    if not work_order_ids:
+        return {}
+    result = await session.execute(
+        select(WorkOrder.id, Product.product_type_id).join(
+            Product, Product.id == WorkOrder.product_id
+        ).where(WorkOrder.id.in_(work_order_ids))
+    )
+    types = {work_order_id: product_type_id or 0 for work_order_id, product_type_id in result}
+    return {work_order_id: types.get(work_order_id, 0) for work_order_id in work_order_ids}
+
+
+async def record_samples(session: AsyncSession, samples: Dict[FactorKey, FactorStats]) -> None:
+    """Merge a batch of factor statistics into duration_factors; the caller commits"""
+    if not samples:
+        return
+    rows = [
+        {
+            "work_center_id": work_center_id,
+            "product_type_id": product_type_id,
+            "naziv_pattern": pattern,
+            "samples": stats.samples,
+            "mean_factor": stats.mean,
+            "m2": stats.m2,
+            "updated_at": datetime.utcnow(),
+        }
+        for (work_center_id, product_type_id, pattern), stats in sorted(samples.items())
+    ]
+    stmt = pg_insert(DurationFactor.__table__).values(rows)
+    table = DurationFactor.__table__.c
+    new = stmt.excluded
+    total = table.samples + new.samples
+    delta = new.mean_factor - table.mean_factor
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=["work_center_id", "product_type_id", "naziv_pattern"],
+        set_={
+            "samples": total,
+            "mean_factor": table.mean_factor + delta * new.samples / total,
+            "m2": table.m2 + new.m2 + delta * delta * table.samples * new.samples / total,
+            "updated_at": new.updated_at,
+        }
+    ))
+    mark_changed(session, "duration_factors")
+
+
+_REFIT_SQL = """
+    SELECT
+        s.work_center_id,
+        COALESCE(p.product_type_id, 0) AS product_type_id,
+        COALESCE(o.naziv, oh.naziv) AS naziv,
+        s.actual_minutes,
+        s.planned_minutes
+    FROM operation_states s
+    LEFT JOIN operations o ON o.id = s.operation_id
+    LEFT JOIN operations_history oh ON o.id IS NULL AND oh.id = s.operation_id
+    LEFT JOIN work_orders wo ON wo.id = s.work_order_id
+    LEFT JOIN work_orders_history woh ON wo.id IS NULL AND woh.id = s.work_order_id
+    LEFT JOIN products p ON p.id = COALESCE(wo.product_id, woh.product_id)
+    WHERE s.status = 'completed' AND s.planned_minutes > 0 AND s.actual_minutes > 0
+"""
+
+
+async def refit(session: AsyncSession) -> Dict[str, int]:
+    """
+    Recompute duration_factors from every completed operation in the projection
+    (after pattern rules change, or to drop reopened operations); the caller commits
+    """
+    # Completions committing meanwhile wait, then merge into the refitted rows
+    await session.execute(text("LOCK TABLE duration_factors IN EXCLUSIVE MODE"))
+    fitted: Dict[FactorKey, FactorStats] = {}
+    result = await session.stream(text(_REFIT_SQL))
+    samples = 0
+    async for row in result:
+        key = (row.work_center_id, row.product_type_id, naziv_pattern(row.naziv))
+        fitted.setdefault(key, FactorStats()).add(clamp_factor(float(row.actual_minutes), float(row.planned_minutes)))
+        samples += 1
+
+    await session.execute(DurationFactor.__table__.delete())
+    keys = sorted(fitted)
+    for start in range(0, len(keys), 1000):
+        await record_samples(session, {key: fitted[key] for key in keys[start:start + 1000]})
+    return {"samples": samples, "factors": len(fitted)}
+
+
+class DurationModel:
+    """In-process lookup table over duration_factors"""
+
+    def __init__(self, min_samples: int = 5, ttl_seconds: float = 300.0):
+        self.min_samples = min_samples
+        self.ttl_seconds = ttl_seconds
+        self._table: Dict[FactorKey, FactorStats] = {}
+        self._loaded_at: Optional[float] = None
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Load the table if it was never loaded, expired or invalidated by a commit"""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        result = await session.execute(select(
+            DurationFactor.work_center_id, DurationFactor.product_type_id, DurationFactor.naziv_pattern,
+            DurationFactor.samples, DurationFactor.mean_factor, DurationFactor.m2
+        ))
+        table: Dict[FactorKey, FactorStats] = {}
+        for work_center_id, product_type_id, pattern, samples, mean, m2 in result:
+            stats = FactorStats(samples, mean, m2)
+            table[(work_center_id, product_type_id, pattern)] = stats
+            # Coarser levels are merges of the finer statistics
+            table.setdefault((work_center_id, product_type_id, ANY), FactorStats()).merge(stats)
+            table.setdefault((work_center_id, ANY, ANY), FactorStats()).merge(stats)
+        self._table = table
+        self._loaded_at = time.monotonic()
+
+    def lookup(self, work_center_id: int, product_type_id: int, naziv: Optional[str]) -> Tuple[Optional[FactorStats], str]:
+        """Most specific statistics with enough samples, and its level"""
+        for key, level in (
+            ((work_center_id, product_type_id, naziv_pattern(naziv)), "pattern"),
+            ((work_center_id, product_type_id, ANY), "product_type"),
+            ((work_center_id, ANY, ANY), "work_center"),
+        ):
+            stats = self._table.get(key)
+            if stats is not None and stats.samples >= self.min_samples:
+                return stats, level
+        return None, "none"
+
+    def estimate(
+        self,
+        work_center_id: int,
+        product_type_id: int,
+        naziv: Optional[str],
+        norma: Optional[float]
+    ) -> DurationEstimate:
+        """Corrected duration of an operation; uncorrected norma (minutes) when nothing was learned"""
+        norma_minutes = float(norma) if norma else None
+        base = norma_minutes or DEFAULT_MINUTES
+        stats, level = self.lookup(work_center_id, product_type_id, naziv)
+        if stats is None:
+            return DurationEstimate(norma_minutes, base, 0.0, 1.0, 0, level)
+        return DurationEstimate(
+            norma_minutes=norma_minutes,
+            minutes=base * stats.mean,
+            std_minutes=base * stats.std,
+            factor=stats.mean,
+            samples=stats.samples,
+            level=level,
+        )
+
+    def get_factors(self, work_center_id: Optional[int] = None) -> List[Dict[str, object]]:
+        """Loaded statistics, all levels, most samples first"""
+        rows = [
+            {
+                "work_center_id": key[0],
+                "product_type_id": key[1],
+                "naziv_pattern": key[2],
+                "samples": stats.samples,
+                "factor": round(stats.mean, 4),
+                "std": round(stats.std, 4),
+            }
+            for key, stats in self._table.items()
+            if work_center_id is None or key[0] == work_center_id
+        ]
+        return sorted(rows, key=lambda row: (-row["samples"], str(row["naziv_pattern"])))
+
+
+duration_model = DurationModel(
+    min_samples=settings.duration_model_min_samples,
+    ttl_seconds=settings.duration_model_ttl_seconds,
+)
+
+
+@on_commit
+def _invalidate_duration_model(change_set: ChangeSet) -> None:
+    # Factors learned in this process apply to the next scheduling call
+    if "duration_factors" in change_set.tables:
+        duration_model.invalidate()
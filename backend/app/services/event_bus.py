@@ -0,0 +1,228 @@
+"""
+In-process pub/sub of schedule and status changes for push clients
+
+Committed row changes are turned into compact events and fanned out to
+subscribers, each of which may restrict itself to a set of work centers.
+The bus lives in the API process; with several workers every worker sees
+only its own commits, so run a single worker (or put a LISTEN/NOTIFY bridge
+in front of publish()) when push matters across processes.
+
+Stream ids are "<epoch>-<sequence>", the epoch being fresh in every
+process: a Last-Event-ID from before a restart or from another worker
+cannot be replayed from the buffer, and the client is told to resync.
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+from app.database.change_tracking import ChangeSet, on_commit
+from app.repositories.work_center_registry import work_center_registry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    """One change notification"""
+    id: int
+    type: str
+    data: Dict[str, Any]
+    work_center_ids: frozenset = frozenset()  # empty: relevant to every subscriber
+    epoch: str = ""
+
+    @property
+    def stream_id(self) -> str:
+        """The SSE id, which clients send back as Last-Event-ID"""
+        return f"{self.epoch}-{self.id}"
+
+
+@dataclass(eq=False)
+class Subscription:
+    """A subscriber's queue and work center filter (None: everything)"""
+    work_center_ids: Optional[Set[int]]
+    queue: "asyncio.Queue[Event]"
+    loop: asyncio.AbstractEventLoop
+    dropped: bool = field(default=False)
+
+    def wants(self, event: Event) -> bool:
+        if self.work_center_ids is None or not event.work_center_ids:
+            return True
+        return bool(self.work_center_ids & event.work_center_ids)
+
+
+class EventBus:
+    """Fan-out of events to subscriber queues, with a replay buffer for reconnects"""
+
+    def __init__(self, queue_size: int = 1000, replay_size: int = 1000):
+        self.queue_size = queue_size
+        self._subscriptions: Set[Subscription] = set()
+        self._recent: Deque[Event] = deque(maxlen=replay_size)
+        self.epoch = uuid.uuid4().hex[:8]
+        self._last_id = 0
+        self._evicted_id = 0  # newest event that fell out of the replay buffer
+
+    def subscribe(
+        self,
+        work_center_ids: Optional[Iterable[int]] = None,
+        last_event_id: Optional[str] = None
+    ) -> Subscription:
+        """Register a subscriber; events after last_event_id are replayed if still buffered"""
+        subscription = Subscription(
+            work_center_ids=set(work_center_ids) if work_center_ids is not None else None,
+            queue=asyncio.Queue(maxsize=self.queue_size),
+            loop=asyncio.get_running_loop()
+        )
+        if last_event_id is not None:
+            reason = self._replay_gap(last_event_id)
+            if reason is not None:
+                # Nothing reliable to replay from; tell the client to refetch
+                self._enqueue(subscription, self._make_event("resync", {"reason": reason}))
+            else:
+                after = int(last_event_id.rpartition("-")[2])
+                for event in self._recent:
+                    if event.id > after and subscription.wants(event):
+                        self._enqueue(subscription, event)
+
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def _replay_gap(self, last_event_id: str) -> Optional[str]:
+        """Why events after last_event_id cannot be replayed, or None if they can"""
+        epoch, _, sequence = last_event_id.rpartition("-")
+        if epoch != self.epoch or not sequence.isdigit():
+            return "restarted"
+        if int(sequence) > self._last_id:
+            return "unknown_id"
+        if int(sequence) < self._evicted_id:
+            return "replay_gap"
+        return None
+
+    def _make_event(self, type: str, data: Dict[str, Any], work_center_ids: Iterable[int] = ()) -> Event:
+        self._last_id += 1
+        return Event(
+            id=self._last_id, type=type, data=data, work_center_ids=frozenset(work_center_ids), epoch=self.epoch
+        )
+
+    def _enqueue(self, subscription: Subscription, event: Event) -> None:
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client: drop its backlog and make it refetch
+            subscription.dropped = True
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(self._make_event("resync", {"reason": "overflow"}))
+
+    def _deliver(self, subscription: Subscription, event: Event) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is subscription.loop:
+            self._enqueue(subscription, event)
+        else:
+            subscription.loop.call_soon_threadsafe(self._enqueue, subscription, event)
+
+    def publish(self, type: str, data: Dict[str, Any], work_center_ids: Iterable[int] = ()) -> Event:
+        """Publish an event to every interested subscriber"""
+        event = self._make_event(type, data, work_center_ids)
+        if len(self._recent) == self._recent.maxlen:
+            self._evicted_id = self._recent[0].id
+        self._recent.append(event)
+        for subscription in list(self._subscriptions):
+            if subscription.wants(event):
+                self._deliver(subscription, event)
+        return event
+
+
+event_bus = EventBus()
+
+
+def events_for_change_set(change_set: ChangeSet) -> List[Dict[str, Any]]:
+    """Translate committed row changes into event payloads"""
+    events = []
+    for change in change_set.row_changes:
+        old, new = change.old or {}, change.new or {}
+
+        if change.table == "operations":
+            work_center_ids = {
+                value for value in (old.get("work_center_id"), new.get("work_center_id")) if value is not None
+            }
+            current = new or old
+            data = {
+                "operation_id": change.id,
+                "work_order_id": current.get("work_order_id"),
+                "work_center_id": current.get("work_center_id"),
+                "work_center": work_center_registry.peek_code(current.get("work_center_id")),
+                "status": new.get("status"),
+            }
+            if change.old is None:
+                events.append({"type": "operation.created", "data": data, "work_center_ids": work_center_ids})
+            elif change.new is None:
+                events.append({"type": "operation.deleted", "data": data, "work_center_ids": work_center_ids})
+            else:
+                if old.get("status") != new.get("status"):
+                    events.append({
+                        "type": "operation.status",
+                        "data": {**data, "previous_status": old.get("status")},
+                        "work_center_ids": work_center_ids
+                    })
+                if (old.get("running_since") is None) != (new.get("running_since") is None):
+                    events.append({
+                        "type": "operation.clock",
+                        "data": {**data, "running": new.get("running_since") is not None},
+                        "work_center_ids": work_center_ids
+                    })
+                if old.get("work_center_id") != new.get("work_center_id"):
+                    events.append({
+                        "type": "operation.moved",
+                        "data": {
+                            **data,
+                            "previous_work_center_id": old.get("work_center_id"),
+                            "previous_work_center": work_center_registry.peek_code(old.get("work_center_id")),
+                        },
+                        "work_center_ids": work_center_ids
+                    })
+
+        elif change.table == "work_orders":
+            changed = sorted(
+                key for key in ("status", "priority_level")
+                if change.old is None or change.new is None or old.get(key) != new.get(key)
+            )
+            if changed:
+                events.append({
+                    "type": "work_order.updated",
+                    "data": {
+                        "work_order_id": change.id,
+                        "status": new.get("status"),
+                        "priority_level": new.get("priority_level"),
+                        "changed": changed,
+                        "deleted": change.new is None,
+                    },
+                    "work_center_ids": set()
+                })
+
+    # Bulk statements are invisible row by row; clients refetch what they show
+    resync_tables = sorted(change_set.bulk_tables & {"operations", "work_orders"})
+    if resync_tables:
+        events.append({"type": "resync", "data": {"tables": resync_tables}, "work_center_ids": set()})
+
+    return events
+
+
+@on_commit
+def _publish_committed_changes(change_set: ChangeSet) -> None:
+    # Published even with nobody listening: a client reconnecting with
+    # Last-Event-ID replays what it missed from the buffer
+    for event in events_for_change_set(change_set):
+        event_bus.publish(event["type"], event["data"], event["work_center_ids"])
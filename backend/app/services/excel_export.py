@@ -0,0 +1,186 @@
+"""
+Constant-memory XLSX export of the production plan
+
+Writes the legacy PRINT sheet layout straight from a database cursor with
+xlsxwriter's constant_memory mode: every row is flushed to a temporary file
+as soon as the next one starts, so the full plant backlog never sits in
+memory, as a DataFrame or otherwise.
+
+Sheets:
+    PRINT       - every active operation, grouped by work center
+    <WC code>   - one sheet per work center with the same columns
+"""
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, date, time, timedelta
+from typing import Any, Dict, Optional
+
+import xlsxwriter
+
+from app.services.export_service import DATASETS, ExportFilters, stream_rows
+
+# Legacy PRINT sheet columns and widths; ZQ, KPLQ, MTO and ITEM are not
+# stored in the database and stay empty so the layout matches the workbook
+PRINT_COLUMNS = [
+    ("SAP", 6), ("STATUS", 11), ("KPL", 10), ("KPLQ", 6), ("RN", 10), ("NAZIV", 40),
+    ("Norma", 8), ("Q", 6), ("ZQ", 6), ("CQ", 6), ("WC", 9), ("WCNAME", 24), ("MTO", 20),
+    ("Isporuka", 11), ("TRAJANJE", 10), ("Datum PS", 11), ("START", 16), ("END", 16),
+    ("END TIME", 9), ("KASNI", 8), ("ITEM", 10),
+]
+
+# The plan starts at the first shift of the export day, as in the PRINT sheet
+DEFAULT_START_TIME = time(7, 0)
+
+# Excel's sheet name limit and forbidden characters
+_MAX_SHEET_NAME = 31
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+@dataclass
+class _SheetState:
+    """Write position and running plan time of one worksheet"""
+    worksheet: Any
+    row: int = 1
+    clock: Dict[str, datetime] = field(default_factory=dict)
+
+
+class PlanWorkbookWriter:
+    """Row-by-row writer of the PRINT layout across several sheets"""
+
+    def __init__(self, path: str, start: datetime):
+        self.start = start
+        self.workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_numbers": False})
+        self.formats = {
+            "header": self.workbook.add_format({
+                "bold": True, "bg_color": "#1F4E78", "font_color": "#FFFFFF", "border": 1, "align": "center"
+            }),
+            "date": self.workbook.add_format({"num_format": "dd.mm.yyyy"}),
+            "datetime": self.workbook.add_format({"num_format": "dd.mm.yyyy hh:mm"}),
+            "time": self.workbook.add_format({"num_format": "hh:mm"}),
+            "duration": self.workbook.add_format({"num_format": "[h]:mm"}),
+            "late": self.workbook.add_format({"num_format": "0.00", "font_color": "#C00000", "bold": True}),
+            "days": self.workbook.add_format({"num_format": "0.00"}),
+            "urgent": self.workbook.add_format({"bg_color": "#FFE699"}),
+        }
+        self.sheets: Dict[str, _SheetState] = {}
+        self.print_sheet = self._add_sheet("PRINT")
+
+    def _add_sheet(self, name: str) -> _SheetState:
+        worksheet = self.workbook.add_worksheet(name)
+        for column, (title, width) in enumerate(PRINT_COLUMNS):
+            worksheet.set_column(column, column, width)
+            worksheet.write_string(0, column, title, self.formats["header"])
+        worksheet.freeze_panes(1, 0)
+        return _SheetState(worksheet)
+
+    def _sheet_for(self, work_center: str) -> _SheetState:
+        state = self.sheets.get(work_center)
+        if state is None:
+            name = _INVALID_SHEET_CHARS.sub("_", work_center)[:_MAX_SHEET_NAME] or "WC"
+            taken = {sheet.worksheet.name.upper() for sheet in [self.print_sheet, *self.sheets.values()]}
+            base, suffix = name, 2
+            while name.upper() in taken:
+                name = f"{base[:_MAX_SHEET_NAME - 3]}_{suffix}"
+                suffix += 1
+            state = self.sheets[work_center] = self._add_sheet(name)
+        return state
+
+    def _write_row(self, state: _SheetState, row: Any) -> None:
+        worksheet, r, formats = state.worksheet, state.row, self.formats
+
+        # Norma is in minutes, as in query.xlsx; operations run back to back per work center
+        minutes = float(row.norma or 0)
+        started = state.clock.get(row.work_center, self.start)
+        finished = started + timedelta(minutes=minutes)
+        state.clock[row.work_center] = finished
+
+        row_format = formats["urgent"] if row.priority_level == 1 else None
+        worksheet.write_number(r, 0, row.quantity_completed or 0, row_format)
+        worksheet.write_string(r, 1, row.status or "", row_format)
+        worksheet.write(r, 2, _as_number(row.kpl), row_format)
+        worksheet.write_blank(r, 3, None, row_format)
+        worksheet.write(r, 4, _as_number(row.rn), row_format)
+        worksheet.write_string(r, 5, row.naziv or "", row_format)
+        worksheet.write_number(r, 6, minutes, row_format)
+        worksheet.write_number(r, 7, row.quantity or 0, row_format)
+        worksheet.write_blank(r, 8, None, row_format)
+        worksheet.write_number(r, 9, row.quantity_completed or 0, row_format)
+        worksheet.write_string(r, 10, row.work_center or "", row_format)
+        worksheet.write_string(r, 11, row.work_center_name or "", row_format)
+        worksheet.write_blank(r, 12, None, row_format)
+        _write_date(worksheet, r, 13, row.datum_isporuke, formats["date"])
+        worksheet.write_number(r, 14, minutes / 1440, formats["duration"])
+        _write_date(worksheet, r, 15, row.datum_sastavljanja, formats["date"])
+        worksheet.write_datetime(r, 16, started, formats["datetime"])
+        worksheet.write_datetime(r, 17, finished, formats["datetime"])
+        worksheet.write_datetime(r, 18, finished.time(), formats["time"])
+
+        if row.datum_isporuke is not None:
+            delivery = datetime.combine(row.datum_isporuke, time.min)
+            days_left = (delivery - finished).total_seconds() / 86400
+            worksheet.write_number(r, 19, round(days_left, 2), formats["late"] if days_left < 0 else formats["days"])
+        else:
+            worksheet.write_blank(r, 19, None)
+        worksheet.write_blank(r, 20, None)
+
+        state.row += 1
+
+    def write(self, row: Any) -> None:
+        """Append an operation to PRINT and to its work center sheet"""
+        self._write_row(self.print_sheet, row)
+        self._write_row(self._sheet_for(row.work_center), row)
+
+    def close(self) -> None:
+        last_column = len(PRINT_COLUMNS) - 1
+        for state in [self.print_sheet, *self.sheets.values()]:
+            state.worksheet.autofilter(0, 0, max(state.row - 1, 1), last_column)
+        self.workbook.close()
+
+
+def _as_number(value: Optional[str]) -> Any:
+    """KPL and RN are numeric in the legacy sheets; keep them numbers when they are"""
+    if value is not None and value.isdigit():
+        return int(value)
+    return value or ""
+
+
+def _write_date(worksheet, row: int, column: int, value: Optional[date], cell_format) -> None:
+    if value is None:
+        worksheet.write_blank(row, column, None)
+    else:
+        worksheet.write_datetime(row, column, datetime.combine(value, time.min), cell_format)
+
+
+async def write_plan_workbook(
+    path: str,
+    work_center_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    batch_size: int = 2000
+) -> Dict[str, Any]:
+    """Stream the active schedule into an XLSX file; returns row and sheet counts"""
+    start = start or datetime.combine(date.today(), DEFAULT_START_TIME)
+    writer = PlanWorkbookWriter(path, start)
+    rows = 0
+    try:
+        dataset = DATASETS["schedule"]
+        async for partition in stream_rows(dataset, ExportFilters(work_center_id=work_center_id), batch_size):
+            for row in partition:
+                writer.write(row)
+            rows += len(partition)
+    finally:
+        writer.close()
+
+    return {"path": path, "rows": rows, "work_centers": len(writer.sheets)}
+
+
+async def export_plan_to_temp_file(**kwargs) -> Dict[str, Any]:
+    """Write the workbook to a temporary file the caller removes when done"""
+    handle, path = tempfile.mkstemp(prefix="plan_", suffix=".xlsx")
+    os.close(handle)
+    try:
+        return await write_plan_workbook(path, **kwargs)
+    except Exception:
+        os.remove(path)
+        raise
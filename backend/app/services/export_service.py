@@ -0,0 +1,300 @@
+"""
+Streaming export of operations, work orders and schedules
+
+Rows are read through a server-side cursor in fixed-size partitions and
+encoded partition by partition, so memory stays flat however large the
+export is and the first bytes go out as soon as the first partition arrives.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import select, Boolean, Date, DateTime, Integer, Numeric
+from sqlalchemy.sql import Select
+
+from app.database.connection import AsyncSessionLocal
+from app.database.models import Operation, WorkOrder, Product, WorkCenter
+from app.repositories.work_center_registry import work_center_registry
+
+ACTIVE_STATUSES = ["pending", "in_progress"]
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+class ExportFormat(str, Enum):
+    """Supported export encodings"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+    ARROW = "arrow"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+FILE_EXTENSIONS = {
+    ExportFormat.NDJSON: "ndjson",
+    ExportFormat.CSV: "csv",
+    ExportFormat.ARROW: "arrow",
+}
+
+
+@dataclass(frozen=True)
+class ExportFilters:
+    """Optional narrowing of an export"""
+    work_center_id: Optional[int] = None
+    status: Optional[str] = None
+
+
+def _operation_columns() -> List[Any]:
+    return [
+        Operation.id.label("operation_id"),
+        WorkOrder.rn.label("rn"),
+        Product.kpl.label("kpl"),
+        Product.name.label("product_name"),
+        WorkCenter.code.label("work_center"),
+        WorkCenter.name.label("work_center_name"),
+        Operation.operation_sequence.label("operation_sequence"),
+        Operation.naziv.label("naziv"),
+        Operation.norma.label("norma"),
+        Operation.quantity.label("quantity"),
+        Operation.quantity_completed.label("quantity_completed"),
+        Operation.status.label("status"),
+        WorkOrder.priority_level.label("priority_level"),
+        WorkOrder.datum_isporuke.label("datum_isporuke"),
+        WorkOrder.datum_sastavljanja.label("datum_sastavljanja"),
+        Operation.updated_at.label("updated_at"),
+    ]
+
+
+def _operations_statement(filters: ExportFilters) -> Select:
+    stmt = select(*_operation_columns()).join(
+        WorkOrder, Operation.work_order_id == WorkOrder.id
+    ).join(
+        Product, WorkOrder.product_id == Product.id
+    ).join(
+        WorkCenter, Operation.work_center_id == WorkCenter.id
+    )
+    if filters.work_center_id is not None:
+        stmt = stmt.where(Operation.work_center_id == filters.work_center_id)
+    if filters.status:
+        stmt = stmt.where(Operation.status == filters.status)
+    return stmt.order_by(Operation.id)
+
+
+def _schedule_statement(filters: ExportFilters) -> Select:
+    stmt = select(*_operation_columns()).join(
+        WorkOrder, Operation.work_order_id == WorkOrder.id
+    ).join(
+        Product, WorkOrder.product_id == Product.id
+    ).join(
+        WorkCenter, Operation.work_center_id == WorkCenter.id
+    ).where(
+        Operation.status.in_([filters.status] if filters.status else ACTIVE_STATUSES)
+    )
+    if filters.work_center_id is not None:
+        stmt = stmt.where(Operation.work_center_id == filters.work_center_id)
+    return stmt.order_by(WorkCenter.code, Operation.operation_sequence, Operation.id)
+
+
+def _work_orders_statement(filters: ExportFilters) -> Select:
+    stmt = select(
+        WorkOrder.id.label("work_order_id"),
+        WorkOrder.rn.label("rn"),
+        Product.kpl.label("kpl"),
+        Product.name.label("product_name"),
+        WorkOrder.quantity.label("quantity"),
+        WorkOrder.priority_level.label("priority_level"),
+        WorkOrder.datum_isporuke.label("datum_isporuke"),
+        WorkOrder.datum_sastavljanja.label("datum_sastavljanja"),
+        WorkOrder.datum_treci.label("datum_treci"),
+        WorkOrder.status.label("status"),
+        WorkOrder.created_at.label("created_at"),
+        WorkOrder.updated_at.label("updated_at"),
+    ).join(Product, WorkOrder.product_id == Product.id)
+    if filters.work_center_id is not None:
+        stmt = stmt.where(
+            select(Operation.id).where(
+                Operation.work_order_id == WorkOrder.id,
+                Operation.work_center_id == filters.work_center_id
+            ).exists()
+        )
+    if filters.status:
+        stmt = stmt.where(WorkOrder.status == filters.status)
+    return stmt.order_by(WorkOrder.id)
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    """A named export and the statement that produces it"""
+    name: str
+    build_statement: Callable[[ExportFilters], Select]
+    description: str = ""
+
+    def columns(self) -> List[Any]:
+        """Selected columns, for headers and Arrow schemas"""
+        return list(self.build_statement(ExportFilters()).selected_columns)
+
+
+DATASETS: Dict[str, ExportDataset] = {
+    dataset.name: dataset for dataset in (
+        ExportDataset("operations", _operations_statement, "Every operation with work order, product and work center"),
+        ExportDataset("schedule", _schedule_statement, "Active operations in work center sequence"),
+        ExportDataset("work_orders", _work_orders_statement, "Work orders with their product"),
+    )
+}
+
+
+async def stream_rows(
+    dataset: ExportDataset,
+    filters: ExportFilters,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> AsyncIterator[Sequence[Any]]:
+    """
+    Yield partitions of rows from a server-side cursor.
+
+    Opens its own session: a streaming response outlives the request scope.
+    """
+    stmt = dataset.build_statement(filters).execution_options(yield_per=batch_size)
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(stmt)
+        async for partition in result.partitions(batch_size):
+            yield partition
+
+
+async def resolve_filters(work_center: Optional[str] = None, status: Optional[str] = None) -> Optional[ExportFilters]:
+    """Filters from request parameters; None if the work center code is unknown"""
+    work_center_id = None
+    if work_center:
+        async with AsyncSessionLocal() as session:
+            work_center_id = await work_center_registry.resolve_id(session, work_center)
+        if work_center_id is None:
+            return None
+    return ExportFilters(work_center_id=work_center_id, status=status)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+async def encode_ndjson(dataset: ExportDataset, rows: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """One JSON object per line"""
+    names = [column.name for column in dataset.columns()]
+    async for partition in rows:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=_json_default, ensure_ascii=False) + "\n"
+            for row in partition
+        ).encode("utf-8")
+
+
+async def encode_csv(dataset: ExportDataset, rows: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """CSV with a header row; BOM first so Excel detects UTF-8"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in dataset.columns()])
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    async for partition in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(partition)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_schema(dataset: ExportDataset):
+    import pyarrow as pa
+
+    def arrow_type(sql_type):
+        if isinstance(sql_type, Boolean):
+            return pa.bool_()
+        if isinstance(sql_type, Integer):
+            return pa.int64()
+        if isinstance(sql_type, Numeric):
+            return pa.float64()
+        if isinstance(sql_type, DateTime):
+            return pa.timestamp("us")
+        if isinstance(sql_type, Date):
+            return pa.date32()
+        return pa.string()
+
+    return pa.schema([(column.name, arrow_type(column.type)) for column in dataset.columns()])
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose buffered bytes can be taken out between writes"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def encode_arrow(dataset: ExportDataset, rows: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """Arrow IPC stream, one record batch per partition"""
+    import pyarrow as pa
+
+    schema = _arrow_schema(dataset)
+    sink = _DrainableSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    yield sink.drain()
+
+    async for partition in rows:
+        columns = list(zip(*partition)) if partition else [() for _ in schema]
+        writer.write_batch(pa.record_batch(
+            [
+                pa.array([float(value) if isinstance(value, Decimal) else value for value in values], type=field.type)
+                for values, field in zip(columns, schema)
+            ],
+            schema=schema
+        ))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    ExportFormat.NDJSON: encode_ndjson,
+    ExportFormat.CSV: encode_csv,
+    ExportFormat.ARROW: encode_arrow,
+}
+
+
+def arrow_available() -> bool:
+    """Whether the optional pyarrow dependency is installed"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_stream(
+    dataset: ExportDataset,
+    export_format: ExportFormat,
+    filters: ExportFilters,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> AsyncIterator[bytes]:
+    """Encoded byte chunks of a dataset"""
+    return ENCODERS[export_format](dataset, stream_rows(dataset, filters, batch_size))
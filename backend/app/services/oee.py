@@ -0,0 +1,298 @@
+"""
+OEE per work center and shift: availability x performance x quality
+
+The counters in oee_shift_stats are added to by every shop-floor batch
+(see app.services.operation_events), so reading a range is a primary-key
+scan plus, for operations running right now, the minutes since they
+clocked in. Shifts without any activity are filled in from the calendar.
+
+availability = run minutes / planned minutes (shift length less breaks,
+               up to now for the current shift), at most 1
+performance  = standard minutes of the pieces made / run minutes
+quality      = good pieces / (good + scrap)
+oee          = availability x min(performance, 1) x quality
+
+The counters are rebuilt from the event log only when the shift calendar
+or the accounting rules change (rebuild_oee).
+"""
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import AsyncSessionLocal
+from app.database.models import OeeShiftStats, Operation, OperationEvent, WorkCenter
+from app.services.operation_events import (
+    EVENT_LOG_LOCK_KEY, FloorState, InvalidTransition, account_oee, apply_event
+)
+from app.services.operation_projection import load_planning
+from app.services.shift_calendar import OVERTIME, OeeAccumulator, ShiftWindow, shift_calendar
+
+# Operations replayed per rebuild page
+REBUILD_PAGE_SIZE = 500
+
+
+@dataclass
+class ShiftOee:
+    """OEE of one work center in one shift"""
+    work_center_id: int
+    shift_name: str
+    day: date
+    shift_start: datetime
+    shift_end: datetime
+    planned_minutes: float
+    run_minutes: float
+    ideal_minutes: float
+    good_quantity: int
+    scrap_quantity: int
+    stops: int
+    running_operations: int = 0
+    availability: Optional[float] = None
+    performance: Optional[float] = None
+    quality: Optional[float] = None
+    oee: Optional[float] = None
+
+    def compute(self) -> "ShiftOee":
+        """Fill in the ratios from the counters"""
+        self.availability = round(min(self.run_minutes / self.planned_minutes, 1.0), 4) if self.planned_minutes else None
+        self.performance = round(self.ideal_minutes / self.run_minutes, 4) if self.run_minutes else None
+        pieces = self.good_quantity + self.scrap_quantity
+        self.quality = round(self.good_quantity / pieces, 4) if pieces else None
+        if self.availability is not None and self.performance is not None and self.quality is not None:
+            self.oee = round(self.availability * min(self.performance, 1.0) * self.quality, 4)
+        else:
+            self.oee = None
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class OeeRebuildResult:
+    """Counts of one OEE counter rebuild"""
+    date_from: date
+    date_to: date
+    operations: int = 0
+    replayed_events: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _utc_range(date_from: date, date_to: date) -> Tuple[datetime, datetime]:
+    return (
+        shift_calendar.to_utc(datetime.combine(date_from, datetime.min.time())),
+        shift_calendar.to_utc(datetime.combine(date_to + timedelta(days=1), datetime.min.time())),
+    )
+
+
+async def _work_center_ids(session: AsyncSession, work_center_id: Optional[int]) -> List[int]:
+    if work_center_id is not None:
+        return [work_center_id]
+    result = await session.execute(
+        select(WorkCenter.id).where(WorkCenter.is_active.is_(True)).order_by(WorkCenter.id)
+    )
+    return list(result.scalars())
+
+
+async def get_shift_oee(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    work_center_id: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> List[ShiftOee]:
+    """OEE per work center and shift that started by now on the plant days date_from..date_to"""
+    now = now or datetime.utcnow()
+    await shift_calendar.ensure_loaded(session)
+    work_center_ids = await _work_center_ids(session, work_center_id)
+    range_start, range_end = _utc_range(date_from, date_to)
+    range_end = min(range_end, now)
+
+    shifts: Dict[Tuple[int, datetime, str], ShiftOee] = {}
+
+    def shift_of(work_center: int, window: ShiftWindow) -> ShiftOee:
+        key = (work_center, window.start, window.name)
+        if key not in shifts:
+            shifts[key] = ShiftOee(
+                work_center, window.name, window.day, window.start, window.end,
+                window.planned_minutes, 0.0, 0.0, 0, 0, 0
+            )
+        return shifts[key]
+
+    # Every shift of the calendar, active or not
+    for work_center in work_center_ids:
+        for window in shift_calendar.windows(work_center, range_start, range_end):
+            if date_from <= window.day <= date_to:
+                shift_of(work_center, window)
+
+    stmt = select(OeeShiftStats).where(OeeShiftStats.day.between(date_from, date_to))
+    if work_center_id is not None:
+        stmt = stmt.where(OeeShiftStats.work_center_id == work_center_id)
+    for row in (await session.execute(stmt)).scalars():
+        shift = shift_of(row.work_center_id, ShiftWindow(
+            row.shift_name, row.day, row.shift_start, row.shift_end, float(row.planned_minutes or 0)
+        ))
+        shift.run_minutes += float(row.run_minutes or 0)
+        shift.ideal_minutes += float(row.ideal_minutes or 0)
+        shift.good_quantity += row.good_quantity or 0
+        shift.scrap_quantity += row.scrap_quantity or 0
+        shift.stops += row.stops or 0
+
+    # Intervals still open count up to now
+    running_stmt = select(Operation.work_center_id, Operation.running_since).where(
+        Operation.running_since.is_not(None), Operation.running_since < range_end
+    )
+    if work_center_id is not None:
+        running_stmt = running_stmt.where(Operation.work_center_id == work_center_id)
+    live = OeeAccumulator(shift_calendar)
+    running: Dict[Tuple[int, ShiftWindow], int] = {}
+    for work_center, running_since in await session.execute(running_stmt):
+        live.add_run(work_center, max(running_since, range_start), range_end)
+        if range_end == now:
+            window = shift_calendar.window_at(work_center, now)
+            running[(work_center, window)] = running.get((work_center, window), 0) + 1
+    for (work_center, window), counters in live.buckets.items():
+        if date_from <= window.day <= date_to:
+            shift_of(work_center, window).run_minutes += counters.run_minutes
+    for (work_center, window), count in running.items():
+        if date_from <= window.day <= date_to:
+            shift_of(work_center, window).running_operations += count
+
+    result = []
+    for shift in shifts.values():
+        if shift.shift_start > now:
+            continue
+        if shift.shift_end > now and shift.shift_name != OVERTIME:
+            # The current shift is measured against its planned time so far
+            elapsed = (now - shift.shift_start) / (shift.shift_end - shift.shift_start)
+            shift.planned_minutes *= elapsed
+        shift.planned_minutes = round(shift.planned_minutes, 2)
+        shift.run_minutes = round(shift.run_minutes, 2)
+        shift.ideal_minutes = round(shift.ideal_minutes, 2)
+        if shift.shift_name == OVERTIME and not (shift.run_minutes or shift.good_quantity or shift.scrap_quantity):
+            continue
+        result.append(shift.compute())
+    return sorted(result, key=lambda shift: (shift.work_center_id, shift.shift_start, shift.shift_name))
+
+
+async def get_current_oee(session: AsyncSession, work_center_id: Optional[int] = None) -> List[ShiftOee]:
+    """OEE of the shift running now at each work center (overtime where no shift is)"""
+    now = datetime.utcnow()
+    today = shift_calendar.to_local(now).date()
+    shifts = await get_shift_oee(session, today - timedelta(days=1), today, work_center_id, now=now)
+    current = {}
+    for shift in shifts:
+        if shift.shift_start <= now < shift.shift_end:
+            # A real shift wins over the overtime row of the same day
+            if shift.work_center_id not in current or current[shift.work_center_id].shift_name == OVERTIME:
+                current[shift.work_center_id] = shift
+    return [current[key] for key in sorted(current)]
+
+
+def summarize(shifts: List[ShiftOee]) -> Dict[str, Any]:
+    """OEE over several shifts: ratios of the summed counters"""
+    totals = ShiftOee(0, "", date.min, datetime.min, datetime.min, 0.0, 0.0, 0.0, 0, 0, 0)
+    for shift in shifts:
+        totals.planned_minutes += shift.planned_minutes
+        totals.run_minutes += shift.run_minutes
+        totals.ideal_minutes += shift.ideal_minutes
+        totals.good_quantity += shift.good_quantity
+        totals.scrap_quantity += shift.scrap_quantity
+        totals.stops += shift.stops
+    totals.compute()
+    return {
+        "shifts": len(shifts),
+        "planned_minutes": round(totals.planned_minutes, 2),
+        "run_minutes": round(totals.run_minutes, 2),
+        "ideal_minutes": round(totals.ideal_minutes, 2),
+        "good_quantity": totals.good_quantity,
+        "scrap_quantity": totals.scrap_quantity,
+        "stops": totals.stops,
+        "availability": totals.availability,
+        "performance": totals.performance,
+        "quality": totals.quality,
+        "oee": totals.oee,
+    }
+
+
+async def rebuild_oee(date_from: date, date_to: date) -> OeeRebuildResult:
+    """
+    Recompute the OEE counters of the plant days date_from..date_to from the
+    event log, e.g. after the shift calendar changed. Writers wait until it commits.
+
+    Operations are replayed from their first event, so those whose status
+    predates the event log start as pending.
+    """
+    started = time.perf_counter()
+    result = OeeRebuildResult(date_from, date_to)
+    async with AsyncSessionLocal() as session:
+        await session.execute(select(func.pg_advisory_xact_lock(EVENT_LOG_LOCK_KEY)))
+        await shift_calendar.ensure_loaded(session)
+        range_start, _ = _utc_range(date_from, date_to)
+
+        await session.execute(delete(OeeShiftStats.__table__).where(
+            OeeShiftStats.__table__.c.day.between(date_from, date_to)
+        ))
+
+        # Every operation with an event from the range on: intervals closed later still count in it
+        ids_stmt = select(OperationEvent.operation_id).where(
+            OperationEvent.occurred_at >= range_start
+        ).distinct().order_by(OperationEvent.operation_id).limit(REBUILD_PAGE_SIZE)
+        after = None
+        while True:
+            stmt = ids_stmt if after is None else ids_stmt.where(OperationEvent.operation_id > after)
+            operation_ids = list((await session.execute(stmt)).scalars())
+            if not operation_ids:
+                break
+            after = operation_ids[-1]
+            result.operations += len(operation_ids)
+
+            planning = await load_planning(session, operation_ids)
+            events = await session.execute(
+                select(
+                    OperationEvent.operation_id, OperationEvent.work_center_id, OperationEvent.event_type,
+                    OperationEvent.status, OperationEvent.occurred_at, OperationEvent.quantity,
+                    OperationEvent.scrap_quantity
+                ).where(OperationEvent.operation_id.in_(operation_ids)).order_by(
+                    OperationEvent.operation_id, OperationEvent.id
+                )
+            )
+
+            oee = OeeAccumulator(shift_calendar)
+            states: Dict[int, FloorState] = {}
+            for event in events:
+                plan = planning.get(event.operation_id)
+                quantity = plan.quantity if plan is not None else None
+                planned_minutes = float(plan.norma) if plan is not None and plan.norma is not None else None
+                before = states.get(event.operation_id) or FloorState(quantity=quantity)
+                try:
+                    after_event = apply_event(before, event.event_type, event.occurred_at, event.quantity, event.status)
+                except InvalidTransition:
+                    continue
+                states[event.operation_id] = after_event
+                result.replayed_events += 1
+                account_oee(
+                    oee, event.work_center_id, planned_minutes, quantity, before, after_event,
+                    event.event_type, event.occurred_at, event.scrap_quantity
+                )
+
+            oee.buckets = {
+                key: counters for key, counters in oee.buckets.items()
+                if date_from <= key[1].day <= date_to
+            }
+            await oee.flush(session)
+
+        result.rows = await session.scalar(
+            select(func.count()).select_from(OeeShiftStats).where(OeeShiftStats.day.between(date_from, date_to))
+        )
+        await session.commit()
+
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
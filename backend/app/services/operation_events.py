@@ -0,0 +1,590 @@
+"""
+Operation lifecycle events: start, pause, stop, shift end, complete and status
+
+Terminals report what happens at a machine, and planners' status changes
+are recorded the same way; every event is appended to operation_events and
+folded into the operation it concerns, so an operation's status, actual
+start/completion times, accumulated running minutes and completed quantity
+always follow from its event log. The same transaction upserts the
+operation_states projection (see app.services.operation_projection) and
+adds to the per-shift OEE counters (see app.services.oee).
+
+Replaces the interactive start-/stop-cekiranje scripts, which wrote to a
+local SQLite file per run.
+
+Writes go through OperationEventWriter, which queues events from all
+requests and commits them in groups: one transaction per batch instead of
+one per terminal, with operation rows locked in id order for the few
+milliseconds the batch takes.
+"""
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import AsyncSessionLocal, settings
+from app.database.models import Operation, OperationEvent, OperationState, WorkOrder
+from app.services.duration_model import FactorStats, clamp_factor, naziv_pattern, product_types_of, record_samples
+from app.services.shift_calendar import OeeAccumulator, shift_calendar
+from app.utils.instrumentation import current_trace
+
+logger = logging.getLogger(__name__)
+
+START = "start"
+PAUSE = "pause"
+STOP = "stop"
+SHIFT_END = "shift_end"
+COMPLETE = "complete"
+STATUS = "status"  # planner/office status change, not a terminal report
+
+EVENT_TYPES = (START, PAUSE, STOP, SHIFT_END, COMPLETE, STATUS)
+TERMINAL_EVENT_TYPES = (START, PAUSE, STOP, SHIFT_END, COMPLETE)
+
+# Events that close a running interval without finishing the operation
+CLOCK_OUT_EVENTS = (PAUSE, STOP, SHIFT_END)
+
+OPERATION_STATUSES = ("pending", "in_progress", "completed", "cancelled")
+FINAL_STATUSES = ("completed", "cancelled")
+
+# Writers hold it shared; snapshots take it exclusively to wait out in-flight batches
+EVENT_LOG_LOCK_KEY = 0x4F504556  # "OPEV"
+
+
+class InvalidTransition(ValueError):
+    """The event does not apply to the operation's current state"""
+
+
+@dataclass
+class FloorState:
+    """The part of an operation the shop floor drives"""
+    status: str = "pending"
+    running_since: Optional[datetime] = None
+    actual_start_time: Optional[datetime] = None
+    actual_completion_time: Optional[datetime] = None
+    actual_minutes: float = 0.0
+    quantity_completed: int = 0
+    quantity: Optional[int] = None  # planned, read only
+
+    @property
+    def running(self) -> bool:
+        return self.running_since is not None
+
+    @classmethod
+    def of(cls, operation: Operation) -> "FloorState":
+        return cls(
+            status=operation.status or "pending",
+            running_since=operation.running_since,
+            actual_start_time=operation.actual_start_time,
+            actual_completion_time=operation.actual_completion_time,
+            actual_minutes=float(operation.actual_minutes or 0),
+            quantity_completed=operation.quantity_completed or 0,
+            quantity=operation.quantity,
+        )
+
+    def apply_to(self, operation: Operation) -> None:
+        """Write the state back, touching only attributes that changed"""
+        for name in (
+            "status", "running_since", "actual_start_time", "actual_completion_time",
+            "actual_minutes", "quantity_completed",
+        ):
+            value = getattr(self, name)
+            current = getattr(operation, name)
+            if name == "actual_minutes":
+                if float(current or 0) == value:
+                    continue
+                value = round(value, 2)
+            elif current == value:
+                continue
+            setattr(operation, name, value)
+
+
+def _close_interval(state: FloorState, occurred_at: datetime) -> float:
+    # Late (out-of-order) reports never subtract time
+    return max((occurred_at - state.running_since).total_seconds() / 60, 0.0)
+
+
+def apply_event(
+    state: FloorState,
+    event_type: str,
+    occurred_at: datetime,
+    quantity: Optional[int] = None,
+    status: Optional[str] = None
+) -> FloorState:
+    """
+    Fold one event into an operation's floor state.
+
+    Paused, stopped and shift-ended operations stay in_progress: they are
+    unfinished work, just not running. quantity on a clock-out or on
+    complete is the number of pieces made since the previous report.
+    A status event sets the status outright (reopening finished operations
+    included) and closes a running interval unless the status is in_progress.
+    """
+    if event_type not in EVENT_TYPES:
+        raise InvalidTransition(f"Unknown event type: {event_type}")
+
+    if event_type == STATUS:
+        if status not in OPERATION_STATUSES:
+            raise InvalidTransition(f"Unknown operation status: {status}")
+        keeps_running = status == "in_progress"
+        minutes = _close_interval(state, occurred_at) if state.running and not keeps_running else 0.0
+        if status == "completed":
+            completion_time = state.actual_completion_time or occurred_at
+        elif status == "cancelled":
+            completion_time = state.actual_completion_time
+        else:
+            completion_time = None
+        return replace(
+            state,
+            status=status,
+            running_since=state.running_since if keeps_running else None,
+            actual_start_time=state.actual_start_time or (occurred_at if keeps_running else None),
+            actual_completion_time=completion_time,
+            actual_minutes=state.actual_minutes + minutes,
+        )
+
+    if state.status in FINAL_STATUSES:
+        raise InvalidTransition(f"Operation is {state.status}")
+    if quantity is not None and quantity < 0:
+        raise InvalidTransition("Quantity cannot be negative")
+
+    if event_type == START:
+        if state.running:
+            raise InvalidTransition(f"Operation is already running since {state.running_since.isoformat()}")
+        return replace(
+            state,
+            status="in_progress",
+            running_since=occurred_at,
+            actual_start_time=state.actual_start_time or occurred_at,
+        )
+
+    if event_type in CLOCK_OUT_EVENTS:
+        if not state.running:
+            raise InvalidTransition("Operation is not running")
+        return replace(
+            state,
+            running_since=None,
+            actual_minutes=state.actual_minutes + _close_interval(state, occurred_at),
+            quantity_completed=state.quantity_completed + (quantity or 0),
+        )
+
+    # COMPLETE: closes a running interval; without a count the planned quantity is done
+    minutes = _close_interval(state, occurred_at) if state.running else 0.0
+    if quantity is not None:
+        quantity_completed = state.quantity_completed + quantity
+    else:
+        quantity_completed = max(state.quantity_completed, state.quantity or 0)
+    return replace(
+        state,
+        status="completed",
+        running_since=None,
+        actual_completion_time=occurred_at,
+        actual_minutes=state.actual_minutes + minutes,
+        quantity_completed=quantity_completed,
+    )
+
+
+@dataclass
+class ShopFloorEvent:
+    """One terminal report, before it is recorded"""
+    operation_id: int
+    event_type: str
+    occurred_at: Optional[datetime] = None  # default: when it is recorded
+    quantity: Optional[int] = None
+    terminal_id: Optional[str] = None
+    operator: Optional[str] = None
+    note: Optional[str] = None
+    client_event_id: Optional[str] = None  # default: a new UUID (no retry protection)
+    status: Optional[str] = None  # target status of a status event
+    scrap_quantity: Optional[int] = None  # rejected pieces, on top of quantity
+
+
+@dataclass
+class EventOutcome:
+    """
+    What became of one report:
+    accepted, duplicate (already recorded), rejected (invalid transition) or not_found
+    """
+    client_event_id: str
+    operation_id: int
+    event_type: str
+    outcome: str
+    error: Optional[str] = None
+    operation: Optional[Dict[str, Any]] = field(default=None)
+
+
+def _operation_state(operation: Operation) -> Dict[str, Any]:
+    return {
+        "id": operation.id,
+        "work_order_id": operation.work_order_id,
+        "work_center_id": operation.work_center_id,
+        "status": operation.status,
+        "running": operation.running_since is not None,
+        "running_since": operation.running_since,
+        "actual_start_time": operation.actual_start_time,
+        "actual_completion_time": operation.actual_completion_time,
+        "actual_minutes": float(operation.actual_minutes or 0),
+        "quantity": operation.quantity,
+        "quantity_completed": operation.quantity_completed,
+    }
+
+
+def _planned_minutes(operation: Operation) -> Optional[float]:
+    # norma is the operation's standard time in minutes, as in query.xlsx
+    return round(float(operation.norma), 2) if operation.norma is not None else None
+
+
+def _projection_row(operation: Operation, state: FloorState, now: datetime) -> Dict[str, Any]:
+    return {
+        "operation_id": operation.id,
+        "work_order_id": operation.work_order_id,
+        "work_center_id": operation.work_center_id,
+        "status": state.status,
+        "running_since": state.running_since,
+        "actual_start_time": state.actual_start_time,
+        "actual_completion_time": state.actual_completion_time,
+        "actual_minutes": round(state.actual_minutes, 2),
+        "planned_minutes": _planned_minutes(operation),
+        "quantity": operation.quantity,
+        "quantity_completed": state.quantity_completed,
+        "updated_at": now,
+    }
+
+
+def account_oee(
+    oee: OeeAccumulator,
+    work_center_id: int,
+    planned_minutes: Optional[float],
+    quantity: Optional[int],
+    before: FloorState,
+    after: FloorState,
+    event_type: str,
+    occurred_at: datetime,
+    scrap_quantity: Optional[int] = None
+) -> None:
+    """
+    Add one applied event to the OEE counters: the running interval it closed,
+    the pieces it reported and their standard time (norma spread over the
+    planned quantity, or the whole norma on completion when there is none)
+    """
+    if before.running and not after.running:
+        oee.add_run(work_center_id, before.running_since, max(occurred_at, before.running_since))
+    good = max(after.quantity_completed - before.quantity_completed, 0)
+    scrap = scrap_quantity or 0
+    ideal_minutes = 0.0
+    if planned_minutes:
+        if quantity:
+            ideal_minutes = (good + scrap) * planned_minutes / quantity
+        elif after.status == "completed" and before.status != "completed":
+            ideal_minutes = planned_minutes
+    oee.add_output(work_center_id, occurred_at, good, scrap, ideal_minutes, stop=event_type in (PAUSE, STOP))
+
+
+async def upsert_states(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Upsert operation_states rows; their event_count is added, last_event_id kept at the maximum"""
+    stmt = pg_insert(OperationState.__table__).values(rows)
+    table = OperationState.__table__
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=["operation_id"],
+        set_={
+            **{
+                column: stmt.excluded[column] for column in (
+                    "work_order_id", "work_center_id", "status", "running_since", "actual_start_time",
+                    "actual_completion_time", "actual_minutes", "planned_minutes", "quantity",
+                    "quantity_completed", "updated_at",
+                )
+            },
+            "event_count": table.c.event_count + stmt.excluded.event_count,
+            "last_event_id": func.greatest(table.c.last_event_id, stmt.excluded.last_event_id),
+        }
+    ))
+
+
+async def record_events(session: AsyncSession, events: List[ShopFloorEvent]) -> List[EventOutcome]:
+    """
+    Append events and fold them into their operations, in list order.
+
+    Invalid events are rejected individually and never reach the log. The
+    caller commits; nothing is written for rejected, duplicate or unknown-
+    operation events.
+    """
+    now = datetime.utcnow()
+    for event in events:
+        event.client_event_id = event.client_event_id or uuid.uuid4().hex
+        event.occurred_at = event.occurred_at or now
+
+    await session.execute(select(func.pg_advisory_xact_lock_shared(EVENT_LOG_LOCK_KEY)))
+    await shift_calendar.ensure_loaded(session)
+    oee = OeeAccumulator(shift_calendar)
+
+    # Locks in id order, so concurrent batches cannot deadlock
+    operation_ids = sorted({event.operation_id for event in events})
+    result = await session.execute(
+        select(Operation).where(Operation.id.in_(operation_ids)).order_by(Operation.id).with_for_update()
+    )
+    operations = {operation.id: operation for operation in result.scalars()}
+
+    # Checked under the locks: a concurrent retry of the same event has committed by now
+    client_ids = [event.client_event_id for event in events]
+    recorded = set((await session.execute(
+        select(OperationEvent.client_event_id).where(OperationEvent.client_event_id.in_(client_ids))
+    )).scalars())
+
+    states: Dict[int, FloorState] = {}
+    outcomes: List[EventOutcome] = []
+    rows: List[Dict[str, Any]] = []
+    started_work_orders = set()
+    for event in events:
+        outcome = EventOutcome(event.client_event_id, event.operation_id, event.event_type, "accepted")
+        outcomes.append(outcome)
+        operation = operations.get(event.operation_id)
+        if operation is None:
+            outcome.outcome = "not_found"
+            outcome.error = "Operation not found"
+            continue
+        if event.client_event_id in recorded:
+            outcome.outcome = "duplicate"
+            continue
+
+        state = states.get(operation.id) or FloorState.of(operation)
+        try:
+            if event.scrap_quantity is not None and event.scrap_quantity < 0:
+                raise InvalidTransition("Scrap quantity cannot be negative")
+            states[operation.id] = apply_event(
+                state, event.event_type, event.occurred_at, event.quantity, event.status
+            )
+        except InvalidTransition as e:
+            outcome.outcome = "rejected"
+            outcome.error = str(e)
+            continue
+        account_oee(
+            oee, operation.work_center_id, _planned_minutes(operation), operation.quantity,
+            state, states[operation.id], event.event_type, event.occurred_at, event.scrap_quantity
+        )
+
+        recorded.add(event.client_event_id)
+        if event.event_type == START:
+            started_work_orders.add(operation.work_order_id)
+        rows.append({
+            "operation_id": operation.id,
+            "work_center_id": operation.work_center_id,
+            "event_type": event.event_type,
+            "status": states[operation.id].status,
+            "occurred_at": event.occurred_at,
+            "recorded_at": now,
+            "quantity": event.quantity,
+            "scrap_quantity": event.scrap_quantity,
+            "terminal_id": event.terminal_id,
+            "operator": event.operator,
+            "note": event.note,
+            "client_event_id": event.client_event_id,
+        })
+
+    if rows:
+        inserted = await session.execute(
+            pg_insert(OperationEvent.__table__).values(rows).on_conflict_do_nothing(
+                index_elements=["client_event_id"]
+            ).returning(OperationEvent.__table__.c.id, OperationEvent.__table__.c.operation_id)
+        )
+        appended: Dict[int, List[int]] = {}
+        for event_id, operation_id in inserted:
+            appended.setdefault(operation_id, []).append(event_id)
+
+        # States and log commit together; a rebuild would produce the same rows
+        await upsert_states(session, [
+            {
+                **_projection_row(operations[operation_id], states[operation_id], now),
+                "event_count": len(event_ids),
+                "last_event_id": max(event_ids),
+            }
+            for operation_id, event_ids in sorted(appended.items())
+        ])
+        await oee.flush(session)
+
+    # Operations this batch completed teach the duration model (before apply_to overwrites the old status)
+    completed = [
+        (operations[operation_id], state) for operation_id, state in states.items()
+        if state.status == "completed" and operations[operation_id].status != "completed"
+        and state.actual_minutes > 0 and operations[operation_id].norma
+    ]
+    if completed:
+        product_types = await product_types_of(session, {operation.work_order_id for operation, _ in completed})
+        samples: Dict[Tuple[int, int, str], FactorStats] = {}
+        for operation, state in completed:
+            key = (operation.work_center_id, product_types[operation.work_order_id], naziv_pattern(operation.naziv))
+            samples.setdefault(key, FactorStats()).add(clamp_factor(state.actual_minutes, _planned_minutes(operation)))
+        await record_samples(session, samples)
+
+    # ORM writes, so change tracking sees every derived status and time change
+    for operation_id, state in states.items():
+        state.apply_to(operations[operation_id])
+
+    # The first operation started moves its work order from pending to in_progress
+    if started_work_orders:
+        result = await session.execute(
+            select(WorkOrder).where(
+                WorkOrder.id.in_(started_work_orders), WorkOrder.status == "pending"
+            ).order_by(WorkOrder.id).with_for_update()
+        )
+        for work_order in result.scalars():
+            work_order.status = "in_progress"
+            work_order.updated_at = now
+
+    await session.flush()
+    for outcome in outcomes:
+        operation = operations.get(outcome.operation_id)
+        if operation is not None:
+            outcome.operation = _operation_state(operation)
+    return outcomes
+
+
+async def record_status_change(
+    session: AsyncSession,
+    operation_ids: List[int],
+    status: str,
+    occurred_at: Optional[datetime] = None,
+    note: Optional[str] = None
+) -> List[EventOutcome]:
+    """Set the status of operations through the event log; the caller commits"""
+    return await record_events(session, [
+        ShopFloorEvent(
+            operation_id=operation_id, event_type=STATUS, status=status, occurred_at=occurred_at, note=note
+        )
+        for operation_id in operation_ids
+    ])
+
+
+class OperationEventWriter:
+    """
+    Group commit for terminal reports.
+
+    submit() queues an event and waits for its outcome; a background task
+    takes whatever is queued (up to batch_size, waiting at most window_ms
+    for more) and records it in one transaction.
+    """
+
+    def __init__(self, batch_size: int = 200, window_ms: float = 20.0):
+        self.batch_size = batch_size
+        self.window_seconds = window_ms / 1000
+        self._queue: Optional["asyncio.Queue[Tuple[ShopFloorEvent, asyncio.Future]]"] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def submit(self, event: ShopFloorEvent) -> EventOutcome:
+        """Record one event with the next batch"""
+        return (await self.submit_many([event]))[0]
+
+    async def submit_many(self, events: List[ShopFloorEvent]) -> List[EventOutcome]:
+        """Record events in order; they may be split across consecutive batches"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for event in events:
+            future = loop.create_future()
+            self._queue.put_nowait((event, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _next_batch(self) -> List[Tuple[ShopFloorEvent, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.window_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Whatever else is already waiting goes along without further delay
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _commit(self, events: List[ShopFloorEvent]) -> List[EventOutcome]:
+        async with AsyncSessionLocal() as session:
+            outcomes = await record_events(session, events)
+            await session.commit()
+            return outcomes
+
+    async def _write(self, batch: List[Tuple[ShopFloorEvent, asyncio.Future]]) -> None:
+        batch = [(event, future) for event, future in batch if not future.cancelled()]
+        if not batch:
+            return
+        try:
+            outcomes = await self._commit([event for event, _ in batch])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # One bad event must not fail the terminals it was batched with
+            logger.warning("Shop-floor batch of %d failed (%s), retrying one by one", len(batch), e)
+            for item in batch:
+                await self._write([item])
+            return
+
+        for (_, future), outcome in zip(batch, outcomes):
+            if not future.done():
+                future.set_result(outcome)
+
+    async def run(self) -> None:
+        """Write batches until cancelled"""
+        # The task copies the context of the request that started it; the
+        # batches it commits belong to no request
+        current_trace.set(None)
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    if not future.done():
+                        future.cancel()
+                raise
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Requests still waiting get an error instead of hanging
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Shop-floor event writer stopped"))
+
+
+_writer: Optional[OperationEventWriter] = None
+
+
+def get_event_writer() -> OperationEventWriter:
+    """The process-wide writer, built from settings on first use"""
+    global _writer
+    if _writer is None:
+        _writer = OperationEventWriter(
+            batch_size=settings.shop_floor_batch_size,
+            window_ms=settings.shop_floor_batch_window_ms,
+        )
+    return _writer
+
+
+async def stop_event_writer() -> None:
+    """Stop the writer if it was ever started"""
+    if _writer is not None:
+        await _writer.stop()
@@ -0,0 +1,334 @@
+"""
+operation_states projection: snapshots and rebuilds
+
+operation_states is written in the same transaction as the events it
+summarises (see app.services.operation_events), so it is never behind. It
+is rebuilt only when it is lost or its fold rules change, and a rebuild
+starts from the newest snapshot: it replays just the events recorded
+after the snapshot's horizon, so its cost follows the events since the
+last snapshot rather than the whole log.
+
+A snapshot's horizon is the highest event id at a moment no batch was in
+flight (writers hold EVENT_LOG_LOCK_KEY shared; the snapshot waits for it
+exclusively, briefly). Events above the horizon may already be reflected
+in a copied row; each row's last_event_id tells which.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, delete, func, insert, literal, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import AsyncSessionLocal, settings
+from app.database.models import (
+    Operation, OperationHistory, OperationEvent, OperationState, OperationStateSnapshot, ProjectionSnapshot
+)
+from app.services.operation_events import (
+    EVENT_LOG_LOCK_KEY, FloorState, InvalidTransition, apply_event, upsert_states
+)
+
+logger = logging.getLogger(__name__)
+
+PROJECTION = "operation_states"
+
+# Events fetched per replay page
+REPLAY_PAGE_SIZE = 10000
+
+_STATE_COLUMNS = [column.name for column in OperationState.__table__.columns]
+
+
+@dataclass
+class SnapshotResult:
+    """A snapshot that was taken"""
+    snapshot_id: int
+    event_horizon: int
+    row_count: int
+    pruned: int
+    seconds: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class RebuildResult:
+    """Counts of one projection rebuild"""
+    snapshot_id: Optional[int]
+    event_horizon: int
+    restored_rows: int = 0
+    replayed_events: int = 0
+    updated_rows: int = 0
+    skipped_events: int = 0  # events of operations that no longer exist anywhere
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+async def _latest_snapshot(session: AsyncSession) -> Optional[ProjectionSnapshot]:
+    return await session.scalar(
+        select(ProjectionSnapshot).where(
+            ProjectionSnapshot.projection == PROJECTION
+        ).order_by(ProjectionSnapshot.id.desc()).limit(1)
+    )
+
+
+async def take_snapshot(keep: Optional[int] = None) -> Optional[SnapshotResult]:
+    """Copy operation_states into a new snapshot; None if nothing happened since the last one"""
+    keep = keep or settings.projection_snapshots_kept
+    started = time.perf_counter()
+
+    async with AsyncSessionLocal() as session:
+        # Every batch holding an id below the horizon has committed once this lock is granted
+        await session.execute(select(func.pg_advisory_xact_lock(EVENT_LOG_LOCK_KEY)))
+        horizon = await session.scalar(select(func.coalesce(func.max(OperationEvent.id), 0)))
+        latest = await _latest_snapshot(session)
+        await session.commit()
+    if latest is not None and latest.event_horizon >= horizon:
+        return None
+
+    async with AsyncSessionLocal() as session:
+        snapshot = ProjectionSnapshot(projection=PROJECTION, event_horizon=horizon)
+        session.add(snapshot)
+        await session.flush()
+
+        copied = await session.execute(
+            insert(OperationStateSnapshot.__table__).from_select(
+                ["snapshot_id", *_STATE_COLUMNS],
+                select(literal(snapshot.id), *[OperationState.__table__.c[name] for name in _STATE_COLUMNS])
+            )
+        )
+        snapshot.row_count = copied.rowcount
+
+        kept = select(ProjectionSnapshot.id).where(
+            ProjectionSnapshot.projection == PROJECTION
+        ).order_by(ProjectionSnapshot.id.desc()).limit(keep)
+        pruned = await session.execute(
+            delete(ProjectionSnapshot.__table__).where(
+                ProjectionSnapshot.__table__.c.projection == PROJECTION,
+                ProjectionSnapshot.__table__.c.id.not_in(kept.scalar_subquery())
+            )
+        )
+        await session.commit()
+
+    return SnapshotResult(
+        snapshot_id=snapshot.id,
+        event_horizon=horizon,
+        row_count=snapshot.row_count,
+        pruned=pruned.rowcount,
+        seconds=round(time.perf_counter() - started, 3),
+    )
+
+
+async def load_planning(session: AsyncSession, operation_ids: List[int]) -> Dict[int, Any]:
+    """Planning columns of operations, from the hot table or history"""
+    columns = ("id", "work_order_id", "work_center_id", "norma", "quantity")
+    stmt = union_all(
+        select(*[Operation.__table__.c[name] for name in columns]).where(Operation.id.in_(operation_ids)),
+        select(*[OperationHistory.__table__.c[name] for name in columns]).where(
+            OperationHistory.id.in_(operation_ids)
+        ),
+    )
+    return {row.id: row for row in await session.execute(stmt)}
+
+
+def _state_of(row) -> FloorState:
+    return FloorState(
+        status=row.status,
+        running_since=row.running_since,
+        actual_start_time=row.actual_start_time,
+        actual_completion_time=row.actual_completion_time,
+        actual_minutes=float(row.actual_minutes or 0),
+        quantity_completed=row.quantity_completed or 0,
+        quantity=row.quantity,
+    )
+
+
+async def rebuild_projection(use_snapshot: bool = True) -> RebuildResult:
+    """
+    Replace operation_states with the newest snapshot plus the events after it
+    (or a replay of the whole log). Writers wait until the rebuild commits.
+
+    Operations whose status predates the event log start a full replay as
+    pending, so rebuild from a snapshot wherever one exists.
+    """
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        await session.execute(select(func.pg_advisory_xact_lock(EVENT_LOG_LOCK_KEY)))
+        snapshot = await _latest_snapshot(session) if use_snapshot else None
+        result = RebuildResult(
+            snapshot_id=snapshot.id if snapshot else None,
+            event_horizon=snapshot.event_horizon if snapshot else 0
+        )
+
+        await session.execute(delete(OperationState.__table__))
+        if snapshot is not None:
+            restored = await session.execute(
+                insert(OperationState.__table__).from_select(
+                    _STATE_COLUMNS,
+                    select(*[OperationStateSnapshot.__table__.c[name] for name in _STATE_COLUMNS]).where(
+                        OperationStateSnapshot.snapshot_id == snapshot.id
+                    )
+                )
+            )
+            result.restored_rows = restored.rowcount
+
+        events = OperationEvent.__table__.c
+        states = OperationState.__table__
+        page_stmt = select(
+            events.id, events.operation_id, events.event_type, events.status,
+            events.occurred_at, events.quantity, events.work_center_id
+        ).select_from(
+            OperationEvent.__table__.outerjoin(states, states.c.operation_id == events.operation_id)
+        ).where(
+            events.id > result.event_horizon,
+            events.id > func.coalesce(states.c.last_event_id, 0)
+        ).order_by(events.operation_id, events.id).limit(REPLAY_PAGE_SIZE)
+
+        after = None
+        while True:
+            stmt = page_stmt if after is None else page_stmt.where(
+                tuple_(events.operation_id, events.id) > tuple_(*after)
+            )
+            page = (await session.execute(stmt)).all()
+            if not page:
+                break
+            after = (page[-1].operation_id, page[-1].id)
+            result.replayed_events += len(page)
+
+            operation_ids = sorted({row.operation_id for row in page})
+            planning = await load_planning(session, operation_ids)
+            current = {
+                row.operation_id: row for row in await session.execute(
+                    select(states).where(states.c.operation_id.in_(operation_ids))
+                )
+            }
+
+            # An operation split across pages is upserted once per page; counts add up
+            grouped: Dict[int, List[Any]] = {}
+            for row in page:
+                grouped.setdefault(row.operation_id, []).append(row)
+
+            rows = []
+            now = datetime.utcnow()
+            for operation_id, operation_events in grouped.items():
+                plan = planning.get(operation_id)
+                existing = current.get(operation_id)
+                if plan is None and existing is None:
+                    result.skipped_events += len(operation_events)
+                    continue
+
+                state = _state_of(existing) if existing is not None else FloorState(quantity=plan.quantity)
+                for event in operation_events:
+                    try:
+                        state = apply_event(state, event.event_type, event.occurred_at, event.quantity, event.status)
+                    except InvalidTransition as e:
+                        # Accepted when written; only a fold rule change gets here
+                        logger.warning("Replay skipped event %d of operation %d: %s", event.id, operation_id, e)
+
+                norma = plan.norma if plan is not None else None
+                rows.append({
+                    "operation_id": operation_id,
+                    "work_order_id": plan.work_order_id if plan is not None else existing.work_order_id,
+                    "work_center_id": operation_events[-1].work_center_id,
+                    "status": state.status,
+                    "running_since": state.running_since,
+                    "actual_start_time": state.actual_start_time,
+                    "actual_completion_time": state.actual_completion_time,
+                    "actual_minutes": round(state.actual_minutes, 2),
+                    "planned_minutes": round(float(norma), 2) if norma is not None else (
+                        existing.planned_minutes if existing is not None else None
+                    ),
+                    "quantity": plan.quantity if plan is not None else existing.quantity,
+                    "quantity_completed": state.quantity_completed,
+                    "event_count": len(operation_events),
+                    "last_event_id": operation_events[-1].id,
+                    "updated_at": now,
+                })
+
+            if rows:
+                await upsert_states(session, rows)
+                result.updated_rows += len(rows)
+
+        await session.commit()
+
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+async def ensure_projection() -> Optional[RebuildResult]:
+    """Rebuild operation_states if it is empty while events exist (new or restored database)"""
+    async with AsyncSessionLocal() as session:
+        has_states = await session.scalar(select(select(OperationState.operation_id).exists()))
+        has_events = await session.scalar(select(select(OperationEvent.id).exists()))
+    if has_states or not has_events:
+        return None
+    return await rebuild_projection()
+
+
+async def get_projection_status() -> Dict[str, Any]:
+    """Projection size, newest snapshot and the replay a rebuild would need"""
+    async with AsyncSessionLocal() as session:
+        snapshot = await _latest_snapshot(session)
+        horizon = snapshot.event_horizon if snapshot else 0
+        stmt = select(
+            select(func.count()).select_from(OperationState).scalar_subquery().label("rows"),
+            select(func.count()).select_from(OperationEvent).where(
+                OperationEvent.id > horizon
+            ).scalar_subquery().label("events_since_snapshot"),
+            select(func.max(OperationEvent.id)).scalar_subquery().label("last_event_id"),
+        )
+        row = (await session.execute(stmt)).one()
+    return {
+        "projection": PROJECTION,
+        **dict(row._mapping),
+        "snapshot": {
+            "id": snapshot.id,
+            "event_horizon": snapshot.event_horizon,
+            "row_count": snapshot.row_count,
+            "created_at": snapshot.created_at,
+        } if snapshot else None,
+    }
+
+
+class ProjectionSnapshotter:
+    """Background loop taking a snapshot every interval when there were new events"""
+
+    def __init__(self, interval_minutes: float = 60.0):
+        self.interval_seconds = interval_minutes * 60
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                snapshot = await take_snapshot()
+                if snapshot:
+                    logger.info(
+                        "Projection snapshot %d: %d rows up to event %d",
+                        snapshot.snapshot_id, snapshot.row_count, snapshot.event_horizon
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Projection snapshot failed")
+
+    def start(self) -> None:
+        if self.interval_seconds > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+projection_snapshotter = ProjectionSnapshotter(settings.projection_snapshot_interval_minutes)
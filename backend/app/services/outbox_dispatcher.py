@@ -0,0 +1,255 @@
+"""
+Outbox dispatcher: publishes committed change events to downstream consumers
+
+Unpublished outbox rows are claimed in id order, handed to a sink as one
+batch and marked published only after the sink returns. A crash or sink
+error between the two leaves the rows unpublished, so delivery is
+at-least-once: consumers deduplicate by event id.
+
+Sinks:
+    stdout   one JSON object per line on standard output
+    file     appended NDJSON, fsynced per batch
+    webhook  POST {"events": [...]} to a URL; any non-2xx response is a failure
+
+Run inside the API (outbox_enabled=true) or as a separate worker:
+    python -m app.services.outbox_dispatcher
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Optional, Protocol
+
+from app.database.change_tracking import ChangeSet, on_commit
+from app.database.connection import AsyncSessionLocal, settings
+from app.repositories.outbox import OutboxRepository, CAPTURED_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of the retry delay after consecutive sink failures
+MAX_BACKOFF_SECONDS = 60.0
+
+# Published rows are purged at most this often
+PURGE_INTERVAL_SECONDS = 3600.0
+
+
+class OutboxSink(Protocol):
+    """Destination of outbox batches; raising means nothing was delivered"""
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        ...
+
+
+class StdoutSink:
+    """Write events as JSON lines to standard output"""
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        sys.stdout.write("".join(json.dumps(event, default=str) + "\n" for event in events))
+        sys.stdout.flush()
+
+
+class FileSink:
+    """Append events as NDJSON to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, data: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(event, default=str, ensure_ascii=False) + "\n" for event in events)
+        await asyncio.to_thread(self._append, data)
+
+
+class WebhookSink:
+    """POST event batches to an HTTP endpoint"""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+        self._client = None
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.post(
+            self.url,
+            content=json.dumps({"events": events}, default=str),
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_sink(name: Optional[str] = None) -> OutboxSink:
+    """Sink configured by settings (or by name)"""
+    name = (name or settings.outbox_sink).lower()
+    if name == "stdout":
+        return StdoutSink()
+    if name == "file":
+        return FileSink(settings.outbox_file_path)
+    if name == "webhook":
+        if not settings.outbox_webhook_url:
+            raise ValueError("outbox_webhook_url must be set for the webhook sink")
+        return WebhookSink(settings.outbox_webhook_url)
+    raise ValueError(f"Unknown outbox sink: {name}")
+
+
+def _message(event) -> Dict[str, Any]:
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": event.aggregate_id,
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+        "payload": event.payload,
+    }
+
+
+class OutboxDispatcher:
+    """Background loop moving outbox rows to a sink"""
+
+    def __init__(self, sink: OutboxSink, batch_size: int = 500, poll_seconds: float = 2.0, retention_days: int = 7):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.retention_days = retention_days
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_purge = 0.0
+
+    async def dispatch_once(self) -> int:
+        """Publish one batch; returns how many events were delivered"""
+        async with AsyncSessionLocal() as session:
+            repository = OutboxRepository(session)
+            events = await repository.claim_unpublished(self.batch_size)
+            if not events:
+                await session.rollback()
+                return 0
+
+            ids = [event.id for event in events]
+            try:
+                await self.sink.publish([_message(event) for event in events])
+            except Exception as e:
+                await repository.mark_failed(ids, f"{type(e).__name__}: {e}")
+                await session.commit()
+                raise
+
+            await repository.mark_published(ids)
+            await session.commit()
+            return len(ids)
+
+    async def purge(self) -> int:
+        """Drop published events past retention"""
+        async with AsyncSessionLocal() as session:
+            deleted = await OutboxRepository(session).purge_published(self.retention_days)
+            await session.commit()
+        return deleted
+
+    def notify(self) -> None:
+        """Wake the loop early (safe from any thread)"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self) -> None:
+        """Dispatch until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        failures = 0
+        while True:
+            # Commits from here on wake the next wait
+            self._wakeup.clear()
+            try:
+                # Drain the backlog batch by batch before waiting again
+                while await self.dispatch_once() == self.batch_size:
+                    pass
+                failures = 0
+
+                if self._loop.time() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                    purged = await self.purge()
+                    self._last_purge = self._loop.time()
+                    if purged:
+                        logger.info("Purged %d published outbox events", purged)
+                delay = self.poll_seconds
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                failures += 1
+                delay = min(self.poll_seconds * 2 ** failures, MAX_BACKOFF_SECONDS)
+                logger.exception("Outbox dispatch failed (attempt %d), retrying in %.0fs", failures, delay)
+
+            if failures:
+                # A commit must not cut a backoff short
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if isinstance(self.sink, WebhookSink):
+            await self.sink.close()
+
+
+_dispatcher: Optional[OutboxDispatcher] = None
+
+
+def get_dispatcher() -> OutboxDispatcher:
+    """The process-wide dispatcher, built from settings on first use"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = OutboxDispatcher(
+            create_sink(),
+            batch_size=settings.outbox_batch_size,
+            poll_seconds=settings.outbox_poll_seconds,
+            retention_days=settings.outbox_retention_days,
+        )
+    return _dispatcher
+
+
+@on_commit
+def _wake_dispatcher(change_set: ChangeSet) -> None:
+    # Commits in this process wrote outbox rows; publish them without waiting for the poll
+    if _dispatcher is not None and change_set.tables & set(CAPTURED_TABLES):
+        _dispatcher.notify()
+
+
+async def _main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    dispatcher = get_dispatcher()
+    print(f"📤 Dispatching outbox events to {settings.outbox_sink} (Ctrl+C to stop)")
+    try:
+        await dispatcher.run()
+    finally:
+        await dispatcher.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,98 @@
+"""
+Refresh of the daily performance rollups from the operation_states projection
+
+Each pass recomputes the recent days (performance_rollup_recent_days, so
+same-day corrections and late reports land) plus any older completion day
+whose operations changed since the previous pass. Changes are found by
+operation_states.updated_at against the newest refreshed_at, so a restart
+picks up where the last pass ended. An empty rollup table is filled from
+the whole projection.
+
+A reopened operation loses its completion day, so rollups older than the
+recent window keep counting it until that range is refreshed explicitly.
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.database.connection import AsyncSessionLocal, settings
+from app.repositories.performance import PerformanceRepository
+
+logger = logging.getLogger(__name__)
+
+# Overlap with the previous pass, covering clock skew and transactions in flight
+CHANGE_SLACK = timedelta(minutes=5)
+
+
+async def refresh_performance_rollups(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Refresh a day range, or (no range) the recent and changed days.
+    Returns the refreshed days and rollup rows written.
+    """
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        repository = PerformanceRepository(session)
+        if date_from or date_to:
+            completion = await repository.get_completion_range()
+            if completion is None:
+                return {"days": 0, "rows": 0, "seconds": 0.0}
+            date_from = date_from or completion["first_day"]
+            date_to = date_to or completion["last_day"]
+            days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+        else:
+            last_refresh = await repository.get_last_refresh()
+            if last_refresh is None:
+                completion = await repository.get_completion_range()
+                if completion is None:
+                    return {"days": 0, "rows": 0, "seconds": 0.0}
+                first, last = completion["first_day"], completion["last_day"]
+                days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+            else:
+                today = datetime.utcnow().date()
+                days = [today - timedelta(days=offset) for offset in range(settings.performance_rollup_recent_days)]
+                days += await repository.get_changed_days(last_refresh - CHANGE_SLACK)
+
+        rows = await repository.refresh_days(days)
+        await session.commit()
+
+    return {"days": len(set(days)), "rows": rows, "seconds": round(time.perf_counter() - started, 3)}
+
+
+class PerformanceRollupRefresher:
+    """Background loop refreshing the rollups every interval"""
+
+    def __init__(self, interval_seconds: float = 300.0):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                result = await refresh_performance_rollups()
+                logger.debug("Performance rollups refreshed: %s", result)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Performance rollup refresh failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self.interval_seconds > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+performance_rollup_refresher = PerformanceRollupRefresher(settings.performance_rollup_interval_seconds)
@@ -0,0 +1,457 @@
+"""
+Incremental import of query.xlsx-style ERP plan exports
+
+The pipeline has three steps:
+
+    parse_plan_export()  vectorized column conversion into a DataFrame
+    diff_plan()          compare against the database by (KPL, RN, WC)
+    apply_plan_diff()    write only the differences, in bulk statements
+
+Mapping onto the schema:
+    KPL        -> Product (kpl)
+    KPL + RN   -> WorkOrder, rn "KPL-RN" (the key the legacy workbook's PROMJENA sheet uses)
+    KPL+RN+WC  -> Operation of that work order on work center WC
+
+Existing operations keep their operation_sequence, so the planners' manual
+ordering survives a re-import; new operations are appended to the end of
+their work center's queue. Open operations missing from the export are
+closed (or kept/deleted, see MissingPolicy).
+"""
+import time
+from dataclasses import dataclass, field, asdict
+from enum import Enum
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update, delete, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.change_tracking import mark_work_orders_changed
+from app.database.models import Plant, Product, WorkOrder, Operation, WorkCenter
+
+ACTIVE_STATUSES = ["pending", "in_progress"]
+
+# Excel's day zero (1900 leap-year bug included)
+EXCEL_EPOCH = "1899-12-30"
+
+# Source column -> internal column
+SOURCE_COLUMNS = {
+    "KPL": "kpl",
+    "RN": "rn",
+    "NAZIV": "naziv",
+    "Norma": "norma",
+    "Q": "quantity",
+    "CQ": "quantity_completed",
+    "WC": "wc",
+    "WCNAME": "wc_name",
+    "Isporuka": "datum_isporuke",
+    "Datum SAS": "datum_sastavljanja",
+    "ZAVRŠETAK MAŠINSKE": "datum_treci",
+    "HITNO": "priority_level",
+}
+
+KEY_COLUMNS = ["kpl", "rn", "wc"]
+WORK_ORDER_FIELDS = ["quantity", "priority_level", "datum_isporuke", "datum_sastavljanja", "datum_treci"]
+OPERATION_FIELDS = ["naziv", "norma", "quantity", "quantity_completed"]
+
+INTEGER_COLUMNS = {
+    "id", "product_id", "work_order_id", "work_center_id", "operation_sequence",
+    "quantity", "quantity_completed", "priority_level",
+}
+
+# Rows per bulk statement; keeps bind parameter counts well under asyncpg's limit
+CHUNK_SIZE = 2000
+
+
+class MissingPolicy(str, Enum):
+    """What happens to open operations that are no longer in the export"""
+    COMPLETE = "complete"
+    KEEP = "keep"
+    DELETE = "delete"
+
+
+@dataclass
+class PlanDiff:
+    """Rows to insert, update and close, as DataFrames keyed by (kpl, rn, wc)"""
+    new_operations: pd.DataFrame
+    changed_operations: pd.DataFrame
+    missing_operations: pd.DataFrame
+    changed_work_orders: pd.DataFrame
+    unchanged_count: int
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "new_operations": len(self.new_operations),
+            "changed_operations": len(self.changed_operations),
+            "missing_operations": len(self.missing_operations),
+            "changed_work_orders": len(self.changed_work_orders),
+            "unchanged_operations": self.unchanged_count,
+        }
+
+
+@dataclass
+class ImportResult:
+    """Counts and timings of one import"""
+    rows_read: int = 0
+    products_created: int = 0
+    work_centers_created: int = 0
+    work_orders_created: int = 0
+    work_orders_updated: int = 0
+    operations_created: int = 0
+    operations_updated: int = 0
+    operations_closed: int = 0
+    unchanged_operations: int = 0
+    dry_run: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _excel_dates(series: pd.Series) -> pd.Series:
+    """Excel serial numbers (or already parsed dates) to datetime.date, vectorized"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        parsed = series
+    else:
+        serials = pd.to_numeric(series, errors="coerce")
+        # Zero and negatives are empty cells in ERP exports
+        serials = serials.where(serials > 0)
+        parsed = pd.to_datetime(serials, unit="D", origin=EXCEL_EPOCH)
+    return parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+
+def _codes(series: pd.Series) -> pd.Series:
+    """Numeric or text codes (KPL, RN) to clean strings"""
+    numeric = pd.to_numeric(series, errors="coerce")
+    as_int = numeric.round().astype("Int64").astype(str)
+    return as_int.where(numeric.notna(), series.astype(str).str.strip())
+
+
+def parse_plan_export(source: Union[str, BinaryIO], sheet_name: Union[int, str] = 0) -> pd.DataFrame:
+    """
+    Read a query.xlsx-style export into typed columns.
+
+    Every conversion works on whole columns; there is no per-row Python loop.
+    Rows repeating a (KPL, RN, WC) key keep their last occurrence.
+    """
+    raw = pd.read_excel(
+        source,
+        sheet_name=sheet_name,
+        usecols=lambda column: column in SOURCE_COLUMNS,
+    )
+    return normalize_plan_export(raw)
+
+
+def normalize_plan_export(raw: pd.DataFrame) -> pd.DataFrame:
+    """Typed columns from export rows already in memory (see parse_plan_export)"""
+    raw = raw[[column for column in raw.columns if column in SOURCE_COLUMNS]]
+    missing = [column for column in ("KPL", "RN", "WC") if column not in raw.columns]
+    if missing:
+        raise ValueError(f"Export is missing required columns: {', '.join(missing)}")
+
+    df = raw.rename(columns=SOURCE_COLUMNS)
+    df = df.dropna(subset=["kpl", "rn", "wc"])
+
+    df["kpl"] = _codes(df["kpl"])
+    df["rn"] = _codes(df["rn"])
+    df["wc"] = df["wc"].astype(str).str.strip()
+
+    for column in ("naziv", "wc_name"):
+        if column in df:
+            df[column] = df[column].fillna("").astype(str).str.strip().str.slice(0, 200)
+        else:
+            df[column] = ""
+
+    df["norma"] = pd.to_numeric(df.get("norma"), errors="coerce").fillna(0.0).round(2)
+    for column in ("quantity", "quantity_completed", "priority_level"):
+        values = pd.to_numeric(df[column], errors="coerce") if column in df else pd.Series(0, index=df.index)
+        df[column] = values.fillna(0).astype(np.int64)
+    df["quantity"] = df["quantity"].clip(lower=1)
+
+    for column in ("datum_isporuke", "datum_sastavljanja", "datum_treci"):
+        df[column] = _excel_dates(df[column]) if column in df else None
+
+    df["work_order_rn"] = df["kpl"] + "-" + df["rn"]
+    df["file_order"] = np.arange(len(df))
+
+    return df.drop_duplicates(subset=KEY_COLUMNS, keep="last").reset_index(drop=True)
+
+
+async def load_current_state(session: AsyncSession) -> pd.DataFrame:
+    """Current operations with their keys and comparable fields, one query"""
+    stmt = select(
+        Operation.id.label("operation_id"),
+        Operation.work_order_id,
+        Operation.operation_sequence,
+        Operation.status.label("operation_status"),
+        Product.kpl.label("kpl"),
+        WorkOrder.rn.label("work_order_rn"),
+        WorkCenter.code.label("wc"),
+        Operation.naziv,
+        Operation.norma,
+        Operation.quantity,
+        Operation.quantity_completed,
+        WorkOrder.quantity.label("work_order_quantity"),
+        WorkOrder.priority_level,
+        WorkOrder.datum_isporuke,
+        WorkOrder.datum_sastavljanja,
+        WorkOrder.datum_treci,
+    ).join(
+        WorkOrder, Operation.work_order_id == WorkOrder.id
+    ).join(
+        Product, WorkOrder.product_id == Product.id
+    ).join(
+        WorkCenter, Operation.work_center_id == WorkCenter.id
+    )
+    result = await session.execute(stmt)
+    current = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+    if current.empty:
+        current["rn"] = pd.Series(dtype=object)
+        return current
+
+    # Work orders created by this pipeline are named "KPL-RN"; anything else is not ours to diff
+    parts = current["work_order_rn"].str.split("-", n=1, expand=True).reindex(columns=[0, 1])
+    current["rn"] = parts[1]
+    current = current[parts[0] == current["kpl"]].copy()
+    current["norma"] = pd.to_numeric(current["norma"], errors="coerce").fillna(0.0).round(2)
+    return current
+
+
+def _differs(left: pd.Series, right: pd.Series) -> pd.Series:
+    """Element-wise inequality that treats two missing values as equal"""
+    both_missing = left.isna() & right.isna()
+    return (left != right) & ~both_missing
+
+
+def diff_plan(incoming: pd.DataFrame, current: pd.DataFrame) -> PlanDiff:
+    """Split the export into new, changed, unchanged and missing operations"""
+    merged = incoming.merge(
+        current, on=KEY_COLUMNS, how="outer", suffixes=("", "_db"), indicator=True
+    )
+
+    new_operations = merged[merged["_merge"] == "left_only"]
+    missing_operations = merged[
+        (merged["_merge"] == "right_only") & merged["operation_status"].isin(ACTIVE_STATUSES)
+    ]
+
+    both = merged[merged["_merge"] == "both"]
+    operation_changed = np.zeros(len(both), dtype=bool)
+    for column in OPERATION_FIELDS:
+        operation_changed |= _differs(both[column], both[f"{column}_db"]).to_numpy()
+    changed_operations = both[operation_changed]
+
+    work_order_changed = _differs(both["quantity"], both["work_order_quantity"]).to_numpy().copy()
+    for column in WORK_ORDER_FIELDS[1:]:
+        work_order_changed |= _differs(both[column], both[f"{column}_db"]).to_numpy()
+    changed_work_orders = both[work_order_changed].drop_duplicates("work_order_rn")
+
+    return PlanDiff(
+        new_operations=new_operations,
+        changed_operations=changed_operations,
+        missing_operations=missing_operations,
+        changed_work_orders=changed_work_orders,
+        unchanged_count=int(len(both) - operation_changed.sum())
+    )
+
+
+def _records(df: pd.DataFrame, columns: List[str]) -> List[Dict[str, Any]]:
+    """DataFrame rows to plain dicts of Python values, NaN turned into None"""
+    subset = df[columns].copy()
+    # Outer merges turn integer columns into floats; the driver wants ints back
+    for column in INTEGER_COLUMNS.intersection(columns):
+        subset[column] = pd.to_numeric(subset[column], errors="coerce").round().astype("Int64")
+    return subset.astype(object).where(subset.notna(), None).to_dict("records")
+
+
+def _chunks(records: List[Dict[str, Any]], size: int = CHUNK_SIZE):
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+async def _ensure_work_centers(session: AsyncSession, incoming: pd.DataFrame, result: ImportResult) -> Dict[str, int]:
+    existing = await session.execute(select(WorkCenter.code, WorkCenter.id))
+    ids = {code: id for code, id in existing.fetchall()}
+
+    unknown = incoming.loc[~incoming["wc"].isin(ids), ["wc", "wc_name"]].drop_duplicates("wc")
+    if len(unknown):
+        plant_id = await session.scalar(select(Plant.id).order_by(Plant.id).limit(1))
+        if plant_id is None:
+            raise ValueError("No plant exists to attach new work centers to")
+        rows = [
+            {"plant_id": plant_id, "code": row["wc"], "name": row["wc_name"] or row["wc"]}
+            for row in unknown.to_dict("records")
+        ]
+        inserted = await session.execute(
+            pg_insert(WorkCenter).values(rows).returning(WorkCenter.code, WorkCenter.id)
+        )
+        ids.update({code: id for code, id in inserted.fetchall()})
+        result.work_centers_created = len(rows)
+    return ids
+
+
+async def _ensure_products(session: AsyncSession, incoming: pd.DataFrame, result: ImportResult) -> Dict[str, int]:
+    products = incoming.drop_duplicates("kpl")[["kpl", "naziv"]]
+    rows = [{"kpl": row["kpl"], "name": row["naziv"] or f"Product {row['kpl']}"} for row in products.to_dict("records")]
+
+    for chunk in _chunks(rows):
+        inserted = await session.execute(
+            pg_insert(Product).values(chunk).on_conflict_do_nothing(index_elements=[Product.kpl]).returning(Product.id)
+        )
+        result.products_created += len(inserted.fetchall())
+
+    ids: Dict[str, int] = {}
+    kpls = products["kpl"].tolist()
+    for start in range(0, len(kpls), CHUNK_SIZE):
+        found = await session.execute(
+            select(Product.kpl, Product.id).where(Product.kpl.in_(kpls[start:start + CHUNK_SIZE]))
+        )
+        ids.update({kpl: id for kpl, id in found.fetchall()})
+    return ids
+
+
+async def _upsert_work_orders(
+    session: AsyncSession,
+    rows: pd.DataFrame,
+    product_ids: Dict[str, int],
+    result: ImportResult
+) -> Dict[str, int]:
+    """Insert or update work orders by rn; returns rn -> id"""
+    work_orders = rows.drop_duplicates("work_order_rn").copy()
+    work_orders["product_id"] = work_orders["kpl"].map(product_ids)
+    records = [
+        {"rn": record.pop("work_order_rn"), **record}
+        for record in _records(work_orders, ["work_order_rn", "product_id"] + WORK_ORDER_FIELDS)
+    ]
+
+    ids: Dict[str, int] = {}
+    for chunk in _chunks(records):
+        stmt = pg_insert(WorkOrder).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkOrder.rn],
+            set_={
+                **{column: stmt.excluded[column] for column in WORK_ORDER_FIELDS},
+                "updated_at": func.timezone("utc", func.now()),
+            }
+        ).returning(WorkOrder.rn, WorkOrder.id, literal_column("xmax = 0"))
+        for rn, id, inserted in (await session.execute(stmt)).fetchall():
+            ids[rn] = id
+            if inserted:
+                result.work_orders_created += 1
+            else:
+                result.work_orders_updated += 1
+    return ids
+
+
+async def apply_plan_diff(
+    session: AsyncSession,
+    diff: PlanDiff,
+    missing_policy: MissingPolicy = MissingPolicy.COMPLETE,
+    result: Optional[ImportResult] = None
+) -> ImportResult:
+    """Write the diff with a handful of bulk statements; the caller commits"""
+    result = result or ImportResult()
+    result.unchanged_operations = diff.unchanged_count
+    touched_work_orders: set = set()
+
+    started = time.perf_counter()
+    work_center_ids = await _ensure_work_centers(session, diff.new_operations, result)
+    product_ids = await _ensure_products(session, diff.new_operations, result)
+    result.timings["reference_data"] = time.perf_counter() - started
+
+    # Work orders: new ones and those whose dates/quantity/priority changed
+    started = time.perf_counter()
+    work_order_rows = pd.concat([diff.new_operations, diff.changed_work_orders], ignore_index=True)
+    work_order_ids: Dict[str, int] = {}
+    if len(work_order_rows):
+        work_order_ids = await _upsert_work_orders(session, work_order_rows, product_ids, result)
+        touched_work_orders.update(work_order_ids.values())
+    result.timings["work_orders"] = time.perf_counter() - started
+
+    # New operations go to the back of their work center's queue, in file order
+    started = time.perf_counter()
+    if len(diff.new_operations):
+        tails = await session.execute(
+            select(Operation.work_center_id, func.max(Operation.operation_sequence)).group_by(Operation.work_center_id)
+        )
+        tail_by_work_center = {work_center_id: tail or 0 for work_center_id, tail in tails.fetchall()}
+
+        new = diff.new_operations.sort_values(["priority_level", "datum_isporuke", "file_order"], na_position="last").copy()
+        new["work_center_id"] = new["wc"].map(work_center_ids).astype("Int64")
+        new["work_order_id"] = new["work_order_rn"].map(work_order_ids).astype("Int64")
+        new["operation_sequence"] = (
+            new.groupby("work_center_id").cumcount() + 1
+            + new["work_center_id"].map(tail_by_work_center).fillna(0).astype(np.int64)
+        )
+        records = _records(new, ["work_order_id", "work_center_id", "operation_sequence"] + OPERATION_FIELDS)
+        for record in records:
+            record["status"] = "pending"
+        for chunk in _chunks(records):
+            await session.execute(pg_insert(Operation).values(chunk).on_conflict_do_nothing())
+        result.operations_created = len(records)
+        touched_work_orders.update(new["work_order_id"].dropna().astype(int).tolist())
+
+    # Changed operations: one executemany UPDATE by primary key; sequence untouched
+    if len(diff.changed_operations):
+        changed = diff.changed_operations.rename(columns={"operation_id": "id"})
+        changed["id"] = changed["id"].astype("Int64")
+        records = _records(changed, ["id"] + OPERATION_FIELDS)
+        for chunk in _chunks(records):
+            await session.execute(update(Operation), chunk)
+        result.operations_updated = len(records)
+        touched_work_orders.update(changed["work_order_id"].dropna().astype(int).tolist())
+
+    # Open operations the ERP no longer lists
+    if len(diff.missing_operations) and missing_policy != MissingPolicy.KEEP:
+        missing_ids = diff.missing_operations["operation_id"].astype(int).tolist()
+        for start in range(0, len(missing_ids), CHUNK_SIZE):
+            chunk = missing_ids[start:start + CHUNK_SIZE]
+            if missing_policy == MissingPolicy.DELETE:
+                await session.execute(
+                    delete(Operation).where(Operation.id.in_(chunk)).execution_options(synchronize_session=False)
+                )
+            else:
+                await session.execute(
+                    update(Operation).where(Operation.id.in_(chunk)).values(
+                        status="completed", updated_at=func.timezone("utc", func.now())
+                    ).execution_options(synchronize_session=False)
+                )
+        result.operations_closed = len(missing_ids)
+        touched_work_orders.update(diff.missing_operations["work_order_id"].dropna().astype(int).tolist())
+    result.timings["operations"] = time.perf_counter() - started
+
+    # Bulk statements are invisible to the flush; name the work orders for derived tables
+    mark_work_orders_changed(session, touched_work_orders)
+    return result
+
+
+async def import_plan(
+    session: AsyncSession,
+    source: Union[str, BinaryIO, pd.DataFrame],
+    missing_policy: MissingPolicy = MissingPolicy.COMPLETE,
+    dry_run: bool = False
+) -> ImportResult:
+    """Parse, diff and apply an export; the caller commits (or rolls back a dry run)"""
+    result = ImportResult(dry_run=dry_run)
+
+    started = time.perf_counter()
+    incoming = source if isinstance(source, pd.DataFrame) else parse_plan_export(source)
+    result.rows_read = len(incoming)
+    result.timings["parse"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    current = await load_current_state(session)
+    diff = diff_plan(incoming, current)
+    result.timings["diff"] = time.perf_counter() - started
+
+    if dry_run:
+        summary = diff.summary()
+        result.operations_created = summary["new_operations"]
+        result.operations_updated = summary["changed_operations"]
+        result.operations_closed = summary["missing_operations"] if missing_policy != MissingPolicy.KEEP else 0
+        result.work_orders_updated = summary["changed_work_orders"]
+        result.unchanged_operations = summary["unchanged_operations"]
+        return result
+
+    return await apply_plan_diff(session, diff, missing_policy, result)
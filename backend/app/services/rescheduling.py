@@ -0,0 +1,330 @@
+"""
+Incremental rescheduling of work center queues around shifts and downtime
+
+A work center's queue is its active operations in operation_sequence order
+(started ones first). Rescheduling walks that queue once, placing each
+operation's corrected duration (app.services.duration_model) into the
+work center's available time: its shift windows minus downtime. An
+operation may be interrupted by a shift end or a maintenance window and
+continue after it. The result is stored in estimated_start_time /
+estimated_completion_time.
+
+Only the work centers an event concerns are rescheduled: the one that
+broke down (or got a maintenance window) and its alternates, the active
+work centers of the same category. For operations a downtime delays, the
+alternate that would finish them soonest is suggested.
+"""
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import settings
+from app.database.models import Operation
+from app.repositories.downtime import DowntimeRepository
+from app.repositories.work_center_registry import work_center_registry
+from app.services.duration_model import duration_model, product_types_of
+from app.services.event_bus import event_bus
+from app.services.shift_calendar import shift_calendar
+
+# Namespace of the per-work-center advisory locks taken while rescheduling
+RESCHEDULE_LOCK_KEY = 0x52534348  # "RSCH"
+
+Interval = Tuple[datetime, datetime]
+
+
+@dataclass
+class PlannedOperation:
+    """Where one operation landed in its work center's queue"""
+    operation_id: int
+    work_order_id: int
+    sequence: int
+    status: str
+    remaining_minutes: float
+    estimated_start: Optional[datetime]
+    estimated_completion: Optional[datetime]
+    delay_minutes: Optional[float] = None  # against the previous estimate
+    blocked_by_downtime: bool = False
+    alternate: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class RescheduleResult:
+    """Plans of the rescheduled work centers"""
+    work_center_ids: List[int]
+    operations: int = 0
+    changed: int = 0
+    unscheduled: int = 0  # no capacity within the horizon
+    seconds: float = 0.0
+    plans: Dict[int, List[PlannedOperation]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def available_intervals(
+    work_center_id: int,
+    start: datetime,
+    end: datetime,
+    gaps: List[Interval]
+) -> List[Interval]:
+    """Shift windows of a work center within [start, end), less the downtime gaps"""
+    intervals = []
+    gap_index = 0
+    for window in shift_calendar.windows(work_center_id, start, end):
+        cursor, window_end = max(window.start, start), min(window.end, end)
+        while gap_index < len(gaps) and gaps[gap_index][1] <= cursor:
+            gap_index += 1
+        index = gap_index
+        while cursor < window_end:
+            if index < len(gaps) and gaps[index][0] < window_end:
+                gap_start, gap_end = gaps[index]
+                if gap_start > cursor:
+                    intervals.append((cursor, gap_start))
+                cursor = max(cursor, gap_end)
+                index += 1
+            else:
+                intervals.append((cursor, window_end))
+                break
+    # Overlapping shift definitions must not count the same minutes twice
+    merged: List[Interval] = []
+    for interval_start, interval_end in sorted(intervals):
+        if merged and interval_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], interval_end))
+        else:
+            merged.append((interval_start, interval_end))
+    return merged
+
+
+def place(intervals: List[Interval], index: int, cursor: datetime, minutes: float):
+    """
+    Consume minutes of available time from cursor on.
+    Returns (start, end, index, cursor); start and end are None when it does not fit.
+    """
+    start = None
+    remaining = timedelta(minutes=minutes)
+    while index < len(intervals):
+        interval_start, interval_end = intervals[index]
+        cursor = max(cursor, interval_start)
+        if cursor >= interval_end:
+            index += 1
+            continue
+        if start is None:
+            start = cursor
+        available = interval_end - cursor
+        if available >= remaining:
+            cursor += remaining
+            return start, cursor, index, cursor
+        remaining -= available
+        cursor = interval_end
+        index += 1
+    return None, None, index, cursor
+
+
+def _overlaps(gaps: List[Interval], start: Optional[datetime], end: Optional[datetime]) -> bool:
+    if start is None or end is None:
+        return bool(gaps)
+    return any(gap_start < end and gap_end > start for gap_start, gap_end in gaps)
+
+
+async def alternates_of(session: AsyncSession, work_center_id: int) -> List[int]:
+    """Active work centers of the same category"""
+    work_center = await work_center_registry.get_by_id(session, work_center_id)
+    if work_center is None or work_center.category_id is None:
+        return []
+    return [
+        other.id for other in await work_center_registry.get_all(session, active_only=True)
+        if other.category_id == work_center.category_id and other.id != work_center_id
+    ]
+
+
+async def reschedule_work_centers(
+    session: AsyncSession,
+    work_center_ids: Iterable[int],
+    include_alternates: bool = True,
+    now: Optional[datetime] = None
+) -> RescheduleResult:
+    """
+    Replan the queues of the given work centers (and their alternates); the
+    caller commits and then calls publish_reschedule
+    """
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    horizon = now + timedelta(days=settings.reschedule_horizon_days)
+    primary = sorted(set(work_center_ids))
+    affected = set(primary)
+    if include_alternates:
+        for work_center_id in primary:
+            affected.update(await alternates_of(session, work_center_id))
+    affected_ids = sorted(affected)
+    result = RescheduleResult(work_center_ids=affected_ids)
+    if not affected_ids:
+        return result
+
+    # One rescheduler per work center at a time, locked in id order
+    for work_center_id in affected_ids:
+        await session.execute(select(func.pg_advisory_xact_lock(RESCHEDULE_LOCK_KEY, work_center_id)))
+
+    await shift_calendar.ensure_loaded(session)
+    await duration_model.ensure_loaded(session)
+    gaps = await DowntimeRepository(session).get_gaps(affected_ids, now, horizon, now=now)
+
+    queue = await session.execute(
+        select(Operation).where(
+            Operation.work_center_id.in_(affected_ids),
+            Operation.status.in_(["pending", "in_progress"])
+        ).order_by(
+            Operation.work_center_id,
+            case((Operation.status == "in_progress", 0), else_=1),
+            Operation.operation_sequence,
+            Operation.id
+        )
+    )
+    operations: Dict[int, List[Operation]] = {work_center_id: [] for work_center_id in affected_ids}
+    for operation in queue.scalars():
+        operations[operation.work_center_id].append(operation)
+    product_types = await product_types_of(
+        session, {operation.work_order_id for ops in operations.values() for operation in ops}
+    )
+
+    availability: Dict[int, List[Interval]] = {}
+    queue_end: Dict[int, Tuple[int, datetime]] = {}
+    for work_center_id in affected_ids:
+        info = await work_center_registry.get_by_id(session, work_center_id)
+        active = info is not None and info.is_active
+        intervals = available_intervals(work_center_id, now, horizon, gaps[work_center_id]) if active else []
+        availability[work_center_id] = intervals
+
+        plan: List[PlannedOperation] = []
+        index, cursor = 0, now
+        for operation in operations[work_center_id]:
+            estimate = duration_model.estimate(
+                work_center_id, product_types.get(operation.work_order_id, 0), operation.naziv, operation.norma
+            )
+            done = float(operation.actual_minutes or 0)
+            if operation.running_since is not None:
+                done += max((now - operation.running_since).total_seconds() / 60, 0.0)
+            remaining = max(estimate.minutes - done, 0.0)
+
+            start, end, index, cursor = place(intervals, index, cursor, remaining)
+            if operation.running_since is not None and start is not None:
+                start = min(start, operation.running_since)
+
+            previous = operation.estimated_completion_time
+            if (operation.estimated_start_time, operation.estimated_completion_time) != (start, end):
+                operation.estimated_start_time = start
+                operation.estimated_completion_time = end
+                result.changed += 1
+            if end is None:
+                result.unscheduled += 1
+
+            plan.append(PlannedOperation(
+                operation_id=operation.id,
+                work_order_id=operation.work_order_id,
+                sequence=operation.operation_sequence,
+                status=operation.status,
+                remaining_minutes=round(remaining, 1),
+                estimated_start=start,
+                estimated_completion=end,
+                delay_minutes=round((end - previous).total_seconds() / 60, 1) if end and previous else None,
+                blocked_by_downtime=_overlaps(gaps[work_center_id], start, end) if active else True,
+            ))
+        result.operations += len(plan)
+        result.plans[work_center_id] = plan
+        queue_end[work_center_id] = (index, cursor)
+
+    if include_alternates:
+        await _suggest_alternates(session, primary, result, availability, queue_end, product_types, operations)
+
+    await session.flush()
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+async def _suggest_alternates(
+    session: AsyncSession,
+    primary: List[int],
+    result: RescheduleResult,
+    availability: Dict[int, List[Interval]],
+    queue_end: Dict[int, Tuple[int, datetime]],
+    product_types: Dict[int, int],
+    operations: Dict[int, List[Operation]]
+) -> None:
+    """For pending operations a downtime holds up, the alternate that finishes them first"""
+    by_id = {operation.id: operation for ops in operations.values() for operation in ops}
+    for work_center_id in primary:
+        alternates = [other for other in result.work_center_ids if other not in primary]
+        blocked = [
+            planned for planned in result.plans.get(work_center_id, [])
+            if planned.status == "pending" and planned.blocked_by_downtime
+        ]
+        if not alternates or not blocked:
+            continue
+
+        # A work order has at most one operation per work center
+        taken = set((await session.execute(
+            select(Operation.work_order_id, Operation.work_center_id).where(
+                Operation.work_order_id.in_({planned.work_order_id for planned in blocked}),
+                Operation.work_center_id.in_(alternates)
+            )
+        )).all())
+
+        # Suggestions queue up behind each other on the alternate
+        tails = {alternate: queue_end[alternate] for alternate in alternates}
+        for planned in blocked:
+            operation = by_id[planned.operation_id]
+            best = None
+            for alternate in alternates:
+                if (operation.work_order_id, alternate) in taken:
+                    continue
+                minutes = duration_model.estimate(
+                    alternate, product_types.get(operation.work_order_id, 0), operation.naziv, operation.norma
+                ).minutes
+                index, cursor = tails[alternate]
+                start, end, next_index, next_cursor = place(availability[alternate], index, cursor, minutes)
+                if end is None:
+                    continue
+                if planned.estimated_completion is not None and end >= planned.estimated_completion:
+                    continue
+                if best is None or end < best[2]:
+                    best = (alternate, start, end, next_index, next_cursor)
+            if best is None:
+                continue
+            alternate, start, end, next_index, next_cursor = best
+            tails[alternate] = (next_index, next_cursor)
+            planned.alternate = {
+                "work_center_id": alternate,
+                "work_center": work_center_registry.peek_code(alternate),
+                "estimated_start": start,
+                "estimated_completion": end,
+                "saves_minutes": round((planned.estimated_completion - end).total_seconds() / 60, 1)
+                if planned.estimated_completion else None,
+            }
+
+
+def publish_reschedule(result: RescheduleResult, reason: str) -> None:
+    """Push the new plans to planners' event streams (after commit)"""
+    for work_center_id, plan in result.plans.items():
+        event_bus.publish(
+            "schedule.rescheduled",
+            {
+                "work_center_id": work_center_id,
+                "work_center": work_center_registry.peek_code(work_center_id),
+                "reason": reason,
+                "operations": [
+                    {
+                        "operation_id": planned.operation_id,
+                        "estimated_start": planned.estimated_start.isoformat() if planned.estimated_start else None,
+                        "estimated_completion": (
+                            planned.estimated_completion.isoformat() if planned.estimated_completion else None
+                        ),
+                        "alternate": planned.alternate["work_center"] if planned.alternate else None,
+                    }
+                    for planned in plan
+                ],
+            },
+            work_center_ids=[work_center_id]
+        )
@@ -1,17 +1,26 @@
 """
 Scheduling service for optimization algorithms
 """
-from typing import List, Tuple, Any
+import math
+from typing import List, Tuple, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.database.models import Operation, WorkOrder
+from app.services.duration_model import duration_model, product_types_of
+
+# z-score of the 90th percentile, for the pessimistic end of a sequence
+P90_Z = 1.2816
 
 
 class SchedulingService:
     """Service for scheduling operations and optimization"""
     
+    def __init__(self, session: Optional[AsyncSession] = None):
+        # Without a session, durations are the uncorrected norma
+        self.session = session
+    
     async def optimize_by_criteria(
         self, 
         operations_data: List[Tuple[Operation, str]], 
@@ -105,6 +114,10 @@ class SchedulingService:
         """
         Calculate estimated completion times for operations
         
+        Durations are the norma corrected by the learned duration model
+        (app.services.duration_model). Uncertainties add up as variances,
+        so estimated_end_p90 widens along the sequence.
+        
         Args:
             operations: List of operations in sequence
             start_time: Starting time (defaults to now)
@@ -116,21 +129,37 @@ class SchedulingService:
         if start_time is None:
             start_time = datetime.now()
         
+        product_types = {}
+        if self.session is not None and operations:
+            await duration_model.ensure_loaded(self.session)
+            product_types = await product_types_of(self.session, {op.work_order_id for op in operations})
+        
         results = []
         current_time = start_time
+        variance_minutes = 0.0
         
         for operation in operations:
-            # Calculate duration from norma (standard time in hours)
-            duration_hours = float(operation.norma) if operation.norma else 1.0
-            duration = timedelta(hours=duration_hours)
-            
-            end_time = current_time + duration
+            estimate = duration_model.estimate(
+                operation.work_center_id,
+                product_types.get(operation.work_order_id, 0),
+                operation.naziv,
+                operation.norma
+            )
+            duration_hours = estimate.hours
+            end_time = current_time + timedelta(minutes=estimate.minutes)
+            variance_minutes += estimate.std_minutes ** 2
             
             results.append({
                 "operation_id": operation.id,
                 "estimated_start": current_time,
                 "estimated_end": end_time,
-                "duration_hours": duration_hours
+                "estimated_end_p90": end_time + timedelta(minutes=P90_Z * math.sqrt(variance_minutes)),
+                "duration_hours": round(duration_hours, 3),
+                "norma_minutes": float(operation.norma) if operation.norma else None,
+                "correction_factor": round(estimate.factor, 3),
+                "uncertainty_hours": round(estimate.std_minutes / 60, 3),
+                "samples": estimate.samples,
+                "model_level": estimate.level
             })
             
             # Next operation starts when current one ends
@@ -155,7 +184,7 @@ class SchedulingService:
         conflicts = []
         
         # Check for capacity conflicts (placeholder)
-        total_hours = sum(float(op.norma) if op.norma else 0 for op in operations)
+        total_hours = sum(float(op.norma) if op.norma else 0 for op in operations) / 60
         if total_hours > 40:  # More than 40 hours of work
             conflicts.append({
                 "type": "capacity_exceeded",
@@ -0,0 +1,75 @@
+"""
+Unified search across work orders, products and work centers
+"""
+from typing import Iterable, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.work_order import WorkOrderRepository
+from app.repositories.product import ProductRepository
+from app.repositories.work_center import WorkCenterRepository
+from app.schemas.search import SearchEntity, SearchHit, SearchResponse
+
+
+class SearchService:
+    """
+    Type-ahead search service.
+
+    Each entity is searched through its repository with prefix matching on
+    codes (RN, KPL, work center code) and pg_trgm similarity on names; the
+    per-entity hits are then merged by score.
+    """
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.work_order_repo = WorkOrderRepository(session)
+        self.product_repo = ProductRepository(session)
+        self.work_center_repo = WorkCenterRepository(session)
+    
+    async def search(
+        self,
+        query: str,
+        entities: Iterable[SearchEntity] = tuple(SearchEntity),
+        limit: int = 10
+    ) -> SearchResponse:
+        """Search the requested entity types and merge results by relevance"""
+        hits: List[SearchHit] = []
+        entities = set(entities)
+        
+        if SearchEntity.WORK_ORDER in entities:
+            for work_order, score in await self.work_order_repo.search_work_orders_ranked(query, limit=limit):
+                hits.append(SearchHit(
+                    type=SearchEntity.WORK_ORDER,
+                    id=work_order.id,
+                    code=work_order.rn,
+                    label=work_order.product.name if work_order.product else "",
+                    score=score,
+                    product_kpl=work_order.product.kpl if work_order.product else None,
+                    status=work_order.status
+                ))
+        
+        if SearchEntity.PRODUCT in entities:
+            for product, score in await self.product_repo.search_products_ranked(query, limit=limit):
+                hits.append(SearchHit(
+                    type=SearchEntity.PRODUCT,
+                    id=product.id,
+                    code=product.kpl,
+                    label=product.name,
+                    score=score,
+                    product_kpl=product.kpl
+                ))
+        
+        if SearchEntity.WORK_CENTER in entities:
+            for work_center, score in await self.work_center_repo.search_work_centers_ranked(query, limit=limit):
+                hits.append(SearchHit(
+                    type=SearchEntity.WORK_CENTER,
+                    id=work_center.id,
+                    code=work_center.code,
+                    label=work_center.name,
+                    score=score
+                ))
+        
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        hits = hits[:limit]
+        
+        return SearchResponse(query=query, results=hits, total=len(hits))
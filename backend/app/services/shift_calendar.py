@@ -0,0 +1,262 @@
+"""
+Shift calendar and the incremental OEE counters kept per work center and shift
+
+Shifts are defined in plant local time (settings.plant_timezone) and
+resolved into UTC windows, since every timestamp in the database is naive
+UTC. Time outside any shift belongs to the 'overtime' window of its local
+day, which has no planned minutes.
+
+OeeAccumulator collects what one shop-floor batch adds to each (work
+center, shift window) and upserts it additively in the batch's own
+transaction, so the counters are exactly as current as the event log.
+"""
+import time as clock
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.change_tracking import ChangeSet, mark_changed, on_commit
+from app.database.connection import settings
+from app.database.models import OeeShiftStats, Shift
+
+OVERTIME = "overtime"
+
+
+@dataclass(frozen=True)
+class ShiftDefinition:
+    """One shift of the calendar, in plant local time"""
+    name: str
+    start_time: time
+    end_time: time
+    weekdays: str = "12345"
+    break_minutes: int = 0
+
+
+@dataclass(frozen=True)
+class ShiftWindow:
+    """One occurrence of a shift, in UTC"""
+    name: str
+    day: date  # plant local date the shift starts on
+    start: datetime
+    end: datetime
+    planned_minutes: float
+
+
+def parse_shifts(value: str, break_minutes: int = 0) -> List[ShiftDefinition]:
+    """Shifts from 'name=HH:MM-HH:MM,...' (the plant_default_shifts setting)"""
+    shifts = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, span = item.partition("=")
+        start, _, end = span.partition("-")
+        shifts.append(ShiftDefinition(
+            name=name.strip(),
+            start_time=time.fromisoformat(start.strip()),
+            end_time=time.fromisoformat(end.strip()),
+            break_minutes=break_minutes,
+        ))
+    return shifts
+
+
+class ShiftCalendar:
+    """In-process shift calendar, reloaded when the shifts table changes"""
+
+    def __init__(self, timezone_name: str = "UTC", default_shifts: Optional[List[ShiftDefinition]] = None, ttl_seconds: float = 300.0):
+        self.zone = ZoneInfo(timezone_name)
+        self.default_shifts = default_shifts or []
+        self.ttl_seconds = ttl_seconds
+        self._shifts: Dict[Optional[int], List[ShiftDefinition]] = {}
+        self._loaded_at: Optional[float] = None
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Load active shifts if never loaded, expired or invalidated by a commit"""
+        if self._loaded_at is not None and clock.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        result = await session.execute(
+            select(Shift).where(Shift.is_active.is_(True)).order_by(Shift.start_time)
+        )
+        shifts: Dict[Optional[int], List[ShiftDefinition]] = {}
+        for shift in result.scalars():
+            shifts.setdefault(shift.work_center_id, []).append(ShiftDefinition(
+                name=shift.name,
+                start_time=shift.start_time,
+                end_time=shift.end_time,
+                weekdays=shift.weekdays or "1234567",
+                break_minutes=shift.break_minutes or 0,
+            ))
+        self._shifts = shifts
+        self._loaded_at = clock.monotonic()
+
+    def definitions(self, work_center_id: int) -> List[ShiftDefinition]:
+        """Work center's own shifts, else the plant-wide ones, else the configured default"""
+        return self._shifts.get(work_center_id) or self._shifts.get(None) or self.default_shifts
+
+    def to_local(self, moment: datetime) -> datetime:
+        return moment.replace(tzinfo=timezone.utc).astimezone(self.zone).replace(tzinfo=None)
+
+    def to_utc(self, local: datetime) -> datetime:
+        return local.replace(tzinfo=self.zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+    def windows(self, work_center_id: int, start: datetime, end: datetime) -> List[ShiftWindow]:
+        """Shift windows overlapping [start, end), in start order"""
+        windows = []
+        day = self.to_local(start).date() - timedelta(days=1)
+        last_day = self.to_local(end).date()
+        while day <= last_day:
+            for shift in self.definitions(work_center_id):
+                if str(day.isoweekday()) not in shift.weekdays:
+                    continue
+                end_day = day + timedelta(days=1) if shift.end_time <= shift.start_time else day
+                window_start = self.to_utc(datetime.combine(day, shift.start_time))
+                window_end = self.to_utc(datetime.combine(end_day, shift.end_time))
+                if window_start < end and window_end > start:
+                    minutes = (window_end - window_start).total_seconds() / 60
+                    windows.append(ShiftWindow(
+                        shift.name, day, window_start, window_end, max(minutes - shift.break_minutes, 0.0)
+                    ))
+            day += timedelta(days=1)
+        return sorted(windows, key=lambda window: window.start)
+
+    def overtime_window(self, moment: datetime) -> ShiftWindow:
+        """The out-of-shift window of the local day containing moment"""
+        day = self.to_local(moment).date()
+        return ShiftWindow(
+            OVERTIME, day,
+            self.to_utc(datetime.combine(day, time.min)),
+            self.to_utc(datetime.combine(day + timedelta(days=1), time.min)),
+            0.0
+        )
+
+    def window_at(self, work_center_id: int, moment: datetime) -> ShiftWindow:
+        """Shift window containing moment (overtime outside every shift)"""
+        for window in self.windows(work_center_id, moment, moment + timedelta(microseconds=1)):
+            if window.start <= moment < window.end:
+                return window
+        return self.overtime_window(moment)
+
+    def split(self, work_center_id: int, start: datetime, end: datetime) -> List[Tuple[ShiftWindow, float]]:
+        """Minutes of [start, end) falling into each shift window (gaps go to overtime)"""
+        pieces: List[Tuple[ShiftWindow, float]] = []
+
+        def overtime(gap_start: datetime, gap_end: datetime) -> None:
+            while gap_start < gap_end:
+                window = self.overtime_window(gap_start)
+                piece_end = min(window.end, gap_end)
+                pieces.append((window, (piece_end - gap_start).total_seconds() / 60))
+                gap_start = piece_end
+
+        cursor = start
+        for window in self.windows(work_center_id, start, end):
+            if window.start > cursor:
+                overtime(cursor, min(window.start, end))
+                cursor = min(window.start, end)
+            piece_end = min(window.end, end)
+            if piece_end > cursor:
+                pieces.append((window, (piece_end - cursor).total_seconds() / 60))
+                cursor = piece_end
+        overtime(cursor, end)
+        return pieces
+
+
+@dataclass
+class OeeCounters:
+    """What happened in one shift window of one work center"""
+    run_minutes: float = 0.0
+    ideal_minutes: float = 0.0
+    good_quantity: int = 0
+    scrap_quantity: int = 0
+    stops: int = 0
+
+
+@dataclass
+class OeeAccumulator:
+    """OEE counters one batch adds, flushed as one additive upsert"""
+    calendar: "ShiftCalendar"
+    buckets: Dict[Tuple[int, ShiftWindow], OeeCounters] = field(default_factory=dict)
+
+    def _bucket(self, work_center_id: int, window: ShiftWindow) -> OeeCounters:
+        return self.buckets.setdefault((work_center_id, window), OeeCounters())
+
+    def add_run(self, work_center_id: int, start: datetime, end: datetime) -> None:
+        """A closed running interval, split across the shifts it spans"""
+        for window, minutes in self.calendar.split(work_center_id, start, end):
+            self._bucket(work_center_id, window).run_minutes += minutes
+
+    def add_output(
+        self,
+        work_center_id: int,
+        at: datetime,
+        good: int = 0,
+        scrap: int = 0,
+        ideal_minutes: float = 0.0,
+        stop: bool = False
+    ) -> None:
+        """Pieces reported, their standard time and whether the report stopped the work"""
+        if not (good or scrap or ideal_minutes or stop):
+            return
+        counters = self._bucket(work_center_id, self.calendar.window_at(work_center_id, at))
+        counters.good_quantity += good
+        counters.scrap_quantity += scrap
+        counters.ideal_minutes += ideal_minutes
+        counters.stops += int(stop)
+
+    async def flush(self, session: AsyncSession) -> None:
+        """Add the counters to oee_shift_stats; the caller commits"""
+        if not self.buckets:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "work_center_id": work_center_id,
+                "shift_start": window.start,
+                "shift_name": window.name,
+                "shift_end": window.end,
+                "day": window.day,
+                "planned_minutes": round(window.planned_minutes, 2),
+                "run_minutes": round(counters.run_minutes, 2),
+                "ideal_minutes": round(counters.ideal_minutes, 2),
+                "good_quantity": counters.good_quantity,
+                "scrap_quantity": counters.scrap_quantity,
+                "stops": counters.stops,
+                "updated_at": now,
+            }
+            # Key order, so concurrent batches lock rows in the same order
+            for (work_center_id, window), counters in sorted(
+                self.buckets.items(), key=lambda item: (item[0][0], item[0][1].start, item[0][1].name)
+            )
+        ]
+        stmt = pg_insert(OeeShiftStats.__table__).values(rows)
+        table = OeeShiftStats.__table__.c
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["work_center_id", "shift_start", "shift_name"],
+            set_={
+                **{
+                    column: table[column] + stmt.excluded[column] for column in (
+                        "run_minutes", "ideal_minutes", "good_quantity", "scrap_quantity", "stops"
+                    )
+                },
+                "updated_at": stmt.excluded.updated_at,
+            }
+        ))
+        mark_changed(session, "oee_shift_stats")
+        self.buckets.clear()
+
+
+shift_calendar = ShiftCalendar(
+    timezone_name=settings.plant_timezone,
+    default_shifts=parse_shifts(settings.plant_default_shifts, settings.plant_default_break_minutes),
+    ttl_seconds=settings.shift_calendar_ttl_seconds,
+)
+
+
+@on_commit
+def _invalidate_shift_calendar(change_set: ChangeSet) -> None:
+    if "shifts" in change_set.tables:
+        shift_calendar.invalidate()
@@ -0,0 +1,164 @@
+"""
+Work order status transitions and their cascade to operations
+
+A work order's status follows WORK_ORDER_TRANSITIONS. Completing,
+cancelling or reopening it moves its open operations along (CASCADES)
+through the operation event log, so their history, projections and OEE
+counters stay consistent with the work order.
+
+transition_work_orders() handles any number of work orders with a fixed
+number of statements: the event log's shared advisory lock, one locking
+SELECT of their operations, one of the work orders, one event-log batch for the cascaded operations and one
+batched UPDATE of the work orders.
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Operation, WorkOrder
+from app.services.operation_events import EVENT_LOG_LOCK_KEY, record_status_change
+
+WORK_ORDER_TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    "pending": ("in_progress", "cancelled"),
+    "in_progress": ("completed", "cancelled"),
+    "completed": (),
+    "cancelled": ("pending",),
+}
+WORK_ORDER_STATUSES = tuple(WORK_ORDER_TRANSITIONS)
+
+# Work order target status -> (operation statuses it moves, their new status)
+CASCADES: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "completed": (("pending", "in_progress"), "completed"),
+    "cancelled": (("pending", "in_progress"), "cancelled"),
+    "pending": (("cancelled",), "pending"),
+}
+
+
+class InvalidStatusTransition(ValueError):
+    """A work order status change the state machine does not allow"""
+
+
+def validate_transition(current: str, target: str) -> None:
+    """Raise InvalidStatusTransition unless current -> target is allowed"""
+    if target not in WORK_ORDER_TRANSITIONS:
+        raise InvalidStatusTransition(f"Unknown work order status: {target}")
+    if target not in WORK_ORDER_TRANSITIONS.get(current, ()):
+        raise InvalidStatusTransition(f"Invalid status transition from {current} to {target}")
+
+
+@dataclass
+class TransitionOutcome:
+    """What became of one work order: accepted, unchanged (already there), rejected or not_found"""
+    work_order_id: int
+    outcome: str
+    from_status: Optional[str] = None
+    error: Optional[str] = None
+    operations: int = 0  # cascaded
+
+
+@dataclass
+class TransitionResult:
+    """Outcomes of one transition batch"""
+    status: str
+    accepted: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    not_found: int = 0
+    operations: int = 0
+    outcomes: List[TransitionOutcome] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+async def transition_work_orders(
+    session: AsyncSession,
+    work_order_ids: Iterable[int],
+    status: str,
+    note: Optional[str] = None,
+    all_or_nothing: bool = False
+) -> TransitionResult:
+    """
+    Move work orders to status, cascading to their operations; the caller commits.
+
+    Invalid transitions are rejected individually unless all_or_nothing is
+    set, in which case any rejected or missing work order raises
+    InvalidStatusTransition before anything is written.
+    """
+    if status not in WORK_ORDER_TRANSITIONS:
+        raise InvalidStatusTransition(f"Unknown work order status: {status}")
+    work_order_ids = list(dict.fromkeys(work_order_ids))
+    result = TransitionResult(status=status)
+    if not work_order_ids:
+        return result
+
+    # The shop-floor event log's lock order: its shared advisory lock, then
+    # operations in id order, then work orders. Taking the advisory lock only
+    # in record_status_change, after the row locks, would deadlock against a
+    # shop-floor writer while a snapshot waits for the exclusive lock
+    await session.execute(select(func.pg_advisory_xact_lock_shared(EVENT_LOG_LOCK_KEY)))
+    operation_rows = (await session.execute(
+        select(Operation.id, Operation.work_order_id, Operation.status).where(
+            Operation.work_order_id.in_(work_order_ids)
+        ).order_by(Operation.id).with_for_update()
+    )).all()
+    work_orders = {
+        work_order.id: work_order for work_order in (await session.execute(
+            select(WorkOrder).where(WorkOrder.id.in_(work_order_ids)).order_by(WorkOrder.id).with_for_update()
+        )).scalars()
+    }
+
+    accepted: Dict[int, TransitionOutcome] = {}
+    for work_order_id in work_order_ids:
+        work_order = work_orders.get(work_order_id)
+        if work_order is None:
+            outcome = TransitionOutcome(work_order_id, "not_found", error="Work order not found")
+            result.not_found += 1
+        elif work_order.status == status:
+            outcome = TransitionOutcome(work_order_id, "unchanged", from_status=work_order.status)
+            result.unchanged += 1
+        else:
+            outcome = TransitionOutcome(work_order_id, "accepted", from_status=work_order.status)
+            try:
+                validate_transition(work_order.status, status)
+                accepted[work_order_id] = outcome
+                result.accepted += 1
+            except InvalidStatusTransition as e:
+                outcome.outcome, outcome.error = "rejected", str(e)
+                result.rejected += 1
+        result.outcomes.append(outcome)
+
+    if all_or_nothing and (result.rejected or result.not_found):
+        failed = next(outcome for outcome in result.outcomes if outcome.outcome in ("rejected", "not_found"))
+        raise InvalidStatusTransition(f"Work order {failed.work_order_id}: {failed.error}")
+    if not accepted:
+        return result
+
+    if status in CASCADES:
+        from_statuses, operation_status = CASCADES[status]
+        cascaded = [
+            (operation_id, work_order_id) for operation_id, work_order_id, operation_state in operation_rows
+            if work_order_id in accepted and operation_state in from_statuses
+        ]
+        if cascaded:
+            outcomes = await record_status_change(
+                session, [operation_id for operation_id, _ in cascaded], operation_status,
+                note=note or f"Work order {status}"
+            )
+            rejected = [outcome for outcome in outcomes if outcome.outcome == "rejected"]
+            if rejected:
+                raise ValueError(f"Operation {rejected[0].operation_id}: {rejected[0].error}")
+            for _, work_order_id in cascaded:
+                accepted[work_order_id].operations += 1
+            result.operations = len(cascaded)
+
+    # ORM writes, so change tracking sees each row; the flush sends them as one batched UPDATE
+    now = datetime.utcnow()
+    for work_order_id in accepted:
+        work_orders[work_order_id].status = status
+        work_orders[work_order_id].updated_at = now
+    await session.flush()
+    return result
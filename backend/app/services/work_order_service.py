@@ -3,11 +3,18 @@ Work Order service layer with business logic
 """
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database.change_tracking import mark_work_orders_changed
+from app.database.models import WorkOrder
 from app.repositories.work_order import WorkOrderRepository
 from app.repositories.operation import OperationRepository
 from app.repositories.product import ProductRepository
+from app.repositories.work_order_summary import WorkOrderSummaryRepository
+from app.repositories.counting import CountMode
+from app.services.dashboard_rollups import dashboard_rollups
+from app.services.status_transitions import InvalidStatusTransition, TransitionResult, transition_work_orders
 from app.schemas.work_order import WorkOrderCreate, WorkOrderUpdate, WorkOrderResponse
 
 
@@ -21,6 +28,7 @@ class WorkOrderService:
         self.work_order_repo = WorkOrderRepository(session)
         self.operation_repo = OperationRepository(session)
         self.product_repo = ProductRepository(session)
+        self.summary_repo = WorkOrderSummaryRepository(session)
     
     async def create_work_order(self, work_order_data: WorkOrderCreate) -> WorkOrderResponse:
         """Create a new work order with validation"""
@@ -69,26 +77,21 @@ class WorkOrderService:
     
     async def delete_work_order(self, id: int) -> bool:
         """Delete work order with validation"""
-        work_order = await self.work_order_repo.get_by_id(id)
-        if not work_order:
+        if not await self.work_order_repo.exists(id):
             return False
         
         # Check if work order has operations in progress
-        operations = await self.operation_repo.get_by_work_order(id)
-        in_progress_ops = [op for op in operations if op.status == 'in_progress']
-        
-        if in_progress_ops:
+        if await self.operation_repo.has_in_progress(id):
             raise ValueError("Cannot delete work order with operations in progress")
         
-        # Delete operations first
-        for operation in operations:
-            await self.operation_repo.delete(operation.id)
-        
-        # Delete work order
-        success = await self.work_order_repo.delete(id)
+        # Delete operations first, then the work order, one statement each
+        await self.operation_repo.delete_by_work_order(id)
+        await self.session.execute(delete(WorkOrder).where(WorkOrder.id == id))
+        # Bulk deletes are invisible to the flush; the outbox publishes work_order.deleted for marked ids
+        mark_work_orders_changed(self.session, [id])
         await self.session.commit()
         
-        return success
+        return True
     
     async def get_work_orders_with_filters(
         self,
@@ -97,58 +100,61 @@ class WorkOrderService:
         work_center: Optional[str] = None,
         urgent_only: bool = False,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        count_mode: CountMode = CountMode.EXACT,
+        include_work_center_stats: bool = False
     ) -> Dict[str, Any]:
-        """Get work orders with comprehensive filtering"""
-        return await self.work_order_repo.get_work_orders_with_filters(
+        """Get work orders with comprehensive filtering, read from the summary table"""
+        result = await self.summary_repo.get_work_orders_with_filters(
             status=status,
             priority_level=priority_level,
             work_center=work_center,
             urgent_only=urgent_only,
             skip=skip,
-            limit=limit
+            limit=limit,
+            count_mode=count_mode
         )
+        
+        result["work_center_stats"] = {}
+        if include_work_center_stats:
+            result["work_center_stats"] = await self.work_order_repo.get_work_center_statistics()
+        
+        return result
     
     async def update_work_order_status(
         self, 
         id: int, 
-        status: str
+        status: str,
+        note: Optional[str] = None
     ) -> Optional[WorkOrderResponse]:
-        """Update work order status with business logic"""
-        work_order = await self.work_order_repo.get_by_id(id)
-        if not work_order:
+        """Update work order status through the state machine, cascading to its operations"""
+        outcome, = (await transition_work_orders(self.session, [id], status, note=note)).outcomes
+        if outcome.outcome == "not_found":
             return None
+        if outcome.outcome == "rejected":
+            raise InvalidStatusTransition(outcome.error)
         
-        # Validate status transition
-        valid_transitions = {
-            'pending': ['in_progress', 'cancelled'],
-            'in_progress': ['completed', 'cancelled'],
-            'completed': [],
-            'cancelled': ['pending']
-        }
-        
-        if status not in valid_transitions.get(work_order.status, []):
-            raise ValueError(f"Invalid status transition from {work_order.status} to {status}")
-        
-        # Update related operations if needed
-        if status == 'completed':
-            operations = await self.operation_repo.get_by_work_order(id)
-            for operation in operations:
-                if operation.status in ['pending', 'in_progress']:
-                    await self.operation_repo.update_operation_status(
-                        operation.id, 
-                        'completed',
-                        actual_completion_time=datetime.utcnow()
-                    )
-        
-        updated_work_order = await self.work_order_repo.update_status(id, status)
         await self.session.commit()
-        
-        return WorkOrderResponse.from_orm(updated_work_order)
+        work_order = await self.work_order_repo.get_by_id(id)
+        return WorkOrderResponse.from_orm(work_order)
+    
+    async def transition_work_orders(
+        self,
+        ids: List[int],
+        status: str,
+        note: Optional[str] = None,
+        all_or_nothing: bool = False
+    ) -> TransitionResult:
+        """Move many work orders to a status at once, e.g. at the end-of-shift close-out"""
+        result = await transition_work_orders(
+            self.session, ids, status, note=note, all_or_nothing=all_or_nothing
+        )
+        await self.session.commit()
+        return result
     
     async def get_dashboard_statistics(self) -> Dict[str, Any]:
-        """Get dashboard statistics for work orders"""
-        return await self.work_order_repo.get_dashboard_statistics()
+        """Get dashboard statistics for work orders from the in-process rollups"""
+        return await dashboard_rollups.get_work_order_counters(self.session)
     
     async def get_recent_work_orders(self, limit: int = 5) -> List[WorkOrderResponse]:
         """Get recently updated work orders"""
@@ -0,0 +1,272 @@
+"""
+Request and SQL instrumentation
+
+MetricsMiddleware times every HTTP request per route template and binds a
+RequestTrace to the request's context; the SQLAlchemy cursor hooks from
+instrument_engine() add each statement and its duration to the current
+trace (SQLAlchemy carries the context into its async driver calls).
+
+At the end of a request:
+- latency, query count and SQL time go into per-route histograms
+- a statement executed settings.n_plus_one_threshold times or more in the
+  request is counted as an N+1 suspect of the route
+- a request slower than settings.slow_request_ms is kept, with its
+  statements and their timings, in a ring buffer (see /api/diagnostics)
+
+Statements are compared by shape: parameters and IN lists of any length
+count as the same statement. In development and tests settings.query_audit
+("log" or "raise") reports a repeated shape as soon as it reaches the
+threshold; audit_queries() traces code that runs outside a request.
+"""
+import logging
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database.connection import settings
+from app.utils.metrics import COUNT_BUCKETS, metrics
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text kept in a captured request
+MAX_STATEMENT_LENGTH = 2000
+
+REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+REQUEST_QUERIES = metrics.histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), COUNT_BUCKETS
+)
+REQUEST_DB_TIME = metrics.histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("method", "route")
+)
+N_PLUS_ONE = metrics.counter(
+    "http_request_n_plus_one_total", "Requests repeating one statement n_plus_one_threshold times or more",
+    ("method", "route")
+)
+SLOW_REQUESTS = metrics.counter(
+    "http_slow_requests_total", "Requests slower than slow_request_ms", ("method", "route")
+)
+QUERY_DURATION = metrics.histogram(
+    "db_query_duration_seconds", "SQL statement latency by statement kind", ("kind",)
+)
+QUERY_ERRORS = metrics.counter("db_query_errors_total", "SQL statements that raised", ("kind",))
+
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s")
+_PARAMETER_LIST = re.compile(r"\bIN\s*\(\s*\?(?:::[^,()]+)?(?:\s*,\s*\?(?:::[^,()]+)?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RepeatedQueryError(RuntimeError):
+    """One statement shape ran n_plus_one_threshold times in a request (query_audit = "raise")"""
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """Statement with its parameters and IN lists collapsed"""
+    shape = _PARAMETER.sub("?", statement)
+    shape = _PARAMETER_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class RequestTrace:
+    """SQL executed on behalf of one request"""
+    method: str
+    path: str
+    queries: int = 0
+    db_seconds: float = 0.0
+    statements: List[Tuple[str, float]] = field(default_factory=list)  # capped
+    statement_counts: Dict[str, int] = field(default_factory=dict)
+    dropped_statements: int = 0
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        shape = statement_shape(statement)
+        count = self.statement_counts[shape] = self.statement_counts.get(shape, 0) + 1
+        if len(self.statements) < settings.slow_request_max_statements:
+            self.statements.append((statement, seconds))
+        else:
+            self.dropped_statements += 1
+        if count == settings.n_plus_one_threshold and settings.query_audit != "off":
+            self.audit(shape, count)
+
+    def audit(self, shape: str, count: int) -> None:
+        """Report a repeated statement shape the way settings.query_audit asks"""
+        message = f"{self.method} {self.path} ran the same statement {count} times: {shape[:MAX_STATEMENT_LENGTH]}"
+        if settings.query_audit == "raise":
+            raise RepeatedQueryError(message)
+        logger.warning("Possible N+1 query: %s", message)
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+        """Statements executed at least threshold times, most repeated first"""
+        return [
+            {"statement": statement[:MAX_STATEMENT_LENGTH], "count": count}
+            for statement, count in sorted(self.statement_counts.items(), key=lambda item: -item[1])
+            if count >= threshold
+        ]
+
+
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+# Captured slow requests, newest last
+slow_requests: Deque[Dict[str, Any]] = deque(maxlen=settings.slow_request_buffer_size)
+
+# Latest N+1 suspect per route
+n_plus_one_suspects: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+
+@contextmanager
+def audit_queries(label: str) -> Iterator[RequestTrace]:
+    """Trace the statements of a block outside any request (tests, scripts, background jobs)"""
+    trace = RequestTrace("AUDIT", label)
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+
+
+def _statement_kind(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    kind = words[0].upper() if words else ""
+    return kind if kind in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement of an engine (pass AsyncEngine.sync_engine)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        seconds = time.perf_counter() - started
+        QUERY_DURATION.observe(seconds, _statement_kind(statement))
+        # May raise RepeatedQueryError, after the statement ran
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(statement, seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        if isinstance(exception_context.original_exception, RepeatedQueryError):
+            return
+        stack = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if stack:
+            stack.pop()
+        QUERY_ERRORS.inc(_statement_kind(exception_context.statement or ""))
+
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        metrics.gauge("db_pool_checked_out", "Connections in use", pool.checkedout)
+        metrics.gauge("db_pool_size", "Connections kept open", pool.size)
+        metrics.gauge("db_pool_overflow", "Connections open beyond the pool size", pool.overflow)
+
+
+def _route_template(scope: Scope) -> str:
+    """Path template of the matched route; unmatched paths share one label"""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    app = scope.get("app")
+    for candidate in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return candidate.path
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and SQL per request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = current_trace.set(trace)
+        status = 500
+        streaming = False
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_trace.reset(token)
+            self._record(scope, trace, status, time.perf_counter() - started, streaming)
+
+    def _record(self, scope: Scope, trace: RequestTrace, status: int, seconds: float, streaming: bool) -> None:
+        method, route = trace.method, _route_template(scope)
+        REQUEST_DURATION.observe(seconds, method, route)
+        REQUESTS.inc(method, route, str(status))
+        REQUEST_QUERIES.observe(trace.queries, method, route)
+        REQUEST_DB_TIME.observe(trace.db_seconds, method, route)
+
+        repeated = trace.repeated(settings.n_plus_one_threshold)
+        if repeated:
+            N_PLUS_ONE.inc(method, route)
+            n_plus_one_suspects[(method, route)] = {
+                "method": method,
+                "route": route,
+                "path": trace.path,
+                "at": datetime.utcnow(),
+                "queries": trace.queries,
+                "repeated": repeated[:5],
+            }
+
+        # Event streams are open for as long as a client listens; they are not slow
+        if seconds * 1000 >= settings.slow_request_ms and not streaming:
+            SLOW_REQUESTS.inc(method, route)
+            slow_requests.append({
+                "method": method,
+                "route": route,
+                "path": trace.path,
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "at": datetime.utcnow(),
+                "duration_ms": round(seconds * 1000, 1),
+                "queries": trace.queries,
+                "db_ms": round(trace.db_seconds * 1000, 1),
+                "statements": [
+                    {"statement": statement[:MAX_STATEMENT_LENGTH], "ms": round(statement_seconds * 1000, 2)}
+                    for statement, statement_seconds in trace.statements
+                ],
+                "dropped_statements": trace.dropped_statements,
+                "repeated": repeated,
+            })
+            logger.warning(
+                "Slow request %s %s: %.0f ms, %d queries (%.0f ms SQL)",
+                method, trace.path, seconds * 1000, trace.queries, trace.db_seconds * 1000
+            )
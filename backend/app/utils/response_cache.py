@@ -0,0 +1,305 @@
+"""
+Two-tier response cache for polled read endpoints
+
+A per-process LRU sits in front of a shared tier. The shared tier is Redis
+when `response_cache_redis_url` is configured and an in-memory stand-in
+otherwise, so single-process deployments need nothing extra.
+
+Entries carry tags. Invalidating a tag bumps its generation in the shared
+tier; an entry is served only while the generations it was stored with are
+still current, so every process sees an invalidation on its next read.
+Responses carry an ETag and a matching If-None-Match gets a 304.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.database.change_tracking import ChangeSet, on_commit
+from app.database.connection import settings
+
+logger = logging.getLogger(__name__)
+
+# Bumped with every invalidation; guards entries built while one was in flight
+EPOCH_TAG = "*"
+
+
+def table_tag(table: str) -> str:
+    """Tag of everything derived from a table"""
+    return f"table:{table}"
+
+
+def bulk_tag(table: str) -> str:
+    """Tag bumped only by bulk statements against a table"""
+    return f"bulk:{table}"
+
+
+def work_center_tag(work_center_id: int) -> str:
+    """Tag of responses derived from one work center's operations"""
+    return f"work_center:{work_center_id}"
+
+
+def tags_for_change_set(change_set: ChangeSet) -> List[str]:
+    """Tags a committed transaction invalidates"""
+    tags = {table_tag(table) for table in change_set.tables}
+    tags.update(bulk_tag(table) for table in change_set.bulk_tables)
+    for change in change_set.row_changes:
+        if change.table != "operations":
+            continue
+        for values in (change.old, change.new):
+            if values is not None:
+                tags.add(work_center_tag(values["work_center_id"]))
+    return sorted(tags)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A rendered JSON body and the tag generations it was built against"""
+    body: bytes
+    etag: str
+    tags: Tuple[str, ...]
+    generations: Tuple[int, ...]
+
+    def dumps(self) -> bytes:
+        return json.dumps({
+            "body": self.body.decode("utf-8"),
+            "etag": self.etag,
+            "tags": list(self.tags),
+            "generations": list(self.generations)
+        }).encode("utf-8")
+
+    @classmethod
+    def loads(cls, payload: bytes) -> "CachedResponse":
+        data = json.loads(payload)
+        return cls(
+            body=data["body"].encode("utf-8"),
+            etag=data["etag"],
+            tags=tuple(data["tags"]),
+            generations=tuple(data["generations"])
+        )
+
+
+class LocalCache:
+    """Per-process LRU with a TTL"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """Drop entries carrying any of the tags"""
+        tags = set(tags)
+        for key in [key for key, (_, entry) in self._entries.items() if tags.intersection(entry.tags)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SharedCacheBackend(Protocol):
+    """Cache tier shared by all API processes"""
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None: ...
+
+    async def get_generations(self, tags: Sequence[str]) -> List[int]: ...
+
+    async def bump(self, tags: Sequence[str]) -> None: ...
+
+
+class InMemorySharedBackend:
+    """Stand-in for the shared tier when no Redis is configured"""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[float, bytes]] = {}
+        self._generations: Counter = Counter()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._values.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._values[key] = (time.monotonic() + ttl_seconds, value)
+
+    async def get_generations(self, tags: Sequence[str]) -> List[int]:
+        return [self._generations[tag] for tag in tags]
+
+    async def bump(self, tags: Sequence[str]) -> None:
+        self.bump_nowait(tags)
+
+    def bump_nowait(self, tags: Sequence[str]) -> None:
+        self._generations.update(tags)
+
+
+class RedisSharedBackend:
+    """Shared tier on Redis; tag generations are plain INCR counters"""
+
+    def __init__(self, url: str, prefix: str = "mes:response-cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("response_cache_redis_url is set but the redis package is not installed") from e
+
+        self._client = redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(self._prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self._client.set(self._prefix + key, value, px=int(ttl_seconds * 1000))
+
+    async def get_generations(self, tags: Sequence[str]) -> List[int]:
+        values = await self._client.mget([f"{self._prefix}tag:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, tags: Sequence[str]) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"{self._prefix}tag:{tag}")
+            await pipe.execute()
+
+
+class ResponseCache:
+    """Local LRU in front of a shared tier, with tag invalidation"""
+
+    def __init__(self, local: LocalCache, shared: SharedCacheBackend, ttl_seconds: float):
+        self.local = local
+        self.shared = shared
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """A cached response whose tags have not been invalidated since it was stored"""
+        entry = self.local.get(key)
+        from_local = entry is not None
+        if entry is None:
+            payload = await self.shared.get(key)
+            if payload is None:
+                return None
+            entry = CachedResponse.loads(payload)
+
+        if tuple(await self.shared.get_generations(entry.tags)) != entry.generations:
+            return None
+
+        if not from_local:
+            self.local.set(key, entry)
+        return entry
+
+    async def epoch(self) -> int:
+        """Current invalidation epoch; pass it to set() to reject stale builds"""
+        return (await self.shared.get_generations([EPOCH_TAG]))[0]
+
+    async def set(self, key: str, body: bytes, tags: Sequence[str], epoch: int) -> CachedResponse:
+        """Store a body unless an invalidation happened since `epoch` was read"""
+        tags = tuple(sorted(set(tags)))
+        generations = await self.shared.get_generations((EPOCH_TAG,) + tags)
+        entry = CachedResponse(
+            body=body,
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            tags=tags,
+            generations=tuple(generations[1:])
+        )
+        if generations[0] == epoch:
+            self.local.set(key, entry)
+            await self.shared.set(key, entry.dumps(), self.ttl_seconds)
+        return entry
+
+    async def invalidate(self, *tags: str) -> None:
+        """Invalidate tags in every process before returning"""
+        self.local.invalidate(tags)
+        await self.shared.bump((EPOCH_TAG,) + tags)
+
+    def invalidate_nowait(self, *tags: str) -> None:
+        """Invalidate from synchronous code; the shared tier is updated in the background"""
+        self.local.invalidate(tags)
+        if isinstance(self.shared, InMemorySharedBackend):
+            self.shared.bump_nowait((EPOCH_TAG,) + tags)
+            return
+        try:
+            asyncio.get_running_loop().create_task(self.shared.bump((EPOCH_TAG,) + tags))
+        except RuntimeError:
+            logger.warning("No running event loop; shared cache tags %s left to expire", tags)
+
+
+def _build_shared_backend() -> SharedCacheBackend:
+    if settings.response_cache_redis_url:
+        return RedisSharedBackend(settings.response_cache_redis_url)
+    return InMemorySharedBackend()
+
+
+response_cache = ResponseCache(
+    local=LocalCache(settings.response_cache_ttl_seconds, settings.response_cache_max_entries),
+    shared=_build_shared_backend(),
+    ttl_seconds=settings.response_cache_ttl_seconds
+)
+
+
+@on_commit
+def _invalidate_committed_tables(change_set: ChangeSet) -> None:
+    """Writes that bypass the API endpoints still invalidate what they touched"""
+    response_cache.invalidate_nowait(*tags_for_change_set(change_set))
+
+
+def cache_key(request: Request) -> str:
+    """Path plus normalized query string"""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def _render(entry: CachedResponse, request: Request) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def cached_json_response(
+    request: Request,
+    build: Callable[[], Awaitable[Tuple[Any, Sequence[str]]]]
+) -> Response:
+    """
+    Serve a JSON response from the cache, or build and cache it.
+
+    `build` returns the payload and the tags it depends on; exceptions it
+    raises (404s, ...) propagate and nothing is cached.
+    """
+    key = cache_key(request)
+    entry = await response_cache.get(key)
+    if entry is None:
+        epoch = await response_cache.epoch()
+        payload, tags = await build()
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+        entry = await response_cache.set(key, body, tags, epoch)
+    return _render(entry, request)
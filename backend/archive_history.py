@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Move finished work orders into the partitioned history tables (run nightly)
+
+Usage:
+    python archive_history.py [--older-than-days 90] [--batch-size 500]
+"""
+import argparse
+import asyncio
+
+from app.services.archive_service import archive_finished_work_orders
+
+
+async def run_archive(older_than_days: int = None, batch_size: int = None):
+    """Archive finished work orders"""
+    print("🗄️  Archiving finished work orders...")
+    
+    result = await archive_finished_work_orders(older_than_days=older_than_days, batch_size=batch_size)
+    
+    for partition in result.partitions_created:
+        print(f"  • Created partition {partition}")
+    print(f"✅ Archived {result.work_orders} work orders and {result.operations} operations "
+          f"older than {result.cutoff:%Y-%m-%d} in {result.batches} batches ({result.seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive finished work orders")
+    parser.add_argument("--older-than-days", type=int, help="Default: archive_after_days setting")
+    parser.add_argument("--batch-size", type=int, help="Work orders per transaction")
+    args = parser.parse_args()
+    
+    asyncio.run(run_archive(args.older_than_days, args.batch_size))
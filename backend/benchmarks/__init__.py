@@ -0,0 +1,9 @@
+"""
+Performance benchmarks (run from backend/ with python -m benchmarks.<name>)
+
+    data_generator  synthetic plant in the legacy query.xlsx layout
+    algorithms      scheduling and plan import algorithms, in memory
+    endpoints       hot API endpoints on a local PostgreSQL database
+    bulk_load       ORM bulk_create vs COPY + merge
+    compare         regressions between two result files
+"""
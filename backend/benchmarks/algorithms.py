@@ -0,0 +1,150 @@
+"""
+Scheduling and plan import algorithm benchmarks, no database needed
+
+Runs on a synthetic plant (benchmarks.data_generator) held in memory:
+operations are transient ORM objects, the duration model and the shift
+calendar use their defaults (no learned factors, the configured shifts).
+
+    plan.normalize              typed columns from the export rows
+    plan.diff_initial           diff against an empty database
+    plan.diff_reimport          diff against a database holding the plan, some rows changed
+    schedule.optimize.<criteria> SchedulingService sort of the busiest work center's queue
+    schedule.completion_times   corrected durations and P90 ends along that queue
+    reschedule.intervals        shift windows less downtime over the horizon
+    reschedule.place_queue      placing the queue into them
+
+Usage (from backend/):
+    python -m benchmarks.algorithms [--operations 4700] [--iterations 20] [--output results.json]
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.database.connection import settings
+from app.database.models import Operation
+from app.services.plan_import import diff_plan, normalize_plan_export
+from app.services.rescheduling import available_intervals, place
+from app.services.scheduling_service import SchedulingService
+from benchmarks.data_generator import add_profile_arguments, generate_plant, profile_from_arguments
+from benchmarks.harness import Timing, measure, results_document, write_results
+
+CRITERIA = ["datum_isporuke", "datum_sastavljanja", "datum_treci", "hitno"]
+
+# Share of rows a re-import changes (norma) and drops
+REIMPORT_CHANGED = 0.05
+REIMPORT_DROPPED = 0.02
+
+
+def database_state(incoming: pd.DataFrame) -> pd.DataFrame:
+    """The plan as load_current_state() would read it back after importing it"""
+    current = incoming.copy()
+    current["operation_id"] = np.arange(1, len(current) + 1)
+    current["work_order_id"] = pd.factorize(current["work_order_rn"])[0] + 1
+    current["operation_sequence"] = current.groupby("wc").cumcount() + 1
+    current["operation_status"] = "pending"
+    current["work_order_quantity"] = current["quantity"]
+    return current.drop(columns=["wc_name", "file_order"])
+
+
+def transient_operations(incoming: pd.DataFrame) -> Dict[int, List[Tuple[Operation, str]]]:
+    """(Operation, work order rn) per work center id, never attached to a session"""
+    work_center_ids = pd.factorize(incoming["wc"])[0] + 1
+    work_order_ids = pd.factorize(incoming["work_order_rn"])[0] + 1
+    sequences = incoming.groupby("wc").cumcount() + 1
+    queues: Dict[int, List[Tuple[Operation, str]]] = {}
+    for index, row in enumerate(incoming.itertuples(index=False)):
+        operation = Operation(
+            id=index + 1,
+            work_order_id=int(work_order_ids[index]),
+            work_center_id=int(work_center_ids[index]),
+            operation_sequence=int(sequences.iloc[index]),
+            naziv=row.naziv,
+            norma=float(row.norma),
+            quantity=int(row.quantity),
+            status="pending",
+        )
+        queues.setdefault(operation.work_center_id, []).append((operation, row.work_order_rn))
+    return queues
+
+
+def downtime_gaps(start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+    """A four-hour maintenance window every third day"""
+    gaps, cursor = [], start + timedelta(days=1, hours=9)
+    while cursor < end:
+        gaps.append((cursor, cursor + timedelta(hours=4)))
+        cursor += timedelta(days=3)
+    return gaps
+
+
+async def run(rows: pd.DataFrame, iterations: int) -> List[Timing]:
+    timings = []
+    incoming = normalize_plan_export(rows)
+    timings.append(await measure("plan.normalize", lambda: normalize_plan_export(rows), iterations))
+
+    empty = database_state(incoming).iloc[0:0]
+    timings.append(await measure("plan.diff_initial", lambda: diff_plan(incoming, empty), iterations))
+
+    rng = np.random.default_rng(0)
+    current = database_state(incoming)
+    reimport = incoming[rng.random(len(incoming)) >= REIMPORT_DROPPED].copy()
+    changed = rng.random(len(reimport)) < REIMPORT_CHANGED
+    reimport.loc[changed, "norma"] = (reimport.loc[changed, "norma"] * 1.1 + 1).round()
+    summary = diff_plan(reimport, current).summary()
+    timings.append(await measure(
+        "plan.diff_reimport", lambda: diff_plan(reimport, current), iterations, info=summary
+    ))
+
+    queues = transient_operations(incoming)
+    work_center_id, queue = max(queues.items(), key=lambda item: len(item[1]))
+    info = {"operations": len(queue)}
+    service = SchedulingService()
+    for criteria in CRITERIA:
+        timings.append(await measure(
+            f"schedule.optimize.{criteria}",
+            lambda criteria=criteria: service.optimize_by_criteria(queue, criteria),
+            iterations, info=info
+        ))
+    operations = [operation for operation, _ in queue]
+    timings.append(await measure(
+        "schedule.completion_times", lambda: service.calculate_completion_times(operations), iterations, info=info
+    ))
+
+    now = datetime.utcnow().replace(microsecond=0)
+    horizon = now + timedelta(days=settings.reschedule_horizon_days)
+    gaps = downtime_gaps(now, horizon)
+    timings.append(await measure(
+        "reschedule.intervals", lambda: available_intervals(work_center_id, now, horizon, gaps), iterations,
+        info={"days": settings.reschedule_horizon_days, "gaps": len(gaps)}
+    ))
+    intervals = available_intervals(work_center_id, now, horizon, gaps)
+
+    def place_queue():
+        index, cursor = 0, now
+        for operation in operations:
+            _, _, index, cursor = place(intervals, index, cursor, float(operation.norma))
+
+    timings.append(await measure("reschedule.place_queue", place_queue, iterations, info=info))
+    return timings
+
+
+async def main(args: argparse.Namespace):
+    profile = profile_from_arguments(args)
+    rows = generate_plant(profile, seed=args.seed)
+    print(f"🧮 Algorithm benchmarks on {len(rows)} operations ({profile.work_centers} work centers)")
+    timings = await run(rows, args.iterations)
+    if args.output:
+        write_results(results_document("algorithms", profile.to_dict(), args.seed, timings), args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scheduling and plan import algorithms in memory")
+    add_profile_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
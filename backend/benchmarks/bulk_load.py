@@ -0,0 +1,133 @@
+"""
+Bulk load benchmark: ORM bulk_create vs COPY + merge
+
+Inserts the same synthetic products and work orders once through
+BaseRepository.bulk_create and once through BulkLoader, each inside a
+transaction that is rolled back, so the database is left as it was.
+
+Usage (from backend/):
+    python -m benchmarks.bulk_load [--rows 100000] [--skip-orm] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+
+from app.database.bulk_loader import BulkLoader
+from app.database.connection import AsyncSessionLocal, engine
+from app.database.models import Product, WorkOrder
+from app.repositories.base import BaseRepository
+
+
+def generate_rows(count: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Synthetic products and one work order per product, with keys unique to this run"""
+    run = uuid.uuid4().hex[:8]
+    today = date.today()
+    products, work_orders = [], []
+    for i in range(count):
+        kpl = f"B{run}{i:07d}"
+        products.append({"kpl": kpl, "name": f"Benchmark product {i}", "description": None, "is_active": True})
+        work_orders.append({
+            "rn": f"{kpl}-1",
+            "kpl": kpl,
+            "quantity": 1 + i % 20,
+            "priority_level": i % 4,
+            "datum_isporuke": today + timedelta(days=i % 90),
+            "datum_sastavljanja": None,
+            "datum_treci": None,
+            "status": "pending",
+        })
+    return {"products": products, "work_orders": work_orders}
+
+
+async def run_orm(rows: Dict[str, List[Dict[str, Any]]]) -> Dict[str, float]:
+    """BaseRepository.bulk_create for products, then work orders"""
+    async with AsyncSessionLocal() as session:
+        try:
+            started = time.perf_counter()
+            products = await BaseRepository(Product, session).bulk_create(rows["products"])
+            products_seconds = time.perf_counter() - started
+
+            product_ids = {product.kpl: product.id for product in products}
+            work_orders = [
+                {**{k: v for k, v in row.items() if k != "kpl"}, "product_id": product_ids[row["kpl"]]}
+                for row in rows["work_orders"]
+            ]
+            started = time.perf_counter()
+            await BaseRepository(WorkOrder, session).bulk_create(work_orders)
+            work_orders_seconds = time.perf_counter() - started
+        finally:
+            await session.rollback()
+
+    return {"products": products_seconds, "work_orders": work_orders_seconds}
+
+
+async def run_copy(rows: Dict[str, List[Dict[str, Any]]]) -> Dict[str, float]:
+    """BulkLoader: COPY into staging tables and merge"""
+    async with AsyncSessionLocal() as session:
+        try:
+            loader = BulkLoader(session)
+            started = time.perf_counter()
+            products = await loader.load_products(rows["products"])
+            products_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            work_orders = await loader.load_work_orders(rows["work_orders"])
+            work_orders_seconds = time.perf_counter() - started
+
+            # Sanity check: every generated row made it in
+            loaded = await session.scalar(
+                select(WorkOrder.id).where(WorkOrder.rn == rows["work_orders"][-1]["rn"])
+            )
+            if products.inserted != len(rows["products"]) or work_orders.inserted != len(rows["work_orders"]) or not loaded:
+                raise RuntimeError(f"Bulk load incomplete: {products}, {work_orders}")
+        finally:
+            await session.rollback()
+
+    return {"products": products_seconds, "work_orders": work_orders_seconds}
+
+
+async def main(count: int, skip_orm: bool, output: str = None):
+    # Keep SQL echo out of the timings
+    engine.echo = False
+    rows = generate_rows(count)
+    print(f"📦 Benchmarking {count} products + {count} work orders")
+
+    results: Dict[str, Any] = {"rows": count, "paths": {}}
+    paths = [("copy", run_copy)] if skip_orm else [("orm", run_orm), ("copy", run_copy)]
+    for name, run in paths:
+        print(f"⏱️  {name}...")
+        timings = await run(rows)
+        total = sum(timings.values())
+        results["paths"][name] = {
+            **{f"{table}_seconds": round(seconds, 3) for table, seconds in timings.items()},
+            "total_seconds": round(total, 3),
+            "rows_per_second": round(2 * count / total),
+        }
+        print(f"  • {name}: {total:.2f}s ({2 * count / total:,.0f} rows/s)")
+
+    if "orm" in results["paths"]:
+        results["speedup"] = round(results["paths"]["orm"]["total_seconds"] / results["paths"]["copy"]["total_seconds"], 1)
+        print(f"🚀 COPY + merge is {results['speedup']}x faster")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {output}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ORM bulk_create with the COPY bulk loader")
+    parser.add_argument("--rows", type=int, default=100_000, help="Products (and work orders) to load")
+    parser.add_argument("--skip-orm", action="store_true", help="Only run the COPY path")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.skip_orm, args.output))
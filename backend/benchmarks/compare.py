@@ -0,0 +1,52 @@
+"""
+Compare two benchmark result files
+
+Prints the median change of every benchmark both files have, and exits
+with status 1 when one got slower than the threshold, so it can gate a
+commit against the results of its parent.
+
+Usage (from backend/):
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> List[Tuple[str, float, float, float]]:
+    """(name, baseline ms, candidate ms, change %) per common benchmark, by median"""
+    rows = []
+    for name, before in baseline["benchmarks"].items():
+        after = candidate["benchmarks"].get(name)
+        if after is None or not before["median_ms"]:
+            continue
+        change = (after["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+        rows.append((name, before["median_ms"], after["median_ms"], change))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Slowdown in percent counted as a regression")
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline.get("profile", {}).get("operations") != candidate.get("profile", {}).get("operations"):
+        print("⚠️  The files were measured on plants of different sizes")
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+
+    regressions = 0
+    for name, before, after, change in compare(baseline, candidate):
+        marker = "❌" if change > args.threshold else "✅" if change < -args.threshold else "  "
+        regressions += change > args.threshold
+        print(f"{marker} {name:40} {before:10.2f} ms {after:10.2f} ms {change:+7.1f}%")
+
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,210 @@
+"""
+Synthetic plant data in the legacy query.xlsx layout
+
+The default profile follows the legacy export (legacy-analysis): about
+4,700 operations of 3,000 work orders (KPL + RN) for 600 products, over nine
+months of delivery dates, with the first work center taking most of the load.
+Counts scale freely; the same profile and seed always give the same rows.
+
+Distributions, per legacy column:
+    KPL        product popularity is Zipf-like: few products repeat a lot
+    RN         work order number, unique per KPL
+    WC/WCNAME  load falls off with work center rank, like SAV100 before G1000
+    NAZIV      a work center's operation vocabulary, with dimensions
+    Norma      log-normal standard minutes (median 24, whole minutes, 1 to 1440)
+    Q / CQ     log-normal quantities; some already partly made
+    Isporuka   delivery dates from two months back to seven months ahead
+    Datum SAS  assembly a few days to three weeks before delivery
+    ZAVRŠETAK MAŠINSKE  machining end a few days before assembly
+    HITNO      mostly 0; 1-3 for a tail of urgent orders
+
+Rows are ready for the plan import (app.services.plan_import), which is how
+the endpoint benchmarks load them. The export can also be written as .xlsx
+(importable with import_plan.py) or as a SQLite table like the legacy
+queryX.db.
+
+Usage (from backend/):
+    python -m benchmarks.data_generator --output plant.xlsx [--operations 4700] [--seed 1]
+"""
+import argparse
+import sqlite3
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Operation names per kind of work center; dimensions are appended
+OPERATION_NAMES = [
+    ["Savijanje", "Savijanje profila", "Savijanje ugla", "Kantovanje"],
+    ["Glodanje", "Glodanje utora", "Bušenje", "Obrada kontura"],
+    ["Rezanje", "Laser rezanje", "Plazma rezanje"],
+    ["Zavarivanje", "Točkasto zavarivanje", "Zavarivanje šava"],
+    ["Farbanje", "Plastifikacija"],
+]
+WORK_CENTER_NAMES = ["Abkant presa", "CNC glodalica", "Laser", "Zavarivanje", "Farbara"]
+
+PRIORITY_LEVELS = [0, 1, 2, 3]
+PRIORITY_WEIGHTS = [0.85, 0.10, 0.04, 0.01]
+
+
+@dataclass
+class PlantProfile:
+    """Counts and shape of a synthetic plant"""
+    work_centers: int = 2
+    products: int = 600
+    work_orders: int = 3000
+    operations: int = 4700
+    # Single-operation work orders pick work centers ~ 1 / rank^skew
+    work_center_skew: float = 2.2
+    product_skew: float = 1.1
+    # Delivery dates from days_back before the reference date to days_ahead after it
+    days_back: int = 60
+    days_ahead: int = 220
+    missing_date_share: float = 0.1
+    started_share: float = 0.15  # work orders with some pieces made already
+    reference_date: Optional[date] = None  # default: today
+    prefix: str = field(default_factory=lambda: "B" + uuid.uuid4().hex[:4].upper())
+
+    def validate(self) -> None:
+        if min(self.work_centers, self.products, self.work_orders) < 1:
+            raise ValueError("A plant needs at least one work center, product and work order")
+        if not self.work_orders <= self.operations <= self.work_orders * self.work_centers:
+            raise ValueError(
+                "Operations must be between the work order count and work orders x work centers "
+                "(one operation per work order and work center)"
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "reference_date": str(self.reference_date or date.today())}
+
+
+def work_center_codes(profile: PlantProfile) -> List[str]:
+    """Codes of the synthetic work centers, unique to the profile's prefix"""
+    return [f"{profile.prefix}-WC{index + 1:02d}" for index in range(profile.work_centers)]
+
+
+def _zipf_weights(count: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+def _excel_serials(dates: pd.Series) -> pd.Series:
+    """Dates as Excel serial numbers, the way the ERP exports them (0 for empty cells)"""
+    serials = (pd.to_datetime(dates) - pd.Timestamp("1899-12-30")).dt.days
+    return serials.fillna(0).astype(np.int64)
+
+
+def generate_plant(profile: Optional[PlantProfile] = None, seed: int = 1) -> pd.DataFrame:
+    """One export row per operation, columns as in query.xlsx"""
+    profile = profile or PlantProfile()
+    profile.validate()
+    rng = np.random.default_rng(seed)
+    today = profile.reference_date or date.today()
+
+    # Work orders: a product each, delivery/assembly/machining dates, priority, quantity
+    orders = pd.DataFrame({
+        "product": rng.choice(profile.products, size=profile.work_orders, p=_zipf_weights(profile.products, profile.product_skew)),
+        "quantity": np.clip(np.round(rng.lognormal(np.log(10), 1.0, profile.work_orders)), 1, 500).astype(np.int64),
+        "priority": rng.choice(PRIORITY_LEVELS, size=profile.work_orders, p=PRIORITY_WEIGHTS),
+    })
+    offsets = rng.integers(-profile.days_back, profile.days_ahead + 1, profile.work_orders)
+    # Urgent orders are due sooner
+    offsets = np.where(orders["priority"] > 0, np.minimum(offsets, rng.integers(0, 21, profile.work_orders)), offsets)
+    delivery = pd.Series(pd.Timestamp(today) + pd.to_timedelta(offsets, unit="D"))
+    assembly = delivery - pd.to_timedelta(rng.integers(3, 22, profile.work_orders), unit="D")
+    machining = assembly - pd.to_timedelta(rng.integers(1, 11, profile.work_orders), unit="D")
+    orders["delivery"] = delivery
+    orders["assembly"] = assembly.where(rng.random(profile.work_orders) >= profile.missing_date_share)
+    orders["machining"] = machining.where(rng.random(profile.work_orders) >= profile.missing_date_share)
+    orders["rn"] = orders.groupby("product").cumcount() + 1
+
+    # Operations: every work order gets one, the rest go to work orders with a work center left
+    operations_per_order = np.ones(profile.work_orders, dtype=np.int64)
+    extra = profile.operations - profile.work_orders
+    while extra > 0:
+        open_orders = np.flatnonzero(operations_per_order < profile.work_centers)
+        picked = rng.choice(open_orders, size=min(extra, len(open_orders)), replace=False)
+        operations_per_order[picked] += 1
+        extra -= len(picked)
+
+    center_weights = _zipf_weights(profile.work_centers, profile.work_center_skew)
+    order_index, work_center = [], []
+    for order, count in enumerate(operations_per_order):
+        order_index.extend([order] * count)
+        work_center.extend(rng.choice(profile.work_centers, size=count, replace=False, p=center_weights))
+    operations = orders.iloc[order_index].reset_index(drop=True)
+    operations["wc"] = np.asarray(work_center)
+
+    vocabulary = [OPERATION_NAMES[wc % len(OPERATION_NAMES)] for wc in range(profile.work_centers)]
+    name_index = rng.integers(0, 16, len(operations))
+    naziv = [
+        f"{vocabulary[wc][index % len(vocabulary[wc])]} {2 + index % 7}mm"
+        for wc, index in zip(operations["wc"], name_index)
+    ]
+    norma = np.clip(np.round(rng.lognormal(np.log(24), 1.1, len(operations))), 1, 1440)
+    started = rng.random(len(operations)) < profile.started_share
+    completed = np.where(
+        started, np.floor(operations["quantity"] * rng.uniform(0.1, 0.9, len(operations))), 0
+    ).astype(np.int64)
+
+    codes = work_center_codes(profile)
+    center_names = [
+        f"{WORK_CENTER_NAMES[wc % len(WORK_CENTER_NAMES)]} {wc + 1}" for wc in range(profile.work_centers)
+    ]
+    return pd.DataFrame({
+        "KPL": [f"{profile.prefix}{product:06d}" for product in operations["product"]],
+        "RN": operations["rn"].astype(np.int64),
+        "NAZIV": naziv,
+        "Norma": norma,
+        "Q": operations["quantity"],
+        "CQ": completed,
+        "WC": [codes[wc] for wc in operations["wc"]],
+        "WCNAME": [center_names[wc] for wc in operations["wc"]],
+        "Isporuka": _excel_serials(operations["delivery"]),
+        "Datum SAS": _excel_serials(operations["assembly"]),
+        "ZAVRŠETAK MAŠINSKE": _excel_serials(operations["machining"]),
+        "HITNO": operations["priority"].astype(np.int64),
+    })
+
+
+def write_export(rows: pd.DataFrame, path: str) -> None:
+    """Write rows as a query.xlsx-style workbook, or as a SQLite 'query' table for .db/.sqlite paths"""
+    if path.endswith((".db", ".sqlite")):
+        with sqlite3.connect(path) as connection:
+            rows.to_sql("query", connection, if_exists="replace", index=False)
+    else:
+        rows.to_excel(path, index=False)
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Plant size and seed options shared by the benchmark scripts"""
+    parser.add_argument("--work-centers", type=int, default=2)
+    parser.add_argument("--products", type=int, default=600)
+    parser.add_argument("--work-orders", type=int, default=3000)
+    parser.add_argument("--operations", type=int, default=4700)
+    parser.add_argument("--prefix", help="KPL and work center code prefix (default: random)")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def profile_from_arguments(args: argparse.Namespace) -> PlantProfile:
+    profile = PlantProfile(
+        work_centers=args.work_centers, products=args.products,
+        work_orders=args.work_orders, operations=args.operations
+    )
+    if args.prefix:
+        profile.prefix = args.prefix
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic plan export")
+    parser.add_argument("--output", required=True, help="Export path: .xlsx, or .db for a SQLite table")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    rows = generate_plant(profile_from_arguments(args), seed=args.seed)
+    write_export(rows, args.output)
+    print(f"✅ {len(rows)} operations of {rows[['KPL', 'RN']].drop_duplicates().shape[0]} work orders written to {args.output}")
@@ -0,0 +1,136 @@
+"""
+Hot endpoint benchmarks against a local PostgreSQL database
+
+Loads a synthetic plant (benchmarks.data_generator) through the plan
+import, with codes under a prefix of its own, then calls the endpoints
+in-process through the ASGI app, so no server needs to run:
+
+    work_orders.list[.cold|.warm]   GET  /api/work-orders/?limit=100
+    work_orders.by_work_center      GET  /api/work-orders/?work_center=...
+    schedule.optimize               POST /api/schedule/optimize
+    schedule.get                    GET  /api/schedule/{wc}
+    machines.stats                  GET  /api/machines/{wc}
+
+Cold runs drop the response cache before every call; warm runs hit it.
+The synthetic rows are deleted afterwards unless --keep is given. Existing
+data stays as it is, so results compare between runs on the same database.
+
+The schema needs PostgreSQL (JSONB, arrays, advisory locks); without a
+database, run benchmarks.algorithms.
+
+Usage (from backend/):
+    python -m benchmarks.endpoints [--operations 4700] [--iterations 20] [--output results.json] [--keep]
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+from sqlalchemy import delete, select
+
+from app.database.connection import AsyncSessionLocal, engine
+from app.database.models import Operation, Product, WorkCenter, WorkOrder
+from app.main import app
+from app.services.plan_import import MissingPolicy, import_plan, normalize_plan_export
+from app.utils.response_cache import response_cache, table_tag
+from benchmarks.data_generator import (
+    PlantProfile, add_profile_arguments, generate_plant, profile_from_arguments, work_center_codes
+)
+from benchmarks.harness import Timing, measure, results_document, write_results
+
+CACHE_TAGS = [table_tag(table) for table in ("work_orders", "operations", "products", "work_centers")]
+
+
+async def load_plant(profile: PlantProfile, seed: int) -> Timing:
+    """Import the synthetic plant; existing operations are kept"""
+    incoming = normalize_plan_export(generate_plant(profile, seed=seed))
+    async with AsyncSessionLocal() as session:
+        started = time.perf_counter()
+        result = await import_plan(session, incoming, missing_policy=MissingPolicy.KEEP)
+        await session.commit()
+        seconds = time.perf_counter() - started
+    print(f"  • load: {result.operations_created} operations in {seconds:.2f}s")
+    return Timing.of("load.import_plan", [seconds * 1000], {
+        "operations": result.operations_created, "work_orders": result.work_orders_created
+    })
+
+
+async def remove_plant(profile: PlantProfile) -> None:
+    """Delete everything the synthetic plant created"""
+    async with AsyncSessionLocal() as session:
+        products = select(Product.id).where(Product.kpl.startswith(profile.prefix))
+        work_orders = select(WorkOrder.id).where(WorkOrder.product_id.in_(products))
+        await session.execute(delete(Operation).where(Operation.work_order_id.in_(work_orders)))
+        await session.execute(delete(WorkOrder).where(WorkOrder.product_id.in_(products)))
+        await session.execute(delete(Product).where(Product.kpl.startswith(profile.prefix)))
+        await session.execute(delete(WorkCenter).where(WorkCenter.code.in_(work_center_codes(profile))))
+        await session.commit()
+    await response_cache.invalidate(*CACHE_TAGS)
+
+
+async def run(profile: PlantProfile, iterations: int) -> List[Timing]:
+    busiest = work_center_codes(profile)[0]
+    timings = []
+
+    async def drop_cache():
+        await response_cache.invalidate(*CACHE_TAGS)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        def call(method: str, url: str, **kwargs):
+            async def request():
+                response = await client.request(method, url, **kwargs)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{method} {url}: {response.status_code} {response.text[:200]}")
+                return response
+            return request
+
+        work_orders = call("GET", "/api/work-orders/", params={"limit": 100})
+        timings.append(await measure("work_orders.list.cold", work_orders, iterations, before=drop_cache))
+        timings.append(await measure("work_orders.list.warm", work_orders, iterations))
+        timings.append(await measure(
+            "work_orders.by_work_center",
+            call("GET", "/api/work-orders/", params={"work_center": busiest, "limit": 100}),
+            iterations, before=drop_cache
+        ))
+        timings.append(await measure(
+            "schedule.optimize",
+            call("POST", "/api/schedule/optimize", json={"work_center": busiest, "criteria": "datum_isporuke"}),
+            iterations
+        ))
+        timings.append(await measure(
+            "schedule.get", call("GET", f"/api/schedule/{busiest}"), iterations, before=drop_cache
+        ))
+        timings.append(await measure(
+            "machines.stats", call("GET", f"/api/machines/{busiest}"), iterations, before=drop_cache
+        ))
+    return timings
+
+
+async def main(args: argparse.Namespace):
+    # Keep SQL echo out of the timings
+    engine.echo = False
+    profile = profile_from_arguments(args)
+    print(f"🌐 Endpoint benchmarks on {args.operations} synthetic operations (prefix {profile.prefix})")
+    timings = [await load_plant(profile, args.seed)]
+    try:
+        timings += await run(profile, args.iterations)
+    finally:
+        if not args.keep:
+            await remove_plant(profile)
+            print("🧹 Synthetic plant removed")
+    if args.output:
+        write_results(results_document("endpoints", profile.to_dict(), args.seed, timings), args.output)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the hot API endpoints on a synthetic plant")
+    add_profile_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--keep", action="store_true", help="Leave the synthetic plant in the database")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,113 @@
+"""
+Timing and result files shared by the benchmarks
+
+A result file records what was measured and where: the git commit, the
+plant profile and seed, and per benchmark the latency distribution over
+its iterations. benchmarks.compare reads two of them.
+"""
+import inspect
+import json
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+RESULTS_VERSION = 1
+
+
+@dataclass
+class Timing:
+    """Latency of one benchmark over its iterations, in milliseconds"""
+    name: str
+    iterations: int
+    mean_ms: float
+    median_ms: float
+    p95_ms: float
+    min_ms: float
+    max_ms: float
+    info: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def of(cls, name: str, samples: List[float], info: Optional[Dict[str, Any]] = None) -> "Timing":
+        ordered = sorted(samples)
+        return cls(
+            name=name,
+            iterations=len(ordered),
+            mean_ms=round(statistics.fmean(ordered), 3),
+            median_ms=round(statistics.median(ordered), 3),
+            p95_ms=round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))], 3),
+            min_ms=round(ordered[0], 3),
+            max_ms=round(ordered[-1], 3),
+            info=info or {},
+        )
+
+
+async def measure(
+    name: str,
+    run: Callable[[], Union[Any, Awaitable[Any]]],
+    iterations: int,
+    warmup: int = 1,
+    before: Optional[Callable[[], Union[Any, Awaitable[Any]]]] = None,
+    info: Optional[Dict[str, Any]] = None
+) -> Timing:
+    """
+    Time run() (sync or async) iterations times after warmup untimed calls.
+    before() runs ahead of every call, outside the timing (e.g. to drop caches).
+    """
+    async def call(function):
+        result = function()
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    for _ in range(warmup):
+        if before is not None:
+            await call(before)
+        await call(run)
+
+    samples = []
+    for _ in range(iterations):
+        if before is not None:
+            await call(before)
+        started = time.perf_counter()
+        await call(run)
+        samples.append((time.perf_counter() - started) * 1000)
+    timing = Timing.of(name, samples, info)
+    print(f"  • {name}: median {timing.median_ms:.2f} ms, p95 {timing.p95_ms:.2f} ms")
+    return timing
+
+
+def git_commit() -> Optional[str]:
+    """Commit the working tree is on, with '-dirty' when it has changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout
+        return f"{commit}-dirty" if dirty.strip() else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def results_document(suite: str, profile: Dict[str, Any], seed: int, timings: List[Timing]) -> Dict[str, Any]:
+    """Result file contents of one suite run"""
+    return {
+        "version": RESULTS_VERSION,
+        "suite": suite,
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "profile": profile,
+        "seed": seed,
+        "benchmarks": {timing.name: asdict(timing) for timing in timings},
+    }
+
+
+def write_results(document: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, default=str)
+    print(f"✅ Results written to {path}")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Export the active production plan to XLSX in the legacy PRINT layout
+
+Usage:
+    python export_plan.py [--output Plan.xlsx] [--work-center SAV100] [--start "2025-06-17 07:00"]
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from app.database.connection import AsyncSessionLocal
+from app.repositories.work_center_registry import work_center_registry
+from app.services.excel_export import write_plan_workbook
+
+
+async def export_plan(output: str, work_center: str = None, start: datetime = None):
+    """Write the plan workbook"""
+    print("📤 Exporting production plan...")
+    
+    work_center_id = None
+    if work_center:
+        async with AsyncSessionLocal() as session:
+            work_center_id = await work_center_registry.resolve_id(session, work_center)
+        if work_center_id is None:
+            print(f"❌ Work center {work_center} not found")
+            return
+    
+    result = await write_plan_workbook(output, work_center_id=work_center_id, start=start)
+    
+    print(f"✅ Wrote {result['rows']} operations across {result['work_centers']} work centers to {result['path']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the production plan to Excel")
+    parser.add_argument("--output", default=f"Plan_{datetime.now():%Y%m%d_%H%M}.xlsx", help="Output .xlsx path")
+    parser.add_argument("--work-center", help="Only this work center code")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Plan start (default: today 07:00)")
+    args = parser.parse_args()
+    
+    asyncio.run(export_plan(args.output, args.work_center, args.start))
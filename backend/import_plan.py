@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Incrementally import an ERP plan export (query.xlsx layout)
+
+Usage:
+    python import_plan.py path/to/query.xlsx [--dry-run] [--missing complete|keep|delete]
+"""
+import argparse
+import asyncio
+
+from app.database.connection import AsyncSessionLocal
+from app.services.plan_import import MissingPolicy, import_plan
+
+
+async def run_import(path: str, missing_policy: MissingPolicy, dry_run: bool = False):
+    """Import one export file"""
+    print(f"🔄 Importing plan from {path}{' (dry run)' if dry_run else ''}...")
+    
+    async with AsyncSessionLocal() as session:
+        try:
+            result = await import_plan(session, path, missing_policy=missing_policy, dry_run=dry_run)
+            if dry_run:
+                await session.rollback()
+            else:
+                await session.commit()
+        except Exception as e:
+            await session.rollback()
+            print(f"❌ Import failed: {e}")
+            raise
+    
+    print(f"📋 Rows read: {result.rows_read}")
+    print(f"🏭 Work centers created: {result.work_centers_created}")
+    print(f"📦 Products created: {result.products_created}")
+    print(f"📝 Work orders created/updated: {result.work_orders_created}/{result.work_orders_updated}")
+    print(f"⚙️  Operations created/updated/closed: "
+          f"{result.operations_created}/{result.operations_updated}/{result.operations_closed}")
+    print(f"⏭️  Operations unchanged: {result.unchanged_operations}")
+    print("⏱️  " + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in result.timings.items()))
+    print("✅ Import completed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import an ERP plan export")
+    parser.add_argument("path", help="Plan export .xlsx")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument(
+        "--missing", type=MissingPolicy, default=MissingPolicy.COMPLETE,
+        help="Active operations absent from the export: complete (default), keep or delete"
+    )
+    args = parser.parse_args()
+    
+    asyncio.run(run_import(args.path, args.missing, args.dry_run))
@@ -1,11 +1,30 @@
 #!/usr/bin/env python3
 """
 Migration script to transfer legacy Excel data from SQLite to PostgreSQL
+
+Rows are streamed from SQLite in batches and written with set-based
+INSERT ... ON CONFLICT statements, one transaction per batch. Every step is
+an upsert, so the script can be re-run at any time; a checkpoint file lets
+an interrupted run continue after the last committed batch.
+
+Mapping (same as the plan import):
+    kpl           -> Product
+    kpl + rn      -> WorkOrder "KPL-RN"
+    kpl + rn + wc -> Operation of that work order on work center wc
+
+Usage:
+    python migrate_legacy_data.py [--batch-size 5000] [--restart]
 """
+import argparse
 import asyncio
 import sqlite3
-from datetime import datetime
+import time
+from datetime import date
 from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.database.connection import AsyncSessionLocal
 from app.database.models import Organization, Plant, WorkCenter, WorkCenterCategory, ProductType, Product, WorkOrder, Operation
@@ -13,7 +32,261 @@ from app.database.models import Organization, Plant, WorkCenter, WorkCenterCateg
 # Legacy SQLite database path
 LEGACY_DB_PATH = Path(__file__).parent.parent / "legacy-analysis" / "queryX.db"
 
-async def migrate_legacy_data():
+# Last committed SQLite row id of an interrupted run
+CHECKPOINT_PATH = Path(__file__).parent / ".migrate_legacy_checkpoint"
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Rows per INSERT statement; keeps bind parameters under asyncpg's 32767 limit
+STATEMENT_ROWS = 2000
+
+CATEGORIES = [
+    {
+        "category_code": "PRESS",
+        "category_name": "Press Operations",
+        "description": "Press brake and forming operations",
+        "default_setup_time_minutes": 30,
+    },
+    {
+        "category_code": "MILL",
+        "category_name": "Milling Operations",
+        "description": "CNC milling and machining operations",
+        "default_setup_time_minutes": 45,
+    },
+]
+
+# Work centers with known specifications; every other legacy code gets defaults
+KNOWN_WORK_CENTERS = {
+    "SAV100": {
+        "category": "PRESS",
+        "name": "Press Brake SAV100",
+        "description": "Press brake operations",
+        "capacity_hours_per_day": 8,
+        "setup_time_minutes": 30,
+        "cost_per_hour": 50.00,
+    },
+    "G1000": {
+        "category": "MILL",
+        "name": "CNC Mill G1000",
+        "description": "CNC milling operations",
+        "capacity_hours_per_day": 16,
+        "setup_time_minutes": 45,
+        "cost_per_hour": 75.00,
+    },
+}
+
+LEGACY_COLUMNS = "id, kpl, rn, naziv, norma, quantity, cq, wc, hitno, datum_isporuke, datum_sastavljanja, zavrsetak_masinske"
+
+
+def _date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value[:10]) if value else None
+
+
+def _chunks(records: List[Dict[str, Any]], size: int = STATEMENT_ROWS):
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+def _read_checkpoint() -> int:
+    try:
+        return int(CHECKPOINT_PATH.read_text().strip())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_checkpoint(last_id: int) -> None:
+    CHECKPOINT_PATH.write_text(str(last_id))
+
+
+async def _upsert_reference_data(session, sqlite_conn) -> Dict[str, int]:
+    """Organization, plant, categories, product type and work centers; returns wc code -> id"""
+    org_stmt = pg_insert(Organization).values(code="KEKEISEN", name="Kekeisen Manufacturing")
+    org_id = (await session.execute(
+        org_stmt.on_conflict_do_update(index_elements=[Organization.code], set_={"name": org_stmt.excluded.name})
+        .returning(Organization.id)
+    )).scalar_one()
+    
+    plant_stmt = pg_insert(Plant).values(
+        organization_id=org_id, code="MAIN", name="Main Manufacturing Plant", location="Main Factory", is_active=True
+    )
+    plant_id = (await session.execute(
+        plant_stmt.on_conflict_do_update(
+            index_elements=[Plant.organization_id, Plant.code], set_={"name": plant_stmt.excluded.name}
+        ).returning(Plant.id)
+    )).scalar_one()
+    print("✅ Organization and plant ready")
+    
+    category_stmt = pg_insert(WorkCenterCategory).values(CATEGORIES)
+    category_rows = await session.execute(
+        category_stmt.on_conflict_do_update(
+            index_elements=[WorkCenterCategory.category_code],
+            set_={"category_name": category_stmt.excluded.category_name}
+        ).returning(WorkCenterCategory.category_code, WorkCenterCategory.id)
+    )
+    category_ids = dict(category_rows.fetchall())
+    
+    await session.execute(
+        pg_insert(ProductType).values(
+            type_code="FRAME",
+            type_name="Frame Components",
+            description="Frame and structural components",
+            can_have_children=True,
+            sort_order=1
+        ).on_conflict_do_nothing(index_elements=[ProductType.type_code])
+    )
+    
+    # Every work center the legacy data uses, not just the known ones
+    legacy_centers = sqlite_conn.execute(
+        "SELECT wc, MAX(wcname) AS wcname FROM work_orders WHERE wc IS NOT NULL GROUP BY wc"
+    ).fetchall()
+    rows = []
+    for center in legacy_centers:
+        code = str(center["wc"]).strip()
+        known = KNOWN_WORK_CENTERS.get(code, {})
+        rows.append({
+            "plant_id": plant_id,
+            "category_id": category_ids.get(known.get("category")),
+            "code": code,
+            "name": known.get("name") or (center["wcname"] or code)[:200],
+            "description": known.get("description"),
+            "capacity_hours_per_day": known.get("capacity_hours_per_day", 8),
+            "setup_time_minutes": known.get("setup_time_minutes", 0),
+            "cost_per_hour": known.get("cost_per_hour"),
+            "is_active": True,
+        })
+    
+    work_center_ids: Dict[str, int] = {}
+    if rows:
+        # Existing work centers keep whatever was configured since the last run
+        await session.execute(
+            pg_insert(WorkCenter).values(rows).on_conflict_do_nothing(
+                index_elements=[WorkCenter.plant_id, WorkCenter.code]
+            )
+        )
+        found = await session.execute(
+            select(WorkCenter.code, WorkCenter.id).where(
+                WorkCenter.plant_id == plant_id,
+                WorkCenter.code.in_([row["code"] for row in rows])
+            )
+        )
+        work_center_ids = dict(found.fetchall())
+    print(f"✅ {len(work_center_ids)} work centers ready")
+    
+    await session.commit()
+    return work_center_ids
+
+
+async def _product_ids(session, batch: List[sqlite3.Row], known: Dict[str, int]) -> int:
+    """Insert the batch's unseen products and add their ids to known; returns how many were new"""
+    names: Dict[str, str] = {}
+    for row in batch:
+        kpl = str(row["kpl"])
+        if kpl not in known and kpl not in names:
+            names[kpl] = (row["naziv"] or f"Product {kpl}")[:200]
+    if not names:
+        return 0
+    
+    records = [
+        {"kpl": kpl, "name": name, "description": f"Product {kpl}", "is_active": True}
+        for kpl, name in names.items()
+    ]
+    created = 0
+    for chunk in _chunks(records):
+        inserted = await session.execute(
+            pg_insert(Product).values(chunk).on_conflict_do_nothing(index_elements=[Product.kpl]).returning(Product.id)
+        )
+        created += len(inserted.fetchall())
+    
+    found = await session.execute(select(Product.kpl, Product.id).where(Product.kpl.in_(list(names))))
+    known.update(found.fetchall())
+    return created
+
+
+async def _upsert_work_orders(session, batch: List[sqlite3.Row], product_ids: Dict[str, int]) -> Dict[str, Any]:
+    """Upsert the batch's work orders by rn; returns rn -> id and the number inserted"""
+    records: Dict[str, Dict[str, Any]] = {}
+    for row in batch:
+        kpl = str(row["kpl"])
+        rn = f"{kpl}-{row['rn']}"
+        # A statement may touch each row once; later legacy rows win
+        records[rn] = {
+            "rn": rn,
+            "product_id": product_ids[kpl],
+            "quantity": row["quantity"] or 1,
+            "priority_level": row["hitno"] or 3,
+            "datum_isporuke": _date(row["datum_isporuke"]),
+            "datum_sastavljanja": _date(row["datum_sastavljanja"]),
+            "datum_treci": _date(row["zavrsetak_masinske"]),
+            "status": "pending",
+        }
+    
+    ids, created = {}, 0
+    for chunk in _chunks(list(records.values())):
+        stmt = pg_insert(WorkOrder).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkOrder.rn],
+            set_={
+                "quantity": stmt.excluded.quantity,
+                "priority_level": stmt.excluded.priority_level,
+                "datum_isporuke": stmt.excluded.datum_isporuke,
+                "datum_sastavljanja": stmt.excluded.datum_sastavljanja,
+                "datum_treci": stmt.excluded.datum_treci,
+                "updated_at": func.timezone("utc", func.now()),
+            }
+        ).returning(WorkOrder.rn, WorkOrder.id, literal_column("xmax = 0"))
+        for rn, id, inserted in (await session.execute(stmt)).fetchall():
+            ids[rn] = id
+            created += bool(inserted)
+    return {"ids": ids, "created": created}
+
+
+async def _upsert_operations(
+    session,
+    batch: List[sqlite3.Row],
+    work_order_ids: Dict[str, int],
+    work_center_ids: Dict[str, int],
+    next_sequence: Dict[int, int]
+) -> int:
+    """Upsert the batch's operations by (work order, work center); returns the number inserted"""
+    records: Dict[tuple, Dict[str, Any]] = {}
+    for row in batch:
+        work_center_id = work_center_ids.get(str(row["wc"]).strip()) if row["wc"] else None
+        if work_center_id is None:
+            continue
+        work_order_id = work_order_ids[f"{row['kpl']}-{row['rn']}"]
+        key = (work_order_id, work_center_id)
+        if key not in records:
+            # Legacy row order is the plan order of each work center
+            next_sequence[work_center_id] = next_sequence.get(work_center_id, 0) + 1
+        records[key] = {
+            "work_order_id": work_order_id,
+            "work_center_id": work_center_id,
+            "operation_sequence": next_sequence[work_center_id],
+            "naziv": (row["naziv"] or f"Operation {row['rn']}")[:200],
+            "norma": float(row["norma"]) if row["norma"] else 0.0,
+            "quantity": row["quantity"] or 1,
+            "quantity_completed": row["cq"] or 0,
+            "status": "pending",
+        }
+    # Sequence and status of existing operations are left alone: planners own them
+    created = 0
+    for chunk in _chunks(list(records.values())):
+        stmt = pg_insert(Operation).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Operation.work_order_id, Operation.work_center_id],
+            set_={
+                "naziv": stmt.excluded.naziv,
+                "norma": stmt.excluded.norma,
+                "quantity": stmt.excluded.quantity,
+                "quantity_completed": stmt.excluded.quantity_completed,
+                "updated_at": func.timezone("utc", func.now()),
+            }
+        ).returning(literal_column("xmax = 0"))
+        created += sum(bool(inserted) for inserted, in (await session.execute(stmt)).fetchall())
+    return created
+
+
+async def migrate_legacy_data(batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False):
     """Migrate legacy data from SQLite to PostgreSQL"""
     print("🔄 Starting legacy data migration...")
     
@@ -25,217 +298,86 @@ async def migrate_legacy_data():
     sqlite_conn = sqlite3.connect(LEGACY_DB_PATH)
     sqlite_conn.row_factory = sqlite3.Row
     
+    start_after = 0 if restart else _read_checkpoint()
+    if start_after:
+        print(f"ℹ️  Resuming after legacy row {start_after} (use --restart to start over)")
+    
     async with AsyncSessionLocal() as session:
         try:
-            # Step 1: Create base organization and plant
-            print("📋 Creating base organization and plant...")
+            # Step 1: Reference data
+            print("📋 Upserting organization, plant, categories and work centers...")
+            work_center_ids = await _upsert_reference_data(session, sqlite_conn)
             
-            # Check if organization already exists
-            from sqlalchemy import select
-            org_result = await session.execute(
-                select(Organization).where(Organization.code == "KEKEISEN")
+            sequences = await session.execute(
+                select(Operation.work_center_id, func.max(Operation.operation_sequence))
+                .group_by(Operation.work_center_id)
             )
-            org = org_result.scalar_one_or_none()
+            next_sequence = {work_center_id: value or 0 for work_center_id, value in sequences.fetchall()}
             
-            if org is None:
-                org = Organization(
-                    code="KEKEISEN",
-                    name="Kekeisen Manufacturing"
-                )
-                session.add(org)
-                await session.flush()
-                print("✅ Created organization")
-            else:
-                print("ℹ️  Organization already exists")
+            # Step 2: Stream legacy rows in batches, one transaction per batch
+            total = sqlite_conn.execute(
+                "SELECT COUNT(*) FROM work_orders WHERE kpl IS NOT NULL AND id > ?", (start_after,)
+            ).fetchone()[0]
+            print(f"🔄 Migrating {total} legacy rows in batches of {batch_size}...")
             
-            # Check if plant already exists
-            plant_result = await session.execute(
-                select(Plant).where(Plant.code == "MAIN", Plant.organization_id == org.id)
+            cursor = sqlite_conn.execute(
+                f"SELECT {LEGACY_COLUMNS} FROM work_orders WHERE kpl IS NOT NULL AND id > ? ORDER BY id",
+                (start_after,)
             )
-            plant = plant_result.scalar_one_or_none()
-            
-            if plant is None:
-                plant = Plant(
-                    organization_id=org.id,
-                    code="MAIN",
-                    name="Main Manufacturing Plant",
-                    location="Main Factory",
-                    is_active=True
-                )
-                session.add(plant)
-                await session.flush()
-                print("✅ Created plant")
-            else:
-                print("ℹ️  Plant already exists")
             
-            # Step 2: Create work center categories
-            print("🏭 Creating work center categories...")
-            press_category = WorkCenterCategory(
-                category_code="PRESS",
-                category_name="Press Operations",
-                description="Press brake and forming operations",
-                default_setup_time_minutes=30
-            )
-            mill_category = WorkCenterCategory(
-                category_code="MILL",
-                category_name="Milling Operations", 
-                description="CNC milling and machining operations",
-                default_setup_time_minutes=45
-            )
-            session.add_all([press_category, mill_category])
-            await session.flush()
+            product_ids: Dict[str, int] = {}
+            counts = {"rows": 0, "products": 0, "work_orders": 0, "operations": 0, "skipped": 0}
+            started = time.perf_counter()
             
-            # Step 3: Create work centers
-            print("⚙️  Creating work centers...")
-            work_centers = {
-                "SAV100": WorkCenter(
-                    plant_id=plant.id,
-                    category_id=press_category.id,
-                    code="SAV100",
-                    name="Press Brake SAV100",
-                    description="Press brake operations",
-                    capacity_hours_per_day=8,
-                    setup_time_minutes=30,
-                    cost_per_hour=50.00,
-                    is_active=True
-                ),
-                "G1000": WorkCenter(
-                    plant_id=plant.id,
-                    category_id=mill_category.id,
-                    code="G1000",
-                    name="CNC Mill G1000",
-                    description="CNC milling operations",
-                    capacity_hours_per_day=16,
-                    setup_time_minutes=45,
-                    cost_per_hour=75.00,
-                    is_active=True
-                )
-            }
-            
-            for wc in work_centers.values():
-                session.add(wc)
-            await session.flush()
-            
-            # Step 4: Create product types
-            print("📦 Creating product types...")
-            frame_type = ProductType(
-                type_code="FRAME",
-                type_name="Frame Components",
-                description="Frame and structural components",
-                can_have_children=True,
-                sort_order=1
-            )
-            session.add(frame_type)
-            await session.flush()
-            
-            # Step 5: Migrate products and work orders
-            print("🔄 Migrating products and work orders...")
-            
-            # Get unique products from SQLite
-            cursor = sqlite_conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT kpl, naziv, hitno 
-                FROM work_orders 
-                WHERE kpl IS NOT NULL 
-                ORDER BY kpl
-            """)
-            
-            products = {}
-            for row in cursor.fetchall():
-                kpl = str(row['kpl'])
-                naziv = row['naziv'] or f"Product {kpl}"
-                priority = row['hitno'] or 3
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
                 
-                product = Product(
-                    type_id=frame_type.id,
-                    kpl=kpl,
-                    name=naziv[:200],  # Limit name length
-                    description=f"Product {kpl}",
-                    priority_level=min(priority, 3),
-                    is_active=True
+                counts["products"] += await _product_ids(session, batch, product_ids)
+                work_orders = await _upsert_work_orders(session, batch, product_ids)
+                counts["work_orders"] += work_orders["created"]
+                counts["operations"] += await _upsert_operations(
+                    session, batch, work_orders["ids"], work_center_ids, next_sequence
                 )
-                products[kpl] = product
-                session.add(product)
-            
-            await session.flush()
-            print(f"✅ Created {len(products)} products")
-            
-            # Step 6: Migrate operations
-            print("🔧 Migrating operations...")
-            
-            cursor.execute("""
-                SELECT * FROM work_orders ORDER BY kpl, rn
-            """)
-            
-            operations_created = 0
-            work_orders_created = 0
-            current_work_order = None
-            
-            for row in cursor.fetchall():
-                kpl = str(row['kpl'])
-                if kpl not in products:
-                    continue
-                
-                # Create work order if it doesn't exist for this product
-                if current_work_order is None or current_work_order.product_id != products[kpl].id:
-                    work_order = WorkOrder(
-                        product_id=products[kpl].id,
-                        rn=f"WO-{kpl}",
-                        quantity=row['quantity'] or 1,
-                        priority_level=row['hitno'] or 3,
-                        datum_isporuke=datetime.strptime(row['datum_isporuke'], '%Y-%m-%d').date() if row['datum_isporuke'] else None,
-                        datum_sastavljanja=datetime.strptime(row['datum_sastavljanja'], '%Y-%m-%d').date() if row['datum_sastavljanja'] else None,
-                        datum_treci=datetime.strptime(row['zavrsetak_masinske'], '%Y-%m-%d').date() if row['zavrsetak_masinske'] else None,
-                        status="pending",
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow()
-                    )
-                    session.add(work_order)
-                    await session.flush()
-                    current_work_order = work_order
-                    work_orders_created += 1
+                counts["skipped"] += sum(1 for row in batch if not row["wc"])
+                await session.commit()
+                _write_checkpoint(batch[-1]["id"])
                 
-                # Create operation
-                wc_code = row['wc'] or 'SAV100'
-                if wc_code not in work_centers:
-                    wc_code = 'SAV100'  # Default fallback
-                
-                operation = Operation(
-                    work_order_id=current_work_order.id,
-                    work_center_id=work_centers[wc_code].id,
-                    operation_sequence=row['rn'] or operations_created + 1,
-                    naziv=row['naziv'] or f"Operation {row['rn']}",
-                    norma=float(row['norma']) if row['norma'] else 0.0,
-                    quantity=row['quantity'] or 1,
-                    quantity_completed=row['cq'] or 0,
-                    status="pending",
-                    estimated_start_time=datetime.utcnow(),
-                    estimated_completion_time=datetime.utcnow()
+                counts["rows"] += len(batch)
+                elapsed = time.perf_counter() - started
+                print(
+                    f"  • {counts['rows']}/{total} rows "
+                    f"({counts['rows'] / total:.0%}, {counts['rows'] / elapsed:,.0f} rows/s)"
                 )
-                session.add(operation)
-                operations_created += 1
             
-            await session.commit()
-            print(f"✅ Created {work_orders_created} work orders")
-            print(f"✅ Created {operations_created} operations")
+            CHECKPOINT_PATH.unlink(missing_ok=True)
+            elapsed = time.perf_counter() - started
             
-            # Step 7: Display migration summary
+            # Step 3: Display migration summary
             print("\n📊 Migration Summary:")
-            print(f"  • Organization: {org.name}")
-            print(f"  • Plant: {plant.name}")
-            print(f"  • Work Centers: {len(work_centers)}")
-            print(f"  • Products: {len(products)}")
-            print(f"  • Work Orders: {work_orders_created}")
-            print(f"  • Operations: {operations_created}")
+            print(f"  • Legacy rows: {counts['rows']} in {elapsed:.1f}s")
+            print(f"  • Work Centers: {len(work_center_ids)}")
+            print(f"  • Products created: {counts['products']}")
+            print(f"  • Work Orders created: {counts['work_orders']}")
+            print(f"  • Operations created: {counts['operations']}")
+            if counts["skipped"]:
+                print(f"  • Rows without work center skipped: {counts['skipped']}")
             
             print("\n✅ Legacy data migration completed successfully!")
-            
+        
         except Exception as e:
             print(f"❌ Migration failed: {e}")
+            print("ℹ️  Committed batches are kept; run again to continue from the checkpoint")
             await session.rollback()
             raise
         finally:
             sqlite_conn.close()
 
 if __name__ == "__main__":
-    asyncio.run(migrate_legacy_data())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Migrate the legacy SQLite data to PostgreSQL")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Legacy rows per transaction")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first row")
+    args = parser.parse_args()
+    
+    asyncio.run(migrate_legacy_data(args.batch_size, args.restart))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Snapshot or rebuild the operation_states projection of the operation event log
+
+Usage:
+    python rebuild_projection.py --status
+    python rebuild_projection.py --snapshot
+    python rebuild_projection.py [--full]
+"""
+import argparse
+import asyncio
+
+from app.services.operation_projection import take_snapshot, rebuild_projection, get_projection_status
+
+
+async def run(snapshot: bool = False, full: bool = False, status: bool = False):
+    """Run the requested projection maintenance"""
+    if status:
+        info = await get_projection_status()
+        print(f"📊 {info['rows']} operation states, last event {info['last_event_id']}")
+        if info["snapshot"]:
+            print(f"  • Snapshot {info['snapshot']['id']} up to event {info['snapshot']['event_horizon']} "
+                  f"({info['snapshot']['created_at']:%Y-%m-%d %H:%M})")
+        print(f"  • {info['events_since_snapshot']} events to replay on rebuild")
+        return
+    
+    if snapshot:
+        result = await take_snapshot()
+        if result is None:
+            print("✅ No events since the last snapshot")
+        else:
+            print(f"✅ Snapshot {result.snapshot_id}: {result.row_count} rows up to event "
+                  f"{result.event_horizon} ({result.seconds:.1f}s, {result.pruned} old snapshots pruned)")
+        return
+    
+    print("🔁 Rebuilding operation states" + (" from the whole log..." if full else " from the newest snapshot..."))
+    result = await rebuild_projection(use_snapshot=not full)
+    print(f"✅ Restored {result.restored_rows} rows, replayed {result.replayed_events} events into "
+          f"{result.updated_rows} rows ({result.seconds:.1f}s)")
+    if result.skipped_events:
+        print(f"⚠️  Skipped {result.skipped_events} events of operations that no longer exist")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the operation_states projection")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--snapshot", action="store_true", help="Take a snapshot")
+    group.add_argument("--full", action="store_true", help="Rebuild by replaying the whole log")
+    group.add_argument("--status", action="store_true", help="Show projection and snapshot state")
+    args = parser.parse_args()
+    
+    asyncio.run(run(args.snapshot, args.full, args.status))
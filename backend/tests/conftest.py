@@ -0,0 +1,81 @@
+"""
+Shared fixtures
+
+Tests that need PostgreSQL run against TEST_DATABASE_URL, a migrated
+database (alembic upgrade head), and are skipped when it is not set. Every
+test runs in a transaction that is rolled back afterwards, so the database
+is left as it was; commits inside a test only release a savepoint.
+"""
+import os
+import uuid
+from dataclasses import dataclass
+from typing import List
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.database.models import Operation, Organization, Plant, Product, WorkCenter, WorkOrder
+from app.utils.instrumentation import instrument_engine
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest_asyncio.fixture
+async def db_session():
+    """Session on the test database, rolled back after the test"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set (a migrated PostgreSQL database)")
+
+    engine = create_async_engine(TEST_DATABASE_URL)
+    instrument_engine(engine.sync_engine)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await engine.dispose()
+
+
+@dataclass
+class SeededPlant:
+    """Rows created for a test, codes unique to it"""
+    prefix: str
+    product_id: int
+    work_center_codes: List[str]
+    work_order_ids: List[int]
+    operation_ids: List[int]
+
+
+@pytest_asyncio.fixture
+async def seeded_plant(db_session: AsyncSession) -> SeededPlant:
+    """One product on two work centers and twelve work orders, each with an operation on both"""
+    prefix = "T" + uuid.uuid4().hex[:6].upper()
+    organization = Organization(code=prefix, name=f"Test {prefix}")
+    plant = Plant(organization=organization, code=prefix, name=f"Test {prefix}")
+    work_centers = [WorkCenter(plant=plant, code=f"{prefix}-{index}", name=f"Test {index}") for index in (1, 2)]
+    product = Product(kpl=f"{prefix}-KPL", name=f"Test {prefix}")
+    orders = [
+        WorkOrder(rn=f"{prefix}-{index:03d}", product=product, quantity=10, status="pending")
+        for index in range(12)
+    ]
+    operations = [
+        Operation(
+            work_order=order, work_center=work_center, operation_sequence=index + 1,
+            naziv="Savijanje 4mm", norma=24, quantity=10, status="pending"
+        )
+        for work_center in work_centers
+        for index, order in enumerate(orders)
+    ]
+    db_session.add_all([organization, plant, *work_centers, product, *orders, *operations])
+    await db_session.commit()
+    return SeededPlant(
+        prefix=prefix,
+        product_id=product.id,
+        work_center_codes=[work_center.code for work_center in work_centers],
+        work_order_ids=[order.id for order in orders],
+        operation_ids=[operation.id for operation in operations],
+    )
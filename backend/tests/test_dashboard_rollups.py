@@ -0,0 +1,16 @@
+"""
+Work center counters of the dashboard rollups
+"""
+from app.services.dashboard_rollups import WorkCenterRollup
+
+
+def test_work_center_rollup_reports_hours_and_minutes():
+    rollup = WorkCenterRollup()
+    rollup.add("pending", 3, norma_sum=90.0, norma_count=3)
+    rollup.add("completed", 1, norma_sum=30.0, norma_count=1)
+
+    counters = rollup.to_dict()
+
+    assert counters["total_operations"] == 4
+    assert counters["total_hours"] == 2.0
+    assert counters["average_operation_time"] == 30.0
@@ -0,0 +1,55 @@
+"""
+Replay and resync of the push event bus on reconnect
+"""
+import pytest
+
+from app.services.event_bus import EventBus
+
+pytestmark = pytest.mark.asyncio
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+async def test_reconnect_replays_missed_events():
+    bus = EventBus()
+    first = bus.publish("operation.status", {"operation_id": 1})
+    bus.publish("operation.status", {"operation_id": 2})
+    bus.publish("operation.status", {"operation_id": 3})
+
+    events = drain(bus.subscribe(last_event_id=first.stream_id))
+
+    assert [event.data["operation_id"] for event in events] == [2, 3]
+
+
+async def test_reconnect_to_another_process_resyncs():
+    restarted = EventBus()
+    previous = EventBus().publish("operation.status", {"operation_id": 1})
+
+    events = drain(restarted.subscribe(last_event_id=previous.stream_id))
+
+    assert [(event.type, event.data) for event in events] == [("resync", {"reason": "restarted"})]
+
+
+async def test_reconnect_past_the_buffer_resyncs():
+    bus = EventBus(replay_size=2)
+    first = bus.publish("operation.status", {"operation_id": 1})
+    for operation_id in (2, 3, 4):
+        bus.publish("operation.status", {"operation_id": operation_id})
+
+    events = drain(bus.subscribe(last_event_id=first.stream_id))
+
+    assert [(event.type, event.data) for event in events] == [("resync", {"reason": "replay_gap"})]
+
+
+async def test_unknown_or_malformed_ids_resync():
+    bus = EventBus()
+    bus.publish("operation.status", {"operation_id": 1})
+
+    for last_event_id in (f"{bus.epoch}-99", "42", ""):
+        events = drain(bus.subscribe(last_event_id=last_event_id))
+        assert [event.type for event in events] == ["resync"]
@@ -0,0 +1,78 @@
+"""
+The repeated-statement auditor (settings.query_audit) and the set-based
+write paths it guards
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.database.connection import settings
+from app.repositories.operation import OperationRepository
+from app.services.operation_events import OperationEventWriter, ShopFloorEvent
+from app.services.status_transitions import transition_work_orders
+from app.utils.instrumentation import RepeatedQueryError, audit_queries, current_trace, instrument_engine, statement_shape
+
+THRESHOLD = 5
+
+
+@pytest.fixture
+def raising_audit(monkeypatch):
+    """query_audit = "raise" with a threshold the seeded plant exceeds"""
+    monkeypatch.setattr(settings, "query_audit", "raise")
+    monkeypatch.setattr(settings, "n_plus_one_threshold", THRESHOLD)
+
+
+def test_statement_shape_collapses_parameters_and_in_lists():
+    assert statement_shape("SELECT * FROM operations WHERE id IN ($1, $2, $3)") == \
+        statement_shape("SELECT * FROM operations WHERE id IN ($1)")
+    assert statement_shape("SELECT * FROM work_orders WHERE id = $1::INTEGER") == \
+        "SELECT * FROM work_orders WHERE id = ?::INTEGER"
+
+
+def test_audit_raises_on_repeated_statement(raising_audit):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with engine.connect() as connection, audit_queries("sqlite loop"):
+        for value in range(THRESHOLD - 1):
+            connection.execute(text("SELECT :value"), {"value": value})
+        with pytest.raises(RepeatedQueryError):
+            connection.execute(text("SELECT :value"), {"value": THRESHOLD})
+
+
+@pytest.mark.asyncio
+async def test_audit_catches_per_row_repository_lookups(db_session, seeded_plant, raising_audit):
+    repository = OperationRepository(db_session)
+    with audit_queries("operation lookups"):
+        with pytest.raises(RepeatedQueryError):
+            for operation_id in seeded_plant.operation_ids:
+                await repository.get_by_id(operation_id)
+
+
+@pytest.mark.asyncio
+async def test_status_batch_runs_set_based(db_session, seeded_plant, raising_audit):
+    with audit_queries("cancel work orders") as trace:
+        result = await transition_work_orders(db_session, seeded_plant.work_order_ids, "cancelled")
+        await db_session.commit()
+
+    assert result.accepted == len(seeded_plant.work_order_ids)
+    assert result.operations == len(seeded_plant.operation_ids)
+    assert not trace.repeated(THRESHOLD)
+
+
+@pytest.mark.asyncio
+async def test_event_writer_batches_run_outside_the_request_trace():
+    writer = OperationEventWriter(window_ms=0)
+    traces = []
+
+    async def commit(events):
+        traces.append(current_trace.get())
+        return [None] * len(events)
+
+    writer._commit = commit
+    try:
+        with audit_queries("shop-floor request"):
+            await writer.submit(ShopFloorEvent(operation_id=1, event_type="status", status="in_progress"))
+        await writer.submit(ShopFloorEvent(operation_id=1, event_type="status", status="completed"))
+    finally:
+        await writer.stop()
+
+    assert traces == [None, None]
@@ -0,0 +1,159 @@
+"""
+EXPLAIN regression tests for the hot repository paths
+
+Each test runs a repository method on the test database, captures the
+statements it actually sends, and EXPLAINs them with their parameters.
+Sequential scans are disabled for the transaction, so the planner only
+falls back to one when no index can serve the statement: the plans must
+use the expected index and never scan a hot table sequentially.
+"""
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+
+from app.repositories.counting import CountMode
+from app.repositories.operation import OperationRepository
+from app.repositories.work_center_registry import work_center_registry
+from app.repositories.work_order import WorkOrderRepository
+from app.repositories.work_order_summary import WorkOrderSummaryRepository
+
+BULK_WORK_ORDERS = 4000
+HOT_TABLES = {"work_orders", "operations", "products", "work_order_summaries"}
+
+pytestmark = pytest.mark.asyncio
+
+
+@contextmanager
+def captured_selects(session) -> Iterator[List[Tuple[str, Any]]]:
+    """SELECT statements (with their driver parameters) the session sends inside the block"""
+    statements: List[Tuple[str, Any]] = []
+    engine = session.bind.sync_engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def _walk(plan: Dict[str, Any], nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    nodes.append(plan)
+    for child in plan.get("Plans", []):
+        _walk(child, nodes)
+    return nodes
+
+
+async def explain_captured(session, statements: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    """Plan nodes of every captured statement"""
+    assert statements, "the repository method sent no SELECT"
+    connection = await session.connection()
+    nodes: List[Dict[str, Any]] = []
+    for statement, parameters in statements:
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        _walk(plan[0]["Plan"], nodes)
+    return nodes
+
+
+def assert_index_plan(nodes: List[Dict[str, Any]], *expected_indexes: str) -> None:
+    """One of the expected indexes serves the statements and no hot table is scanned sequentially"""
+    used: Set[str] = {node["Index Name"] for node in nodes if "Index Name" in node}
+    seq_scans = {
+        node["Relation Name"] for node in nodes
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in HOT_TABLES
+    }
+    assert used & set(expected_indexes), f"expected one of {expected_indexes}, plans used {sorted(used)}"
+    assert not seq_scans, f"sequential scan on {sorted(seq_scans)}"
+
+
+@pytest_asyncio.fixture
+async def planner(db_session, seeded_plant):
+    """
+    The seeded plant grown to a few thousand mostly finished work orders,
+    with fresh statistics and sequential scans disabled
+    """
+    work_center_registry.invalidate()
+    await db_session.execute(
+        text("""
+            INSERT INTO work_orders (rn, product_id, quantity, priority_level, datum_isporuke, status, created_at, updated_at)
+            SELECT :prefix || '-B' || n, :product_id, 10, n % 5, current_date + (n % 400 - 200),
+                   CASE WHEN n % 20 = 0 THEN 'pending' WHEN n % 20 = 1 THEN 'in_progress' ELSE 'completed' END,
+                   now(), now() - n * interval '1 minute'
+            FROM generate_series(1, :count) AS n
+        """),
+        {"prefix": seeded_plant.prefix, "product_id": seeded_plant.product_id, "count": BULK_WORK_ORDERS}
+    )
+    await db_session.execute(
+        text("""
+            INSERT INTO operations (work_order_id, work_center_id, operation_sequence, naziv, norma, quantity,
+                                    quantity_completed, actual_minutes, status, created_at, updated_at)
+            SELECT work_orders.id, work_centers.id, row_number() OVER (PARTITION BY work_centers.id ORDER BY work_orders.id),
+                   'Savijanje 4mm', 24, 10, 0, 0, work_orders.status, now(), now()
+            FROM work_orders
+            JOIN work_centers ON work_centers.code LIKE :prefix || '-%'
+            WHERE work_orders.rn LIKE :prefix || '-B%'
+        """),
+        {"prefix": seeded_plant.prefix}
+    )
+    await db_session.execute(text("ANALYZE work_orders, operations, products, work_order_summaries"))
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    return db_session
+
+
+async def test_work_orders_by_status(planner):
+    with captured_selects(planner) as statements:
+        await WorkOrderRepository(planner).get_by_status("in_progress")
+    assert_index_plan(await explain_captured(planner, statements), "ix_work_orders_status")
+
+
+async def test_overdue_work_orders(planner):
+    with captured_selects(planner) as statements:
+        await WorkOrderRepository(planner).get_overdue_orders()
+    assert_index_plan(await explain_captured(planner, statements), "ix_work_orders_active_delivery")
+
+
+async def test_recent_work_orders(planner):
+    with captured_selects(planner) as statements:
+        await WorkOrderRepository(planner).get_recent_work_orders()
+    assert_index_plan(await explain_captured(planner, statements), "ix_work_orders_updated_at")
+
+
+async def test_work_order_list_ordering(planner):
+    with captured_selects(planner) as statements:
+        await WorkOrderRepository(planner).get_work_orders_with_filters(count_mode=CountMode.NONE)
+    assert_index_plan(await explain_captured(planner, statements), "ix_work_orders_priority_delivery")
+
+
+async def test_work_order_summaries_by_work_center(planner, seeded_plant):
+    with captured_selects(planner) as statements:
+        await WorkOrderSummaryRepository(planner).get_work_orders_with_filters(
+            work_center=seeded_plant.work_center_codes[0], count_mode=CountMode.EXACT
+        )
+    assert_index_plan(await explain_captured(planner, statements), "ix_work_order_summaries_work_center_codes")
+
+
+async def test_scheduling_queue(planner, seeded_plant):
+    with captured_selects(planner) as statements:
+        await OperationRepository(planner).get_operations_for_scheduling(seeded_plant.work_center_codes[0])
+    # Either index built for the queue is fine: which one wins depends on how many rows are active
+    assert_index_plan(
+        await explain_captured(planner, statements),
+        "ix_operations_active_work_center_sequence", "ix_operations_work_center_status"
+    )
+
+
+async def test_work_order_search(planner, seeded_plant):
+    if not await planner.scalar(text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")):
+        pytest.skip("pg_trgm is not installed")
+    with captured_selects(planner) as statements:
+        await WorkOrderRepository(planner).search_work_orders_ranked(seeded_plant.prefix)
+    assert_index_plan(await explain_captured(planner, statements), "ix_work_orders_rn_prefix")
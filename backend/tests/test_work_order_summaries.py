@@ -0,0 +1,18 @@
+"""
+Work order summaries kept in step with their operations
+"""
+import pytest
+from sqlalchemy import select
+
+from app.database.models import WorkOrderSummary
+
+
+@pytest.mark.asyncio
+async def test_remaining_hours_convert_norma_minutes(db_session, seeded_plant):
+    summary = await db_session.scalar(
+        select(WorkOrderSummary).where(WorkOrderSummary.work_order_id == seeded_plant.work_order_ids[0])
+    )
+
+    # Two pending operations of 24 minutes each
+    assert float(summary.remaining_hours) == pytest.approx(0.8)
+    assert summary.remaining_hours_by_work_center == {code: 0.4 for code in seeded_plant.work_center_codes}